@@ -124,22 +124,34 @@ class Account(AccountBase):
         """
         Get the total balance of a currency
         """
+        stable_currencies = self._exchange.info_get_stable_currencies()
+        equivalents = self._exchange.info_equivalent_stable_currencies()
+        balances = self.get_account_balances()
 
         if not prices:
-            prices = self._market.market_ticker_prices_all_get()
+            # only request the prices the balances need, instead of a listing of every product
+            symbols = set()
+            if currency not in stable_currencies:
+                for stable in stable_currencies:
+                    symbols.add(self._exchange.info_ticker_join(currency, stable))
+            for asset, (balance, available) in balances.items():
+                if asset == currency or balance + available == 0.0:
+                    continue
+                symbols.add(self._exchange.info_ticker_join(asset, currency))
+                if currency in stable_currencies:
+                    for equivalent in equivalents:
+                        symbols.add(self._exchange.info_ticker_join(asset, equivalent))
+            prices = self._market.market_ticker_prices_get(sorted(symbols))
 
         # if currency is for example BTC, we need to first convert it to a stable currency
-        stable_currencies = self._exchange.info_get_stable_currencies()
         currency_stable_price = 1.0
         if currency not in stable_currencies:
             currency_stable_price = 0.0
             for stable in stable_currencies:
                 symbol = self._exchange.info_ticker_join(currency, stable)
-                try:
-                    currency_stable_price = prices[symbol] #self._market.market_ticker_price_get(ticker=symbol)
+                if symbol in prices:
+                    currency_stable_price = prices[symbol]
                     break
-                except NotImplementedError:
-                    continue
 
         if currency_stable_price == 0.0:
             raise ValueError(f'Currency {currency} not found in {stable_currencies}')
@@ -147,16 +159,9 @@ class Account(AccountBase):
         currencies = self._exchange.info_quote_currencies_list()
         if currency not in currencies:
             raise ValueError(f'Currency {currency} not found in {currencies}')
-        try:
-            prices = self._market.market_ticker_prices_all_get()
-        except NotImplementedError:
-            prices = {}
-            for c in currencies:
-                symbol = self._exchange.info_ticker_join(c, currency)
-                prices[symbol] = self._market.market_ticker_price_get(ticker=symbol)
-    
+
         total_balance = 0.0
-        for asset, (balance, available) in self.get_account_balances().items():
+        for asset, (balance, available) in balances.items():
             total = balance + available
             if total == 0.0:
                 continue
@@ -178,7 +183,7 @@ class Account(AccountBase):
                     total_balance += total * prices[symbol]
                 else:
                     # if there is not an existing trade pair, try to convert from an equivalent stable currency
-                    for equivalent in self._exchange.info_equivalent_stable_currencies():
+                    for equivalent in equivalents:
                         symbol = self._exchange.info_ticker_join(asset, equivalent)
                         if symbol in prices:
                             print(f'Converting {asset} to {currency} using {equivalent}')
@@ -95,6 +95,16 @@ class AccountBase(object):
 
     def update_asset_balance(self, asset: str, available: float, hold: float):
         raise NotImplementedError
+
+    def adjust_asset_balance(self, asset: str, available: float, hold: float) -> tuple[float, float]:
+        """
+        Add available and hold to the asset balance, and return the new balance
+        """
+        balance, balance_hold = self.get_asset_balance(asset, round=False)
+        balance += available
+        balance_hold += hold
+        self.update_asset_balance(asset, balance, balance_hold)
+        return self.get_asset_balance(asset, round=False)
     
     def load_symbol_info(self) -> bool:
         raise NotImplementedError
@@ -1,4 +1,6 @@
 # Same as Account class, but simulates account balances
+# The balances are kept as integers in the smallest unit of each asset (fixed-point), so adding and removing amounts
+# never accumulates float error, and the precisions and min sizes come from a SymbolMetaTable compiled once per symbol
 
 from .AccountBase import AccountBase
 from cointrader.exchange.TraderExchangeBase import TraderExchangeBase
@@ -6,6 +8,7 @@ from cointrader.common.SymbolInfo import SymbolInfo
 from cointrader.common.SymbolInfoConfig import SymbolInfoConfig
 from cointrader.common.AssetInfoConfig import AssetInfoConfig
 from cointrader.common.AssetInfo import AssetInfo
+from cointrader.common.SymbolMetaTable import SymbolMetaTable
 from cointrader.market.MarketBase import MarketBase
 
 class AccountSimulate(AccountBase):
@@ -17,92 +20,63 @@ class AccountSimulate(AccountBase):
         if not asset_info:
             asset_info = AssetInfoConfig(exchange=exchange, path=f'config/{name}_asset_info.json')
         super().__init__(exchange=exchange, market=market, symbol_info=symbol_info, asset_info=asset_info, logger=logger)
-        self._balances = {}
+        self._meta = SymbolMetaTable(symbol_info=symbol_info, asset_info=asset_info)
+        # asset -> (available, hold) in units of 10^-precision of the asset
+        self._balances: dict[str, tuple[int, int]] = {}
         self._tickers_info = {}
 
     def get_base_precision(self, symbol: str) -> int:
         """
         Get the base precision
         """
-        try:
-            return self._symbol_info.get_symbol_info(symbol).base_precision
-        except KeyError:
-            return 8
+        return self._meta.symbol(symbol).base_precision
         
     def get_quote_precision(self, symbol: str) -> int:
         """
         Get the quote precision
         """
-        try:
-            return self._symbol_info.get_symbol_info(symbol).quote_precision
-        except KeyError:
-            return 8
+        return self._meta.symbol(symbol).quote_precision
 
     def get_base_min_size(self, symbol: str) -> float:
         """
         Get the base min size
         """
-        try:
-            return self._symbol_info.get_symbol_info(symbol).base_min_size
-        except KeyError:
-            return 0.0
+        return self._meta.symbol(symbol).base_min_size
 
     def get_quote_min_size(self, symbol: str) -> float:
         """
         Get the quote min size
         """
-        try:
-            return self._symbol_info.get_symbol_info(symbol).quote_min_size
-        except KeyError:
-            return 0.0
+        return self._meta.symbol(symbol).quote_min_size
 
     def round_base(self, symbol: str, amount: float) -> float:
         """
         Round the amount to the base precision
         """
-        try:
-            base_precision = self._symbol_info.get_symbol_info(symbol).base_precision
-        except KeyError:
-            base_precision = 8
-
-        amount_str = f"{amount:.{base_precision}f}"
-        #print(f'round_base: {symbol} {amount} -> {amount_str}')
-        return float(amount_str)
+        # round() with digits gives the same result as formatting to the precision and parsing back
+        return round(amount, self._meta.symbol(symbol).base_precision)
 
     def round_quote(self, symbol: str, amount: float) -> float:
         """
         Round the amount to the quote precision
         """
-        try:
-            quote_precision = self._symbol_info.get_symbol_info(symbol).quote_precision
-        except KeyError:
-            quote_precision = 8
-
-        amount_str = f"{amount:.{quote_precision}f}"
-        #print(f'round_quote: {symbol} {amount} -> {amount_str}')
-        return float(amount_str)
+        return round(amount, self._meta.symbol(symbol).quote_precision)
 
     def round_asset(self, asset: str, amount: float) -> float:
         """
         Round the amount to the asset precision
         """
-        asset_precision = 8
-        try:
-            asset_info = self._asset_info.get_asset_info(asset)
-            if asset_info:
-                asset_precision = asset_info.precision
-        except KeyError:
-            pass
-
-        amount_str = f"{amount:.{asset_precision}f}"
-        #print(f'round_asset: {asset} {amount} -> {amount_str} {asset_precision}')
-        return float(amount_str)
+        return round(amount, self._meta.asset(asset).precision)
 
     def get_account_balances(self, round=False) -> dict:
         """
         Get the account balances
         """
-        return self._balances
+        result = {}
+        for asset, (available, hold) in self._balances.items():
+            meta = self._meta.asset(asset)
+            result[asset] = (meta.from_units(available), meta.from_units(hold))
+        return result
 
     def get_total_balance(self, currency : str, prices: dict = None) -> float:
         """
@@ -166,27 +140,31 @@ class AccountSimulate(AccountBase):
 
     def get_asset_balance(self, asset : str, round=False) -> tuple[float, float]:
         """
-        Get the asset balance
+        Get the asset balance, which is always at the asset precision
         """
-        try:
-            balance, hold = self._balances[asset]
-            if balance != 0.0 and round:
-                balance = self.round_asset(asset, balance)
-            if hold != 0.0 and round:
-                hold = self.round_asset(asset, hold)
-            return tuple([balance, hold])
-        except KeyError:
+        units = self._balances.get(asset)
+        if units is None:
             return tuple([0.0, 0.0])
+        meta = self._meta.asset(asset)
+        return tuple([meta.from_units(units[0]), meta.from_units(units[1])])
 
     def update_asset_balance(self, asset, available: float, hold: float):
         """
         Update the asset balance
         """
-        if available != 0.0:
-            available = self.round_asset(asset, available)
-        if hold != 0.0:
-            hold = self.round_asset(asset, hold)
-        self._balances[asset] = tuple([available, hold])
+        meta = self._meta.asset(asset)
+        self._balances[asset] = (meta.to_units(available), meta.to_units(hold))
+
+    def adjust_asset_balance(self, asset: str, available: float, hold: float) -> tuple[float, float]:
+        """
+        Add available and hold to the asset balance, and return the new balance
+        """
+        meta = self._meta.asset(asset)
+        balance, balance_hold = self._balances.get(asset, (0, 0))
+        balance += meta.to_units(available)
+        balance_hold += meta.to_units(hold)
+        self._balances[asset] = (balance, balance_hold)
+        return tuple([meta.from_units(balance), meta.from_units(balance_hold)])
 
     def get_symbol_list(self):
         return self._symbol_info.get_symbol_list()
@@ -203,6 +181,7 @@ class AccountSimulate(AccountBase):
             self.save_symbol_info()
         else:
             self._symbol_info.load()
+        self._meta.clear()
         return True
 
     def save_symbol_info(self):
@@ -229,6 +208,7 @@ class AccountSimulate(AccountBase):
             self.save_asset_info()
         else:
             self._asset_info.load()
+        self._meta.clear()
         return True
 
     def save_asset_info(self) -> bool:
@@ -0,0 +1,145 @@
+# This file contains the BacktestFeed class, which replays klines for multiple symbols in timestamp order.
+# The data is sorted and converted to arrays once up front, so iterating the feed has no per-row pandas overhead.
+from cointrader.common.Kline import Kline
+from cointrader.common.KlineArray import KlineArray
+from cointrader.common.KlineFrame import KlineFrame
+import numpy as np
+
+class BacktestFeed(object):
+    def __init__(self, frame: KlineFrame, symbols: list[str] = None, start_ts: int = None, end_ts: int = None):
+        if symbols is None:
+            symbols = frame.symbols()
+        self._granularity = frame.granularity()
+        self._symbols = [symbol for symbol in symbols if symbol in frame]
+
+        klines = {}
+        for symbol in self._symbols:
+            symbol_klines = frame[symbol]
+            if start_ts is not None or end_ts is not None:
+                symbol_klines = symbol_klines.range(start_ts if start_ts is not None else np.iinfo(np.int64).min,
+                                                    end_ts if end_ts is not None else np.iinfo(np.int64).max)
+            klines[symbol] = symbol_klines
+
+        # merge all symbols into one stream ordered by ts, with ties in the order of the symbols list
+        parts = [klines[symbol] for symbol in self._symbols]
+        symbol_index = np.concatenate([np.full(len(part), i, dtype=np.int32) for i, part in enumerate(parts)] + [np.empty(0, dtype=np.int32)])
+        ts = np.concatenate([part.ts for part in parts] + [np.empty(0, dtype=np.int64)])
+        order = np.lexsort((symbol_index, ts))
+
+        self._symbol_index = symbol_index[order]
+        self._ts = ts[order]
+        self._open = np.concatenate([part.open for part in parts] + [np.empty(0)])[order]
+        self._high = np.concatenate([part.high for part in parts] + [np.empty(0)])[order]
+        self._low = np.concatenate([part.low for part in parts] + [np.empty(0)])[order]
+        self._close = np.concatenate([part.close for part in parts] + [np.empty(0)])[order]
+        self._volume = np.concatenate([part.volume for part in parts] + [np.empty(0)])[order]
+        self._klines: dict[str, KlineArray] = klines
+        self._path = None
+
+    @staticmethod
+    def from_arrays(symbols: list[str], granularity: int, symbol_index, ts, open, high, low, close, volume, path: str = None):
+        """
+        Create a feed from already merged arrays, as returned by arrays(). The arrays are used as is (not copied),
+        so a feed can be rebuilt on top of shared memory without duplicating the data.
+        path is the file the arrays are memory mapped from, if any
+        """
+        feed = BacktestFeed.__new__(BacktestFeed)
+        feed._granularity = granularity
+        feed._symbols = list(symbols)
+        feed._symbol_index = symbol_index
+        feed._ts = ts
+        feed._open = open
+        feed._high = high
+        feed._low = low
+        feed._close = close
+        feed._volume = volume
+        feed._klines = {}
+        feed._path = path
+        return feed
+
+    @staticmethod
+    def from_csv(path: str, granularity: int, symbols: list[str] = None, start_ts: int = None, end_ts: int = None,
+                 date='Date', symbol='Symbol', open='Open', high='High', low='Low', close='Close', volume='Volume USDT',
+                 quote_suffix='USDT', quote_separator='-'):
+        """
+        Load a feed from a Binance style kline CSV (Date, Symbol, Open, High, Low, Close, Volume USDT).
+        Symbols such as BTCUSDT are renamed to BTC-USDT, and rows for other symbols are dropped before the dates are parsed
+        """
+        frame = KlineFrame.from_csv(path, granularity, symbols=symbols, date=date, symbol=symbol, open=open, high=high, low=low,
+                                    close=close, volume=volume, quote_suffix=quote_suffix, quote_separator=quote_separator)
+        return BacktestFeed(frame, symbols=symbols, start_ts=start_ts, end_ts=end_ts)
+
+    def granularity(self) -> int:
+        return self._granularity
+
+    def symbols(self) -> list[str]:
+        return self._symbols
+
+    def path(self) -> str:
+        """
+        Returns the file the feed is memory mapped from, or None if it is in memory
+        """
+        return self._path
+
+    def klines(self, symbol: str) -> KlineArray:
+        """
+        Returns the klines for a single symbol
+        """
+        if symbol not in self._klines:
+            rows = np.flatnonzero(self._symbol_index == self._symbols.index(symbol))
+            self._klines[symbol] = KlineArray(symbol=symbol, granularity=self._granularity, ts=self._ts[rows],
+                                              open=self._open[rows], high=self._high[rows], low=self._low[rows],
+                                              close=self._close[rows], volume=self._volume[rows])
+        return self._klines[symbol]
+
+    def arrays(self) -> tuple:
+        """
+        Returns the merged (symbol_index, ts, open, high, low, close, volume) arrays in the argument order of from_arrays()
+        """
+        return self._symbol_index, self._ts, self._open, self._high, self._low, self._close, self._volume
+
+    def first_prices(self) -> dict[str, float]:
+        """
+        Returns the first close price of each symbol in the feed
+        """
+        return self._edge_prices(first=True)
+
+    def last_prices(self) -> dict[str, float]:
+        """
+        Returns the last close price of each symbol in the feed
+        """
+        return self._edge_prices(first=False)
+
+    def _edge_prices(self, first: bool) -> dict[str, float]:
+        prices = {}
+        for i, symbol in enumerate(self._symbols):
+            rows = np.flatnonzero(self._symbol_index == i)
+            if len(rows) > 0:
+                prices[symbol] = float(self._close[rows[0] if first else rows[-1]])
+        return prices
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, chunk_size: int = 4096):
+        """
+        Yields a new Kline for every kline of every symbol in timestamp order.
+        Each kline is a separate object, so it can be kept by indicators and emitters
+        """
+        symbols = self._symbols
+        granularity = self._granularity
+        for start in range(0, len(self._ts), chunk_size):
+            end = start + chunk_size
+            rows = zip(self._symbol_index[start:end].tolist(),
+                       self._ts[start:end].tolist(),
+                       self._open[start:end].tolist(),
+                       self._high[start:end].tolist(),
+                       self._low[start:end].tolist(),
+                       self._close[start:end].tolist(),
+                       self._volume[start:end].tolist())
+            for symbol_index, ts, open, high, low, close, volume in rows:
+                yield Kline(symbol=symbols[symbol_index], open=open, close=close, low=low, high=high,
+                            volume=volume, ts=ts, granularity=granularity)
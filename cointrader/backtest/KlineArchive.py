@@ -0,0 +1,218 @@
+# This file contains the KlineArchive class, a directory of binary kline files for backtests.
+# Each symbol and granularity has its own file of fixed width columns, which is opened with numpy.memmap,
+# so opening it is only reading a small header, and pages of kline data are read (and shared between processes)
+# when they are used. The ts column is sorted, so a time range is found with a binary search on the mapped file.
+#
+# File layout: magic (8 bytes), version (uint32), header length (uint32), a JSON header with the count, the columns
+# and their offsets, then each column as a little endian array, starting at a multiple of 64 bytes
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+from cointrader.common.KlineArray import KlineArray
+from cointrader.common.KlineFrame import KlineFrame
+from .BacktestFeed import BacktestFeed
+
+MAGIC = b'CTKLINES'
+VERSION = 1
+
+_PREFIX = struct.Struct('<8sII')
+_ALIGNMENT = 64
+_KLINE_COLUMNS = (('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'))
+_FEED_COLUMNS = (('symbol_index', '<i4'),) + _KLINE_COLUMNS
+
+
+def write_columns(path: str, header: dict, columns: list[tuple[str, np.ndarray]]):
+    """
+    Write the columns, which must all be the same length, and header to path, replacing the file atomically
+    """
+    count = len(columns[0][1]) if columns else 0
+    descriptions = []
+    offset = 0
+    for name, values in columns:
+        values = np.asarray(values)
+        if len(values) != count:
+            raise ValueError("Archive columns must all be the same length")
+        descriptions.append({'name': name, 'dtype': values.dtype.newbyteorder('<').str, 'offset': offset})
+        offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = dict(header, count=count, columns=descriptions)
+
+    # the column offsets are relative to the data start, which depends on the length of the header itself
+    encoded = json.dumps(header).encode()
+    data_start = -(-(_PREFIX.size + len(encoded)) // _ALIGNMENT) * _ALIGNMENT
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for (name, values), description in zip(columns, descriptions):
+            f.seek(data_start + description['offset'])
+            np.ascontiguousarray(values, dtype=description['dtype']).tofile(f)
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> dict:
+    """
+    Read the header of an archive file, without mapping the columns
+    """
+    with open(path, 'rb') as f:
+        magic, version, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} kline archive file")
+        header = json.loads(f.read(length))
+    header['data_start'] = -(-(_PREFIX.size + length) // _ALIGNMENT) * _ALIGNMENT
+    return header
+
+
+def map_columns(path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Returns the header and read only arrays of the columns of an archive file, mapped from the file
+    """
+    header = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    columns = {}
+    for description in header['columns']:
+        columns[description['name']] = np.frombuffer(mapped, dtype=np.dtype(description['dtype']), count=header['count'],
+                                                     offset=header['data_start'] + description['offset'])
+    return header, columns
+
+
+def save_feed(feed: BacktestFeed, path: str):
+    """
+    Write the merged arrays of a feed to path, so open_feed() can map them in any number of processes
+    """
+    write_columns(path, {'symbols': list(feed.symbols()), 'granularity': feed.granularity()},
+                  [(name, values) for (name, _), values in zip(_FEED_COLUMNS, feed.arrays())])
+
+
+def open_feed(path: str) -> BacktestFeed:
+    """
+    Open a feed written by save_feed(), memory mapped from path
+    """
+    header, columns = map_columns(path)
+    return BacktestFeed.from_arrays(header['symbols'], header['granularity'], *[columns[name] for name, _ in _FEED_COLUMNS], path=path)
+
+
+class KlineArchive(object):
+    def __init__(self, path: str):
+        """
+        :param path: Directory of the archive, with a directory of .klines files for each granularity
+        """
+        self._path = path
+
+    def path(self, symbol: str, granularity: int) -> str:
+        return os.path.join(self._path, str(granularity), f"{symbol}.klines")
+
+    def symbols(self, granularity: int) -> list[str]:
+        """
+        Symbols stored for granularity
+        """
+        directory = os.path.join(self._path, str(granularity))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.klines')] for name in os.listdir(directory) if name.endswith('.klines'))
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        symbol, granularity = key
+        return os.path.exists(self.path(symbol, granularity))
+
+    def info(self, symbol: str, granularity: int) -> dict:
+        """
+        Header of the file for symbol, with the count and the first and last ts
+        """
+        return read_header(self.path(symbol, granularity))
+
+    def write(self, klines: KlineArray, granularity: int = None, merge: bool = True):
+        """
+        Write klines to the file of klines.symbol, sorted by ts. If merge is True the klines already stored are kept,
+        except where klines has a kline with the same ts
+        """
+        granularity = granularity if granularity is not None else klines.granularity
+        path = self.path(klines.symbol, granularity)
+        columns = [klines.ts, klines.open, klines.high, klines.low, klines.close, klines.volume]
+        if merge and os.path.exists(path):
+            _, stored = map_columns(path)
+            columns = [np.concatenate((stored[name], values)) for (name, _), values in zip(_KLINE_COLUMNS, columns)]
+
+        # a stable sort keeps the new kline last among klines with the same ts, and only the last one is kept
+        order = np.argsort(columns[0], kind='stable')
+        ts = columns[0][order]
+        keep = order[np.concatenate((ts[1:] != ts[:-1], [True]))] if len(ts) > 0 else order
+        columns = [values[keep] for values in columns]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {'symbol': klines.symbol, 'granularity': granularity,
+                  'first_ts': int(columns[0][0]) if len(keep) > 0 else None,
+                  'last_ts': int(columns[0][-1]) if len(keep) > 0 else None}
+        write_columns(path, header, [(name, values) for (name, _), values in zip(_KLINE_COLUMNS, columns)])
+
+    def write_frame(self, frame: KlineFrame, merge: bool = True):
+        for _, klines in frame.items():
+            self.write(klines, granularity=frame.granularity(), merge=merge)
+
+    def open(self, symbol: str, granularity: int, start_ts: int = None, end_ts: int = None) -> KlineArray:
+        """
+        Returns the klines of symbol where start_ts <= ts <= end_ts as a KlineArray mapped from the file, without copying
+        """
+        header, columns = map_columns(self.path(symbol, granularity))
+        ts = columns['ts']
+        start = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, side='left'))
+        end = len(ts) if end_ts is None else int(np.searchsorted(ts, end_ts, side='right'))
+        return KlineArray(symbol=header['symbol'], granularity=granularity, ts=ts[start:end], open=columns['open'][start:end],
+                          high=columns['high'][start:end], low=columns['low'][start:end], close=columns['close'][start:end],
+                          volume=columns['volume'][start:end])
+
+    def frame(self, granularity: int, symbols: list[str] = None, start_ts: int = None, end_ts: int = None) -> KlineFrame:
+        """
+        Returns a KlineFrame of the symbols stored for granularity, mapped from the files
+        """
+        frame = KlineFrame(granularity=granularity)
+        for symbol in (symbols if symbols is not None else self.symbols(granularity)):
+            if (symbol, granularity) in self:
+                frame.add(self.open(symbol, granularity, start_ts, end_ts))
+        return frame
+
+    def feed(self, granularity: int, symbols: list[str] = None, start_ts: int = None, end_ts: int = None, cache: bool = True) -> BacktestFeed:
+        """
+        Returns a BacktestFeed of the symbols. With cache, the merged feed is saved in the archive the first time,
+        and later calls for the same symbols and range map that file, so starting a backtest doesn't merge the symbols
+        again and all the processes using the feed share its pages. Writing to a symbol makes a new cache file
+        """
+        if symbols is None:
+            symbols = self.symbols(granularity)
+        symbols = [symbol for symbol in symbols if (symbol, granularity) in self]
+        if not cache:
+            return BacktestFeed(self.frame(granularity, symbols), symbols=symbols, start_ts=start_ts, end_ts=end_ts)
+
+        key = [granularity, start_ts, end_ts]
+        for symbol in symbols:
+            stat = os.stat(self.path(symbol, granularity))
+            key.append([symbol, stat.st_size, stat.st_mtime_ns])
+        name = hashlib.sha1(json.dumps(key).encode()).hexdigest()[:16]
+        path = os.path.join(self._path, 'feeds', f"{name}.feed")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_feed(BacktestFeed(self.frame(granularity, symbols), symbols=symbols, start_ts=start_ts, end_ts=end_ts), path)
+        return open_feed(path)
+
+    def import_csv(self, csv_path: str, granularity: int, symbols: list[str] = None, merge: bool = True, **columns) -> list[str]:
+        """
+        Convert a Binance style kline CSV, see KlineFrame.from_csv() for the column arguments. Returns the symbols written
+        """
+        frame = KlineFrame.from_csv(csv_path, granularity, symbols=symbols, **columns)
+        self.write_frame(frame, merge=merge)
+        return frame.symbols()
+
+    def import_storage(self, storage, granularity: int, symbols: list[str] = None, start_ts: int = 0, end_ts: int = 2**62,
+                       merge: bool = True) -> list[str]:
+        """
+        Convert the klines of a MarketStorage database. Returns the symbols written
+        """
+        written = []
+        for symbol in (symbols if symbols is not None else storage.symbols(granularity)):
+            klines = storage.get_kline_array(symbol, start_ts, end_ts, granularity)
+            if len(klines) > 0:
+                self.write(klines, granularity=granularity, merge=merge)
+                written.append(symbol)
+        return written
@@ -0,0 +1,85 @@
+# This file contains the SharedBacktestFeed class, which copies the arrays of a BacktestFeed into shared memory
+# once, so worker processes can attach to the same kline data instead of each loading the CSV again
+from multiprocessing import shared_memory
+from .BacktestFeed import BacktestFeed
+import numpy as np
+
+# names of the merged arrays, in the order of BacktestFeed.arrays()
+_ARRAY_NAMES = ('symbol_index', 'ts', 'open', 'high', 'low', 'close', 'volume')
+
+# shared memory blocks attached by this process, kept open for as long as the process uses the feed
+_attached: dict[str, list[shared_memory.SharedMemory]] = {}
+
+class SharedBacktestFeed(object):
+    def __init__(self, feed: BacktestFeed):
+        self._blocks: list[shared_memory.SharedMemory] = []
+        arrays = []
+        for name, values in zip(_ARRAY_NAMES, feed.arrays()):
+            # zero sized shared memory blocks are not allowed
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            shared = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+            shared[:] = values
+            self._blocks.append(block)
+            arrays.append({'name': name, 'block': block.name, 'dtype': values.dtype.str, 'length': len(values)})
+
+        self._descriptor = {
+            'symbols': list(feed.symbols()),
+            'granularity': feed.granularity(),
+            'arrays': arrays,
+        }
+
+    def descriptor(self) -> dict:
+        """
+        Returns a small picklable description of the shared feed, which is passed to attach() in the worker processes
+        """
+        return self._descriptor
+
+    def feed(self) -> BacktestFeed:
+        """
+        Returns a BacktestFeed on top of the shared memory owned by this process
+        """
+        return SharedBacktestFeed._build(self._descriptor, self._blocks)
+
+    @staticmethod
+    def attach(descriptor: dict) -> BacktestFeed:
+        """
+        Attach to a shared feed created in another process. The returned feed reads the shared memory directly
+        """
+        key = descriptor['arrays'][0]['block']
+        if key not in _attached:
+            _attached[key] = [shared_memory.SharedMemory(name=array['block']) for array in descriptor['arrays']]
+        return SharedBacktestFeed._build(descriptor, _attached[key])
+
+    @staticmethod
+    def detach(descriptor: dict):
+        """
+        Close the shared memory attached in this process by attach()
+        """
+        blocks = _attached.pop(descriptor['arrays'][0]['block'], [])
+        for block in blocks:
+            block.close()
+
+    @staticmethod
+    def _build(descriptor: dict, blocks: list[shared_memory.SharedMemory]) -> BacktestFeed:
+        arrays = [np.ndarray((array['length'],), dtype=np.dtype(array['dtype']), buffer=block.buf)
+                  for array, block in zip(descriptor['arrays'], blocks)]
+        return BacktestFeed.from_arrays(descriptor['symbols'], descriptor['granularity'], *arrays)
+
+    def close(self):
+        """
+        Release and remove the shared memory. Feeds returned by feed() must not be used after this
+        """
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # a feed from feed() still references the memory, it is released when the feed is garbage collected
+                pass
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,177 @@
+# This file contains the SignalStateMatrix class, which records the BUY/SELL/NONE state of every SignalStrength signal
+# for every kline of a symbol. The signal states don't depend on the strategy weights, so the signals only have to run
+# once, and a set of weights can then be scored with a dot product over the matrix instead of replaying the indicators
+from cointrader.common.KlineArray import KlineArray
+from cointrader.order.enum.OrderSide import OrderSide
+from cointrader.strategies.SignalStrength import SignalStrength, SIGNAL_STATE_NAMES, SIGNAL_CHANGE_PARENTS
+import numpy as np
+import hashlib
+import os
+
+# bump when the signals used by SignalStrength change, so old cache files are no longer used
+_CACHE_VERSION = 1
+
+# int8 encoding of the signal states
+STATE_NONE = 0
+STATE_BUY = 1
+STATE_SELL = -1
+
+# registered matrices, looked up by the SignalStrengthCached strategy
+_registered: dict[tuple[str, int], 'SignalStateMatrix'] = {}
+
+class SignalStateMatrix(object):
+    def __init__(self, symbol: str, granularity: int, ts, close, states, names: list[str] = SIGNAL_STATE_NAMES):
+        self.symbol = symbol
+        self.granularity = granularity
+        self.names = tuple(names)
+        self.ts = np.ascontiguousarray(ts, dtype=np.int64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.states = np.ascontiguousarray(states, dtype=np.int8).reshape(len(self.ts), len(self.names))
+        self._buy = None
+        self._sell = None
+
+    @staticmethod
+    def from_klines(klines, symbol: str, granularity: int):
+        """
+        Run every SignalStrength signal once over klines and record the state of each signal after each kline
+        """
+        strategy = SignalStrength(symbol=symbol, granularity=granularity, weights={name: 1.0 for name in SIGNAL_STATE_NAMES})
+        encoding = {OrderSide.BUY: STATE_BUY, OrderSide.SELL: STATE_SELL}
+        ts = []
+        close = []
+        rows = []
+        for kline in klines:
+            strategy.update(kline)
+            ts.append(kline.ts)
+            close.append(kline.close)
+            states = strategy.signal_states
+            rows.append([encoding.get(states.get(name), STATE_NONE) for name in SIGNAL_STATE_NAMES])
+        states = np.array(rows, dtype=np.int8).reshape(len(ts), len(SIGNAL_STATE_NAMES))
+        return SignalStateMatrix(symbol=symbol, granularity=granularity, ts=ts, close=close, states=states)
+
+    @staticmethod
+    def from_kline_array(klines: KlineArray, cache_dir: str = None):
+        """
+        Create the matrix for a KlineArray. If cache_dir is set, the matrix is loaded from there when the
+        same klines were seen before, otherwise it is computed and saved to cache_dir
+        """
+        path = None
+        if cache_dir:
+            path = os.path.join(cache_dir, SignalStateMatrix.cache_name(klines))
+            if os.path.exists(path):
+                return SignalStateMatrix.load(path)
+
+        matrix = SignalStateMatrix.from_klines(klines.klines(), symbol=klines.symbol, granularity=klines.granularity)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            matrix.save(path)
+        return matrix
+
+    @staticmethod
+    def cache_name(klines: KlineArray) -> str:
+        """
+        Cache file name for the klines, which changes if any of the kline values change
+        """
+        digest = hashlib.sha1()
+        digest.update(f"{_CACHE_VERSION}:{','.join(SIGNAL_STATE_NAMES)}".encode())
+        for values in (klines.ts, klines.open, klines.high, klines.low, klines.close, klines.volume):
+            digest.update(values.tobytes())
+        return f"{klines.symbol}_{klines.granularity}_{digest.hexdigest()[:16]}.npz"
+
+    @staticmethod
+    def load(path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return SignalStateMatrix(symbol=str(data['symbol']), granularity=int(data['granularity']), ts=data['ts'],
+                                     close=data['close'], states=data['states'], names=[str(name) for name in data['names']])
+
+    def save(self, path: str):
+        # write to a temporary file first, so a worker reading the cache never sees a partial file
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, symbol=self.symbol, granularity=self.granularity, ts=self.ts, close=self.close,
+                 states=self.states, names=np.array(self.names))
+        os.replace(tmp_path, path)
+
+    def register(self):
+        """
+        Make the matrix available to the SignalStrengthCached strategy for this symbol and granularity
+        """
+        _registered[(self.symbol, self.granularity)] = self
+
+    @staticmethod
+    def registered(symbol: str, granularity: int):
+        return _registered.get((symbol, granularity))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def weight_vector(self, weights) -> np.ndarray:
+        """
+        Convert weights to an array aligned with the matrix columns. weights is a dict of name -> weight,
+        or a list of such dicts, which returns a (signals x combinations) matrix
+        """
+        if isinstance(weights, dict):
+            return np.array([float(weights.get(name, 0)) for name in self.names], dtype=np.float64)
+        return np.array([[float(w.get(name, 0)) for w in weights] for name in self.names], dtype=np.float64).reshape(len(self.names), len(weights))
+
+    def weighted_counts(self, weights) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the buy and sell signal weight for every kline, like SignalStrength._weighted_count_signals().
+        weights may be a dict, a weight vector, or a (signals x combinations) weight matrix to score many combinations at once
+        """
+        if not isinstance(weights, np.ndarray):
+            weights = self.weight_vector(weights)
+        if self._buy is None:
+            self._buy = (self.states == STATE_BUY).astype(np.float64)
+            self._sell = (self.states == STATE_SELL).astype(np.float64)
+
+        # a change state doesn't count when the signal it belongs to has no weight, since SignalStrength never sets it
+        weights = weights.copy()
+        for change, parent in SIGNAL_CHANGE_PARENTS.items():
+            if change in self.names and parent in self.names:
+                weights[self.names.index(change)] *= weights[self.names.index(parent)] > 0
+        return self._buy @ weights, self._sell @ weights
+
+    def signals(self, weights) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the (buy, sell, strong buy, strong sell) signal for every kline with the same rules as SignalStrength.
+        The weight sums are added in a different order than SignalStrength, so with weights that are not exactly
+        representable (such as 0.1) a tie between the buy and sell weight may come out differently
+        """
+        if not isinstance(weights, np.ndarray):
+            weights = self.weight_vector(weights)
+        buy_weight, sell_weight = self.weighted_counts(weights)
+        total_weight = weights.sum(axis=0)
+        valid = (buy_weight != 0) & (sell_weight != 0) & (buy_weight + sell_weight >= total_weight / 2)
+        return (valid & (buy_weight > sell_weight),
+                valid & (sell_weight > buy_weight),
+                valid & (buy_weight >= 2.0 * sell_weight),
+                valid & (sell_weight >= 2.0 * buy_weight))
+
+    def signal_returns(self, weights) -> np.ndarray:
+        """
+        Vectorized score for ranking weights without a replay: the log return of holding from each buy signal
+        until the next sell signal, at the close prices of the klines. Ignores position sizing, stop losses
+        and fees, so it is only meant to select the combinations worth a full backtest
+        """
+        if not isinstance(weights, np.ndarray):
+            weights = self.weight_vector(weights)
+        buy, sell, _, _ = self.signals(weights)
+        events = buy.astype(np.int8) - sell.astype(np.int8)
+        if events.ndim == 1:
+            events = events[:, None]
+
+        # index of the last buy or sell signal at or before each kline, -1 if there is none yet
+        rows = np.arange(len(events))[:, None]
+        last_event = np.maximum.accumulate(np.where(events != 0, rows, -1), axis=0)
+        holding = np.take_along_axis(events, np.maximum(last_event, 0), axis=0) == 1
+        holding &= last_event >= 0
+
+        log_returns = np.diff(np.log(self.close))[:, None]
+        returns = (holding[:-1] * log_returns).sum(axis=0)
+        return returns if weights.ndim > 1 else float(returns[0])
+
+    def row_names(self, index: int, state: int) -> str:
+        """
+        Concatenated names of the signals with the given state at index, like SignalStrength.buy_signal_name()
+        """
+        return "".join(name for name, value in zip(self.names, self.states[index].tolist()) if value == state)
@@ -0,0 +1,251 @@
+# This file contains the WeightOptimizer class, which searches every combination of strategy weights
+# by running backtests in a pool of worker processes that share one copy of the kline data
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .BacktestFeed import BacktestFeed
+from .SharedBacktestFeed import SharedBacktestFeed
+from .KlineArchive import open_feed
+import numpy as np
+import json
+import os
+import time
+
+# set in each worker process by _init_worker()
+_worker_feed: BacktestFeed = None
+_worker_evaluate = None
+_worker_options: dict = {}
+
+def _init_worker(descriptor: dict, evaluate, options: dict):
+    global _worker_feed, _worker_evaluate, _worker_options
+    # a feed mapped from a file is opened again, the workers share its pages through the page cache
+    _worker_feed = open_feed(descriptor['path']) if 'path' in descriptor else SharedBacktestFeed.attach(descriptor)
+    _worker_evaluate = evaluate
+    _worker_options = options
+
+def _evaluate_task(weights: dict[str, float]):
+    return _worker_evaluate(_worker_feed, weights, **_worker_options)
+
+
+class DrawdownPruner(object):
+    """
+    Tracks a running value such as the cumulative net profit percent during a backtest, and reports once
+    it has dropped more than max_drawdown below its peak, so the rest of the backtest can be skipped
+    """
+    def __init__(self, max_drawdown: float, check_interval: int = 1000):
+        self._max_drawdown = abs(max_drawdown)
+        self._check_interval = max(int(check_interval), 1)
+        self._count = 0
+        self._peak = 0.0
+        self._drawdown = 0.0
+        self._pruned = False
+
+    def step(self) -> bool:
+        """
+        Call once per kline, returns True every check_interval klines when update() should be called
+        """
+        self._count += 1
+        return self._count % self._check_interval == 0
+
+    def update(self, value: float) -> bool:
+        """
+        Update with the current value, returns True if the drawdown from the peak exceeds max_drawdown
+        """
+        if value > self._peak:
+            self._peak = value
+        self._drawdown = max(self._drawdown, self._peak - value)
+        if self._drawdown > self._max_drawdown:
+            self._pruned = True
+        return self._pruned
+
+    def drawdown(self) -> float:
+        return self._drawdown
+
+    def pruned(self) -> bool:
+        return self._pruned
+
+
+class WeightOptimizer(object):
+    """
+    Evaluates every combination of weight_values for the given names.
+
+    evaluate(feed, weights, **options) is called in a worker process for each combination, and must be a
+    module level function so it can be pickled. It returns a dict of results, or None if the combination
+    should be ignored. A result with 'pruned' set to True was stopped early and is never counted as a best result.
+    """
+    def __init__(self, feed: BacktestFeed, names: list[str], evaluate, weight_values=(0, 0.5), options: dict = None,
+                 max_workers: int = None, min_nonzero: int = 0, scores=('net_profit',),
+                 checkpoint_path: str = None, checkpoint_interval: float = 60.0, max_in_flight: int = None):
+        self._feed = feed
+        self._names = list(names)
+        self._evaluate = evaluate
+        self._weight_values = list(weight_values)
+        self._options = options if options is not None else {}
+        self._max_workers = max_workers if max_workers else (os.cpu_count() or 1)
+        self._min_nonzero = min_nonzero
+        self._scores = list(scores)
+        self._checkpoint_path = checkpoint_path
+        self._checkpoint_interval = checkpoint_interval
+        self._max_in_flight = max_in_flight if max_in_flight else self._max_workers * 4
+
+        # every index below _next_index is done, _done holds the indices above it which finished out of order
+        self._next_index = 0
+        self._done: set[int] = set()
+        self._evaluated = 0
+        self._pruned = 0
+        self._best: dict[str, dict] = {}
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.load_checkpoint()
+
+    def combination_count(self) -> int:
+        return len(self._weight_values) ** len(self._names)
+
+    def combination(self, index: int) -> tuple:
+        """
+        Returns the combination at index, in the same order as itertools.product(weight_values, repeat=len(names))
+        """
+        base = len(self._weight_values)
+        values = []
+        for _ in range(len(self._names)):
+            index, digit = divmod(index, base)
+            values.append(self._weight_values[digit])
+        return tuple(reversed(values))
+
+    def weights(self, index: int) -> dict[str, float]:
+        return dict(zip(self._names, self.combination(index)))
+
+    def weight_matrix(self, start: int, end: int) -> np.ndarray:
+        """
+        Returns the combinations from start to end as a (combinations x names) array, for scoring them in bulk
+        """
+        base = len(self._weight_values)
+        indices = np.arange(start, min(end, self.combination_count()), dtype=np.int64)
+        powers = base ** np.arange(len(self._names) - 1, -1, -1, dtype=np.int64)
+        digits = (indices[:, None] // powers[None, :]) % base
+        return np.asarray(self._weight_values, dtype=np.float64)[digits]
+
+    def best(self) -> dict[str, dict]:
+        """
+        Returns the best result record for each score name
+        """
+        return self._best
+
+    def next_index(self) -> int:
+        return self._next_index
+
+    def evaluated(self) -> int:
+        return self._evaluated
+
+    def pruned(self) -> int:
+        return self._pruned
+
+    def run(self, end: int = None):
+        """
+        Evaluate the combinations from the last checkpoint up to end, and yield a record for each one as it finishes:
+        {'index': index, 'weights': weights, 'result': result, 'best': [names of the scores it is the new best for]}
+        """
+        if end is None:
+            end = self.combination_count()
+        end = min(end, self.combination_count())
+
+        if self._feed.path() is not None:
+            shared = None
+            descriptor = {'path': self._feed.path()}
+        else:
+            shared = SharedBacktestFeed(self._feed)
+            descriptor = shared.descriptor()
+        executor = ProcessPoolExecutor(max_workers=self._max_workers, initializer=_init_worker,
+                                       initargs=(descriptor, self._evaluate, self._options))
+        pending = {}
+        last_checkpoint = time.time()
+        index = self._next_index
+        try:
+            while True:
+                # keep a bounded number of tasks queued, so memory use doesn't grow with the number of combinations
+                while index < end and len(pending) < self._max_in_flight:
+                    if index in self._done:
+                        index += 1
+                        continue
+                    weights = self.weights(index)
+                    if sum(weight != 0 for weight in weights.values()) < self._min_nonzero:
+                        self._complete(index)
+                    else:
+                        pending[executor.submit(_evaluate_task, weights)] = (index, weights)
+                    index += 1
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_index, weights = pending.pop(future)
+                    result = future.result()
+                    record = {'index': task_index, 'weights': weights, 'result': result, 'best': self._update_best(task_index, weights, result)}
+                    self._complete(task_index)
+                    yield record
+
+                if self._checkpoint_path and time.time() - last_checkpoint >= self._checkpoint_interval:
+                    self.save_checkpoint()
+                    last_checkpoint = time.time()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if shared is not None:
+                shared.close()
+            if self._checkpoint_path:
+                self.save_checkpoint()
+
+    def _complete(self, index: int):
+        self._done.add(index)
+        while self._next_index in self._done:
+            self._done.remove(self._next_index)
+            self._next_index += 1
+
+    def _update_best(self, index: int, weights: dict[str, float], result: dict) -> list[str]:
+        if result is None:
+            return []
+        self._evaluated += 1
+        if result.get('pruned', False):
+            self._pruned += 1
+            return []
+
+        improved = []
+        for score in self._scores:
+            if score not in result:
+                continue
+            best = self._best.get(score)
+            if best is None or result[score] > best['result'][score]:
+                self._best[score] = {'index': index, 'weights': weights, 'result': result}
+                improved.append(score)
+        return improved
+
+    def save_checkpoint(self):
+        """
+        Write the search progress to checkpoint_path. The file is replaced atomically, so an interrupted
+        write never leaves a corrupt checkpoint behind
+        """
+        state = {
+            'names': self._names,
+            'weight_values': self._weight_values,
+            'next_index': self._next_index,
+            'done': sorted(self._done),
+            'evaluated': self._evaluated,
+            'pruned': self._pruned,
+            'best': self._best,
+        }
+        tmp_path = f"{self._checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def load_checkpoint(self):
+        """
+        Restore the search progress from checkpoint_path, so run() continues where the last run stopped
+        """
+        with open(self._checkpoint_path, 'r') as f:
+            state = json.load(f)
+        if state['names'] != self._names or state['weight_values'] != self._weight_values:
+            raise ValueError(f"Checkpoint {self._checkpoint_path} was created for different names or weight values")
+        self._next_index = state['next_index']
+        self._done = set(state['done'])
+        self._evaluated = state['evaluated']
+        self._pruned = state['pruned']
+        self._best = state['best']
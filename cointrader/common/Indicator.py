@@ -1,5 +1,6 @@
 # This file contains the Indicator class, which is the base class for all indicators.
 from .Kline import Kline
+import numpy as np
 
 class Indicator:
     _name = None
@@ -21,6 +22,29 @@ class Indicator:
     def update_with_value(self, value) -> dict:
         raise NotImplementedError
 
+    def compute_batch(self, open, high, low, close, volume, ts=None):
+        """
+        Compute the indicator over arrays of kline values in one call.
+        Returns a float64 array (or a dict of arrays for indicators with multiple outputs), with NaN where
+        the streaming update would return None. The indicator is left in the same state as if every kline
+        had been passed to update(), so streaming can continue from where the batch stopped.
+        The default implementation streams through update(), subclasses override it with array operations.
+        """
+        open, high, low, close, volume, ts = _batch_arrays(open, high, low, close, volume, ts)
+        columns = _BatchColumns()
+        for i in range(len(close)):
+            columns.append(self.update(_batch_kline(open, high, low, close, volume, ts, i)))
+        return columns.result()
+
+    def compute_batch_with_values(self, values):
+        """
+        Batch version of update_with_value(), returns the indicator output for each value in values
+        """
+        columns = _BatchColumns()
+        for value in np.asarray(values, dtype=np.float64).tolist():
+            columns.append(self.update_with_value(value))
+        return columns.result()
+
     def increasing(self) -> bool:
         raise NotImplementedError
     
@@ -60,3 +84,75 @@ class Indicator:
             return self.get_last_value() == other.get_last_value()
         else:
             return self.get_last_value() == other
+
+
+def _batch_arrays(open, high, low, close, volume, ts=None):
+    """
+    Convert the inputs of compute_batch() to contiguous float64 arrays (int64 for ts)
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    arrays = []
+    for values in (open, high, low, volume):
+        if values is None:
+            values = close if len(arrays) < 3 else np.zeros(len(close))
+        arrays.append(np.ascontiguousarray(values, dtype=np.float64))
+    open, high, low, volume = arrays
+    if ts is None:
+        ts = np.zeros(len(close), dtype=np.int64)
+    ts = np.ascontiguousarray(ts, dtype=np.int64)
+    for values in (open, high, low, volume, ts):
+        if len(values) != len(close):
+            raise ValueError("compute_batch() arrays must all be the same length")
+    return open, high, low, close, volume, ts
+
+
+def _batch_kline(open, high, low, close, volume, ts, index: int) -> Kline:
+    """
+    Build the Kline at index from the arrays returned by _batch_arrays()
+    """
+    return Kline(open=float(open[index]), close=float(close[index]), low=float(low[index]), high=float(high[index]),
+                 volume=float(volume[index]), ts=int(ts[index]))
+
+
+def _batch_nan_array(values):
+    """
+    Convert a list of scalar outputs to a float64 array, with None mapped to NaN.
+    Outputs which aren't numeric (lists, dicts) are returned as an object array
+    """
+    try:
+        result = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        if result.ndim == 1:
+            return result
+    except (TypeError, ValueError):
+        pass
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
+
+
+class _BatchColumns(object):
+    """
+    Collects per-kline indicator outputs into columns for compute_batch()
+    """
+    def __init__(self):
+        self._values = []
+        self._keys = None
+
+    def append(self, value):
+        if isinstance(value, dict):
+            if self._keys is None:
+                self._keys = {}
+            for key in value.keys():
+                if key not in self._keys:
+                    self._keys[key] = [None] * len(self._values)
+            for key, column in self._keys.items():
+                column.append(value.get(key))
+        elif self._keys is not None:
+            for column in self._keys.values():
+                column.append(None)
+        self._values.append(value)
+
+    def result(self):
+        if self._keys is not None:
+            return {key: _batch_nan_array(column) for key, column in self._keys.items()}
+        return _batch_nan_array(self._values)
@@ -0,0 +1,77 @@
+# This file contains the IndicatorRegistry class, which shares indicators between the signals of a strategy.
+# Several signals are built on the same indicators of the same klines, for example the 12 and 26 period EMAs of
+# MACD, PPO and EMA cross. The registry keeps one instance of each indicator by class and parameters, and updates
+# each of them once per kline with update(), before the signals run. The signals get a SharedIndicator, whose update()
+# returns the value of the kline the registry already computed, so a signal reads it the same way as its own indicator.
+# A registry is for one kline stream, a symbol at one granularity
+from .Indicator import Indicator
+from .Kline import Kline
+
+class SharedIndicator(object):
+    """
+    Read-only view of an indicator owned by an IndicatorRegistry
+    """
+    def __init__(self, indicator: Indicator):
+        self._indicator = indicator
+        self._result = None
+
+    def indicator(self) -> Indicator:
+        return self._indicator
+
+    def update(self, kline: Kline):
+        """
+        Value for the current kline, which the registry already passed to the indicator
+        """
+        return self._result
+
+    def reset(self):
+        """
+        Shared indicators are reset with the registry, not by each of the signals using them
+        """
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._indicator, name)
+
+
+class IndicatorRegistry(object):
+    def __init__(self):
+        self._shared: dict[tuple, SharedIndicator] = {}
+        # in creation order, so an indicator built on other shared indicators is updated after them
+        self._order: list[SharedIndicator] = []
+        self._requests = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def get(self, cls, **params) -> SharedIndicator:
+        """
+        Get the shared instance of indicator cls with params, created on first use.
+        The name param is not part of the key, indicators with the same class and params compute the same values
+        """
+        self._requests += 1
+        key = (cls, tuple(sorted((name, value) for name, value in params.items() if name != 'name')))
+        shared = self._shared.get(key)
+        if shared is None:
+            shared = SharedIndicator(cls(**params))
+            self._shared[key] = shared
+            self._order.append(shared)
+        return shared
+
+    def requests(self) -> int:
+        """
+        Number of indicators asked for, len() of them were computed
+        """
+        return self._requests
+
+    def update(self, kline: Kline):
+        """
+        Update every shared indicator with kline, once
+        """
+        for shared in self._order:
+            shared._result = shared._indicator.update(kline)
+
+    def reset(self):
+        for shared in self._order:
+            shared._indicator.reset()
+            shared._result = None
@@ -1,22 +1,34 @@
 # Kline (OHLCV) class
 
+# default names of the fields in the dict, in the order symbol, open, close, low, high, volume, ts
+_DEFAULT_DICT_NAMES = ('symbol', 'open', 'close', 'low', 'high', 'volume', 'ts')
+
+def _dict_name_property(index: int):
+    """
+    Property for one of the dict field names, which are shared between klines until changed
+    """
+    def getter(self):
+        return self._dict_names[index]
+
+    def setter(self, value):
+        names = list(self._dict_names)
+        names[index] = value
+        self._dict_names = tuple(names)
+
+    return property(getter, setter)
+
+
 class Kline(object):
-    symbol = None
-    open = 0
-    close = 0
-    low = 0
-    high = 0
-    volume = 0
-    ts = 0
-    granularity = None
+    __slots__ = ('symbol', 'open', 'close', 'low', 'high', 'volume', 'ts', 'granularity', '_dict_names')
+
     # name of the symbol field in the dict
-    symbol_name = 'symbol'
-    open_name = 'open'
-    close_name = 'close'
-    low_name = 'low'
-    high_name = 'high'
-    volume_name = 'volume'
-    ts_name = 'ts'
+    symbol_name = _dict_name_property(0)
+    open_name = _dict_name_property(1)
+    close_name = _dict_name_property(2)
+    low_name = _dict_name_property(3)
+    high_name = _dict_name_property(4)
+    volume_name = _dict_name_property(5)
+    ts_name = _dict_name_property(6)
 
     def __init__(self, symbol=None, open=0, close=0, low=0, high=0,
                  volume=0, ts=0, granularity=None):
@@ -28,26 +40,22 @@ class Kline(object):
         self.volume = volume
         self.ts = ts
         self.granularity = granularity
+        self._dict_names = _DEFAULT_DICT_NAMES
 
-    def set_dict_names(self, symbol=None, open='open', close='close', 
+    def set_dict_names(self, symbol=None, open='open', close='close',
                        low='low', high='high', volume='volume', ts='ts'):
-        self.symbol_name = symbol
-        self.open_name = open
-        self.close_name = close
-        self.low_name = low
-        self.high_name = high
-        self.volume_name = volume
-        self.ts_name = ts
+        self._dict_names = (symbol, open, close, low, high, volume, ts)
 
     def from_dict(self, data):
-        if self.symbol_name:
-            self.symbol = data.get(self.symbol_name)
-        self.open = float(data.get(self.open_name))
-        self.close = float(data.get(self.close_name))
-        self.low = float(data.get(self.low_name))
-        self.high = float(data.get(self.high_name))
-        self.volume = float(data.get(self.volume_name))
-        self.ts = int(data.get(self.ts_name))
+        symbol_name, open_name, close_name, low_name, high_name, volume_name, ts_name = self._dict_names
+        if symbol_name:
+            self.symbol = data.get(symbol_name)
+        self.open = float(data.get(open_name))
+        self.close = float(data.get(close_name))
+        self.low = float(data.get(low_name))
+        self.high = float(data.get(high_name))
+        self.volume = float(data.get(volume_name))
+        self.ts = int(data.get(ts_name))
 
     def __dict__(self):
         return {
@@ -65,7 +73,7 @@ class Kline(object):
 
     def __str__(self):
         return str(self.__repr__())
-    
+
     def __eq__(self, other):
         return self.__dict__() == other.__dict__()
 
@@ -86,13 +94,7 @@ class Kline(object):
         Returns a copy of the Kline object
         """
         kline = Kline()
-        kline.symbol_name = self.symbol_name
-        kline.open_name = self.open_name
-        kline.close_name = self.close_name
-        kline.low_name = self.low_name
-        kline.high_name = self.high_name
-        kline.volume_name = self.volume_name
-        kline.ts_name = self.ts_name
+        kline._dict_names = self._dict_names
 
         kline.symbol = self.symbol
         kline.open = self.open
@@ -102,4 +104,4 @@ class Kline(object):
         kline.volume = self.volume
         kline.ts = self.ts
 
-        return kline
\ No newline at end of file
+        return kline
@@ -0,0 +1,131 @@
+# This file contains the KlineArray class, a columnar store of klines for a single symbol
+# backed by contiguous numpy arrays, used for backtesting over large amounts of kline data
+from .Kline import Kline
+import numpy as np
+
+class KlineArray(object):
+    __slots__ = ('symbol', 'granularity', 'ts', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, symbol: str = None, granularity: int = None, ts=None, open=None, high=None, low=None, close=None, volume=None):
+        self.symbol = symbol
+        self.granularity = granularity
+        self.ts = np.ascontiguousarray(ts if ts is not None else [], dtype=np.int64)
+        self.open = np.ascontiguousarray(open if open is not None else [], dtype=np.float64)
+        self.high = np.ascontiguousarray(high if high is not None else [], dtype=np.float64)
+        self.low = np.ascontiguousarray(low if low is not None else [], dtype=np.float64)
+        self.close = np.ascontiguousarray(close if close is not None else [], dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume if volume is not None else [], dtype=np.float64)
+        for values in (self.open, self.high, self.low, self.close, self.volume):
+            if len(values) != len(self.ts):
+                raise ValueError("KlineArray columns must all be the same length")
+
+    @staticmethod
+    def from_klines(klines: list[Kline], symbol: str = None, granularity: int = None):
+        """
+        Create a KlineArray from a list of Kline objects
+        """
+        if symbol is None and len(klines) > 0:
+            symbol = klines[0].symbol
+        if granularity is None and len(klines) > 0:
+            granularity = klines[0].granularity
+        return KlineArray(symbol=symbol, granularity=granularity,
+                          ts=[k.ts for k in klines],
+                          open=[k.open for k in klines],
+                          high=[k.high for k in klines],
+                          low=[k.low for k in klines],
+                          close=[k.close for k in klines],
+                          volume=[k.volume for k in klines])
+
+    @staticmethod
+    def from_dicts(data: list[dict], symbol: str = None, granularity: int = None, ts='ts', open='open', high='high', low='low', close='close', volume='volume'):
+        """
+        Create a KlineArray from a list of kline dicts, such as the ones returned by MarketStorage
+        """
+        return KlineArray(symbol=symbol, granularity=granularity,
+                          ts=[int(d[ts]) for d in data],
+                          open=[float(d[open]) for d in data],
+                          high=[float(d[high]) for d in data],
+                          low=[float(d[low]) for d in data],
+                          close=[float(d[close]) for d in data],
+                          volume=[float(d[volume]) for d in data])
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, index):
+        """
+        Returns the Kline at index, or a KlineArray view sharing the same memory for a slice
+        """
+        if isinstance(index, slice):
+            return KlineArray(symbol=self.symbol, granularity=self.granularity,
+                              ts=self.ts[index], open=self.open[index], high=self.high[index],
+                              low=self.low[index], close=self.close[index], volume=self.volume[index])
+        return self.kline(index)
+
+    def __iter__(self):
+        return self.klines()
+
+    def kline(self, index: int) -> Kline:
+        """
+        Returns the row at index as a Kline
+        """
+        return Kline(symbol=self.symbol, open=float(self.open[index]), close=float(self.close[index]),
+                     low=float(self.low[index]), high=float(self.high[index]), volume=float(self.volume[index]),
+                     ts=int(self.ts[index]), granularity=self.granularity)
+
+    def klines(self, start: int = 0, end: int = None, chunk_size: int = 4096):
+        """
+        Iterate over the rows from start to end as Kline objects.
+        The columns are converted to python lists one chunk at a time, so reading the values in the
+        hot loop is a plain attribute lookup on the Kline instead of numpy scalar indexing
+        """
+        if end is None:
+            end = len(self.ts)
+        symbol = self.symbol
+        granularity = self.granularity
+        for chunk_start in range(start, end, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, end)
+            rows = zip(self.ts[chunk_start:chunk_end].tolist(),
+                       self.open[chunk_start:chunk_end].tolist(),
+                       self.high[chunk_start:chunk_end].tolist(),
+                       self.low[chunk_start:chunk_end].tolist(),
+                       self.close[chunk_start:chunk_end].tolist(),
+                       self.volume[chunk_start:chunk_end].tolist())
+            for ts, open, high, low, close, volume in rows:
+                yield Kline(symbol=symbol, open=open, close=close, low=low, high=high, volume=volume, ts=ts, granularity=granularity)
+
+    def to_dicts(self) -> list[dict]:
+        """
+        Convert to a list of kline dicts
+        """
+        return [{'ts': ts, 'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume}
+                for ts, open, high, low, close, volume in zip(self.ts.tolist(), self.open.tolist(), self.high.tolist(),
+                                                               self.low.tolist(), self.close.tolist(), self.volume.tolist())]
+
+    def arrays(self) -> tuple:
+        """
+        Returns the (open, high, low, close, volume, ts) arrays in the argument order of Indicator.compute_batch()
+        """
+        return self.open, self.high, self.low, self.close, self.volume, self.ts
+
+    def range(self, start_ts: int, end_ts: int):
+        """
+        Returns a view of the klines with start_ts <= ts <= end_ts, ts must be sorted
+        """
+        start = int(np.searchsorted(self.ts, start_ts, side='left'))
+        end = int(np.searchsorted(self.ts, end_ts, side='right'))
+        return self[start:end]
+
+    def sort(self):
+        """
+        Sort the klines by ts, in place
+        """
+        order = np.argsort(self.ts, kind='stable')
+        for name in ('ts', 'open', 'high', 'low', 'close', 'volume'):
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[order]))
+
+    def nbytes(self) -> int:
+        """
+        Total size in bytes of the kline columns
+        """
+        return sum(getattr(self, name).nbytes for name in ('ts', 'open', 'high', 'low', 'close', 'volume'))
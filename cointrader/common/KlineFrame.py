@@ -0,0 +1,118 @@
+# This file contains the KlineFrame class, which holds a KlineArray per symbol for multi-symbol backtests
+from .KlineArray import KlineArray
+import numpy as np
+
+class KlineFrame(object):
+    def __init__(self, granularity: int = None):
+        self._granularity = granularity
+        self._klines: dict[str, KlineArray] = {}
+
+    @staticmethod
+    def from_columns(symbols, ts, open, high, low, close, volume, granularity: int = None):
+        """
+        Create a KlineFrame from flat columns where each row may belong to a different symbol.
+        Rows are grouped by symbol and sorted by ts within each symbol
+        """
+        symbols = np.asarray(symbols)
+        ts = np.asarray(ts, dtype=np.int64)
+        columns = [np.asarray(values, dtype=np.float64) for values in (open, high, low, close, volume)]
+
+        frame = KlineFrame(granularity=granularity)
+        if len(ts) == 0:
+            return frame
+
+        # sort by symbol, then by ts, so each symbol is a contiguous block
+        names, codes = np.unique(symbols, return_inverse=True)
+        order = np.lexsort((ts, codes))
+        codes = codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(codes)]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            rows = order[start:end]
+            open_, high_, low_, close_, volume_ = [values[rows] for values in columns]
+            frame.add(KlineArray(symbol=str(names[codes[start]]), granularity=granularity, ts=ts[rows],
+                                 open=open_, high=high_, low=low_, close=close_, volume=volume_))
+        return frame
+
+    @staticmethod
+    def from_dataframe(df, granularity: int = None, symbol='Symbol', ts='Timestamp', open='Open', high='High', low='Low', close='Close', volume='Volume'):
+        """
+        Create a KlineFrame from a pandas DataFrame with one row per kline
+        """
+        return KlineFrame.from_columns(df[symbol].to_numpy(), df[ts].to_numpy(), df[open].to_numpy(), df[high].to_numpy(),
+                                       df[low].to_numpy(), df[close].to_numpy(), df[volume].to_numpy(), granularity=granularity)
+
+    @staticmethod
+    def from_csv(path: str, granularity: int, symbols: list[str] = None, date='Date', symbol='Symbol', open='Open', high='High',
+                 low='Low', close='Close', volume='Volume USDT', quote_suffix='USDT', quote_separator='-'):
+        """
+        Load a KlineFrame from a Binance style kline CSV (Date, Symbol, Open, High, Low, Close, Volume USDT).
+        Symbols such as BTCUSDT are renamed to BTC-USDT, and rows for other symbols are dropped before the dates are parsed
+        """
+        import pandas as pd
+
+        df = pd.read_csv(path, usecols=[date, symbol, open, high, low, close, volume])
+        names = df[symbol].astype(str)
+        if quote_suffix:
+            names = names.str.replace(quote_suffix, f'{quote_separator}{quote_suffix}', regex=False)
+        if symbols is not None:
+            selected = names.isin(symbols).to_numpy()
+            df = df[selected]
+            names = names[selected]
+        ts = pd.to_datetime(df[date], format='mixed').to_numpy().astype('datetime64[s]').astype(np.int64)
+
+        return KlineFrame.from_columns(names.to_numpy(), ts, df[open].to_numpy(), df[high].to_numpy(), df[low].to_numpy(),
+                                       df[close].to_numpy(), df[volume].to_numpy(), granularity=granularity)
+
+    def granularity(self) -> int:
+        return self._granularity
+
+    def add(self, klines: KlineArray):
+        """
+        Add (or replace) the klines for klines.symbol
+        """
+        self._klines[klines.symbol] = klines
+
+    def symbols(self) -> list[str]:
+        return list(self._klines.keys())
+
+    def __getitem__(self, symbol: str) -> KlineArray:
+        return self._klines[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._klines
+
+    def __len__(self) -> int:
+        """
+        Total number of klines across all symbols
+        """
+        return sum(len(klines) for klines in self._klines.values())
+
+    def items(self):
+        return self._klines.items()
+
+    def select(self, symbols: list[str]):
+        """
+        Returns a KlineFrame with only the given symbols (the arrays are shared, not copied)
+        """
+        frame = KlineFrame(granularity=self._granularity)
+        for symbol in symbols:
+            if symbol in self._klines:
+                frame.add(self._klines[symbol])
+        return frame
+
+    def range(self, start_ts: int, end_ts: int):
+        """
+        Returns a KlineFrame with the klines where start_ts <= ts <= end_ts for every symbol
+        """
+        frame = KlineFrame(granularity=self._granularity)
+        for klines in self._klines.values():
+            frame.add(klines.range(start_ts, end_ts))
+        return frame
+
+    def nbytes(self) -> int:
+        """
+        Total size in bytes of the kline columns for all symbols
+        """
+        return sum(klines.nbytes() for klines in self._klines.values())
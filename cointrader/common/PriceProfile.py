@@ -0,0 +1,212 @@
+# This file contains the PriceProfile class, which keeps a rolling histogram of volume (or TPO counts) over price bins
+# for the last period klines. Bins have a fixed tick size or are log spaced, so they never have to be rebuilt when the
+# price range changes, and each kline is added and removed as one array update over the bins it covers
+from collections import deque
+from .RollingExtrema import RollingExtrema
+import numpy as np
+
+class PriceProfile(object):
+    def __init__(self, period: int, tick_size: float = None, log_step: float = None, value_area_percentage: float = 70):
+        """
+        :param period: Number of klines in the profile, the oldest kline is removed once it is full.
+        :param tick_size: Width of each bin in price units.
+        :param log_step: Width of each bin in log price, so bins are the same percent of the price at any price level.
+        :param value_area_percentage: Percentage of the total volume to include in the value area.
+        """
+        if (tick_size is None) == (log_step is None):
+            raise ValueError("PriceProfile needs exactly one of tick_size or log_step")
+        if (tick_size is not None and tick_size <= 0) or (log_step is not None and log_step <= 0):
+            raise ValueError("PriceProfile bin size must be positive")
+        self.period = period
+        self.tick_size = tick_size
+        self.log_step = log_step
+        self.value_area_percentage = value_area_percentage
+        self.clear()
+
+    def clear(self):
+        # (first bin, amounts) added for each kline in the window, so removing a kline subtracts exactly what was added
+        self._window = deque()
+        # the bins covered by the window, as the lowest first bin and highest last bin of the klines
+        self._extrema = RollingExtrema(self.period)
+        self._counts = np.zeros(0, dtype=np.float64)
+        # bin number of _counts[0]
+        self._origin = 0
+        self._total = 0.0
+        self._poc = None
+        self._updates = 0
+
+    def bin_index(self, price: float) -> int:
+        """
+        Bin number containing price. Bin numbers are fixed by the bin size, not by the prices in the window
+        """
+        if self.tick_size is not None:
+            return int(np.floor(price / self.tick_size))
+        if not price > 0:
+            raise ValueError(f"PriceProfile log spaced bins need a positive price, got {price}")
+        return int(np.floor(np.log(price) / self.log_step))
+
+    def bin_edges(self, start: int, end: int) -> np.ndarray:
+        """
+        Lower edges of bins start to end, including end
+        """
+        indices = np.arange(start, end + 1, dtype=np.float64)
+        if self.tick_size is not None:
+            return indices * self.tick_size
+        return np.exp(indices * self.log_step)
+
+    def bin_price(self, index: int) -> float:
+        """
+        Price at the middle of bin index
+        """
+        low, high = self.bin_edges(index, index + 1)
+        return float((low + high) / 2)
+
+    def push(self, low: float, high: float, volume: float = None):
+        """
+        Add a kline to the profile, dropping the oldest kline once the window is full.
+        The volume is split over the bins in proportion to how much of the low to high range falls in each bin.
+        If volume is not set, every bin the kline touches gets one TPO (time price opportunity) instead
+        """
+        start = self.bin_index(low)
+        end = max(self.bin_index(high), start)
+        if volume is None:
+            amounts = np.ones(end - start + 1, dtype=np.float64)
+        else:
+            amounts = self._distribute(start, end, low, high, volume)
+
+        if len(self._window) == self.period:
+            old_start, old_amounts = self._window.popleft()
+            self._add(old_start, -old_amounts, removed=True)
+        self._window.append((start, amounts))
+        self._extrema.push(end, start)
+        self._add(start, amounts)
+
+        # adding and removing float amounts leaves rounding errors behind, so rebuild the bins once per period
+        self._updates += 1
+        if self._updates >= self.period:
+            self._resync()
+
+    def _distribute(self, start: int, end: int, low: float, high: float, volume: float) -> np.ndarray:
+        if start == end:
+            return np.array([volume], dtype=np.float64)
+        edges = self.bin_edges(start, end + 1)
+        overlap = np.clip(np.minimum(edges[1:], high) - np.maximum(edges[:-1], low), 0.0, None)
+        total = overlap.sum()
+        if total <= 0:
+            amounts = np.zeros(len(overlap), dtype=np.float64)
+            amounts[0] = volume
+            return amounts
+        return overlap * (volume / total)
+
+    def _reserve(self, start: int, end: int):
+        """
+        Make sure bins start to end are in _counts, growing it with room to spare on both sides
+        """
+        size = len(self._counts)
+        if size and start >= self._origin and end < self._origin + size:
+            return
+        low = min(start, self._origin) if size else start
+        high = max(end, self._origin + size - 1) if size else end
+        padding = max((high - low + 1) // 2, 16)
+        counts = np.zeros(high - low + 1 + 2 * padding, dtype=np.float64)
+        origin = low - padding
+        if size:
+            counts[self._origin - origin:self._origin - origin + size] = self._counts
+        self._counts = counts
+        self._origin = origin
+
+    def _add(self, start: int, amounts: np.ndarray, removed: bool = False):
+        end = start + len(amounts) - 1
+        self._reserve(start, end)
+        offset = start - self._origin
+        counts = self._counts
+        counts[offset:offset + len(amounts)] += amounts
+        self._total += float(amounts.sum())
+
+        if self._poc is None:
+            self._poc = self._argmax()
+        elif not removed:
+            # only these bins went up, so the point of control either stays or moves to one of them
+            candidate = offset + int(np.argmax(counts[offset:offset + len(amounts)]))
+            poc = self._poc - self._origin
+            if counts[candidate] > counts[poc] or (counts[candidate] == counts[poc] and candidate < poc):
+                self._poc = candidate + self._origin
+        elif start <= self._poc <= end:
+            # the point of control lost volume, another bin may now be higher
+            self._poc = self._argmax()
+
+    def _argmax(self) -> int:
+        first, last = self._occupied()
+        if first is None:
+            return None
+        return first + int(np.argmax(self._counts[first - self._origin:last - self._origin + 1]))
+
+    def _occupied(self) -> tuple[int, int]:
+        if not self._window:
+            return None, None
+        return self._extrema.min(), self._extrema.max()
+
+    def _resync(self):
+        """
+        Rebuild the bins from the klines in the window, which also shrinks _counts back to the bins in use
+        """
+        self._updates = 0
+        first, last = self._occupied()
+        self._counts = np.zeros(0, dtype=np.float64)
+        if first is None:
+            self._total = 0.0
+            self._poc = None
+            return
+        self._reserve(first, last)
+        counts = self._counts
+        for start, amounts in self._window:
+            offset = start - self._origin
+            counts[offset:offset + len(amounts)] += amounts
+        self._total = float(counts.sum())
+        self._poc = self._argmax()
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def full(self) -> bool:
+        return len(self._window) == self.period
+
+    def total(self) -> float:
+        return self._total
+
+    def poc(self) -> float:
+        """
+        Point of control, the price of the bin with the most volume. The lowest bin wins a tie
+        """
+        if self._poc is None or self._total <= 0:
+            return None
+        return self.bin_price(self._poc)
+
+    def value_area(self) -> tuple[float, float]:
+        """
+        Returns (val, vah), the lowest and highest prices of the bins holding value_area_percentage of the volume,
+        taking bins from the highest volume down. Only the bins covered by the window are sorted, so the cost
+        is O(B log B) for the B bins the window spans, not for the whole price range. A single kline can reorder
+        the counts of every bin it covers, so the highest first order is rebuilt on each call
+        """
+        first, last = self._occupied()
+        if first is None or self._total <= 0:
+            return None, None
+        counts = self._counts[first - self._origin:last - self._origin + 1]
+        order = np.argsort(-counts, kind='stable')
+        cumulative = np.cumsum(counts[order])
+        target = (self.value_area_percentage / 100.0) * cumulative[-1]
+        count = min(int(np.searchsorted(cumulative, target)), len(order) - 1) + 1
+        selected = order[:count]
+        return self.bin_price(first + int(selected.min())), self.bin_price(first + int(selected.max()))
+
+    def profile(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (prices, counts) for the bins covered by the window, with the price at the middle of each bin
+        """
+        first, last = self._occupied()
+        if first is None:
+            return np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.float64)
+        edges = self.bin_edges(first, last + 1)
+        counts = self._counts[first - self._origin:last - self._origin + 1].copy()
+        return (edges[:-1] + edges[1:]) / 2, counts
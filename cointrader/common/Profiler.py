@@ -0,0 +1,195 @@
+# This file contains the Profiler class, which collects timers and counters per symbol and per component on the trader hot path.
+# Profiling is opt-in: the trader code only calls the profiler when one was passed in, so without one the cost is a None check.
+# Components started while another one is timed are nested under it with ';' (e.g. 'kline;strategy;macd'), the same way
+# stacks are written in the folded flamegraph format. timer() times a with block, and stops the timer when the block
+# raises, so an exception never leaves the following components nested under the wrong parent
+from contextlib import nullcontext
+import json
+import os
+import time
+
+# stands in for a timer when there is no Profiler
+NULL_TIMER = nullcontext()
+
+
+class ProfilerTimer(object):
+    """
+    Context manager timing component for symbol with a Profiler
+    """
+    __slots__ = ('_profiler', '_symbol', '_component', '_start')
+
+    def __init__(self, profiler, symbol: str, component: str):
+        self._profiler = profiler
+        self._symbol = symbol
+        self._component = component
+        self._start = 0
+
+    def __enter__(self):
+        self._start = self._profiler.start(self._component)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.stop(self._symbol, self._start)
+        return False
+
+
+class Profiler(object):
+    def __init__(self, report_interval: float = 0.0):
+        """
+        :param report_interval: Seconds between summaries printed by report(), 0 to only print when forced.
+        """
+        self._report_interval = report_interval
+        self.reset()
+
+    def reset(self):
+        # (symbol, component) -> [count, total_ns, max_ns]
+        self._timers: dict[tuple[str, str], list[int]] = {}
+        # (symbol, name) -> value
+        self._counters: dict[tuple[str, str], int] = {}
+        # full names of the components being timed, innermost last
+        self._paths: list[str] = []
+        self._start_time = time.time()
+        self._last_report = self._start_time
+
+    def timer(self, symbol: str, component: str) -> ProfilerTimer:
+        """
+        Time component for symbol in a with block
+        """
+        return ProfilerTimer(self, symbol, component)
+
+    def start(self, component: str) -> int:
+        """
+        Start timing component, nested under the components that are still being timed.
+        Returns the start time to pass to stop(), which has to be called even if the timed code raises,
+        timer() does that. Only use a Profiler from one thread
+        """
+        paths = self._paths
+        paths.append(f"{paths[-1]};{component}" if paths else component)
+        return time.perf_counter_ns()
+
+    def stop(self, symbol: str, start: int):
+        """
+        Stop timing the last started component, and add the time since start to its timer for symbol
+        """
+        elapsed = time.perf_counter_ns() - start
+        key = (symbol, self._paths.pop())
+        timer = self._timers.get(key)
+        if timer is None:
+            timer = self._timers[key] = [0, 0, 0]
+        timer[0] += 1
+        timer[1] += elapsed
+        if elapsed > timer[2]:
+            timer[2] = elapsed
+
+    def count(self, symbol: str, name: str, value: int = 1):
+        """
+        Add value to the counter for symbol and name
+        """
+        key = (symbol, name)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def components(self, symbol: str = None) -> dict[str, dict]:
+        """
+        Timers for each component, added up over all symbols or only for symbol, sorted by total time
+        """
+        totals: dict[str, list[int]] = {}
+        for (timer_symbol, component), (count, total, maximum) in self._timers.items():
+            if symbol is not None and timer_symbol != symbol:
+                continue
+            entry = totals.setdefault(component, [0, 0, 0])
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], maximum)
+        result = {}
+        for component, (count, total, maximum) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True):
+            result[component] = self._timer_dict(count, total, maximum)
+        return result
+
+    def snapshot(self) -> dict:
+        """
+        All timers and counters by symbol, as a dict that can be written as JSON
+        """
+        timers: dict[str, dict] = {}
+        for (symbol, component), (count, total, maximum) in sorted(self._timers.items()):
+            timers.setdefault(symbol, {})[component] = self._timer_dict(count, total, maximum)
+        counters: dict[str, dict] = {}
+        for (symbol, name), value in sorted(self._counters.items()):
+            counters.setdefault(symbol, {})[name] = value
+        return {
+            'elapsed_seconds': time.time() - self._start_time,
+            'components': self.components(),
+            'timers': timers,
+            'counters': counters,
+        }
+
+    def save_json(self, path: str):
+        """
+        Write snapshot() to path, replacing the file atomically
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def folded(self, by_symbol: bool = True) -> list[str]:
+        """
+        Timers in the folded stack format used by flamegraph.pl and speedscope, one 'frame;frame;frame value' line
+        per component, where value is the time in microseconds spent in the component itself and not in its children
+        """
+        totals: dict[tuple[str, str], int] = {}
+        for (symbol, component), timer in self._timers.items():
+            key = (symbol if by_symbol else '', component)
+            totals[key] = totals.get(key, 0) + timer[1]
+
+        # the time of a component includes the time of its children, so subtract the children to get the self time
+        self_time = dict(totals)
+        for (symbol, component), total in totals.items():
+            parent, _, _ = component.rpartition(';')
+            if parent and (symbol, parent) in self_time:
+                self_time[(symbol, parent)] -= total
+
+        lines = []
+        for (symbol, component), total in sorted(self_time.items()):
+            value = max(total, 0) // 1000
+            if value > 0:
+                lines.append(f"{symbol};{component} {value}" if symbol else f"{component} {value}")
+        return lines
+
+    def save_folded(self, path: str, by_symbol: bool = True):
+        with open(path, 'w') as f:
+            for line in self.folded(by_symbol=by_symbol):
+                f.write(f"{line}\n")
+
+    def summary(self, top: int = 25) -> str:
+        """
+        Text table of the components with the most total time
+        """
+        components = self.components()
+        lines = [f"{'component':<40} {'count':>10} {'total ms':>12} {'avg us':>10} {'max us':>10}"]
+        for component, timer in list(components.items())[:top]:
+            lines.append(f"{component:<40} {timer['count']:>10} {timer['total_ms']:>12.1f} {timer['avg_us']:>10.2f} {timer['max_us']:>10.1f}")
+        counters: dict[str, int] = {}
+        for (_, name), value in self._counters.items():
+            counters[name] = counters.get(name, 0) + value
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:<40} {value:>10}")
+        return '\n'.join(lines)
+
+    def report(self, force: bool = False) -> bool:
+        """
+        Print the summary if report_interval seconds have passed since the last one, returns True if it was printed
+        """
+        now = time.time()
+        if not force and (self._report_interval <= 0 or now - self._last_report < self._report_interval):
+            return False
+        self._last_report = now
+        print(self.summary())
+        return True
+
+    def _timer_dict(self, count: int, total: int, maximum: int) -> dict:
+        return {
+            'count': count,
+            'total_ms': total / 1e6,
+            'avg_us': total / count / 1e3 if count else 0.0,
+            'max_us': maximum / 1e3,
+        }
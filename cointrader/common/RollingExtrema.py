@@ -0,0 +1,73 @@
+# This file contains the RollingExtrema class, which tracks the maximum and minimum over the last period values
+# with monotonic deques, so push(), max() and min() are amortized O(1) instead of rescanning the whole window
+from collections import deque
+
+class RollingExtrema(object):
+    __slots__ = ('period', '_count', '_max', '_min')
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("RollingExtrema period must be at least 1")
+        self.period = period
+        self.clear()
+
+    def clear(self):
+        self._count = 0
+        # (index, value) pairs, with decreasing values in _max and increasing values in _min,
+        # so the front of each deque is the maximum / minimum of the window
+        self._max = deque()
+        self._min = deque()
+
+    def push(self, high: float, low: float = None):
+        """
+        Add a value to the window, dropping the oldest value once the window is full.
+        For klines, pass the high and low, and max() / min() return the highest high and lowest low.
+        If low is not set, max() and min() are for the same value
+        """
+        if low is None:
+            low = high
+        index = self._count
+        self._count += 1
+
+        # values that are no larger than the new value can never be the maximum again, and the same for the minimum
+        max_values = self._max
+        while max_values and max_values[-1][1] <= high:
+            max_values.pop()
+        max_values.append((index, high))
+
+        min_values = self._min
+        while min_values and min_values[-1][1] >= low:
+            min_values.pop()
+        min_values.append((index, low))
+
+        # drop the values that fell out of the window
+        oldest = index - self.period
+        if max_values[0][0] <= oldest:
+            max_values.popleft()
+        if min_values[0][0] <= oldest:
+            min_values.popleft()
+
+    def max(self) -> float:
+        """
+        Maximum (highest high) of the window, None if no values were pushed
+        """
+        if not self._max:
+            return None
+        return self._max[0][1]
+
+    def min(self) -> float:
+        """
+        Minimum (lowest low) of the window, None if no values were pushed
+        """
+        if not self._min:
+            return None
+        return self._min[0][1]
+
+    def __len__(self) -> int:
+        """
+        Number of values in the window, up to period
+        """
+        return min(self._count, self.period)
+
+    def full(self) -> bool:
+        return self._count >= self.period
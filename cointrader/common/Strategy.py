@@ -6,6 +6,7 @@ class Strategy:
     _symbol = None
     _granularity = 0
     _kwargs = None
+    _profiler = None
 
     def __init__(self, symbol, name, granularity, **kwargs):
         self._name = name
@@ -22,6 +23,12 @@ class Strategy:
     def granularity(self):
         return self._granularity
 
+    def set_profiler(self, profiler):
+        """
+        Set a Profiler for timing the parts of update()
+        """
+        self._profiler = profiler
+
     def update(self, kline : Kline):
         raise NotImplementedError
     
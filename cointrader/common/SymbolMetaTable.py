@@ -0,0 +1,102 @@
+# This file contains the SymbolMetaTable class, the precision and size limits of symbols and assets compiled once.
+# SymbolInfoConfig and AssetInfoConfig build a new info object from their dict on every lookup, which is too slow for
+# the rounding done on every simulated order. The table resolves each symbol and asset on first use into a slotted
+# record, with the integer scale of each precision for the fixed-point balances of AccountSimulate.
+# Symbols and assets without info get a precision of 8 and no min size
+from .SymbolInfo import SymbolInfo
+from .AssetInfo import AssetInfo
+
+DEFAULT_PRECISION = 8
+
+class SymbolMeta(object):
+    __slots__ = ('symbol', 'base_precision', 'quote_precision', 'base_scale', 'quote_scale',
+                 'base_min_size', 'quote_min_size', 'base_step_size', 'quote_step_size')
+
+    def __init__(self, symbol: str, info: SymbolInfo = None):
+        self.symbol = symbol
+        if info is None:
+            self.base_precision = DEFAULT_PRECISION
+            self.quote_precision = DEFAULT_PRECISION
+            self.base_min_size = 0.0
+            self.quote_min_size = 0.0
+            self.base_step_size = 0.0
+            self.quote_step_size = 0.0
+        else:
+            self.base_precision = int(info.base_precision)
+            self.quote_precision = int(info.quote_precision)
+            self.base_min_size = float(info.base_min_size)
+            self.quote_min_size = float(info.quote_min_size)
+            self.base_step_size = float(info.base_step_size)
+            self.quote_step_size = float(info.quote_step_size)
+        self.base_scale = 10 ** self.base_precision
+        self.quote_scale = 10 ** self.quote_precision
+
+
+class AssetMeta(object):
+    __slots__ = ('asset', 'precision', 'scale', 'min_size', 'step_size')
+
+    def __init__(self, asset: str, info: AssetInfo = None):
+        self.asset = asset
+        if info is None:
+            self.precision = DEFAULT_PRECISION
+            self.min_size = 0.0
+            self.step_size = 0.0
+        else:
+            self.precision = int(info.precision)
+            self.min_size = float(info.min_size)
+            self.step_size = float(info.step_size)
+        self.scale = 10 ** self.precision
+
+    def to_units(self, amount: float) -> int:
+        """
+        Amount as an integer number of the smallest unit of the asset
+        """
+        return round(amount * self.scale)
+
+    def from_units(self, units: int) -> float:
+        return units / self.scale
+
+
+class SymbolMetaTable(object):
+    def __init__(self, symbol_info=None, asset_info=None):
+        """
+        :param symbol_info: Source of the SymbolInfo of each symbol, like SymbolInfoConfig
+        :param asset_info: Source of the AssetInfo of each asset, like AssetInfoConfig
+        """
+        self._symbol_info = symbol_info
+        self._asset_info = asset_info
+        self._symbols: dict[str, SymbolMeta] = {}
+        self._assets: dict[str, AssetMeta] = {}
+
+    def clear(self):
+        """
+        Drop the compiled records, after the symbol or asset info was loaded again
+        """
+        self._symbols.clear()
+        self._assets.clear()
+
+    def symbol(self, symbol: str) -> SymbolMeta:
+        meta = self._symbols.get(symbol)
+        if meta is None:
+            info = None
+            if self._symbol_info is not None:
+                try:
+                    info = self._symbol_info.get_symbol_info(symbol)
+                except KeyError:
+                    pass
+            meta = SymbolMeta(symbol, info)
+            self._symbols[symbol] = meta
+        return meta
+
+    def asset(self, asset: str) -> AssetMeta:
+        meta = self._assets.get(asset)
+        if meta is None:
+            info = None
+            if self._asset_info is not None:
+                try:
+                    info = self._asset_info.get_asset_info(asset)
+                except KeyError:
+                    pass
+            meta = AssetMeta(asset, info)
+            self._assets[asset] = meta
+        return meta
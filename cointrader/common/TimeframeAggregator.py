@@ -0,0 +1,102 @@
+# This class builds klines of any number of larger granularities from one stream of klines of a symbol.
+# Each larger kline covers a bucket aligned to the epoch (a 1d kline covers 00:00 to 24:00 UTC), and is built with a
+# running OHLCV accumulator, so an update costs the same whatever the granularity. A bucket is emitted as soon as its
+# last kline arrives, or when a kline of a later bucket arrives first, since there are no klines for periods without trades
+from .Kline import Kline
+
+class _Bucket(object):
+    __slots__ = ('ts', 'open', 'high', 'low', 'close', 'volume', 'count')
+
+    def __init__(self, ts: int, kline: Kline):
+        self.ts = ts
+        self.open = kline.open
+        self.high = kline.high
+        self.low = kline.low
+        self.close = kline.close
+        self.volume = kline.volume
+        self.count = 1
+
+    def update(self, kline: Kline):
+        if kline.high > self.high:
+            self.high = kline.high
+        if kline.low < self.low:
+            self.low = kline.low
+        self.close = kline.close
+        self.volume += kline.volume
+        self.count += 1
+
+
+class TimeframeAggregator(object):
+    def __init__(self, src_granularity: int, dst_granularities: list[int], symbol: str = None, emit_partial: bool = True):
+        """
+        :param src_granularity: Granularity of the klines passed to update()
+        :param dst_granularities: Granularities to build, each a multiple of src_granularity
+        :param symbol: Symbol set on the emitted klines, the symbol of the source klines if None
+        :param emit_partial: Emit the buckets that are missing klines, otherwise they are dropped
+        """
+        for granularity in dst_granularities:
+            if granularity <= src_granularity or granularity % src_granularity != 0:
+                raise ValueError(f"granularity {granularity} is not a multiple of src granularity {src_granularity}")
+        self._src_granularity = src_granularity
+        self._granularities = sorted(set(dst_granularities))
+        self._symbol = symbol
+        self._emit_partial = emit_partial
+        self._buckets: dict[int, _Bucket] = {}
+        self._last_ts = None
+        self._last_symbol = symbol
+
+    def granularities(self) -> list[int]:
+        """
+        Granularities of the klines being emitted
+        """
+        return list(self._granularities)
+
+    def reset(self):
+        self._buckets.clear()
+        self._last_ts = None
+
+    def update(self, kline: Kline) -> list[Kline]:
+        """
+        Add a kline, and return the klines of the buckets it completed, in increasing granularity.
+        Klines that are not newer than the previous one are ignored
+        """
+        if self._last_ts is not None and kline.ts <= self._last_ts:
+            return []
+        self._last_ts = kline.ts
+        symbol = self._symbol if self._symbol is not None else kline.symbol
+        self._last_symbol = symbol
+
+        emitted = []
+        for granularity in self._granularities:
+            start = kline.ts - kline.ts % granularity
+            bucket = self._buckets.get(granularity)
+            if bucket is not None and bucket.ts != start:
+                # the last klines of the previous bucket never came
+                self._emit(emitted, bucket, granularity, symbol)
+                bucket = None
+            if bucket is None:
+                bucket = _Bucket(start, kline)
+                self._buckets[granularity] = bucket
+            else:
+                bucket.update(kline)
+            if kline.ts + self._src_granularity >= start + granularity:
+                self._emit(emitted, bucket, granularity, symbol)
+                del self._buckets[granularity]
+        return emitted
+
+    def flush(self) -> list[Kline]:
+        """
+        Emit the buckets still being built, for example at the end of a backtest
+        """
+        emitted = []
+        for granularity in self._granularities:
+            bucket = self._buckets.pop(granularity, None)
+            if bucket is not None:
+                self._emit(emitted, bucket, granularity, self._last_symbol)
+        return emitted
+
+    def _emit(self, emitted: list[Kline], bucket: _Bucket, granularity: int, symbol: str):
+        if not self._emit_partial and bucket.count < granularity // self._src_granularity:
+            return
+        emitted.append(Kline(symbol=symbol, open=bucket.open, close=bucket.close, low=bucket.low, high=bucket.high,
+                             volume=bucket.volume, ts=bucket.ts, granularity=granularity))
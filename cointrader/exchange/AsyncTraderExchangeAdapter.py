@@ -0,0 +1,70 @@
+# AsyncTraderExchangeAdapter makes a blocking TraderExchangeBase (like CBADVTraderExchange, whose REST client is synchronous)
+# usable from an asyncio event loop. Each call runs on a small pool of threads of its own, so the event loop is never
+# blocked by a request, and up to max_workers requests are in flight at once
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from cointrader.exchange.TraderExchangeBase import TraderExchangeBase
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.enum.OrderStopDirection import OrderStopDirection
+from .AsyncTraderExchangeBase import AsyncTraderExchangeBase
+
+class AsyncTraderExchangeAdapter(AsyncTraderExchangeBase):
+    def __init__(self, exchange: TraderExchangeBase, max_workers: int = 8):
+        """
+        :param exchange: Blocking exchange to run the requests on
+        :param max_workers: Max number of requests in flight to the exchange
+        """
+        self._name = exchange.name()
+        self._exchange = exchange
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{self._name}-rest")
+
+    def exchange(self) -> TraderExchangeBase:
+        return self._exchange
+
+    async def _call(self, method, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+    def market_get_max_kline_count(self, granularity: int) -> int:
+        return self._exchange.market_get_max_kline_count(granularity)
+
+    async def market_ticker_price_get(self, ticker: str) -> float:
+        return await self._call(self._exchange.market_ticker_price_get, ticker)
+
+    async def market_ticker_prices_all_get(self) -> dict:
+        return await self._call(self._exchange.market_ticker_prices_all_get)
+
+    async def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> list:
+        return await self._call(self._exchange.market_get_klines_range, ticker, start_ts, end_ts, granularity)
+
+    async def trade_buy_market(self, ticker: str, amount: float) -> OrderResult:
+        return await self._call(self._exchange.trade_buy_market, ticker=ticker, amount=amount)
+
+    async def trade_sell_market(self, ticker: str, amount: float) -> OrderResult:
+        return await self._call(self._exchange.trade_sell_market, ticker=ticker, amount=amount)
+
+    async def trade_buy_limit(self, ticker: str, amount: float, price: float, type: str = "") -> OrderResult:
+        return await self._call(self._exchange.trade_buy_limit, ticker=ticker, amount=amount, price=price, type=type)
+
+    async def trade_sell_limit(self, ticker: str, amount: float, price: float, type: str = "") -> OrderResult:
+        return await self._call(self._exchange.trade_sell_limit, ticker=ticker, amount=amount, price=price, type=type)
+
+    async def trade_buy_stop_limit(self, ticker: str, amount: float, price: float, stop_price: float, stop_direction: OrderStopDirection = OrderStopDirection.ABOVE, type: str = "") -> OrderResult:
+        return await self._call(self._exchange.trade_buy_stop_limit, ticker=ticker, amount=amount, price=price, stop_price=stop_price,
+                                stop_direction=stop_direction, type=type)
+
+    async def trade_sell_stop_limit(self, ticker: str, amount: float, price: float, stop_price: float, stop_direction: OrderStopDirection = OrderStopDirection.BELOW, type: str = "") -> OrderResult:
+        return await self._call(self._exchange.trade_sell_stop_limit, ticker=ticker, amount=amount, price=price, stop_price=stop_price,
+                                stop_direction=stop_direction, type=type)
+
+    async def trade_cancel_order(self, ticker: str, order_id: str) -> OrderResult:
+        return await self._call(self._exchange.trade_cancel_order, ticker, order_id)
+
+    async def trade_get_order(self, ticker: str, order_id: str) -> OrderResult:
+        return await self._call(self._exchange.trade_get_order, ticker, order_id)
+
+    async def trade_get_open_orders(self, ticker: str = None) -> dict[str, OrderResult]:
+        return await self._call(self._exchange.trade_get_open_orders, ticker)
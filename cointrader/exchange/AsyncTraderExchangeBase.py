@@ -0,0 +1,72 @@
+# AsyncTraderExchangeBase is the base class for exchange implementations used from an asyncio event loop.
+# It has the subset of TraderExchangeBase the live runtime uses, with coroutines for everything that does I/O,
+# so requests for many symbols can be in flight at once on one thread
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.enum.OrderStopDirection import OrderStopDirection
+
+class AsyncTraderExchangeBase(object):
+    _name = None
+    def __init__(self):
+        self._name = "base"
+
+    def name(self) -> str:
+        """Return name of exchange"""
+        return self._name
+
+    async def close(self):
+        """Release the connections of the exchange"""
+        pass
+
+
+    def market_get_max_kline_count(self, granularity: int) -> int:
+        """Get max kline count for a given interval"""
+        raise NotImplementedError
+
+    async def market_ticker_price_get(self, ticker: str) -> float:
+        """Get ticker price"""
+        raise NotImplementedError
+
+    async def market_ticker_prices_all_get(self) -> dict:
+        """Get all ticker prices"""
+        raise NotImplementedError
+
+    async def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> list:
+        """Get klines for a given range"""
+        raise NotImplementedError
+
+
+    async def trade_buy_market(self, ticker: str, amount: float) -> OrderResult:
+        """Buy at market price"""
+        raise NotImplementedError
+
+    async def trade_sell_market(self, ticker: str, amount: float) -> OrderResult:
+        """Sell at market price"""
+        raise NotImplementedError
+
+    async def trade_buy_limit(self, ticker: str, amount: float, price: float, type: str = "") -> OrderResult:
+        """Buy at a specific price"""
+        raise NotImplementedError
+
+    async def trade_sell_limit(self, ticker: str, amount: float, price: float, type: str = "") -> OrderResult:
+        """Sell at a specific price"""
+        raise NotImplementedError
+
+    async def trade_buy_stop_limit(self, ticker: str, amount: float, price: float, stop_price: float, stop_direction: OrderStopDirection = OrderStopDirection.ABOVE, type: str = "") -> OrderResult:
+        """Buy at a specific price when stop price is reached"""
+        raise NotImplementedError
+
+    async def trade_sell_stop_limit(self, ticker: str, amount: float, price: float, stop_price: float, stop_direction: OrderStopDirection = OrderStopDirection.BELOW, type: str = "") -> OrderResult:
+        """Sell at a specific price when stop price is reached"""
+        raise NotImplementedError
+
+    async def trade_cancel_order(self, ticker: str, order_id: str) -> OrderResult:
+        """Cancel an open order"""
+        raise NotImplementedError
+
+    async def trade_get_order(self, ticker: str, order_id: str) -> OrderResult:
+        """Get order information"""
+        raise NotImplementedError
+
+    async def trade_get_open_orders(self, ticker: str = None) -> dict[str, OrderResult]:
+        """Get open orders as OrderResults by order id, for ticker or all tickers if None"""
+        raise NotImplementedError
@@ -179,8 +179,8 @@ class TraderExchangeBase(object):
         """Get order information"""
         raise NotImplementedError
    
-    def trade_get_open_orders(self, ticker: str) -> dict:
-        """Get open orders"""
+    def trade_get_open_orders(self, ticker: str = None) -> dict[str, OrderResult]:
+        """Get open orders as OrderResults by order id, for ticker or all tickers if None"""
         raise NotImplementedError
     
     def trade_get_closed_orders(self, ticker: str) -> dict:
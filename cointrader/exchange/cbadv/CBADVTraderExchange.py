@@ -354,9 +354,21 @@ class CBADVTraderExchange(TraderExchangeBase):
             result['response'] = { 'error': 'UNKNOWN', 'message': str(e) }
         return self.trade_parse_order_result(result, ticker)
 
-    def trade_get_open_orders(self, ticker: str) -> dict:
-        """Get open orders"""
-        raise NotImplementedError
+    def trade_get_open_orders(self, ticker: str = None) -> dict[str, OrderResult]:
+        """Get open orders as OrderResults by order id, for ticker or all tickers if None"""
+        result = {}
+        cursor = None
+        while True:
+            response = self.client.list_orders(product_ids=[ticker] if ticker else None, order_status=['OPEN'], cursor=cursor)
+            if not isinstance(response, dict):
+                response = response.to_dict()
+            for order in response.get('orders', []):
+                order_result = self.trade_parse_order_result({'order': order}, order.get('product_id', ticker))
+                result[order_result.id] = order_result
+            cursor = response.get('cursor')
+            if not response.get('has_next') or not cursor:
+                break
+        return result
 
     def trade_get_closed_orders(self, ticker: str) -> dict:
         """Get closed orders"""
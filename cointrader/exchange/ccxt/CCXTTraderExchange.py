@@ -382,11 +382,21 @@ class CCXTTraderExchange(TraderExchangeBase):
         except Exception as e:
             return self.trade_parse_order_result({'error': str(e)}, ticker)
 
-    def trade_get_open_orders(self, ticker: str) -> dict:
-        symbol = self._ccxt_symbol(ticker)
-        orders = self.client.fetch_open_orders(symbol)
-        # Return a list of parsed orders
-        return {'orders': [self.trade_parse_order_result(o, ticker) for o in orders]}
+    def trade_get_open_orders(self, ticker: str = None) -> dict[str, OrderResult]:
+        """Get open orders as OrderResults by order id, for ticker or all tickers if None"""
+        if not self.client.has.get('fetchOpenOrders'):
+            raise NotImplementedError
+        symbol = self._ccxt_symbol(ticker) if ticker else None
+        try:
+            orders = self.client.fetch_open_orders(symbol)
+        except ccxt.ArgumentsRequired:
+            # the exchange only lists the open orders of one symbol at a time
+            raise NotImplementedError
+        result = {}
+        for o in orders:
+            order_result = self.trade_parse_order_result(o, ticker or self._internal_ticker_format(o['symbol']))
+            result[order_result.id] = order_result
+        return result
 
     def trade_get_closed_orders(self, ticker: str) -> dict:
         symbol = self._ccxt_symbol(ticker)
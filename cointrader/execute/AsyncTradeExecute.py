@@ -0,0 +1,43 @@
+# Executes trades on an AsyncTraderExchangeBase. The order methods are coroutines, so ExecuteBase.execute_order()
+# returns a coroutine for the request, which AsyncExecutePipeline awaits on the event loop
+from cointrader.exchange.AsyncTraderExchangeBase import AsyncTraderExchangeBase
+from cointrader.order.OrderResult import OrderResult
+from cointrader.account.AccountBase import AccountBase
+from cointrader.trade.TraderConfig import TraderConfig
+from .ExecuteBase import ExecuteBase
+
+class AsyncTraderExecute(ExecuteBase):
+    def __init__(self, exchange: AsyncTraderExchangeBase, account: AccountBase, config: TraderConfig):
+        self._exchange = exchange
+        self._account = account
+        self._config = config
+
+    def account(self) -> AccountBase:
+        return self._account
+
+    async def market_buy(self, symbol: str, amount: float, current_price: float, current_ts: int) -> OrderResult:
+        return await self._exchange.trade_buy_market(ticker=symbol, amount=amount)
+
+    async def market_sell(self, symbol: str, amount: float, current_price: float, current_ts: int) -> OrderResult:
+        return await self._exchange.trade_sell_market(ticker=symbol, amount=amount)
+
+    async def limit_buy(self, symbol: str, limit_price: float, amount: float) -> OrderResult:
+        return await self._exchange.trade_buy_limit(ticker=symbol, amount=amount, price=limit_price)
+
+    async def limit_sell(self, symbol: str, limit_price: float, amount: float) -> OrderResult:
+        return await self._exchange.trade_sell_limit(ticker=symbol, amount=amount, price=limit_price)
+
+    async def stop_loss_limit_buy(self, symbol: str, limit_price: float, stop_price: float, amount: float) -> OrderResult:
+        return await self._exchange.trade_buy_stop_limit(ticker=symbol, amount=amount, price=limit_price, stop_price=stop_price)
+
+    async def stop_loss_limit_sell(self, symbol: str, limit_price: float, stop_price: float, amount: float) -> OrderResult:
+        return await self._exchange.trade_sell_stop_limit(ticker=symbol, amount=amount, price=limit_price, stop_price=stop_price)
+
+    async def status(self, symbol: str, order_id: str, current_price: float, current_ts: int) -> OrderResult:
+        return await self._exchange.trade_get_order(symbol, order_id)
+
+    async def cancel(self, symbol: str, order_id: str, current_price: float, current_ts: int) -> OrderResult:
+        return await self._exchange.trade_cancel_order(symbol, order_id)
+
+    async def open_orders(self, symbol: str = None) -> dict[str, OrderResult]:
+        return await self._exchange.trade_get_open_orders(symbol)
@@ -72,3 +72,10 @@ class ExecuteBase(object):
         Cancel an order
         """
         raise NotImplementedError
+
+    def open_orders(self, symbol: str = None) -> dict[str, OrderResult]:
+        """
+        Get the results of all open orders by order id, for symbol or all symbols if None.
+        Raises NotImplementedError if the exchange can't list the open orders
+        """
+        raise NotImplementedError
@@ -0,0 +1,64 @@
+# This file contains the SimulateOrderBook class, the resting orders of one symbol in the simulated exchange.
+# Each order has a trigger price, and is in one of two heaps: the orders that trigger when the price falls to their
+# trigger (limit buys and stop loss sells) in a max heap, and the orders that trigger when the price rises to it
+# (limit sells and stop loss buys) in a min heap. The orders crossed by the low and high of a kline are the tops of
+# the heaps, so matching a kline costs the number of triggered orders, not the number of resting ones.
+# Removed orders are dropped lazily, when they reach the top of their heap
+import heapq
+
+class SimulateOrderBook(object):
+    def __init__(self):
+        self._falling: list[tuple[float, int, str]] = []
+        self._rising: list[tuple[float, int, str]] = []
+        self._live: set[str] = set()
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._live
+
+    def add(self, order_id: str, trigger_price: float, falling: bool):
+        """
+        Add an order triggered when the price falls to trigger_price if falling, or rises to it otherwise
+        """
+        # the sequence keeps orders with the same trigger in the order they were placed
+        self._seq += 1
+        if falling:
+            heapq.heappush(self._falling, (-trigger_price, self._seq, order_id))
+        else:
+            heapq.heappush(self._rising, (trigger_price, self._seq, order_id))
+        self._live.add(order_id)
+
+    def remove(self, order_id: str) -> bool:
+        """
+        Remove an order, returns False if it is not in the book
+        """
+        if order_id not in self._live:
+            return False
+        self._live.remove(order_id)
+        # rebuild the heaps once they are mostly removed orders
+        if len(self._falling) + len(self._rising) > 2 * len(self._live) + 64:
+            self._falling = [entry for entry in self._falling if entry[2] in self._live]
+            self._rising = [entry for entry in self._rising if entry[2] in self._live]
+            heapq.heapify(self._falling)
+            heapq.heapify(self._rising)
+        return True
+
+    def match(self, low: float, high: float) -> list[str]:
+        """
+        Remove and return the orders triggered by a price range, the falling orders first, each by trigger price
+        """
+        triggered = []
+        while self._falling and -self._falling[0][0] >= low:
+            order_id = heapq.heappop(self._falling)[2]
+            if order_id in self._live:
+                self._live.remove(order_id)
+                triggered.append(order_id)
+        while self._rising and self._rising[0][0] <= high:
+            order_id = heapq.heappop(self._rising)[2]
+            if order_id in self._live:
+                self._live.remove(order_id)
+                triggered.append(order_id)
+        return triggered
@@ -60,3 +60,6 @@ class TraderExecute(ExecuteBase):
         #if not self._config.simulate():
         #    print(f"Cancel {symbol} {order_id} result: {result}")
         return result
+
+    def open_orders(self, symbol: str = None) -> dict[str, OrderResult]:
+        return self._exchange.trade_get_open_orders(symbol)
@@ -1,6 +1,14 @@
 # Implement simulate trading execution for backtesting
+# The limit and stop loss limit orders rest in a SimulateOrderBook per symbol. market_update_kline() fills every order
+# crossed by the low and high of a kline, and status() fills an order crossed by the current price. Filled and
+# cancelled orders leave the books, and only the last max_completed of them are kept for status() and cancel()
+from collections import OrderedDict
+import threading
+from cointrader.common.Kline import Kline
 from cointrader.exchange.TraderExchangeBase import TraderExchangeBase
 from .ExecuteBase import ExecuteBase
+from .SimulateOrderBook import SimulateOrderBook
+from cointrader.order.OrderRequest import OrderRequest
 from cointrader.order.OrderResult import OrderResult
 from cointrader.order.Order import OrderStatus, OrderType, OrderSide, Order
 from cointrader.account.AccountBase import AccountBase
@@ -9,16 +17,109 @@ from cointrader.common.LogLevel import LogLevel
 import uuid
 
 class TraderExecuteSimulate(ExecuteBase):
-    def __init__(self, exchange: TraderExchangeBase, account: AccountBase, config: TraderConfig):
-        self._orders: dict[str, Order] = {}
+    def __init__(self, exchange: TraderExchangeBase, account: AccountBase, config: TraderConfig, max_completed: int = 1000):
+        """
+        :param max_completed: Number of filled and cancelled orders kept for status() and cancel()
+        """
         self._exchange = exchange
         self._account = account
         self._config = config
-        self._orders = {}
+        self._max_completed = max_completed
+        # resting orders, which are also in the book of their symbol
+        self._orders: dict[str, OrderResult] = {}
+        self._completed: OrderedDict[str, OrderResult] = OrderedDict()
+        self._books: dict[str, SimulateOrderBook] = {}
+        # the orders can be executed by the pipeline threads while the klines are matched
+        self._lock = threading.RLock()
 
     def account(self) -> AccountBase:
         return self._account
 
+    def execute_order(self, order_request: OrderRequest) -> OrderResult:
+        with self._lock:
+            return super().execute_order(order_request)
+
+    def open_orders(self, symbol: str = None) -> dict[str, OrderResult]:
+        with self._lock:
+            return {order_id: order for order_id, order in self._orders.items() if symbol is None or order.symbol == symbol}
+
+    def market_update_kline(self, symbol: str, kline: Kline) -> list[OrderResult]:
+        """
+        Fill the resting orders of symbol crossed by the range of kline, and return them
+        """
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None or len(book) == 0:
+                return []
+            filled = []
+            for order_id in book.match(kline.low, kline.high):
+                order = self._orders[order_id]
+                try:
+                    self._fill(order, kline.ts)
+                except ValueError as e:
+                    # the order keeps resting, and is matched again by the next klines
+                    print(f"TraderExecuteSimulate: Failed to fill {symbol} order {order_id}: {e}")
+                    book.add(order.id, order.limit_price, self._falling(order))
+                    continue
+                filled.append(order)
+            return filled
+
+    def _falling(self, order: OrderResult) -> bool:
+        """
+        True if order is triggered by the price falling to its limit price, False if by the price rising to it
+        """
+        if order.type == OrderType.LIMIT:
+            return order.side == OrderSide.BUY
+        return order.side == OrderSide.SELL
+
+    def _crossed(self, order: OrderResult, low: float, high: float) -> bool:
+        if self._falling(order):
+            return low <= order.limit_price
+        return high >= order.limit_price
+
+    def _place(self, order: OrderResult):
+        book = self._books.get(order.symbol)
+        if book is None:
+            book = SimulateOrderBook()
+            self._books[order.symbol] = book
+        book.add(order.id, order.limit_price, self._falling(order))
+        self._orders[order.id] = order
+
+    def _complete(self, order: OrderResult):
+        book = self._books.get(order.symbol)
+        if book is not None:
+            book.remove(order.id)
+        self._orders.pop(order.id, None)
+        self._completed[order.id] = order
+        while len(self._completed) > self._max_completed:
+            self._completed.popitem(last=False)
+
+    def _fill(self, order: OrderResult, current_ts: int):
+        # if the buy was executed, then update the account, transfer base hold to balance
+        # if the sell was executed, then update the account, transfer quote hold to balance
+        # the account is updated first, so an order that can't be filled stays placed
+        if order.side == OrderSide.BUY:
+            self._limit_buy_filled(order.symbol, order.limit_price, order.size)
+        else:
+            self._limit_sell_filled(order.symbol, order.limit_price, order.size)
+
+        order.status = OrderStatus.FILLED
+        order.price = order.limit_price
+        order.filled_size = order.size
+        order.filled_ts = current_ts
+        self._complete(order)
+
+    def _get_order(self, symbol: str, order_id: str) -> OrderResult:
+        order = self._orders.get(order_id)
+        if order is None:
+            order = self._completed.get(order_id)
+        if order is None:
+            order = OrderResult(symbol)
+            order.id = order_id
+            order.status = OrderStatus.UNKNOWN
+            order.msg = f'order {order_id} not found'
+        return order
+
     def market_buy(self, symbol: str, amount: float, current_price: float, current_ts: int) -> OrderResult:
         """
         Simulate placing a market buy order
@@ -45,20 +146,18 @@ class TraderExecuteSimulate(ExecuteBase):
         quote = self._exchange.info_ticker_get_quote(symbol)
 
         # Update base balance
-        base_balance, base_balance_hold = self._account.get_asset_balance(base)
-        new_base_balance =  base_balance + amount
-        self._account.update_asset_balance(base, new_base_balance, base_balance_hold)
+        self._account.adjust_asset_balance(base, amount, 0.0)
         
         # Update quote balance
         quote_balance, quote_balance_hold = self._account.get_asset_balance(quote)
-        new_quote_balance = quote_balance - self._account.round_quote(symbol, current_price * amount)
-        if new_quote_balance < 0:
+        quote_amount = self._account.round_quote(symbol, current_price * amount)
+        if quote_balance - quote_amount < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'quote_balance: {quote_balance}, quote_balance_hold: {quote_balance_hold}, new_quote_balance: {new_quote_balance}')
+                print(f'quote_balance: {quote_balance}, quote_balance_hold: {quote_balance_hold}, quote_amount: {quote_amount}')
             raise ValueError(f'{symbol} Insufficient balance for {quote} to buy {base}.')
-        self._account.update_asset_balance(quote, new_quote_balance, quote_balance_hold)
+        self._account.adjust_asset_balance(quote, -quote_amount, 0.0)
 
-        self._orders[result.id] = result
+        self._complete(result)
         return result
 
     def market_sell(self, symbol: str, amount: float, current_price: float, current_ts: int) -> OrderResult:
@@ -88,48 +187,38 @@ class TraderExecuteSimulate(ExecuteBase):
 
         # Update base balance
         base_balance, base_balance_hold = self._account.get_asset_balance(base)
-        new_base_balance = base_balance - amount
-        if new_base_balance < 0:
+        if base_balance - amount < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'base_balance: {base_balance}, new_base_balance: {new_base_balance}')
+                print(f'base_balance: {base_balance}, amount: {amount}')
             raise ValueError(f'{symbol} Insufficient balance for {base} to sell {amount}.')
-        self._account.update_asset_balance(base, new_base_balance, base_balance_hold)
+        self._account.adjust_asset_balance(base, -amount, 0.0)
 
         # Update quote balance
-        quote_balance, quote_balance_hold = self._account.get_asset_balance(quote)
-        new_quote_balance = quote_balance + self._account.round_quote(symbol, current_price * amount)
-        self._account.update_asset_balance(quote, new_quote_balance, quote_balance_hold)
+        self._account.adjust_asset_balance(quote, self._account.round_quote(symbol, current_price * amount), 0.0)
 
-        self._orders[result.id] = result
+        self._complete(result)
         return result
     
     # Simulate account for limit buy order placed
     def _limit_buy_placed(self, symbol: str, price: float, amount: float):
         base = self._exchange.info_ticker_get_base(symbol)
         quote = self._exchange.info_ticker_get_quote(symbol)
-        quote_balance, quote_hold = self._account.get_asset_balance(quote)
         quote_amount = self._account.round_quote(symbol, price * amount)
-        new_quote_balance = quote_balance - quote_amount
-        new_quote_hold = quote_hold + quote_amount
-        self._account.update_asset_balance(quote, new_quote_balance, new_quote_hold)
+        new_quote_balance, new_quote_hold = self._account.adjust_asset_balance(quote, -quote_amount, quote_amount)
 
         if new_quote_balance < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'quote_balance: {quote_balance}, new_quote_balance: {new_quote_balance}')
+                print(f'quote_amount: {quote_amount}, new_quote_balance: {new_quote_balance}')
             raise ValueError(f'{symbol} Insufficient balance for {quote} to buy {base}.')
 
     # Simulate account for limit sell order placed
     def _limit_sell_placed(self, symbol: str, price: float, amount: float):
         base = self._exchange.info_ticker_get_base(symbol)
-        quote = self._exchange.info_ticker_get_quote(symbol)
-        base_balance, base_hold = self._account.get_asset_balance(base)
-        new_base_balance = base_balance - amount
-        new_base_hold = base_hold + amount
-        self._account.update_asset_balance(base, new_base_balance, new_base_hold)
+        new_base_balance, new_base_hold = self._account.adjust_asset_balance(base, -amount, amount)
 
         if new_base_balance < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'base_balance: {base_balance}, new_base_balance: {new_base_balance}')
+                print(f'amount: {amount}, new_base_balance: {new_base_balance}')
             raise ValueError(f'{symbol} Insufficient balance for {base} to sell {amount}.')
 
     def _limit_buy_filled(self, symbol: str, price: float, amount: float):
@@ -140,20 +229,17 @@ class TraderExecuteSimulate(ExecuteBase):
         quote = self._exchange.info_ticker_get_quote(symbol)
 
         # Quote hold amount removed
-        quote_balance, quote_hold = self._account.get_asset_balance(quote)
         quote_amount = self._account.round_quote(symbol, price * amount)
-        new_quote_hold = quote_hold - quote_amount
-        self._account.update_asset_balance(quote, quote_balance, new_quote_hold)
+        quote_balance, new_quote_hold = self._account.adjust_asset_balance(quote, 0.0, -quote_amount)
 
         if new_quote_hold < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'quote_balance: {quote_balance}, quote_balance_hold: {quote_hold}, new_quote_hold: {new_quote_hold}')
+                print(f'quote_balance: {quote_balance}, quote_amount: {quote_amount}, new_quote_hold: {new_quote_hold}')
+            self._account.adjust_asset_balance(quote, 0.0, quote_amount)
             raise ValueError(f'{symbol} Insufficient balance for {quote} to buy {base}.')
 
         # Base balance added
-        base_balance, base_hold = self._account.get_asset_balance(base)
-        new_base_balance = base_balance + amount
-        self._account.update_asset_balance(base, new_base_balance, base_hold)
+        self._account.adjust_asset_balance(base, amount, 0.0)
 
     def _limit_sell_filled(self, symbol: str, price: float, amount: float):
         """
@@ -163,20 +249,17 @@ class TraderExecuteSimulate(ExecuteBase):
         quote = self._exchange.info_ticker_get_quote(symbol)
 
         # Base hold amount removed
-        base_balance, base_hold = self._account.get_asset_balance(base)
-        new_base_hold = base_hold - amount
-        self._account.update_asset_balance(base, base_balance, new_base_hold)
+        base_balance, new_base_hold = self._account.adjust_asset_balance(base, 0.0, -amount)
 
         if new_base_hold < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'base_balance: {base_balance}, base_hold: {base_hold}, new_base_hold: {new_base_hold}')
+                print(f'base_balance: {base_balance}, amount: {amount}, new_base_hold: {new_base_hold}')
+            self._account.adjust_asset_balance(base, 0.0, amount)
             raise ValueError(f'{symbol} Insufficient balance for {base} to sell {amount}.')
 
         # Quote balance added
-        quote_balance, quote_hold = self._account.get_asset_balance(quote)
         quote_amount = self._account.round_quote(symbol, price * amount)
-        new_quote_balance = quote_balance + quote_amount
-        self._account.update_asset_balance(quote, new_quote_balance, quote_hold)
+        self._account.adjust_asset_balance(quote, quote_amount, 0.0)
 
     def _limit_buy_cancelled(self, symbol: str, price: float, amount: float):
         """
@@ -186,15 +269,12 @@ class TraderExecuteSimulate(ExecuteBase):
         quote = self._exchange.info_ticker_get_quote(symbol)
 
         # Quote hold amount removed
-        quote_balance, quote_hold = self._account.get_asset_balance(quote)
         quote_amount = self._account.round_quote(symbol, price * amount)
-        new_quote_hold = quote_hold - quote_amount
-        new_quote_balance = quote_balance + quote_amount
-        self._account.update_asset_balance(quote, new_quote_balance, new_quote_hold)
+        quote_balance, new_quote_hold = self._account.adjust_asset_balance(quote, quote_amount, -quote_amount)
 
         if new_quote_hold < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'quote_balance: {quote_balance}, quote_balance_hold: {quote_hold}, new_quote_hold: {new_quote_hold}')
+                print(f'quote_balance: {quote_balance}, quote_amount: {quote_amount}, new_quote_hold: {new_quote_hold}')
             raise ValueError(f'{symbol} Insufficient balance for {quote} to buy {base}.')
 
     def _limit_sell_cancelled(self, symbol: str, price: float, amount: float):
@@ -202,17 +282,13 @@ class TraderExecuteSimulate(ExecuteBase):
         Simulate account for limit sell order cancelled
         """
         base = self._exchange.info_ticker_get_base(symbol)
-        quote = self._exchange.info_ticker_get_quote(symbol)
 
         # Base hold amount removed
-        base_balance, base_hold = self._account.get_asset_balance(base)
-        new_base_hold = base_hold - amount
-        new_base_balance = base_balance + amount
-        self._account.update_asset_balance(base, new_base_balance, new_base_hold)
+        base_balance, new_base_hold = self._account.adjust_asset_balance(base, amount, -amount)
 
         if new_base_hold < 0:
             if self._config.log_level() == LogLevel.DEBUG.value:
-                print(f'base_balance: {base_balance}, base_hold: {base_hold}, new_base_hold: {new_base_hold}')
+                print(f'base_balance: {base_balance}, amount: {amount}, new_base_hold: {new_base_hold}')
             raise ValueError(f'{symbol} Insufficient balance for {base} to sell {amount}.')
 
 
@@ -233,7 +309,7 @@ class TraderExecuteSimulate(ExecuteBase):
         # simulate account update
         self._limit_buy_placed(symbol, limit_price, result.size)
 
-        self._orders[result.id] = result
+        self._place(result)
         return result
 
     def limit_sell(self, symbol: str, limit_price: float, amount: float) -> OrderResult:
@@ -253,7 +329,7 @@ class TraderExecuteSimulate(ExecuteBase):
         # simulate account update
         self._limit_sell_placed(symbol, limit_price, result.size)
 
-        self._orders[result.id] = result
+        self._place(result)
         return result
 
     def stop_loss_limit_buy(self, symbol: str, limit_price: float, stop_price: float, amount: float) -> OrderResult:
@@ -277,7 +353,7 @@ class TraderExecuteSimulate(ExecuteBase):
         # simulate account update
         self._limit_buy_placed(symbol, limit_price, result.size)
 
-        self._orders[result.id] = result
+        self._place(result)
         return result
 
     def stop_loss_limit_sell(self, symbol: str, limit_price: float, stop_price: float, amount: float) -> OrderResult:
@@ -301,64 +377,28 @@ class TraderExecuteSimulate(ExecuteBase):
         # simulate account update
         self._limit_sell_placed(symbol, limit_price, result.size)
 
-        self._orders[result.id] = result
+        self._place(result)
         return result
 
     def status(self, symbol: str, order_id: str, current_price: float, current_ts: int) -> OrderResult:
         """
         Simulate getting the status of an order
         """
-        order = self._orders[order_id]
-
-        bought = False
-        sold = False
-        if order.type == OrderType.MARKET or order.status == OrderStatus.FILLED:
-            return order
-        elif order.type == OrderType.LIMIT and order.status == OrderStatus.PLACED:
-            if order.side == OrderSide.SELL and current_price >= order.limit_price:
-                order.status = OrderStatus.FILLED
-                order.price = order.limit_price
-                order.filled_size = order.size
-                order.filled_ts = current_ts
-                sold  = True
-            elif order.side == OrderSide.BUY and current_price <= order.limit_price:
-                order.status = OrderStatus.FILLED
-                order.price = order.limit_price
-                order.filled_size = order.size
-                order.filled_ts = current_ts
-                bought = True
-        elif order.type == OrderType.STOP_LOSS_LIMIT and order.status == OrderStatus.PLACED:
-            if order.side == OrderSide.SELL and current_price <= order.limit_price:
-                order.status = OrderStatus.FILLED
-                order.price = order.limit_price
-                order.filled_size = order.size
-                order.filled_ts = current_ts
-                sold = True
-            elif order.side == OrderSide.BUY and current_price >= order.limit_price:
-                order.status = OrderStatus.FILLED
-                order.price = order.limit_price
-                order.filled_size = order.size
-                order.filled_ts = current_ts
-                bought = True
-
-        # if the buy was executed, then update the account, transfer base hold to balance
-        # if the sell was executed, then update the account, transfer quote hold to balance
-        if bought:
-            self._limit_buy_filled(symbol, order.limit_price, order.size)
-        if sold:
-            self._limit_sell_filled(symbol, order.limit_price, order.size)
+        order = self._get_order(symbol, order_id)
+        if order.status == OrderStatus.PLACED and self._crossed(order, current_price, current_price):
+            self._fill(order, current_ts)
         return order
 
     def cancel(self, symbol: str, order_id: str, current_price: float, current_ts: int) -> OrderResult:
         """
         Simulate cancelling an order
         """
-        order = self._orders[order_id]
+        order = self._get_order(symbol, order_id)
 
         if self._config.log_level() == LogLevel.DEBUG.value:
             print(f'cancel: {symbol}, {order_id}, {current_price}')
 
-        if order.type == OrderType.MARKET or order.status == OrderStatus.CANCELLED or order.status == OrderStatus.FILLED:
+        if order.status != OrderStatus.PLACED:
             return order
 
         cancel_buy = False
@@ -385,7 +425,8 @@ class TraderExecuteSimulate(ExecuteBase):
 
         # if the cancelled buy was executed, then update the account, transfer quote hold to quote balance
         # if the cancelled sell was executed, then update the account, transfer base hold to base balance
-        if order.status == OrderStatus.CANCELLED:           
+        if order.status == OrderStatus.CANCELLED:
+            self._complete(order)
             if cancel_buy:
                 # simulate account update
                 self._limit_buy_cancelled(symbol, order.limit_price, order.size)
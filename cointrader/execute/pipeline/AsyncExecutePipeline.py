@@ -0,0 +1,95 @@
+# This file contains the AsyncExecutePipeline class, an ExecutePipeline that executes the order requests on an asyncio event loop.
+# Coroutines on the loop await submit() or submit_batch() directly. The traders, which are synchronous and run on a thread
+# of their own, keep using process_order_request() and wait_order_result(): the request is scheduled on the loop,
+# and the trader thread blocks on its future until the exchange answers, while the loop serves everything else
+import asyncio
+import inspect
+import threading
+from concurrent.futures import Future
+from cointrader.execute.ExecuteBase import ExecuteBase
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.OrderRequest import OrderRequest
+from .ExecutePipeline import ExecutePipeline
+
+class AsyncExecutePipeline(ExecutePipeline):
+    def __init__(self, execute: ExecuteBase, max_orders: int = 100, timeout: float = 30.0):
+        """
+        :param execute: Execute with coroutine order methods, like AsyncTraderExecute
+        :param max_orders: Max number of order requests in flight to the exchange
+        :param timeout: Seconds wait_order_result() waits for a result before giving up
+        """
+        super().__init__(execute=execute, max_orders=max_orders, threaded=True, timeout=timeout)
+        self._loop: asyncio.AbstractEventLoop = None
+        self._loop_thread: int = None
+        self._semaphore: asyncio.Semaphore = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        Execute the order requests on loop, the running loop if None. Called by the runtime before the traders run
+        """
+        self._loop = loop if loop is not None else asyncio.get_running_loop()
+        self._semaphore = None
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop_thread = threading.get_ident()
+        else:
+            self._loop_thread = None
+            self._loop.call_soon_threadsafe(self._set_loop_thread)
+
+    def _set_loop_thread(self):
+        self._loop_thread = threading.get_ident()
+
+    def start(self):
+        pass
+
+    def shutdown(self, wait: bool = True):
+        self._loop = None
+
+    async def submit(self, order_request: OrderRequest) -> OrderResult:
+        """
+        Execute an order request from a coroutine on the loop
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_orders)
+        async with self._semaphore:
+            result = self._execute.execute_order(order_request=order_request)
+            if inspect.isawaitable(result):
+                result = await result
+        return result
+
+    async def submit_batch(self, order_requests: list[OrderRequest]) -> list:
+        """
+        Execute order requests concurrently, returns the results in the same order, with the exception instead
+        of the result for requests that failed
+        """
+        return await asyncio.gather(*[self.submit(order_request) for order_request in order_requests], return_exceptions=True)
+
+    def process_order_request(self, order_request: OrderRequest) -> Future:
+        """
+        Schedule an order request on the loop from another thread. Returns the future of the order result
+        """
+        if self._loop is None:
+            raise RuntimeError("AsyncExecutePipeline: bind() the pipeline to an event loop before placing orders")
+        if threading.get_ident() == self._loop_thread:
+            # waiting for the result would block the loop that has to produce it
+            raise RuntimeError("AsyncExecutePipeline: use submit() to place orders from the event loop")
+        future = asyncio.run_coroutine_threadsafe(self.submit(order_request), self._loop)
+        self._add_request(order_request, future)
+        return future
+
+    def process_order_requests(self) -> int:
+        return 0
+
+    def _open_orders(self) -> dict[str, OrderResult]:
+        if not self._use_open_orders:
+            return None
+        try:
+            return asyncio.run_coroutine_threadsafe(self._execute.open_orders(), self._loop).result(timeout=self._timeout)
+        except NotImplementedError:
+            self._use_open_orders = False
+        except Exception as e:
+            print(f"AsyncExecutePipeline: Failed to list open orders: {e}")
+        return None
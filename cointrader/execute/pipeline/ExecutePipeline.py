@@ -1,104 +1,225 @@
 # This file contains the ExecutePipeline class, which is responsible for managing the pipeline of orders to be executed, and retrieving the results of those orders.
+# Each order request gets a concurrent.futures.Future for its result. When threaded, the requests are executed by a pool of
+# worker threads as soon as they are submitted, and the callers block on (or add a callback to) the future, so nothing polls.
+# When not threaded, the requests are queued and executed by the calling thread in wait_order_result() or process_order_requests()
+#
+# prefetch_order_status() queries the status of the open orders of all positions at once, at the start of a tick, and
+# order_status() answers the positions from those results, so a tick costs one batch of requests instead of one
+# round trip per position
 from collections import deque
-from queue import Queue
-from threading import RLock
-import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, RLock
 from cointrader.execute.ExecuteBase import ExecuteBase
-from cointrader.order.Order import Order
 from cointrader.order.OrderResult import OrderResult
 from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.enum.OrderType import OrderType
 
 class ExecutePipeline(object):
-    _placed_orders_requests: Queue[OrderRequest]
-    _processed_orders_results: dict[str, OrderResult]
+    _placed_orders_requests: deque[tuple[OrderRequest, Future]]
+    _processed_orders_results: dict[str, Future]
 
-    def __init__(self, execute: ExecuteBase, max_orders: int = 100, threaded: bool = False):
+    def __init__(self, execute: ExecuteBase, max_orders: int = 100, threaded: bool = False, workers: int = 1, timeout: float = 30.0):
+        """
+        :param max_orders: Max number of threaded order requests in flight, submitting more blocks until one completes
+        :param workers: Number of threads executing order requests when threaded. With more than one worker
+                        the requests are executed concurrently, in no particular order
+        :param timeout: Seconds wait_order_result() waits for a result before giving up
+        """
         self._execute = execute
         self._max_orders = max_orders
         self._threaded = threaded
-        self._placed_orders_requests = Queue(maxsize=max_orders)
+        self._workers = max(int(workers), 1)
+        self._timeout = timeout
+        self._placed_orders_requests = deque()
         self._processed_orders_results = {}
         self._lock = RLock()
+        self._slots = BoundedSemaphore(max_orders)
+        self._executor = None
+        self._profiler = None
+        # order id -> prefetched status result, valid until the next prefetch or a request that changes the order
+        self._order_status: dict[str, OrderResult] = {}
+        self._use_open_orders = True
 
     def execute(self):
         return self._execute
-    
+
+    def set_profiler(self, profiler):
+        """
+        Set a Profiler for timing order execution. Orders executed by the worker threads are not timed,
+        the Profiler is only used from the trading thread
+        """
+        self._profiler = profiler
+
     def account(self):
         if not self._execute:
             return None
         return self._execute.account()
 
-    def process_order_request(self, order_request: OrderRequest):
+    def start(self):
+        """
+        Start the worker threads, which is otherwise done by the first threaded order request
+        """
+        with self._lock:
+            if self._threaded and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='ExecutePipeline')
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the worker threads, after the order requests already submitted are executed if wait is True
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def process_order_request(self, order_request: OrderRequest) -> Future:
         """
-        Add order to the placed orders pipeline
+        Add order to the placed orders pipeline. Returns the future of the order result, which callers can wait on
+        with wait_order_result() or future.result(), or add a callback to with future.add_done_callback()
         """
-        self._placed_orders_requests.put(order_request)
+        future = Future()
+        self._add_request(order_request, future)
 
-    def wait_order_result(self, request_id: str) -> OrderResult:
+        if not self._threaded:
+            self._placed_orders_requests.append((order_request, future))
+            return future
+
+        self.start()
+        self._slots.acquire()
+        future.add_done_callback(lambda _: self._slots.release())
+        self._executor.submit(self._run, order_request, future)
+        return future
+
+    def _add_request(self, order_request: OrderRequest, future: Future):
+        """
+        Keep the future of order_request for wait_order_result(), and drop the prefetched status of the order it changes
+        """
+        with self._lock:
+            self._processed_orders_results[order_request.rid] = future
+            if order_request.order_id is not None and order_request.type != OrderType.STATUS:
+                self._order_status.pop(order_request.order_id, None)
+
+    def process_order_requests_batch(self, order_requests: list[OrderRequest]) -> list[Future]:
         """
-        Wait for processed order result by request id
+        Add several orders to the placed orders pipeline at once, returns their futures in the same order
         """
-        result = None
+        return [self.process_order_request(order_request) for order_request in order_requests]
+
+    def wait_order_result(self, request_id: str, timeout: float = None) -> OrderResult:
+        """
+        Wait for processed order result by request id. Returns None if there is no such request,
+        the order failed with an exception, or there is no result within timeout seconds
+        """
+        with self._lock:
+            future = self._processed_orders_results.get(request_id)
+        if future is None:
+            return None
 
         # handle non-threaded case
         if not self._threaded:
             self.process_order_requests()
-            result = self._processed_orders_results.get(request_id)
-            return result
 
-        counter = 0
-
-        # wait to receive the processed order result
-        while True:
-            with self._lock:
-                keys = self._processed_orders_results.keys()
-            if request_id in keys:
-                break
-            time.sleep(1 / 1000) # sleep for 1ms
-            counter += 1
-            # wait for 30 seconds, then timeout
-            if counter > 30000:
-                print(f"ExecutePipeline: Waited too long for order result {request_id}")
-                return None
+        try:
+            return future.result(timeout=self._timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            print(f"ExecutePipeline: Waited too long for order result {request_id}")
+        except Exception as e:
+            print(f"ExecutePipeline: Order request {request_id} failed: {e}")
+        return None
 
+    def prefetch_order_status(self, order_requests: list[OrderRequest]) -> int:
+        """
+        Query the status of the orders of order_requests (STATUS requests) together, and keep the results for order_status().
+        All open orders are listed with one request where the exchange supports it, and the rest are queried
+        concurrently when threaded. Returns the number of results kept
+        """
+        results = {}
+        open_orders = self._open_orders() if len(order_requests) > 0 else None
+        remaining = []
+        for order_request in order_requests:
+            result = open_orders.get(order_request.order_id) if open_orders else None
+            if result is not None:
+                results[order_request.order_id] = result
+            else:
+                remaining.append(order_request)
+
+        self.process_order_requests_batch(remaining)
+        for order_request in remaining:
+            result = self.wait_order_result(order_request.rid)
+            self.completed(order_request.rid)
+            if result is not None:
+                results[order_request.order_id] = result
+
+        with self._lock:
+            self._order_status = results
+        return len(results)
+
+    def set_order_status(self, results: dict[str, OrderResult]):
+        """
+        Keep status results by order id obtained elsewhere (like a status poll), for order_status() until the next prefetch
+        """
         with self._lock:
-            result = self._processed_orders_results.get(request_id)
+            self._order_status.update(results)
+
+    def order_status(self, symbol: str, order_id: str, current_price: float = 0.0, current_ts: int = 0) -> OrderResult:
+        """
+        Status of an order, from the last prefetch_order_status() if it has the order, otherwise with a STATUS request
+        """
+        with self._lock:
+            result = self._order_status.get(order_id)
+        if result is not None:
+            return result
+
+        oreq = OrderRequest(symbol=symbol, type=OrderType.STATUS, current_price=current_price, current_ts=current_ts)
+        oreq.order_id = order_id
+        self.process_order_request(order_request=oreq)
+        result = self.wait_order_result(oreq.rid)
+        self.completed(oreq.rid)
         return result
 
+    def _open_orders(self) -> dict[str, OrderResult]:
+        """
+        Results of all open orders by order id, or None if the exchange can't list them
+        """
+        if not self._use_open_orders:
+            return None
+        try:
+            return self._execute.open_orders()
+        except NotImplementedError:
+            self._use_open_orders = False
+        except Exception as e:
+            print(f"ExecutePipeline: Failed to list open orders: {e}")
+        return None
+
     def completed(self, request_id: str) -> bool:
         """
         Indicate that the order result has been completed, so remove from processed order results
         """
-        if request_id not in self._processed_orders_results:
-            return False
-
-        if self._threaded:
-            with self._lock:
-                del self._processed_orders_results[request_id]
-        else:
-            del self._processed_orders_results[request_id]
-
-        return True
+        with self._lock:
+            return self._processed_orders_results.pop(request_id, None) is not None
 
     def process_order_requests(self) -> int:
         """
-        Process all placed orders, and move to processed orders. Returns number of orders processed
+        Execute all queued order requests when not threaded. Returns number of orders processed.
+        Threaded order requests are executed by the worker threads, so there is nothing to process
         """
         count = 0
-
-        order_requests = []
-
-        while not self._placed_orders_requests.empty():
-            order_requests.append(self._placed_orders_requests.get())
-
-        for order_request in order_requests:
-            result = self._execute.execute_order(order_request=order_request)
-            # provide results in processed orders
-            if self._threaded:
-                with self._lock:
-                    self._processed_orders_results[order_request.rid] = result
+        while self._placed_orders_requests:
+            order_request, future = self._placed_orders_requests.popleft()
+            if self._profiler is None:
+                self._run(order_request, future)
             else:
-                self._processed_orders_results[order_request.rid] = result
+                with self._profiler.timer(order_request.symbol, 'order_pipeline'):
+                    self._run(order_request, future)
             count += 1
 
         return count
+
+    def _run(self, order_request: OrderRequest, future: Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._execute.execute_order(order_request=order_request))
+        except Exception as e:
+            future.set_exception(e)
@@ -1,6 +1,7 @@
 from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from .ATR import ATR
 
 class ADX(Indicator):
@@ -18,10 +19,10 @@ class ADX(Indicator):
     - adx = SMA(dx, period)
     """
 
-    def __init__(self, name='adx', period=14):
+    def __init__(self, name='adx', period=14, indicators: IndicatorRegistry = None):
         super().__init__(name=name)
         self.period = period
-        self.atr = ATR(period=self.period)
+        self.atr = indicators.get(ATR, period=self.period) if indicators is not None else ATR(period=self.period)
         self.reset()
 
     def reset(self):
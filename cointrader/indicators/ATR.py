@@ -1,6 +1,7 @@
 # This file is created to implement the ATR (Average True Range) indicator
-from cointrader.common.Indicator import Indicator
+from cointrader.common.Indicator import Indicator, _batch_arrays, _batch_kline
 from cointrader.common.Kline import Kline
+import numpy as np
 
 class ATR(Indicator):
     def __init__(self, name='atr', period=14):
@@ -43,6 +44,48 @@ class ATR(Indicator):
         self._last_value = self.result
         return self.result
 
+    def compute_batch(self, open, high, low, close, volume, ts=None) -> np.ndarray:
+        arrays = _batch_arrays(open, high, low, close, volume, ts)
+        _, high, low, close, _, _ = arrays
+        if len(close) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        # true range of every kline after the first can be computed up front,
+        # the smoothing is recursive so it runs as a tight loop over plain floats
+        prev_close = np.concatenate(([self.last_close], close[:-1]))
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        if not self.count:
+            tr[0] = high[0] - low[0]
+
+        window = self.window
+        count = self.count
+        tr_sum = self._tr_sum
+        atr = self.atr
+        prior_atr = self.prior_atr
+        result = []
+        for value in tr.tolist():
+            if count < window - 1:
+                tr_sum += value
+                count += 1
+            elif not atr:
+                tr_sum += value
+                atr = tr_sum / window
+                count += 1
+            else:
+                prior_atr = atr
+                atr = ((prior_atr * float(window - 1)) + value) / window
+            result.append(atr)
+
+        self.count = count
+        self._tr_sum = tr_sum
+        self.atr = atr
+        self.prior_atr = prior_atr
+        self.last_close = float(close[-1])
+        self.result = self.atr
+        self._last_value = self.result
+        self._last_kline = _batch_kline(*arrays, -1)
+        return np.array(result, dtype=np.float64)
+
     def get_last_value(self):
         return self._last_value
 
@@ -1,26 +1,24 @@
 # This file contains the implementation of the Donchian Channels indicator.
-from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 
 class DonchianChannels(Indicator):
     """Donchian Channels Indicator"""
     def __init__(self, name='donchian', period=20):
         super().__init__(name)
         self.period = period
-        self.highs = deque(maxlen=period)  # Store the highs for the period
-        self.lows = deque(maxlen=period)  # Store the lows for the period
+        self.extrema = RollingExtrema(period)  # highest high and lowest low for the period
         self._last_value = {"upper": None, "lower": None, "middle": None}
         self._ready = False
 
     def update(self, kline: Kline):
         # Assuming Kline has 'high' and 'low' attributes
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        self.extrema.push(kline.high, kline.low)
 
-        if len(self.highs) == self.period:
-            upper_band = max(self.highs)
-            lower_band = min(self.lows)
+        if self.extrema.full():
+            upper_band = self.extrema.max()
+            lower_band = self.extrema.min()
             middle_band = (upper_band + lower_band) / 2
 
             self._last_value = {
@@ -37,8 +35,7 @@ class DonchianChannels(Indicator):
         return self._last_value
 
     def reset(self):
-        self.highs.clear()
-        self.lows.clear()
+        self.extrema.clear()
         self._last_value = {"upper": None, "lower": None, "middle": None}
         self._ready = False
         self._last_kline = None
@@ -1,6 +1,7 @@
 from collections import deque
-from cointrader.common.Indicator import Indicator
+from cointrader.common.Indicator import Indicator, _batch_arrays, _batch_kline
 from cointrader.common.Kline import Kline
+import numpy as np
 
 class EMA(Indicator):
     def __init__(self, name='ema', period=12):
@@ -26,6 +27,30 @@ class EMA(Indicator):
 
         return self._last_value
 
+    def compute_batch(self, open, high, low, close, volume, ts=None):
+        arrays = _batch_arrays(open, high, low, close, volume, ts)
+        result = self.compute_batch_with_values(arrays[3])
+        if len(result):
+            self._last_kline = _batch_kline(*arrays, -1)
+        return result
+
+    def compute_batch_with_values(self, values):
+        """
+        Batch version of update_with_value(), returns the EMA for each value in values
+        """
+        result = []
+        multiplier = self.multiplier
+        last_value = self._last_value
+        # the EMA is recursive, so run a tight loop over plain floats instead of calling update_with_value()
+        for value in np.asarray(values, dtype=np.float64).tolist():
+            if last_value is None:
+                last_value = value
+            else:
+                last_value = (value - last_value) * multiplier + last_value
+            result.append(last_value)
+        self._last_value = last_value
+        return np.array(result, dtype=np.float64)
+
     def get_last_value(self):
         return self._last_value
 
@@ -1,30 +1,23 @@
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 
 class FibonacciRetracement(Indicator):
     """Fibonacci Retracement Indicator"""
     def __init__(self, name='fibonacci', period=20):
         super().__init__(name)
         self.period = period
-        self.highs = []  # Store the highs over the period
-        self.lows = []   # Store the lows over the period
+        self.extrema = RollingExtrema(period)  # highest high and lowest low over the period
         self._last_value = None
         self._ready = False
 
     def update(self, kline: Kline):
         # Assuming Kline has 'high' and 'low' attributes
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
-
-        # Maintain only the last 'period' values
-        if len(self.highs) > self.period:
-            self.highs.pop(0)
-        if len(self.lows) > self.period:
-            self.lows.pop(0)
-
-        if len(self.highs) == self.period and len(self.lows) == self.period:
-            highest_high = max(self.highs)
-            lowest_low = min(self.lows)
+        self.extrema.push(kline.high, kline.low)
+
+        if self.extrema.full():
+            highest_high = self.extrema.max()
+            lowest_low = self.extrema.min()
             range = highest_high - lowest_low
 
             # Calculate Fibonacci levels
@@ -49,8 +42,7 @@ class FibonacciRetracement(Indicator):
         return self._last_value
 
     def reset(self):
-        self.highs.clear()
-        self.lows.clear()
+        self.extrema.clear()
         self._last_value = None
         self._ready = False
         self._last_kline = None
@@ -1,14 +1,13 @@
-from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 import math
 
 class FisherTransform(Indicator):
     def __init__(self, name='fisher_transform', length=9):
         super().__init__(name)
         self.length = length
-        self.highs = deque(maxlen=length)
-        self.lows = deque(maxlen=length)
+        self.extrema = RollingExtrema(length)
         self.value = None
         self.prev_x = 0.0
         self.fisher = 0.0
@@ -17,19 +16,18 @@ class FisherTransform(Indicator):
     def update(self, kline: Kline):
         """Update the Fisher Transform indicator with new price data."""
         # Add the new data points
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        self.extrema.push(kline.high, kline.low)
 
         # Only compute if we have enough data
-        if len(self.highs) < self.length:
+        if not self.extrema.full():
             return None
 
         # Median price of the current candle
         median_price = (kline.high + kline.low) / 2.0
 
         # Normalize median price over lookback period
-        min_low = min(self.lows)
-        max_high = max(self.highs)
+        min_low = self.extrema.min()
+        max_high = self.extrema.max()
         if max_high == min_low:
             # Avoid division by zero if all highs and lows are the same.
             x = 0.0
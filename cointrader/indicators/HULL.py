@@ -16,9 +16,15 @@ class HMA(Indicator):
         self._last_kline = None
 
     def update(self, kline: Kline):
-        # Update intermediate WMAs
-        wma_half_value = self.wma_half.update(kline)
-        wma_full_value = self.wma_full.update(kline)
+        result = self.update_with_value(kline.close)
+        if self.wma_half.ready() and self.wma_full.ready():
+            self._last_kline = kline
+        return result
+
+    def update_with_value(self, value):
+        # Update intermediate WMAs, each update is O(1) so the cost doesn't grow with the period
+        wma_half_value = self.wma_half.update_with_value(value)
+        wma_full_value = self.wma_full.update_with_value(value)
 
         if wma_half_value is not None and wma_full_value is not None:
             # Compute the difference: (2 * WMA_half) - WMA_full
@@ -26,7 +32,6 @@ class HMA(Indicator):
 
             # Update the final WMA with the difference
             self._last_value = self.wma_hull.update_with_value(diff_value)
-            self._last_kline = kline
 
         return {"hma": self._last_value}
 
@@ -1,6 +1,7 @@
 from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 
 class IchimokuCloud(Indicator):
     def __init__(self, name='ichimoku_cloud', win_short=9, win_med=26, win_long=52):
@@ -8,46 +9,50 @@ class IchimokuCloud(Indicator):
         self.win_short = win_short
         self.win_med = win_med
         self.win_long = win_long
-        self.highs = deque(maxlen=win_long)
-        self.lows = deque(maxlen=win_long)
+        # highest high and lowest low over each window
+        self.extrema_short = RollingExtrema(win_short)
+        self.extrema_med = RollingExtrema(win_med)
+        self.extrema_long = RollingExtrema(win_long)
         self.closes = deque(maxlen=win_long+1)
 
         self._last_value = None
         self._last_kline = None
 
     def reset(self):
-        self.highs.clear()
-        self.lows.clear()
+        self.extrema_short.clear()
+        self.extrema_med.clear()
+        self.extrema_long.clear()
         self.closes.clear()
         self._last_value = None
         self._last_kline = None
 
     def update(self, kline: Kline):
         # Add new data
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        self.extrema_short.push(kline.high, kline.low)
+        self.extrema_med.push(kline.high, kline.low)
+        self.extrema_long.push(kline.high, kline.low)
         self.closes.append(kline.close)
 
         # We can only calculate once we have enough data:
-        if len(self.highs) < self.win_long:
+        if not self.extrema_long.full():
             return None
 
         # Compute Tenkan-sen
-        high_9 = max(list(self.highs)[-self.win_short:])
-        low_9 = min(list(self.lows)[-self.win_short:])
+        high_9 = self.extrema_short.max()
+        low_9 = self.extrema_short.min()
         tenkan_sen = (high_9 + low_9) / 2
 
         # Compute Kijun-sen
-        high_26 = max(list(self.highs)[-self.win_med:])
-        low_26 = min(list(self.lows)[-self.win_med:])
+        high_26 = self.extrema_med.max()
+        low_26 = self.extrema_med.min()
         kijun_sen = (high_26 + low_26) / 2
 
         # Compute Senkou Span A (Leading line)
         senkou_span_a = (tenkan_sen + kijun_sen) / 2
 
         # Compute Senkou Span B (Leading line)
-        high_52 = max(self.highs)
-        low_52 = min(self.lows)
+        high_52 = self.extrema_long.max()
+        low_52 = self.extrema_long.min()
         senkou_span_b = (high_52 + low_52) / 2
 
         # Compute Chikou Span (Lagging line)
@@ -8,10 +8,17 @@ class KAMA(Indicator):
         self.period = period
         self.fast_period = fast_period
         self.slow_period = slow_period
+        self._fast_sc = 2 / (self.fast_period + 1)
+        self._slow_sc = 2 / (self.slow_period + 1)
         self.reset()
 
     def reset(self):
         self.values = deque(maxlen=self.period)
+        # absolute changes between consecutive values in the window, and their running sum
+        self._changes = deque(maxlen=self.period - 1)
+        self._volatility = 0.0
+        self._nonzero_changes = 0
+        self._updates = 0
         self._last_value = None
 
     def update(self, kline: Kline):
@@ -20,13 +27,31 @@ class KAMA(Indicator):
         return result
 
     def update_with_value(self, value: float):
+        if len(self.values) > 0 and self.period > 1:
+            if len(self._changes) == self._changes.maxlen:
+                oldest = self._changes[0]
+                self._volatility -= oldest
+                if oldest != 0:
+                    self._nonzero_changes -= 1
+            change = abs(value - self.values[-1])
+            self._changes.append(change)
+            self._volatility += change
+            if change != 0:
+                self._nonzero_changes += 1
+
+            # recompute the sum once per period, so rounding errors don't accumulate (still O(1) amortized)
+            self._updates += 1
+            if self._updates >= self.period:
+                self._updates = 0
+                self._volatility = sum(self._changes)
         self.values.append(value)
         
         if len(self.values) == self.period:
             change = abs(self.values[-1] - self.values[0])
-            volatility = sum(abs(self.values[i] - self.values[i - 1]) for i in range(1, self.period))
+            # the count of non zero changes is exact, so a flat window always has a volatility of exactly 0
+            volatility = self._volatility if self._nonzero_changes > 0 else 0
             er = change / volatility if volatility != 0 else 0
-            sc = (er * (2 / (self.fast_period + 1) - 2 / (self.slow_period + 1)) + 2 / (self.slow_period + 1)) ** 2
+            sc = (er * (self._fast_sc - self._slow_sc) + self._slow_sc) ** 2
             
             if self._last_value is None:
                 self._last_value = self.values[-1]
@@ -1,24 +1,34 @@
-from cointrader.common.Indicator import Indicator
+from cointrader.common.Indicator import Indicator, _batch_arrays, _batch_kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.common.Kline import Kline
 from .EMA import EMA
+import numpy as np
 
 class MACD(Indicator):
-    def __init__(self, name=None, short_period=12, long_period=26, signal_period=9):
+    def __init__(self, name=None, short_period=12, long_period=26, signal_period=9, indicators: IndicatorRegistry = None):
         super().__init__(name)
-        self.short_ema = EMA(f"{name}_short", short_period)
-        self.long_ema = EMA(f"{name}_long", long_period)
+        if indicators is not None:
+            # the EMAs of the close are shared, only update() can be used then
+            self.short_ema = indicators.get(EMA, period=short_period)
+            self.long_ema = indicators.get(EMA, period=long_period)
+        else:
+            self.short_ema = EMA(f"{name}_short", short_period)
+            self.long_ema = EMA(f"{name}_long", long_period)
         self.signal_ema = EMA(f"{name}_signal", signal_period)
 
     def update(self, kline: Kline):
-        result = self.update_with_value(kline.close)
+        short_ema_value = self.short_ema.update(kline)
+        long_ema_value = self.long_ema.update(kline)
+        result = self._update_macd(short_ema_value - long_ema_value)
         self._last_kline = kline
         return result
 
     def update_with_value(self, value: float) -> dict:
         short_ema_value = self.short_ema.update_with_value(value)
         long_ema_value = self.long_ema.update_with_value(value)
-        macd_value = short_ema_value - long_ema_value
+        return self._update_macd(short_ema_value - long_ema_value)
 
+    def _update_macd(self, macd_value: float) -> dict:
         signal_value = self.signal_ema.update_with_value(macd_value)
         histogram_value = macd_value - signal_value
         
@@ -30,6 +40,34 @@ class MACD(Indicator):
 
         return self._last_value
 
+    def compute_batch(self, open, high, low, close, volume, ts=None) -> dict:
+        arrays = _batch_arrays(open, high, low, close, volume, ts)
+        result = self.compute_batch_with_values(arrays[3])
+        if len(arrays[3]):
+            self._last_kline = _batch_kline(*arrays, -1)
+        return result
+
+    def compute_batch_with_values(self, values) -> dict:
+        """
+        Batch version of update_with_value(), returns arrays for macd, signal and histogram
+        """
+        macd_values = self.short_ema.compute_batch_with_values(values) - self.long_ema.compute_batch_with_values(values)
+        signal_values = self.signal_ema.compute_batch_with_values(macd_values)
+        histogram_values = macd_values - signal_values
+
+        if len(macd_values):
+            self._last_value = {
+                "macd": float(macd_values[-1]),
+                "signal": float(signal_values[-1]),
+                "histogram": float(histogram_values[-1])
+            }
+
+        return {
+            "macd": macd_values,
+            "signal": signal_values,
+            "histogram": histogram_values
+        }
+
     def get_last_value(self):
         return self._last_value
     
@@ -1,10 +1,11 @@
 # This file contains the implementation of the Percentage Price Oscillator (PPO) indicator.
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.EMA import EMA
 
 class PPO(Indicator):
-    def __init__(self, name='ppo', short_period=12, long_period=26, signal_period=9):
+    def __init__(self, name='ppo', short_period=12, long_period=26, signal_period=9, indicators: IndicatorRegistry = None):
         """
         Initialize the Percentage Price Oscillator (PPO) indicator.
         
@@ -12,6 +13,7 @@ class PPO(Indicator):
         :param short_period: Short-term EMA period.
         :param long_period: Long-term EMA period.
         :param signal_period: Period for the signal line EMA.
+        :param indicators: Registry to share the short and long EMAs from, if set.
         """
         super().__init__(name)
         self.short_period = short_period
@@ -19,8 +21,12 @@ class PPO(Indicator):
         self.signal_period = signal_period
 
         # Initialize EMA instances
-        self.ema_short = EMA(period=self.short_period)
-        self.ema_long = EMA(period=self.long_period)
+        if indicators is not None:
+            self.ema_short = indicators.get(EMA, period=self.short_period)
+            self.ema_long = indicators.get(EMA, period=self.long_period)
+        else:
+            self.ema_short = EMA(period=self.short_period)
+            self.ema_long = EMA(period=self.long_period)
         self.ema_signal = EMA(period=self.signal_period)
 
         # Initialize internal state
@@ -1,6 +1,6 @@
-from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 
 
 class PriceChannel(Indicator):
@@ -18,8 +18,10 @@ class PriceChannel(Indicator):
         """
         Resets the indicator state
         """
-        self.highs = deque(maxlen=self.period)
-        self.lows = deque(maxlen=self.period)
+        self.extrema = RollingExtrema(self.period)
+        # the window without the newest kline, for the previous middle value in increasing() / decreasing()
+        self._previous_extrema = RollingExtrema(self.period - 1) if self.period > 1 else None
+        self._previous_middle = None
         self._last_value = None
         self._last_kline = None
 
@@ -29,13 +31,16 @@ class PriceChannel(Indicator):
         :param kline: Kline object containing OHLC data
         :return: A dictionary with the highest high, lowest low, and middle value
         """
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        self.extrema.push(kline.high, kline.low)
+        if self._previous_extrema is not None:
+            if len(self._previous_extrema) > 0:
+                self._previous_middle = (self._previous_extrema.max() + self._previous_extrema.min()) / 2
+            self._previous_extrema.push(kline.high, kline.low)
 
         # Check if the indicator is ready
-        if len(self.highs) == self.period and len(self.lows) == self.period:               
-            high = max(self.highs)
-            low = min(self.lows)
+        if self.extrema.full():
+            high = self.extrema.max()
+            low = self.extrema.min()
             middle = (high + low) / 2
 
             self._last_value = {'high': high, 'low': low, 'middle': middle}
@@ -64,17 +69,17 @@ class PriceChannel(Indicator):
         Check if the indicator is ready to provide values
         :return: True if the indicator has enough data, False otherwise
         """
-        return  len(self.highs) == self.period and len(self.lows) == self.period
+        return self.extrema.full()
 
     def increasing(self) -> bool:
         """
         Check if the middle value is increasing
         :return: True if the middle value is increasing, False otherwise
         """
-        if len(self.highs) < 2 or self._last_value is None:
+        if len(self.extrema) < 2 or self._last_value is None:
             return False
         current_middle = self._last_value['middle']
-        previous_middle = (max(list(self.highs)[:-1]) + min(list(self.lows)[:-1])) / 2
+        previous_middle = self._previous_middle
         return current_middle > previous_middle
 
     def decreasing(self) -> bool:
@@ -82,8 +87,8 @@ class PriceChannel(Indicator):
         Check if the middle value is decreasing
         :return: True if the middle value is decreasing, False otherwise
         """
-        if len(self.highs) < 2 or self._last_value is None:
+        if len(self.extrema) < 2 or self._last_value is None:
             return False
         current_middle = self._last_value['middle']
-        previous_middle = (max(list(self.highs)[:-1]) + min(list(self.lows)[:-1])) / 2
+        previous_middle = self._previous_middle
         return current_middle < previous_middle
@@ -1,7 +1,8 @@
 # Implements the Rate of Change (ROC) indicator
 from collections import deque
-from cointrader.common.Indicator import Indicator
+from cointrader.common.Indicator import Indicator, _batch_arrays, _batch_kline
 from cointrader.common.Kline import Kline
+import numpy as np
 
 class ROC(Indicator):
     def __init__(self, name='roc', period=14, **kwargs):
@@ -36,6 +37,35 @@ class ROC(Indicator):
             self._last_value = None
         return self._last_value
 
+    def compute_batch(self, open, high, low, close, volume, ts=None) -> np.ndarray:
+        arrays = _batch_arrays(open, high, low, close, volume, ts)
+        result = self.compute_batch_with_values(arrays[3])
+        if len(result):
+            self._last_kline = _batch_kline(*arrays, -1)
+        return result
+
+    def compute_batch_with_values(self, values) -> np.ndarray:
+        """
+        Batch version of update_with_value(), compares each value with the value period - 1 klines earlier
+        """
+        values = np.asarray(values, dtype=np.float64)
+        window = len(self._values)
+        data = np.concatenate((np.asarray(self._values, dtype=np.float64), values))
+        result = np.full(len(values), np.nan)
+
+        # index of the first new value which has a full window behind it
+        start = max(self.period - 1 - window, 0)
+        if start < len(values):
+            current = data[window + start:]
+            prev = data[start + window - self.period + 1:len(data) - self.period + 1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[start:] = np.where(prev != 0, ((current - prev) / prev) * 100.0, np.nan)
+            self._last_value = None if np.isnan(result[-1]) else float(result[-1])
+
+        self._values.clear()
+        self._values.extend(data[-self.period:].tolist())
+        return result
+
     def above(self) -> bool:
         if not self.ready():
             return False
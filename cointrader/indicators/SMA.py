@@ -1,5 +1,6 @@
-from cointrader.common.Indicator import Indicator
+from cointrader.common.Indicator import Indicator, _batch_arrays, _batch_kline
 from cointrader.common.Kline import Kline
+import numpy as np
 
 class SMA(Indicator):
     def __init__(self, name='sma', period=14):
@@ -28,6 +29,36 @@ class SMA(Indicator):
         self._last_value = self.result
         return self.result
 
+    def compute_batch(self, open, high, low, close, volume, ts=None):
+        arrays = _batch_arrays(open, high, low, close, volume, ts)
+        result = self.compute_batch_with_values(arrays[3])
+        if len(result):
+            self._last_kline = _batch_kline(*arrays, -1)
+        return result
+
+    def compute_batch_with_values(self, values):
+        """
+        Batch version of update_with_value(), computes the rolling means with a cumulative sum
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        # prices is a ring buffer once full, so put the current window back into chronological order
+        window = self.prices[int(self.age):] + self.prices[:int(self.age)] if len(self.prices) == self.period else self.prices
+        data = np.concatenate((np.asarray(window, dtype=np.float64), values))
+        sums = np.concatenate(([0.0], np.cumsum(data)))
+        end = np.arange(len(window) + 1, len(data) + 1)
+        count = np.minimum(end, self.period)
+        result = (sums[end] - sums[end - count]) / count
+
+        self.prices = data[-self.period:].tolist()
+        self.age = len(self.prices) % self.period
+        self.sum = sum(self.prices)
+        self.result = float(result[-1])
+        self._last_value = self.result
+        return result
+
     def get_last_value(self):
         return self._last_value
 
@@ -1,6 +1,6 @@
-from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 from cointrader.indicators.SMA import SMA
 
 class StochasticOscillator(Indicator):
@@ -9,8 +9,7 @@ class StochasticOscillator(Indicator):
         self.k_period = k_period
         self.d_period = d_period
 
-        self.highs = deque(maxlen=k_period)
-        self.lows = deque(maxlen=k_period)
+        self.extrema = RollingExtrema(k_period)
 
         # We'll calculate %K each update and feed it into an SMA for %D
         self.d_sma = SMA(name='stoch_d_sma', period=d_period)
@@ -19,26 +18,24 @@ class StochasticOscillator(Indicator):
         self._last_kline = None
 
     def reset(self):
-        self.highs.clear()
-        self.lows.clear()
+        self.extrema.clear()
         self.d_sma.reset()
         self._last_value = None
         self._last_kline = None
 
     def update(self, kline: Kline):
         # Add current high and low
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        self.extrema.push(kline.high, kline.low)
 
         # Check if we have enough data for %K
-        if len(self.highs) < self.k_period:
+        if not self.extrema.full():
             # Not enough data yet to produce %K or %D
             self._last_value = None
             self._last_kline = kline
             return None
 
-        highest_high = max(self.highs)
-        lowest_low = min(self.lows)
+        highest_high = self.extrema.max()
+        lowest_low = self.extrema.min()
 
         if highest_high == lowest_low:
             percent_k = 100.0
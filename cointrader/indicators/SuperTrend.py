@@ -1,15 +1,16 @@
 # This file contains the SuperTrend indicator implementation
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.ATR import ATR
 import math
 
 class SuperTrend(Indicator):
-    def __init__(self, name='supertrend', period=10, multiplier=3.0):
+    def __init__(self, name='supertrend', period=10, multiplier=3.0, indicators: IndicatorRegistry = None):
         super().__init__(name)
         self.period = period
         self.multiplier = multiplier
-        self.atr = ATR(period=period)
+        self.atr = indicators.get(ATR, period=period) if indicators is not None else ATR(period=period)
         self.reset()
 
     def reset(self):
@@ -1,31 +1,28 @@
 # This file contains the WILLiams %R indicator
-from collections import deque
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 
 class WILLR(Indicator):
     def __init__(self, name='willr', period=14):
         super().__init__(name)
         self.window = period
-        self.highs = deque(maxlen=period)
-        self.lows = deque(maxlen=period)
+        self.extrema = RollingExtrema(period)
         self.result = 0.0
         self._last_value = None
 
     def reset(self):
-        self.highs.clear()
-        self.lows.clear()
+        self.extrema.clear()
         self.result = 0.0
         self._last_value = None
 
     def update(self, kline: Kline):
-        # Update high and low deque
-        self.highs.append(kline.high)
-        self.lows.append(kline.low)
+        # Update highest high and lowest low
+        self.extrema.push(kline.high, kline.low)
 
-        if len(self.highs) == self.window and len(self.lows) == self.window:
-            highest_high = max(self.highs)
-            lowest_low = min(self.lows)
+        if self.extrema.full():
+            highest_high = self.extrema.max()
+            lowest_low = self.extrema.min()
 
             # Avoid division by zero
             if highest_high - lowest_low == 0:
@@ -41,4 +38,4 @@ class WILLR(Indicator):
         return self._last_value
 
     def ready(self) -> bool:
-        return len(self.highs) == self.window
+        return self.extrema.full()
@@ -7,11 +7,16 @@ class WMA(Indicator):
     def __init__(self, name='wma', period=14):
         super().__init__(name)
         self.period = period
+        self._weight_sum = period * (period + 1) / 2
         self.reset()
 
     def reset(self):
         self.values = deque(maxlen=self.period)
         self._last_kline = None
+        # running sum of the values, and of the values multiplied by their weight (1 for the oldest, period for the newest)
+        self._sum = 0.0
+        self._weighted_sum = 0.0
+        self._updates = 0
 
     def update(self, kline: Kline):
         result = self.update_with_value(kline.close)
@@ -19,13 +24,27 @@ class WMA(Indicator):
         return result
 
     def update_with_value(self, value):
-        self.values.append(value)
- 
         if len(self.values) < self.period:
-            return None  # Not enough data for WMA
+            self.values.append(value)
+            self._weighted_sum += len(self.values) * value
+            self._sum += value
+            if len(self.values) < self.period:
+                return None  # Not enough data for WMA
+        else:
+            # every value moves down one weight, the oldest value drops out and the new value gets the highest weight
+            oldest = self.values[0]
+            self.values.append(value)
+            self._weighted_sum += self.period * value - self._sum
+            self._sum += value - oldest
 
-        weights = range(1, len(self.values) + 1)
-        self._last_value = sum(v * w for v, w in zip(self.values, weights)) / sum(weights)
+            # recompute the sums once per period, so rounding errors don't accumulate (still O(1) amortized)
+            self._updates += 1
+            if self._updates >= self.period:
+                self._updates = 0
+                self._sum = sum(self.values)
+                self._weighted_sum = sum(v * w for v, w in zip(self.values, range(1, self.period + 1)))
+
+        self._last_value = self._weighted_sum / self._weight_sum
         return self._last_value
 
     def get_last_value(self):
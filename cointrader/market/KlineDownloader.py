@@ -0,0 +1,161 @@
+# This file contains the KlineDownloader class, which fills a MarketStorage with historical klines from an exchange.
+# The ranges that were never fetched are split into chunks of the max kline count of the exchange, and the chunks
+# of all symbols are requested from a pool of threads, within a budget of requests per second. The klines are
+# written to the database from the calling thread, in bulk, so the sqlite connection is only used by one thread
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from .MarketStorage import MarketStorage
+
+
+class RateLimiter(object):
+    """
+    Spaces out calls to acquire() from any number of threads to at most requests_per_second
+    """
+    def __init__(self, requests_per_second: float):
+        self._interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self._interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def exchange_kline_dict(kline: dict) -> dict:
+    """
+    Kline dict with the ts in seconds. The klines of cbadv have the start in seconds, and the ones of ccxt a start_time in milliseconds
+    """
+    if 'start' in kline:
+        ts = int(kline['start'])
+    else:
+        ts = int(kline['start_time']) // 1000
+    return {'ts': ts, 'open': kline['open'], 'high': kline['high'], 'low': kline['low'], 'close': kline['close'], 'volume': kline['volume']}
+
+
+class KlineDownloader(object):
+    def __init__(self, exchange, storage: MarketStorage, requests_per_second: float = 10.0, max_workers: int = 4,
+                 max_retries: int = 5, backoff: float = 1.0, max_backoff: float = 60.0, flush_size: int = 20000, logger=None):
+        """
+        :param exchange: Exchange with market_get_max_kline_count() and market_get_klines_range()
+        :param storage: MarketStorage to write the klines to
+        :param requests_per_second: Budget of requests to the exchange for all threads together, 0 for no limit
+        :param max_workers: Number of requests in flight at once, 1 to request from the calling thread
+        :param max_retries: Number of times a failed request is retried before its chunk is given up
+        :param backoff: Seconds to wait before the first retry, doubled on each retry up to max_backoff
+        :param flush_size: Number of klines buffered for a symbol before they are written in one transaction
+        """
+        self._exchange = exchange
+        self._storage = storage
+        self._limiter = RateLimiter(requests_per_second)
+        self._max_workers = max(int(max_workers), 1)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._flush_size = flush_size
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+
+    def chunks(self, symbol: str, start_ts: int, end_ts: int, granularity: int) -> list[tuple[int, int]]:
+        """
+        The (first ts, last ts) of each request needed to fill the missing ranges of symbol from start_ts to end_ts
+        """
+        chunk = granularity * (self._exchange.market_get_max_kline_count(granularity) - 1)
+        result = []
+        for gap_start, gap_end in self._storage.get_missing_ranges(symbol, granularity, start_ts, end_ts):
+            for chunk_start in range(gap_start, gap_end + 1, chunk + granularity):
+                result.append((chunk_start, min(chunk_start + chunk, gap_end)))
+        return result
+
+    def download(self, symbols: list[str], start_ts: int, end_ts: int, granularity: int) -> dict:
+        """
+        Download the klines of symbols from start_ts to end_ts that are not stored yet.
+        Chunks that still fail after the retries are left missing, so the next download picks them up again.
+        Returns a dict with the number of klines stored and chunks failed for each symbol, and the request counts
+        """
+        # the kline that is still open changes until it closes, so it is stored but not marked as fetched
+        last_closed_ts = int(time.time()) // granularity * granularity - granularity
+        chunks = {symbol: self.chunks(symbol, start_ts, end_ts, granularity) for symbol in symbols}
+        # interleave the symbols, so the requests in flight are spread over all of them
+        tasks = []
+        for i in range(max((len(symbol_chunks) for symbol_chunks in chunks.values()), default=0)):
+            for symbol in symbols:
+                if i < len(chunks[symbol]):
+                    tasks.append((symbol, chunks[symbol][i]))
+
+        stats = {symbol: {'chunks': len(chunks[symbol]), 'klines': 0, 'failed': 0} for symbol in symbols}
+        pending = {symbol: ([], []) for symbol in symbols}
+        self._requests = 0
+        self._retries = 0
+
+        def done(symbol: str, chunk: tuple[int, int], klines: list):
+            if klines is None:
+                stats[symbol]['failed'] += 1
+                return
+            buffered, covered = pending[symbol]
+            buffered.extend(exchange_kline_dict(kline) for kline in klines)
+            if chunk[0] <= last_closed_ts:
+                covered.append((chunk[0], min(chunk[1], last_closed_ts)))
+            if len(buffered) >= self._flush_size:
+                stats[symbol]['klines'] += self._flush(symbol, granularity, buffered, covered)
+
+        if self._max_workers == 1:
+            for symbol, chunk in tasks:
+                done(symbol, chunk, self._fetch(symbol, chunk, granularity))
+        else:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                futures = {executor.submit(self._fetch, symbol, chunk, granularity): (symbol, chunk) for symbol, chunk in tasks}
+                for future in as_completed(futures):
+                    symbol, chunk = futures[future]
+                    done(symbol, chunk, future.result())
+
+        for symbol in symbols:
+            buffered, covered = pending[symbol]
+            stats[symbol]['klines'] += self._flush(symbol, granularity, buffered, covered)
+        return {'symbols': stats, 'requests': self._requests, 'retries': self._retries}
+
+    def _fetch(self, symbol: str, chunk: tuple[int, int], granularity: int):
+        """
+        Request one chunk, retrying with exponential backoff. Returns None if every attempt failed
+        """
+        delay = self._backoff
+        for attempt in range(self._max_retries + 1):
+            self._limiter.acquire()
+            with self._lock:
+                self._requests += 1
+                if attempt > 0:
+                    self._retries += 1
+            try:
+                return self._exchange.market_get_klines_range(symbol, chunk[0], chunk[1], granularity)
+            except Exception as e:
+                if attempt == self._max_retries:
+                    self._log(f"Giving up on {symbol} klines from {chunk[0]} to {chunk[1]}: {e}")
+                    return None
+                self._log(f"Retrying {symbol} klines from {chunk[0]} to {chunk[1]} in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+
+    def _flush(self, symbol: str, granularity: int, buffered: list, covered: list) -> int:
+        """
+        Write the buffered klines in one transaction, then mark their chunks as fetched
+        """
+        count = self._storage.store_klines(symbol, granularity, buffered, ts='ts')
+        for start, end in covered:
+            self._storage.add_covered_range(symbol, granularity, start, end)
+        buffered.clear()
+        covered.clear()
+        return count
+
+    def _log(self, message: str):
+        if self._logger:
+            self._logger.info(message)
+        else:
+            print(message)
@@ -1,22 +1,76 @@
 from .MarketBase import MarketBase
 from cointrader.exchange.TraderExchangeBase import TraderExchangeBase
 from .MarketStorage import MarketStorage
+from .KlineDownloader import KlineDownloader
+from .PriceCache import PriceCache
+from cointrader.common.KlineArray import KlineArray
 
 class Market(MarketBase):
     _exchange = None
-    def __init__(self, exchange: TraderExchangeBase, db_path='market_data.db', logger=None):
+    def __init__(self, exchange: TraderExchangeBase, db_path='market_data.db', logger=None, price_cache: PriceCache = None):
+        """
+        :param price_cache: Cache of the streamed prices, the ticker prices are then only requested for the stale symbols
+        """
         super().__init__(exchange, logger)
         self._exchange = exchange
+        self._price_cache = price_cache
         self._db_path = db_path
         self._storage = MarketStorage(db_path)
+        # requests from the calling thread, without a rate limit, for the few chunks a preload needs
+        self._downloader = KlineDownloader(exchange, self._storage, requests_per_second=0, max_workers=1, max_retries=2, logger=logger)
+
+    def storage(self) -> MarketStorage:
+        return self._storage
 
     def market_ticker_price_get(self, ticker: str) -> float:
         """Get ticker price"""
         return self._exchange.market_ticker_price_get(ticker)
 
+    def price_cache(self) -> PriceCache:
+        return self._price_cache
+
     def market_ticker_prices_all_get(self) -> dict:
         """Get all ticker prices"""
-        return self._exchange.market_ticker_prices_all_get()
+        prices = self._exchange.market_ticker_prices_all_get()
+        if self._price_cache is not None:
+            self._price_cache.update_prices(prices, listing=True)
+        return prices
+
+    def market_ticker_prices_get(self, tickers: list[str]) -> dict:
+        """
+        Get the prices of tickers, the tickers without a price are left out. With a price cache, the fresh prices
+        are served from the cache, and only the stale tickers are requested: one by one if there are a few of them,
+        with a full listing otherwise
+        """
+        if self._price_cache is None:
+            try:
+                prices = self._exchange.market_ticker_prices_all_get()
+            except NotImplementedError:
+                return self._ticker_prices_get(tickers)
+            return {ticker: prices[ticker] for ticker in tickers if ticker in prices}
+
+        stale = self._price_cache.stale_symbols(tickers)
+        if len(stale) > self._price_cache.rest_limit():
+            try:
+                self.market_ticker_prices_all_get()
+            except NotImplementedError:
+                self._price_cache.update_prices(self._ticker_prices_get(stale))
+        elif len(stale) > 0:
+            self._price_cache.update_prices(self._ticker_prices_get(stale))
+        return self._price_cache.prices(tickers)
+
+    def _ticker_prices_get(self, tickers: list[str]) -> dict:
+        prices = {}
+        for ticker in tickers:
+            try:
+                prices[ticker] = self._exchange.market_ticker_price_get(ticker)
+            except Exception as e:
+                message = f"Market: Failed to get price of {ticker}: {e}"
+                if self._logger:
+                    self._logger.warning(message)
+                else:
+                    print(message)
+        return prices
 
     def market_get_kline_granularities(self) -> list[int]:
         """Get kline granularities"""
@@ -26,41 +80,26 @@ class Market(MarketBase):
         """Get max kline count for a given interval"""
         return self._exchange.market_get_max_kline_count(granularity)
 
-    def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int, store_db=False) -> dict:
-        """Get klines for a given range, and stores them in the database if store_db is True"""
-        if store_db:
-            max_klines = self._exchange.market_get_max_kline_count(granularity)
-            # if the table exists, get klines from the database
-            if self._storage.table_exists(ticker, granularity):
-                klines = self._storage.get_klines_range(ticker, start_ts, end_ts, granularity)
-                for kline in klines:
-                    if not self._storage.kline_exists(symbol=ticker, ts=kline['ts'], granularity=granularity):
-                        break
-                    start_ts += granularity * max_klines
-
-                # if all kliness are in the database, return them
-                if start_ts >= end_ts:
-                    return klines
-                
-                # get klines from the exchange and store them in the database
-                new_klines = self._exchange.market_get_klines_range(ticker, start_ts, end_ts, granularity)
-                for kline in new_klines:
-                    self._storage.store_kline(ticker, open=kline['open'], high=kline['high'], low=kline['low'], close=kline['close'], volume=kline['volume'], ts=kline['start'], granularity=granularity)
-                    klines.append(kline)
-                return klines
-            else:
-                self._storage.create_table(ticker, granularity)
-                # get klines from the exchange and store them in the database
-                klines = self._exchange.market_get_klines_range(ticker, start_ts, end_ts, granularity)
-                for kline in klines:
-                    self._storage.store_kline(ticker, open=kline['open'], high=kline['high'], low=kline['low'], close=kline['close'], volume=kline['volume'], ts=kline['start'], granularity=granularity)
-                return klines
-        else:
+    def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int, store_db=False) -> list:
+        """
+        Get klines for a given range. If store_db is True, only the ranges that were never fetched are requested from
+        the exchange, in chunks of at most the max kline count, and the klines in the range are returned from the database
+        """
+        if not store_db:
             return self._exchange.market_get_klines_range(ticker, start_ts, end_ts, granularity)
 
+        self._downloader.download([ticker], start_ts, end_ts, granularity)
+        return self._storage.get_klines_range(ticker, start_ts, end_ts, granularity)
+
     def market_get_stored_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> dict:
         """
         Get klines for a given range from the database only
         """
         """Get klines for a given range from the database"""
-        return self._storage.get_klines_range(ticker, start_ts, end_ts, granularity)
\ No newline at end of file
+        return self._storage.get_klines_range(ticker, start_ts, end_ts, granularity)
+
+    def market_get_stored_kline_array(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> KlineArray:
+        """
+        Get klines for a given range from the database only, as a KlineArray
+        """
+        return self._storage.get_kline_array(ticker, start_ts, end_ts, granularity)
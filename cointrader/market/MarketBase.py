@@ -18,6 +18,10 @@ class MarketBase(object):
         """Get all ticker prices"""
         raise NotImplementedError
 
+    def market_ticker_prices_get(self, tickers: list[str]) -> dict:
+        """Get the prices of tickers, the tickers without a price are left out"""
+        raise NotImplementedError
+
     def market_get_kline_granularities(self) -> list[int]:
         """Get kline granularities"""
         raise NotImplementedError
@@ -1,110 +1,294 @@
+# This file contains the MarketStorage class, which stores klines in sqlite.
+# All klines are in one table keyed by (symbol, granularity, ts), so lookups by time are index seeks,
+# storing a kline that is already there replaces it, and a batch of klines is written in one transaction
+import re
 import sqlite3
+import numpy as np
 from cointrader.common.Kline import Kline
+from cointrader.common.KlineArray import KlineArray
+
+# granularity names used by the per symbol tables of older databases
+LEGACY_GRANULARITY_NAMES = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600}
+
+_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
 
 class MarketStorage:
     def __init__(self, db_path='market_data.db'):
+        self._header = "(symbol, granularity, ts, open, high, low, close, volume)"
         if db_path:
             self.connection = sqlite3.connect(db_path)
+            if db_path != ':memory:':
+                # readers don't block the writer, and a commit doesn't wait for the disk on every transaction
+                self.connection.execute('PRAGMA journal_mode=WAL')
+                self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.create_table()
+            self.migrate_legacy_tables()
+            self.create_coverage_table()
         else:
             self.connection = None
-        self._header = "(open, high, low, close, volume, ts)"
 
     def table_name(self, symbol, granularity):
-        if granularity == 60:
-            granularity_name = "1m"
-        elif granularity == 300: # 5 minutes
-            granularity_name = "5m"
-        elif granularity == 900: # 15 minutes
-            granularity_name = "15m"
-        elif granularity == 3600: # 1 hour
-            granularity_name = "1h"
-        else:
-            granularity_name = ''
-        return symbol.replace('-', '_') + '_' + granularity_name
-
-    def table_exists(self, symbol, granularity):
-        cursor = self.connection.cursor()
-        cursor.execute(f'''
-            SELECT name FROM sqlite_master WHERE type='table' AND name='{self.table_name(symbol, granularity)}'
-        ''')
-        return cursor.fetchone() is not None
+        """
+        Name of the per symbol table used before all klines were in one table
+        """
+        for name, seconds in LEGACY_GRANULARITY_NAMES.items():
+            if granularity == seconds:
+                return symbol.replace('-', '_') + '_' + name
+        return symbol.replace('-', '_') + '_'
 
-    def create_table(self, symbol, granularity):
+    def create_table(self, symbol=None, granularity=None):
+        """
+        Create the klines table if it doesn't exist, symbol and granularity are only kept for older callers
+        """
         with self.connection:
-            self.connection.execute(f'''
-                CREATE TABLE IF NOT EXISTS {self.table_name(symbol, granularity)} (
-                    id INTEGER PRIMARY KEY,
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS klines (
+                    symbol TEXT NOT NULL,
+                    granularity INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
                     open REAL NOT NULL,
                     high REAL NOT NULL,
                     low REAL NOT NULL,
                     close REAL NOT NULL,
                     volume REAL NOT NULL,
-                    ts INTEGER NOT NULL
-                )
+                    PRIMARY KEY (symbol, granularity, ts)
+                ) WITHOUT ROWID
+            ''')
+
+    def create_coverage_table(self):
+        """
+        Create the table of the ts ranges that were fetched from the exchange. A range is covered once it was fetched,
+        even if the exchange had no klines in it, so only the ranges that were never fetched are missing.
+        A new table starts out covering the runs of consecutive klines that are already stored
+        """
+        exists = self.connection.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='kline_coverage'").fetchone()
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS kline_coverage (
+                    symbol TEXT NOT NULL,
+                    granularity INTEGER NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    end_ts INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, granularity, start_ts)
+                ) WITHOUT ROWID
             ''')
+        if exists:
+            return
+        pairs = self.connection.execute('SELECT DISTINCT symbol, granularity FROM klines').fetchall()
+        for symbol, granularity in pairs:
+            ts = self.get_ts(symbol, 0, 2**62, granularity)
+            # a run ends wherever the next kline isn't one granularity later
+            breaks = np.flatnonzero(np.diff(ts) != granularity)
+            starts = np.concatenate(([0], breaks + 1))
+            ends = np.concatenate((breaks, [len(ts) - 1]))
+            rows = [(symbol, granularity, int(ts[start]), int(ts[end])) for start, end in zip(starts, ends)]
+            with self.connection:
+                self.connection.executemany('INSERT INTO kline_coverage (symbol, granularity, start_ts, end_ts) VALUES (?, ?, ?, ?)', rows)
+
+    def migrate_legacy_tables(self) -> int:
+        """
+        Move the klines in the per symbol tables of an older database into the klines table, and drop those tables.
+        Returns the number of tables migrated
+        """
+        cursor = self.connection.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'klines'")
+        migrated = 0
+        for (name,) in cursor.fetchall():
+            match = re.fullmatch(r'(\w+?)_(1m|5m|15m|1h)', name)
+            if match is None:
+                continue
+            columns = [row[1] for row in self.connection.execute(f'PRAGMA table_info("{name}")')]
+            if not set(_COLUMNS).issubset(columns):
+                continue
+            symbol = match.group(1).replace('_', '-')
+            granularity = LEGACY_GRANULARITY_NAMES[match.group(2)]
+            # the older tables had no unique ts, the first row stored for a ts wins
+            with self.connection:
+                self.connection.execute(f'''
+                    INSERT OR IGNORE INTO klines {self._header}
+                    SELECT ?, ?, ts, open, high, low, close, volume FROM "{name}" ORDER BY ts
+                ''', (symbol, granularity))
+                self.connection.execute(f'DROP TABLE "{name}"')
+            migrated += 1
+        return migrated
+
+    def table_exists(self, symbol, granularity):
+        """
+        Check if any klines are stored for symbol and granularity
+        """
+        cursor = self.connection.execute('SELECT 1 FROM klines WHERE symbol = ? AND granularity = ? LIMIT 1', (symbol, granularity))
+        return cursor.fetchone() is not None
 
     def kline_exists(self, symbol, ts, granularity):
         """
         Check if a kline exists in the database
         """
-        cursor = self.connection.cursor()
-        cursor.execute(f'SELECT 1 FROM {self.table_name(symbol, granularity)} WHERE ts = ?', (ts,))
-        result = cursor.fetchone()
-        return result is not None
+        cursor = self.connection.execute('SELECT 1 FROM klines WHERE symbol = ? AND granularity = ? AND ts = ?', (symbol, granularity, ts))
+        return cursor.fetchone() is not None
 
-    def store_kline(self, symbol, kline: Kline, granularity):
+    def store_kline(self, symbol, open, high, low, close, volume, ts, granularity):
         """
-        Store a kline in the database
+        Store a kline in the database, replacing the kline with the same ts.
+        Use store_klines() or store_kline_array() for more than one kline
         """
-        self.create_table(symbol)
         with self.connection:
-            self.connection.execute(f'''
-                INSERT INTO {self.table_name(symbol, granularity)} (open, high, low, close, volume, ts)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (kline.open, kline.high, kline.low, kline.close, kline.volume, kline.ts))
+            self.connection.execute(self._upsert_sql(), (symbol, granularity, int(ts), open, high, low, close, volume))
 
-    def store_kline(self, symbol, open, high, low, close, volume, ts, granularity):
+    def store_klines(self, symbol, granularity, klines: list, ts='start') -> int:
+        """
+        Store a list of kline dicts, as returned by the exchange, or Kline objects in one transaction.
+        ts is the name of the time key in the dicts. Returns the number of klines stored
+        """
+        if len(klines) == 0:
+            return 0
+        if isinstance(klines[0], Kline):
+            rows = [(symbol, granularity, int(k.ts), k.open, k.high, k.low, k.close, k.volume) for k in klines]
+        else:
+            rows = [(symbol, granularity, int(k[ts]), float(k['open']), float(k['high']), float(k['low']), float(k['close']), float(k['volume'])) for k in klines]
+        with self.connection:
+            self.connection.executemany(self._upsert_sql(), rows)
+        return len(rows)
+
+    def store_kline_array(self, klines: KlineArray, symbol=None, granularity=None) -> int:
         """
-        Store a kline in the database
+        Store all the klines in a KlineArray in one transaction. Returns the number of klines stored
         """
-        self.create_table(symbol, granularity)
+        symbol = symbol if symbol is not None else klines.symbol
+        granularity = granularity if granularity is not None else klines.granularity
+        if len(klines) == 0:
+            return 0
+        # tolist() gives python ints and floats, which sqlite binds without a conversion per value
+        rows = zip([symbol] * len(klines), [granularity] * len(klines), klines.ts.tolist(), klines.open.tolist(),
+                   klines.high.tolist(), klines.low.tolist(), klines.close.tolist(), klines.volume.tolist())
         with self.connection:
-            self.connection.execute(f'''
-                INSERT INTO {self.table_name(symbol, granularity)} (open, high, low, close, volume, ts)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (open, high, low, close, volume, ts))
+            self.connection.executemany(self._upsert_sql(), rows)
+        return len(klines)
 
     def get_kline(self, symbol, ts, granularity):
         """
         Get a kline from the database
         """
-        cursor = self.connection.cursor()
-        cursor.execute(f'SELECT * FROM {self.table_name(symbol, granularity)} WHERE ts = ?', (ts,))
-        columns = [column[0] for column in cursor.description]
+        cursor = self.connection.execute(f'SELECT {", ".join(_COLUMNS)} FROM klines WHERE symbol = ? AND granularity = ? AND ts = ?',
+                                         (symbol, granularity, ts))
         result = cursor.fetchone()
-        return dict(zip(columns, result))
+        if result is None:
+            return None
+        return dict(zip(_COLUMNS, result))
 
     def get_klines(self, symbol, granularity):
         """
-        Get all klines for a symbol from the database with the given symbol
+        Get all klines for a symbol from the database with the given symbol, oldest first
         """
-        cursor = self.connection.cursor()
-        cursor.execute(f'SELECT * FROM {self.table_name(symbol, granularity)}')
-        # convert from list of tuples to list of dictionaries
-        columns = [column[0] for column in cursor.description]
-        results = cursor.fetchall()
-        return [dict(zip(columns, row)) for row in results]
-    
+        cursor = self.connection.execute(f'SELECT {", ".join(_COLUMNS)} FROM klines WHERE symbol = ? AND granularity = ? ORDER BY ts',
+                                         (symbol, granularity))
+        return [dict(zip(_COLUMNS, row)) for row in cursor.fetchall()]
+
     def get_klines_range(self, symbol, start_ts, end_ts, granularity):
         """
-        Get all klines for a symbol from the database in the specified range with the given symbol
+        Get all klines for a symbol from the database in the specified range with the given symbol, oldest first
         """
-        cursor = self.connection.cursor()
-        cursor.execute(f'SELECT * FROM {self.table_name(symbol, granularity)} WHERE ts >= ? AND ts <= ?', (start_ts, end_ts))
-        # convert from list of tuples to list of dictionaries
-        columns = [column[0] for column in cursor.description]
-        results = cursor.fetchall()
-        return [dict(zip(columns, row)) for row in results]
+        return [dict(zip(_COLUMNS, row)) for row in self._select_range(symbol, start_ts, end_ts, granularity)]
+
+    def get_kline_array(self, symbol, start_ts, end_ts, granularity) -> KlineArray:
+        """
+        Get the klines for a symbol in the specified range as a KlineArray, oldest first
+        """
+        rows = self._select_range(symbol, start_ts, end_ts, granularity)
+        if len(rows) == 0:
+            return KlineArray(symbol=symbol, granularity=granularity)
+        values = np.array(rows, dtype=np.float64)
+        return KlineArray(symbol=symbol, granularity=granularity, ts=np.array([row[0] for row in rows], dtype=np.int64),
+                          open=values[:, 1], high=values[:, 2], low=values[:, 3], close=values[:, 4], volume=values[:, 5])
+
+    def get_ts_range(self, symbol, granularity, start_ts=None, end_ts=None) -> tuple:
+        """
+        Returns (first ts, last ts, count) of the klines stored for symbol and granularity, optionally only in a range.
+        The first and last ts are None when nothing is stored
+        """
+        sql = 'SELECT MIN(ts), MAX(ts), COUNT(*) FROM klines WHERE symbol = ? AND granularity = ?'
+        params = [symbol, granularity]
+        if start_ts is not None:
+            sql += ' AND ts >= ?'
+            params.append(start_ts)
+        if end_ts is not None:
+            sql += ' AND ts <= ?'
+            params.append(end_ts)
+        return self.connection.execute(sql, params).fetchone()
+
+    def get_ts(self, symbol, start_ts, end_ts, granularity) -> np.ndarray:
+        """
+        Timestamps of the klines stored for symbol in the specified range, oldest first
+        """
+        cursor = self.connection.execute('SELECT ts FROM klines WHERE symbol = ? AND granularity = ? AND ts >= ? AND ts <= ? ORDER BY ts',
+                                         (symbol, granularity, start_ts, end_ts))
+        return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+    def add_covered_range(self, symbol, granularity, start_ts, end_ts):
+        """
+        Mark the klines from start_ts to end_ts, both included, as fetched. The range is merged with
+        the ranges it overlaps or touches, so the ranges stored for a symbol never overlap
+        """
+        with self.connection:
+            cursor = self.connection.execute('''
+                SELECT start_ts, end_ts FROM kline_coverage
+                WHERE symbol = ? AND granularity = ? AND start_ts <= ? AND end_ts >= ?
+            ''', (symbol, granularity, end_ts + granularity, start_ts - granularity))
+            for covered_start, covered_end in cursor.fetchall():
+                start_ts = min(start_ts, covered_start)
+                end_ts = max(end_ts, covered_end)
+            self.connection.execute('DELETE FROM kline_coverage WHERE symbol = ? AND granularity = ? AND start_ts >= ? AND start_ts <= ?',
+                                    (symbol, granularity, start_ts, end_ts))
+            self.connection.execute('INSERT INTO kline_coverage (symbol, granularity, start_ts, end_ts) VALUES (?, ?, ?, ?)',
+                                    (symbol, granularity, start_ts, end_ts))
+
+    def get_covered_ranges(self, symbol, granularity, start_ts, end_ts) -> list[tuple[int, int]]:
+        """
+        The fetched ranges that overlap start_ts to end_ts, oldest first
+        """
+        cursor = self.connection.execute('''
+            SELECT start_ts, end_ts FROM kline_coverage
+            WHERE symbol = ? AND granularity = ? AND start_ts <= ? AND end_ts >= ? ORDER BY start_ts
+        ''', (symbol, granularity, end_ts, start_ts))
+        return cursor.fetchall()
+
+    def get_missing_ranges(self, symbol, granularity, start_ts, end_ts) -> list[tuple[int, int]]:
+        """
+        The ranges of kline ts from start_ts to end_ts that were never fetched, oldest first.
+        Each range is (ts of the first missing kline, ts of the last missing kline), aligned to granularity
+        """
+        first = -(-start_ts // granularity) * granularity
+        last = end_ts // granularity * granularity
+        missing = []
+        for covered_start, covered_end in self.get_covered_ranges(symbol, granularity, first, last):
+            if covered_start > first:
+                missing.append((first, covered_start - granularity))
+            first = max(first, covered_end + granularity)
+        if first <= last:
+            missing.append((first, last))
+        return missing
+
+    def symbols(self, granularity=None) -> list[str]:
+        """
+        Symbols with klines stored, for all granularities or only for granularity
+        """
+        if granularity is None:
+            cursor = self.connection.execute('SELECT DISTINCT symbol FROM klines ORDER BY symbol')
+        else:
+            cursor = self.connection.execute('SELECT DISTINCT symbol FROM klines WHERE granularity = ? ORDER BY symbol', (granularity,))
+        return [row[0] for row in cursor.fetchall()]
 
     def close(self):
         self.connection.close()
+
+    def _upsert_sql(self) -> str:
+        return f'''
+            INSERT INTO klines {self._header} VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (symbol, granularity, ts) DO UPDATE SET
+                open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close, volume = excluded.volume
+        '''
+
+    def _select_range(self, symbol, start_ts, end_ts, granularity) -> list[tuple]:
+        cursor = self.connection.execute(f'''
+            SELECT {", ".join(_COLUMNS)} FROM klines
+            WHERE symbol = ? AND granularity = ? AND ts >= ? AND ts <= ? ORDER BY ts
+        ''', (symbol, granularity, start_ts, end_ts))
+        return cursor.fetchall()
@@ -0,0 +1,117 @@
+# PriceCache keeps the latest price of each symbol with the time it was updated, so the prices streamed from the
+# websocket (candle closes) can be served without asking the exchange for a full product listing on every refresh.
+# A price older than max_age seconds is stale, and only the stale symbols need to be fetched over REST again.
+# Updates come from the websocket thread and reads from the trader thread, so every access takes the lock
+import threading
+import time
+
+class PriceCache(object):
+    def __init__(self, max_age: float = 60.0, rest_limit: int = 10, clock=time.time):
+        """
+        :param max_age: Seconds a price stays fresh after its last update
+        :param rest_limit: Max number of stale symbols fetched one by one, more than that are refreshed with a full listing
+        :param clock: Time source in seconds, for tests
+        """
+        self._max_age = max_age
+        self._rest_limit = rest_limit
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._prices: dict[str, float] = {}
+        self._updated: dict[str, float] = {}
+        # symbols in the last full listing, the symbols outside it have no price on the exchange and are never stale
+        self._listed: set[str] = None
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._prices
+
+    def max_age(self) -> float:
+        return self._max_age
+
+    def rest_limit(self) -> int:
+        return self._rest_limit
+
+    def update(self, symbol: str, price: float, ts: float = None):
+        """
+        Update the price of symbol, ts is the time of the update in seconds, now if None
+        """
+        if not price or price <= 0:
+            return
+        if ts is None:
+            ts = self._clock()
+        with self._lock:
+            # an older update arriving late does not overwrite a newer price
+            if ts < self._updated.get(symbol, 0):
+                return
+            self._prices[symbol] = price
+            self._updated[symbol] = ts
+
+    def update_prices(self, prices: dict[str, float], ts: float = None, listing: bool = False):
+        """
+        Update the prices of several symbols at once. If listing is True, prices is a full listing of the exchange
+        """
+        if ts is None:
+            ts = self._clock()
+        with self._lock:
+            for symbol, price in prices.items():
+                if not price or price <= 0 or ts < self._updated.get(symbol, 0):
+                    continue
+                self._prices[symbol] = price
+                self._updated[symbol] = ts
+            if listing:
+                self._listed = set(prices.keys())
+
+    def get(self, symbol: str, max_age: float = None) -> float:
+        """
+        Get the price of symbol if it is fresh, None otherwise
+        """
+        if max_age is None:
+            max_age = self._max_age
+        now = self._clock()
+        with self._lock:
+            updated = self._updated.get(symbol)
+            if updated is None or now - updated > max_age:
+                return None
+            return self._prices[symbol]
+
+    def age(self, symbol: str) -> float:
+        """
+        Seconds since the last update of symbol, None if it has no price
+        """
+        with self._lock:
+            updated = self._updated.get(symbol)
+        if updated is None:
+            return None
+        return self._clock() - updated
+
+    def stale_symbols(self, symbols: list[str] = None, max_age: float = None) -> list[str]:
+        """
+        Get the symbols whose price is missing or older than max_age, of symbols or of all the cached symbols if None
+        """
+        if max_age is None:
+            max_age = self._max_age
+        now = self._clock()
+        with self._lock:
+            if symbols is None:
+                symbols = list(self._prices.keys())
+            stale = []
+            for symbol in symbols:
+                updated = self._updated.get(symbol)
+                if updated is None:
+                    if self._listed is not None and symbol not in self._listed:
+                        continue
+                    stale.append(symbol)
+                elif now - updated > max_age:
+                    stale.append(symbol)
+            return stale
+
+    def prices(self, symbols: list[str] = None) -> dict[str, float]:
+        """
+        Get the latest price of symbols, or of all the cached symbols if None, whatever their age
+        """
+        with self._lock:
+            if symbols is None:
+                return dict(self._prices)
+            return {symbol: self._prices[symbol] for symbol in symbols if symbol in self._prices}
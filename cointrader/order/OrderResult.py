@@ -56,7 +56,7 @@ class OrderResult(object):
     def from_dict(self, data: dict):
         self.id = data['id']
         if 'pid' in data:
-            self.id = data['pid']
+            self.pid = data['pid']
         if 'active' in data:
             self.active = data['active']
         if 'symbol' in data:
@@ -1,10 +1,29 @@
+# This file contains the OrderStorage class, which stores orders in sqlite.
+# In simulations all writes go through one connection, and are committed by commit().
+# In live mode the writes are handed to a writer thread with one long lived connection: writes to the same order
+# are coalesced, and the pending writes are written in one transaction every flush_interval seconds, or as soon as
+# flush_count orders have pending writes, so the trading loop never waits for the disk. Reads flush first, so they
+# always see the writes made before them. A batch that fails to write stays pending, merged with the newer writes, and
+# is tried again after flush_interval; flush() and commit() raise the error instead of reporting the writes as done.
+# Once close() stopped the writer thread, writes go straight to the database
+import atexit
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from cointrader.order.Order import Order
 from cointrader.trade.TraderConfig import TraderConfig
 
+# kinds of pending writes
+_INSERT = 0
+_UPDATE = 1
+_DELETE = 2
+
 class OrderStorage:
-    def __init__(self, config: TraderConfig, db_path='orders.db', reset=True):
+    def __init__(self, config: TraderConfig, db_path='orders.db', reset=True, write_behind: bool = None):
+        """
+        :param write_behind: Write from a writer thread, by default only in live mode
+        """
         self._config = config
         self.db_path = db_path
         self._reset = reset
@@ -14,16 +33,54 @@ class OrderStorage:
         ]
         print(f"db_path: {db_path}")
         self._simulate = self._config.simulate()
+        self._write_behind = not self._simulate if write_behind is None else write_behind
+        self._writer = None
         # sqlite connections must be created in the same thread as they are used, so for simulations this is fine
-        if self._simulate:
+        if self._write_behind:
+            # only used by the writer thread once it runs, and by reset() while holding the lock
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(f"PRAGMA synchronous={config.orders_db_synchronous()}")
+            self._conn_lock = threading.Lock()
+            self._readers = threading.local()
+            # the reader connections of all threads, closed by close()
+            self._reader_conns: list[sqlite3.Connection] = []
+            self._flush_interval = config.orders_db_flush_interval()
+            self._flush_count = config.orders_db_flush_count()
+            self._cond = threading.Condition()
+            # order id -> (kind, values), values are the full row for inserts and the changed fields for updates
+            self._pending: dict[str, tuple[int, object]] = {}
+            self._queued = 0
+            self._written = 0
+            self._writes = 0
+            self._flush_requested = False
+            self._closing = False
+            self._stopped = False
+            # last write error, and the number of failed writes, cleared by a successful write
+            self._error: Exception = None
+            self._failures = 0
+        elif self._simulate:
             self._conn = sqlite3.connect(self.db_path)
         else:
             self._conn = None
         self.reset()
-
+        if self._write_behind:
+            self._writer = threading.Thread(target=self._run_writer, name='OrderStorageWriter', daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
 
     def reset(self):
+        if self._write_behind:
+            self.flush()
+            with self._conn_lock:
+                self._create_table(self._conn)
+            return
         conn = self.get_connection()
+        self._create_table(conn)
+        if not self._simulate:
+            conn.close()
+
+    def _create_table(self, conn):
         cursor = conn.cursor()
         if self._reset:
             cursor.execute('DROP TABLE IF EXISTS orders')
@@ -52,52 +109,77 @@ class OrderStorage:
                 error_msg TEXT NOT NULL
                 )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS orders_symbol_active ON orders (symbol, active)')
         conn.commit()
-        if not self._simulate:
-            conn.close()
 
     def get_connection(self):
-        if self._simulate:
+        if self._simulate and not self._write_behind:
             return self._conn
+        elif self._write_behind:
+            # a long lived connection for the reads of each thread, WAL lets them read while the writer writes
+            conn = getattr(self._readers, 'conn', None)
+            if conn is None:
+                # close() closes it from another thread
+                conn = self._readers.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                with self._conn_lock:
+                    self._reader_conns.append(conn)
+            return conn
         else:
             return sqlite3.connect(self.db_path)
 
+    def _release(self, conn):
+        """
+        Close a connection from get_connection() that is only used for one call
+        """
+        if not self._simulate and not self._write_behind:
+            conn.close()
+
     def table_exists(self):
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='orders'")
-        return cursor.fetchone() is not None
+        result = cursor.fetchone() is not None
+        self._release(conn)
+        return result
+
+    def _order_row(self, order: Order) -> tuple:
+        """
+        The values of order in the order of self._fields
+        """
+        return (order.id, order.pid, int(order.active), order.symbol, order.type.name, order.limit_type.name, order.side.name, order.price, order.limit_price,
+                order.stop_price, order.stop_direction.name, order.size, order.filled_size, order.fee, order.placed_ts,
+                order.filled_ts, order.msg, int(order.post_only), order.status.name, order.error_reason.name, str(order.error_msg))
 
     def add_order(self, order: Order):
         if not order.id:
             raise ValueError('Order id is required')
+        if self._write_behind:
+            self._queue(order.id, _INSERT, self._order_row(order))
+            return
         conn = self.get_connection()
         field_str = ', '.join(self._fields)
         cursor = conn.cursor()
-        cursor.execute(f"INSERT INTO orders ({field_str}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (order.id, order.pid, int(order.active), order.symbol, order.type.name, order.limit_type.name, order.side.name, order.price, order.limit_price,
-                order.stop_price, order.stop_direction.name, order.size, order.filled_size, order.fee, order.placed_ts,
-                order.filled_ts, order.msg, int(order.post_only), order.status.name, order.error_reason.name, str(order.error_msg)))
-        
-        if not self._config.simulate():
+        cursor.execute(f"INSERT INTO orders ({field_str}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._order_row(order))
+
+        if not self._simulate:
             conn.commit()
             conn.close()
 
-    def exists_order(self, order_id):
-        return self.get_order(order_id) is not None
+    def exists_order(self, order_id, symbol: str = None):
+        return self.get_order(order_id, symbol) is not None
 
-    def get_order(self, order_id: str, symbol: str) -> Order:
+    def get_order(self, order_id: str, symbol: str = None) -> Order:
+        if self._write_behind:
+            self.flush()
         conn = self.get_connection()
         cursor = conn.cursor()
         if symbol is not None:
             cursor.execute('SELECT * FROM orders WHERE id = ? AND symbol = ?', (order_id, symbol))
         else:
-            cursor.execute('SELECT * FROM orders WHERE order_id = ?', (order_id,))
+            cursor.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
         columns = [column[0] for column in cursor.description]
         result = cursor.fetchone()
-
-        if not self._config.simulate():
-            conn.close()
+        self._release(conn)
 
         if result is None:
             return None
@@ -106,6 +188,8 @@ class OrderStorage:
     def get_all_orders(self, symbol: str=None) -> list[Order]:
         if not self.table_exists():
             return []
+        if self._write_behind:
+            self.flush()
         conn = self.get_connection()
         cursor = conn.cursor()
         if symbol is None:
@@ -114,15 +198,15 @@ class OrderStorage:
             cursor.execute('SELECT * FROM orders WHERE symbol = ?', (symbol,))
         columns = [column[0] for column in cursor.description]
         result = cursor.fetchall()
-
-        if not self._config.simulate():
-            conn.close()
+        self._release(conn)
 
         if result is None:
             return None
         return [Order(symbol=symbol, data=dict(zip(columns, row))) for row in result]
     
     def get_active_orders(self, symbol: str=None) -> list[Order]:
+        if self._write_behind:
+            self.flush()
         conn = self.get_connection()
         cursor = conn.cursor()
         if symbol is None:
@@ -131,9 +215,7 @@ class OrderStorage:
             cursor.execute('SELECT * FROM orders WHERE symbol = ? AND active = 1', (symbol,))
         columns = [column[0] for column in cursor.description]
         result = cursor.fetchall()
-
-        if not self._config.simulate():
-            conn.close()
+        self._release(conn)
 
         if result is None:
             return None
@@ -141,40 +223,212 @@ class OrderStorage:
         return [Order(symbol=symbol, data=dict(zip(columns, row))) for row in result]
 
     def update_order(self, order: Order):
+        if self._write_behind:
+            self._queue(order.id, _UPDATE, dict(zip(self._fields[1:], self._order_row(order)[1:])))
+            return
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('UPDATE orders SET pid = ?, active = ?, symbol = ?, type = ?, limit_type = ?, side = ?, price = ?, limit_price = ?, stop_price = ?, stop_direction = ?, size = ?, filled_size = ?, fee = ?, placed_ts = ?, filled_ts = ?, msg = ?, post_only = ?, status = ?, error_reason = ?, error_msg = ? WHERE id = ?',
-            (order.pid, int(order.active), order.symbol, order.type.name, order.limit_type.name, order.side.name, order.price, order.limit_price, order.stop_price, order.stop_direction.name, order.size, order.filled_size, order.fee, order.placed_ts, order.filled_ts, order.msg, int(order.post_only), order.status.name, order.error_reason.name, str(order.error_msg), order.id))
-        if not self._config.simulate():
+            self._order_row(order)[1:] + (order.id,))
+        if not self._simulate:
             conn.commit()
             conn.close()
 
     def update_order_status(self, order_id, status):
+        if self._write_behind:
+            self._queue(order_id, _UPDATE, {'status': status})
+            return
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('UPDATE orders SET status = ? WHERE id = ?', (status, order_id))
-        if not self._config.simulate():
+        if not self._simulate:
             conn.commit()
             conn.close()
 
     def update_order_active(self, order_id: str, active: bool):
+        if self._write_behind:
+            self._queue(order_id, _UPDATE, {'active': int(active)})
+            return
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('UPDATE orders SET active = ? WHERE id = ?', (active, order_id))
-        if not self._config.simulate():
+        if not self._simulate:
             conn.commit()
             conn.close()
 
     def delete_order(self, order_id):
+        if self._write_behind:
+            self._queue(order_id, _DELETE, None)
+            return
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM orders WHERE id = ?', (order_id,))
-        if not self._config.simulate():
+        if not self._simulate:
             conn.commit()
             conn.close()
 
     def commit(self):
+        if self._write_behind:
+            self.flush()
+            return
         conn = self.get_connection()
         conn.commit()
-        if not self._config.simulate():
+        if not self._simulate:
             conn.close()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until the writes queued before the call are written. Returns False on timeout, and raises
+        RuntimeError if the writer failed to write them
+        """
+        if not self._write_behind:
+            return True
+        with self._cond:
+            target = self._queued
+            failures = self._failures
+            if self._written < target and not self._stopped:
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._written >= target or self._failures > failures or self._stopped, timeout=timeout)
+            if self._written >= target:
+                return True
+            if self._failures > failures or self._stopped:
+                raise RuntimeError(f"OrderStorage: failed to write {len(self._pending)} orders to {self.db_path}: {self._error}") from self._error
+            return False
+
+    def stats(self) -> dict:
+        """
+        Number of writes queued, orders written (after coalescing) and transactions of the writer thread
+        """
+        if not self._write_behind:
+            return {}
+        with self._cond:
+            return {'queued': self._queued, 'written': self._writes, 'pending': len(self._pending)}
+
+    def close(self):
+        """
+        Write the pending writes and stop the writer thread. Raises RuntimeError if they could not be written
+        """
+        if self._writer is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._writer = None
+        with self._conn_lock:
+            self._conn.close()
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+            self._readers = threading.local()
+        with self._cond:
+            if self._pending:
+                raise RuntimeError(f"OrderStorage: failed to write {len(self._pending)} orders to {self.db_path}: {self._error}") from self._error
+
+    def _merge(self, pending: tuple, kind: int, values) -> tuple:
+        """
+        Merge a write into the write pending for the same order
+        """
+        if pending is None or kind != _UPDATE:
+            return (kind, values)
+        pending_kind, pending_values = pending
+        if pending_kind == _INSERT:
+            row = list(pending_values)
+            for name, value in values.items():
+                row[self._fields.index(name)] = value
+            return (_INSERT, tuple(row))
+        elif pending_kind == _UPDATE:
+            return (_UPDATE, dict(pending_values, **values))
+        # the order is deleted, there is nothing to update
+        return pending
+
+    def _queue(self, order_id: str, kind: int, values):
+        """
+        Queue a write for the writer thread, merged with the write already pending for the same order
+        """
+        with self._cond:
+            if self._stopped:
+                self._write_direct(order_id, kind, values)
+                return
+            pending = self._pending.get(order_id)
+            self._pending[order_id] = self._merge(pending, kind, values)
+            self._queued += 1
+            # the writer waits for the first write, and then for flush_interval or flush_count writes
+            if pending is None and (len(self._pending) == 1 or len(self._pending) >= self._flush_count):
+                self._cond.notify_all()
+
+    def _write_direct(self, order_id: str, kind: int, values):
+        """
+        Write to the database from the calling thread, after the writer thread stopped
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            error = self._write_pending({order_id: (kind, values)}, conn)
+        finally:
+            conn.close()
+        if error is not None:
+            raise RuntimeError(f"OrderStorage: failed to write order {order_id} to {self.db_path}: {error}") from error
+        self._queued += 1
+        self._written = self._queued
+
+    def _run_writer(self):
+        failed = False
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                deadline = time.monotonic() + self._flush_interval
+                # after a failed write, wait flush_interval before trying again, unless a flush or close asks for it
+                while not (self._closing or self._flush_requested or (not failed and len(self._pending) >= self._flush_count)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                pending = self._pending
+                self._pending = {}
+                target = self._queued
+                self._flush_requested = False
+                closing = self._closing
+
+            error = self._write_pending(pending, self._conn) if pending else None
+
+            with self._cond:
+                if error is None:
+                    self._written = target
+                    self._writes += len(pending)
+                    self._error = None
+                else:
+                    # keep the batch, with the writes queued since applied on top of it
+                    for order_id, (kind, values) in self._pending.items():
+                        pending[order_id] = self._merge(pending.get(order_id), kind, values)
+                    self._pending = pending
+                    self._error = error
+                    self._failures += 1
+                failed = error is not None
+                self._cond.notify_all()
+                # a failed write on close is not tried again, close() reports the writes that are left
+                if closing and (failed or not self._pending):
+                    self._stopped = True
+                    self._cond.notify_all()
+                    return
+
+    def _write_pending(self, pending: dict, conn: sqlite3.Connection) -> Exception:
+        """
+        Write the pending writes in one transaction, returns the error if it failed
+        """
+        field_str = ', '.join(self._fields)
+        placeholders = ', '.join(['?'] * len(self._fields))
+        try:
+            with self._conn_lock, conn:
+                for order_id, (kind, values) in pending.items():
+                    if kind == _INSERT:
+                        conn.execute(f"INSERT OR REPLACE INTO orders ({field_str}) VALUES ({placeholders})", values)
+                    elif kind == _UPDATE:
+                        assignments = ', '.join(f"{name} = ?" for name in values.keys())
+                        conn.execute(f"UPDATE orders SET {assignments} WHERE id = ?", tuple(values.values()) + (order_id,))
+                    else:
+                        conn.execute('DELETE FROM orders WHERE id = ?', (order_id,))
+        except sqlite3.Error as e:
+            print(f"Error writing {len(pending)} orders to {self.db_path}: {e}")
+            return e
+        return None
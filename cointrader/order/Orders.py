@@ -1,13 +1,24 @@
-# Orders class to store all orders
+# Orders class to store all orders.
+# All orders are kept in memory, indexed by id, by symbol, by position id and by the active flag, so the traders look up
+# orders without going to the database. The order storage is only written to (in live mode by its writer thread),
+# and read once on startup to rebuild the index
 from .Order import Order
 from .OrderStorage import OrderStorage
 from cointrader.trade.TraderConfig import TraderConfig
 
 class Orders:
     def __init__(self, config: TraderConfig, order_storage: OrderStorage = None, db_path='orders.db', reset=True):
-        self.orders = {}
+        # symbol -> order id -> order
+        self.orders: dict[str, dict[str, Order]] = {}
         self._config = config
         self._db_path = db_path
+        self._by_id: dict[str, Order] = {}
+        # (symbol, pid) -> order id -> order
+        self._by_pid: dict[tuple[str, int], dict[str, Order]] = {}
+        # symbol -> order id -> order, for the active orders only
+        self._active: dict[str, dict[str, Order]] = {}
+        # order id -> (symbol, pid) the order is indexed under, the pid of an order can change after it was added
+        self._keys: dict[str, tuple[str, int]] = {}
 
         if db_path is None:
             self._order_storage = None
@@ -15,63 +26,126 @@ class Orders:
             self._order_storage = order_storage
         else:
             self._order_storage = OrderStorage(config=config, db_path=db_path, reset=reset)
+        self._profiler = None
+        self.load()
 
-    def add_order(self, symbol: str, order: Order):
-        if symbol not in self.orders:
-            self.orders[symbol] = { order.id: order }
+    def load(self) -> int:
+        """
+        Rebuild the index from the order storage with one query. Returns the number of orders loaded
+        """
+        self.orders.clear()
+        self._by_id.clear()
+        self._by_pid.clear()
+        self._active.clear()
+        self._keys.clear()
+        if not self._order_storage:
+            return 0
+        orders = self._order_storage.get_all_orders()
+        for order in orders:
+            order.active = bool(order.active)
+            self._index(order.symbol, order)
+        return len(orders)
+
+    def set_profiler(self, profiler):
+        """
+        Set a Profiler for timing the writes to the order storage
+        """
+        self._profiler = profiler
+
+    def _index(self, symbol: str, order: Order):
+        key = self._keys.get(order.id)
+        if key is not None and key != (symbol, order.pid):
+            self._unindex(order.id)
+        self._keys[order.id] = (symbol, order.pid)
+        self._by_id[order.id] = order
+        self.orders.setdefault(symbol, {})[order.id] = order
+        self._by_pid.setdefault((symbol, order.pid), {})[order.id] = order
+        self._set_active(symbol, order)
+
+    def _unindex(self, order_id: str) -> Order:
+        key = self._keys.pop(order_id, None)
+        order = self._by_id.pop(order_id, None)
+        if key is None:
+            return order
+        symbol, pid = key
+        self.orders.get(symbol, {}).pop(order_id, None)
+        self._active.get(symbol, {}).pop(order_id, None)
+        by_pid = self._by_pid.get(key)
+        if by_pid is not None:
+            by_pid.pop(order_id, None)
+            if not by_pid:
+                del self._by_pid[key]
+        return order
+
+    def _set_active(self, symbol: str, order: Order):
+        if order.active:
+            self._active.setdefault(symbol, {})[order.id] = order
         else:
-            self.orders[symbol][order.id] = order
-        
-        if self._order_storage:
-            self._order_storage.add_order(order)
-        elif symbol not in self.orders:
-            self.orders[symbol] = { order.id: order }
+            self._active.get(symbol, {}).pop(order.id, None)
+
+    def _store(self, symbol: str, write, *args):
+        if self._profiler is None:
+            write(*args)
         else:
-            self.orders[symbol][order.id] = order
+            with self._profiler.timer(symbol, 'orders_db'):
+                write(*args)
 
-    def get_order(self, symbol: str, order_id: str) -> Order:
+    def add_order(self, symbol: str, order: Order):
+        self._index(symbol, order)
         if self._order_storage:
-            return self._order_storage.get_order(order_id=order_id)
-        elif symbol in self.orders and order_id in self.orders[symbol]:
-            return self.orders[symbol][order_id]
-        
-        return None
+            self._store(symbol, self._order_storage.add_order, order)
 
-    def get_all_orders(self, symbol: str) -> list:
+    def get_order(self, symbol: str, order_id: str) -> Order:
         """
-        Get all orders for a symbol
+        Get an order by id, None if there is no order with that id for symbol. symbol None matches any symbol
         """
-        if self._order_storage:
-            return self._order_storage.get_all_orders()
-        elif symbol in self.orders:
-            return list(self.orders[symbol].values())
+        order = self._by_id.get(order_id)
+        if order is None or (symbol is not None and self._keys[order_id][0] != symbol):
+            return None
+        return order
 
-    def get_active_orders(self, symbol: str) -> list[Order]:
+    def get_all_orders(self, symbol: str = None) -> list[Order]:
         """
-        Get all active orders for a symbol
+        Get all orders for a symbol, or for all symbols if symbol is None
         """
-        if self._order_storage:
-            return self._order_storage.get_active_orders(symbol=symbol)
-        elif symbol in self.orders:
-            return [order for order in self.orders[symbol].values() if order.active]
+        if symbol is None:
+            return list(self._by_id.values())
+        return list(self.orders.get(symbol, {}).values())
+
+    def get_active_orders(self, symbol: str = None) -> list[Order]:
+        """
+        Get all active orders for a symbol, or for all symbols if symbol is None
+        """
+        if symbol is None:
+            return [order for orders in self._active.values() for order in orders.values()]
+        return list(self._active.get(symbol, {}).values())
+
+    def get_position_orders(self, symbol: str, pid: int) -> list[Order]:
+        """
+        Get the orders of the position pid of symbol
+        """
+        return list(self._by_pid.get((symbol, pid), {}).values())
 
     def update_order(self, symbol: str, order: Order):
+        self._index(symbol, order)
         if self._order_storage:
-            self._order_storage.update_order(order)
-        elif symbol in self.orders and order.id in self.orders[symbol]:
-            self.orders[symbol][order.id] = order
+            self._store(symbol, self._order_storage.update_order, order)
 
     def update_order_active(self, symbol: str, order_id: str, active: bool):
+        order = self._by_id.get(order_id)
+        if order is not None:
+            order.active = active
+            self._set_active(self._keys[order_id][0], order)
         if self._order_storage:
-            self._order_storage.update_order_active(order_id=order_id, active=active)
-        elif symbol in self.orders and order_id in self.orders[symbol]:
-            self.orders[symbol][order_id].active = active
+            self._store(symbol, self._order_storage.update_order_active, order_id, active)
 
     def remove_order(self, symbol: str, order_id: str) -> bool:
-        if symbol in self.orders and order_id in self.orders[symbol]:
-            del self.orders[symbol][order_id]
-            return True
-        return False
+        if self.get_order(symbol, order_id) is None:
+            return False
+        self._unindex(order_id)
+        if self._order_storage:
+            self._store(symbol, self._order_storage.delete_order, order_id)
+        return True
 
     def commit(self):
         if self._order_storage:
@@ -1,14 +1,15 @@
 # This file is used to create a signal based on the ADX indicator
 from collections import deque
 from cointrader.common.Signal import Signal
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.ADX import ADX
 
 class ADXSignal(Signal):
-    def __init__(self, name='adx', symbol=None, period=14, threshold=25):
+    def __init__(self, name='adx', symbol=None, period=14, threshold=25, indicators: IndicatorRegistry = None):
         super().__init__(name, symbol)
         self.period = period
         self._threshold = threshold
-        self.adx = ADX(period)
+        self.adx = ADX(period, indicators=indicators)
         self.reset()
 
     def reset(self):
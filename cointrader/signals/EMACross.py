@@ -1,16 +1,21 @@
 from collections import deque
 from cointrader.common.Signal import Signal
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.EMA import EMA
 
 class EMACross(Signal):
-    def __init__(self, name='ema', symbol=None, short_period=12, long_period=24):
+    def __init__(self, name='ema', symbol=None, short_period=12, long_period=24, indicators: IndicatorRegistry = None):
         super().__init__(name, symbol)
         self.short_period = short_period
         self.long_period = long_period
         self.window = max(short_period, long_period)
-        self.short_ema = EMA(f"{self._name}_short", self.short_period)
-        self.long_ema = EMA(f"{self._name}_long", self.long_period)
+        if indicators is not None:
+            self.short_ema = indicators.get(EMA, period=self.short_period)
+            self.long_ema = indicators.get(EMA, period=self.long_period)
+        else:
+            self.short_ema = EMA(f"{self._name}_short", self.short_period)
+            self.long_ema = EMA(f"{self._name}_long", self.long_period)
         self.diff_period = 9
         self.diff_ema = EMA(f"{self._name}_diff", self.diff_period)
         self._threshold = 0.01
@@ -1,144 +1,53 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
-from typing import List, Tuple, Optional
+from typing import List, Dict, Optional
 from collections import deque
 
 from cointrader.common.Indicator import Indicator
 from cointrader.common.Kline import Kline
 
+# wave labels in order, 5 impulse waves followed by 3 corrective waves
+ELLIOTT_WAVE_LABELS = [1, 2, 3, 4, 5, 'A', 'B', 'C']
+
 class ElliottWaveIndicator(Indicator):
-    def __init__(self, name='elliott_wave', period=500, sensitivity=1.0):
+    def __init__(self, name='elliott_wave', period=500, sensitivity=1.0, max_waves=16):
         """
         Initialize the Elliott Wave Indicator.
 
+        Peaks and troughs are found with a zig-zag over the closing prices: a peak is confirmed once the close
+        drops min_prominence * sensitivity below the highest close since the last trough, and a trough once
+        it rises the same amount above the lowest close since the last peak. This finds the same alternating
+        peaks and troughs as a peak search by prominence over the whole window, but each update only looks
+        at the current close.
+
         :param name: Name of the indicator.
         :param period: Number of recent Klines to consider for wave analysis.
         :param sensitivity: Sensitivity factor for peak/trough detection.
                             Higher values lead to fewer detected peaks/troughs.
+        :param max_waves: Number of recent waves to keep.
         """
         super().__init__(name)
         self.period = period
         self.sensitivity = sensitivity
+        self.max_waves = max_waves
         self.klines = deque(maxlen=self.period)
-        self.wave_counts = []
-        self.waves = []  # List of waves identified
-        self.current_wave = []
+        self.waves = deque(maxlen=self.max_waves)  # recent waves, oldest first
         self.phase = 'impulse'  # 'impulse' or 'corrective'
         self.min_distance = 5  # Minimum number of Klines between peaks/troughs
         self.min_prominence = 0.5  # Minimum prominence of peaks/troughs
+        self.reset()
 
     def reset(self):
         """
         Reset the Elliott Wave indicator to its initial state.
         """
         self.klines.clear()
-        self.wave_counts = []
-        self.waves = []
-        self.current_wave = []
+        self.waves.clear()
         self.phase = 'impulse'
-
-    def _extract_prices(self) -> pd.Series:
-        """
-        Extract the closing prices from the Klines.
-
-        :return: Pandas Series of closing prices.
-        """
-        return pd.Series([k.close for k in self.klines])
-
-    def _identify_peaks_troughs(self, prices: pd.Series) -> Tuple[List[int], List[int]]:
-        """
-        Identify peaks (local maxima) and troughs (local minima) in the price series.
-
-        :param prices: Pandas Series of closing prices.
-        :return: Tuple containing lists of peak indices and trough indices.
-        """
-        # Identify peaks
-        peaks, _ = find_peaks(prices, distance=self.min_distance, prominence=self.min_prominence * self.sensitivity)
-
-        # Identify troughs by inverting the prices
-        troughs, _ = find_peaks(-prices, distance=self.min_distance, prominence=self.min_prominence * self.sensitivity)
-
-        return peaks.tolist(), troughs.tolist()
-
-    def _assign_waves(self, peaks: List[int], troughs: List[int]):
-        """
-        Assign identified peaks and troughs to Elliott Waves based on their sequence.
-
-        :param peaks: List of peak indices.
-        :param troughs: List of trough indices.
-        """
-        # Combine peaks and troughs
-        extrema = sorted(peaks + troughs)
-        wave_sequence = []
-        for idx in extrema:
-            if idx in peaks:
-                wave_sequence.append(('peak', idx))
-            else:
-                wave_sequence.append(('trough', idx))
-
-        # Assign waves based on impulse and corrective phases
-        for point in wave_sequence:
-            wave_type, idx = point
-            price = self.klines[idx].close
-            time = self.klines[idx].time
-
-            if not self.current_wave:
-                # Start the first wave
-                self.current_wave.append({'type': wave_type, 'index': idx, 'price': price, 'time': time})
-                continue
-
-            last_wave = self.current_wave[-1]
-
-            # Ensure waves alternate between peak and trough
-            if last_wave['type'] != wave_type:
-                self.current_wave.append({'type': wave_type, 'index': idx, 'price': price, 'time': time})
-            else:
-                # If two consecutive peaks or troughs, keep the more extreme one
-                if wave_type == 'peak' and price > last_wave['price']:
-                    self.current_wave[-1] = {'type': wave_type, 'index': idx, 'price': price, 'time': time}
-                elif wave_type == 'trough' and price < last_wave['price']:
-                    self.current_wave[-1] = {'type': wave_type, 'index': idx, 'price': price, 'time': time}
-
-        # After assigning, analyze wave counts
-        self._analyze_waves()
-
-    def _analyze_waves(self):
-        """
-        Analyze the current wave sequence to identify Elliott Waves.
-        """
-        # Elliott Waves consist of 5 impulse waves and 3 corrective waves
-        # This simplistic implementation counts sequences accordingly
-
-        wave_types = [wave['type'] for wave in self.current_wave]
-
-        # Check for impulse waves (5 waves)
-        if len(wave_types) >= 5:
-            # A simplistic check: 5 alternating peaks/troughs
-            last_five = wave_types[-5:]
-            if all(last_five[i] != last_five[i+1] for i in range(4)):
-                # Assign wave numbers
-                wave_numbers = list(range(1, 6))
-                for i, wave in enumerate(self.current_wave[-5:]):
-                    wave['elliott_wave'] = wave_numbers[i]
-                self.waves.extend(self.current_wave[-5:])
-                print(f"Elliott Wave Phase: Impulse completed at index {self.current_wave[-1]['index']}")
-        
-        # Check for corrective waves (3 waves)
-        if len(wave_types) >= 3:
-            last_three = wave_types[-3:]
-            if all(last_three[i] != last_three[i+1] for i in range(2)):
-                # Assign wave numbers
-                corrective_wave_numbers = ['A', 'B', 'C']
-                for i, wave in enumerate(self.current_wave[-3:]):
-                    wave['elliott_wave'] = corrective_wave_numbers[i]
-                self.waves.extend(self.current_wave[-3:])
-                print(f"Elliott Wave Phase: Corrective completed at index {self.current_wave[-1]['index']}")
-        
-        # Reset current_wave to prevent overlap
-        if len(self.current_wave) > 8:
-            self.current_wave = self.current_wave[-8:]
+        self._count = 0
+        self._wave_count = 0
+        # 0 until the first swing, then 1 while tracking a peak and -1 while tracking a trough
+        self._direction = 0
+        self._high = None
+        self._low = None
 
     def update(self, kline: Kline) -> Optional[List[Dict[str, float]]]:
         """
@@ -147,20 +56,102 @@ class ElliottWaveIndicator(Indicator):
         :param kline: The new Kline data.
         :return: List of identified waves or None if not ready.
         """
-        self.klines.append(kline)
-
-        if len(self.klines) < 10:
+        index = self._count
+        self._count += 1
+        # (index, price, time) of the candidate point
+        point = (index, kline.close, kline.ts)
+        self.klines.append((kline.ts, kline.close))
+        threshold = self.min_prominence * self.sensitivity
+
+        if self._direction == 0:
+            if self._high is None or point[1] > self._high[1]:
+                self._high = point
+            if self._low is None or point[1] < self._low[1]:
+                self._low = point
+            # the first swing only sets the direction, the extreme before it has nothing on its other side
+            if self._high[1] - point[1] >= threshold:
+                self._direction = -1
+                self._low = point
+            elif point[1] - self._low[1] >= threshold:
+                self._direction = 1
+                self._high = point
+        elif self._direction == 1:
+            if point[1] > self._high[1]:
+                self._high = point
+            elif self._high[1] - point[1] >= threshold:
+                # start tracking the trough first, _add_wave() may merge an earlier trough into it
+                self._direction = -1
+                self._low = point
+                self._add_wave('peak', self._high)
+        else:
+            if point[1] < self._low[1]:
+                self._low = point
+            elif point[1] - self._low[1] >= threshold:
+                self._direction = 1
+                self._high = point
+                self._add_wave('trough', self._low)
+
+        # drop the waves that are older than the window
+        oldest = self._count - self.period
+        while self.waves and self.waves[0]['index'] < oldest:
+            self.waves.popleft()
+
+        if self._count < 10 or len(self.waves) == 0:
             # Not enough data to identify waves
             return None
-
-        prices = self._extract_prices()
-        peaks, troughs = self._identify_peaks_troughs(prices)
-        self._assign_waves(peaks, troughs)
-
-        if len(self.waves) > 0:
-            return self.waves.copy()
+        return list(self.waves)
+
+    def _add_wave(self, wave_type: str, point: tuple):
+        index, price, time = point
+        self.waves.append({'type': wave_type, 'index': index, 'price': price, 'time': time})
+        self._wave_count += 1
+
+        # Two peaks (or troughs) closer than min_distance are one wave: keep the more extreme one, then the
+        # troughs (or peaks) on either side of the dropped one are next to each other, so keep the more extreme of those
+        changed = False
+        while len(self.waves) >= 3 and self.waves[-1]['index'] - self.waves[-3]['index'] < self.min_distance:
+            last = self.waves.pop()
+            middle = self.waves.pop()
+            previous = self.waves.pop()
+            if self._more_extreme(last, previous):
+                # the earlier one is dropped, merge the point between them into the one before it
+                if self.waves and self._more_extreme(middle, self.waves[-1]):
+                    self.waves[-1] = middle
+                elif not self.waves:
+                    self.waves.append(middle)
+                    self._wave_count += 1
+                self.waves.append(last)
+                self._wave_count -= 2
+            else:
+                # the new one is dropped, the point between them is merged into the point being tracked now
+                self.waves.append(previous)
+                self._wave_count -= 2
+                self._merge_tracked(middle)
+            changed = True
+
+        if changed:
+            self._relabel()
         else:
-            return None
+            self.waves[-1]['elliott_wave'] = ELLIOTT_WAVE_LABELS[(self._wave_count - 1) % len(ELLIOTT_WAVE_LABELS)]
+        self.phase = 'impulse' if isinstance(ELLIOTT_WAVE_LABELS[self._wave_count % len(ELLIOTT_WAVE_LABELS)], int) else 'corrective'
+
+    def _merge_tracked(self, wave: dict):
+        point = (wave['index'], wave['price'], wave['time'])
+        if wave['type'] == 'trough':
+            if point[1] <= self._low[1]:
+                self._low = point
+        elif point[1] >= self._high[1]:
+            self._high = point
+
+    def _more_extreme(self, wave: dict, other: dict) -> bool:
+        if wave['type'] == 'peak':
+            return wave['price'] > other['price']
+        return wave['price'] < other['price']
+
+    def _relabel(self):
+        first = self._wave_count - len(self.waves)
+        for i, wave in enumerate(self.waves):
+            wave['elliott_wave'] = ELLIOTT_WAVE_LABELS[(first + i) % len(ELLIOTT_WAVE_LABELS)]
 
     def get_last_waves(self) -> Optional[List[Dict[str, float]]]:
         """
@@ -169,7 +160,7 @@ class ElliottWaveIndicator(Indicator):
         :return: List of waves with details or None.
         """
         if len(self.waves) > 0:
-            return self.waves.copy()
+            return list(self.waves)
         return None
 
     def plot_elliott_waves(self):
@@ -182,17 +173,13 @@ class ElliottWaveIndicator(Indicator):
             print("No Elliott Waves to plot.")
             return
 
-        # Prepare data
-        dates = [k.time for k in self.klines]
-        prices = [k.close for k in self.klines]
-        df = pd.DataFrame({
-            'Date': dates,
-            'Price': prices
-        })
-        df.set_index('Date', inplace=True)
+        import matplotlib.pyplot as plt
+
+        dates = [ts for ts, _ in self.klines]
+        prices = [close for _, close in self.klines]
 
         plt.figure(figsize=(15, 8))
-        plt.plot(df.index, df['Price'], label='Close Price', color='blue')
+        plt.plot(dates, prices, label='Close Price', color='blue')
 
         # Annotate waves
         for wave in self.waves:
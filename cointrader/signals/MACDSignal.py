@@ -1,10 +1,11 @@
 from collections import deque
 from cointrader.common.Signal import Signal
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.MACD import MACD
 
 class MACDSignal(Signal):
-    def __init__(self, name='macd', symbol=None, short_period=12, long_period=24, signal_period=9):
+    def __init__(self, name='macd', symbol=None, short_period=12, long_period=24, signal_period=9, indicators: IndicatorRegistry = None):
         super().__init__(name, symbol)
         self.short_period = short_period
         self.long_period = long_period
@@ -12,7 +13,8 @@ class MACDSignal(Signal):
         self.window = max(short_period, long_period, signal_period)
         self.macd = MACD(short_period=self.short_period,
                          long_period=self.long_period,
-                         signal_period=self.signal_period)
+                         signal_period=self.signal_period,
+                         indicators=indicators)
         self.reset()
 
     def reset(self):
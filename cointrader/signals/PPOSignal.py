@@ -1,10 +1,11 @@
 from collections import deque
 from cointrader.common.Signal import Signal
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.PPO import PPO
 
 class PPOSignal(Signal):
-    def __init__(self, name='ppo', symbol=None, short_period=12, long_period=26, signal_period=9, overbought=100, oversold=-100):
+    def __init__(self, name='ppo', symbol=None, short_period=12, long_period=26, signal_period=9, overbought=100, oversold=-100, indicators: IndicatorRegistry = None):
         """
         Initialize the PPO Signal.
         
@@ -15,6 +16,7 @@ class PPOSignal(Signal):
         :param signal_period: Period for the signal line EMA.
         :param overbought: Threshold for overbought condition.
         :param oversold: Threshold for oversold condition.
+        :param indicators: Registry of the strategy to share the EMAs from, if set.
         """
         super().__init__(name, symbol)
         self.short_period = short_period
@@ -24,7 +26,8 @@ class PPOSignal(Signal):
         self.oversold = oversold
 
         # Initialize PPO indicator
-        self.ppo = PPO(name='ppo_indicator', short_period=self.short_period, long_period=self.long_period, signal_period=self.signal_period)
+        self.ppo = PPO(name='ppo_indicator', short_period=self.short_period, long_period=self.long_period, signal_period=self.signal_period,
+                       indicators=indicators)
         self.reset()
 
     def reset(self):
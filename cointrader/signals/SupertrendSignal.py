@@ -1,13 +1,14 @@
 from cointrader.common.Signal import Signal
 from cointrader.common.Kline import Kline
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.indicators.SuperTrend import SuperTrend
 
 class SupertrendSignal(Signal):
-    def __init__(self, name='supertrend', symbol=None, period=14, multiplier=3):
+    def __init__(self, name='supertrend', symbol=None, period=14, multiplier=3, indicators: IndicatorRegistry = None):
         super().__init__(name, symbol)
         self.period = period
         self.multiplier = multiplier
-        self.supertrend = SuperTrend(period=self.period, multiplier=self.multiplier)
+        self.supertrend = SuperTrend(period=self.period, multiplier=self.multiplier, indicators=indicators)
         self.reset()
 
     def reset(self):
@@ -1,14 +1,30 @@
 # Just like TradingView buy, strong buy, neutral, strong sell, etc we will use the various signals to determine performing a buy or sell based on indicator consensus.
 from cointrader.common.Strategy import Strategy
 from cointrader.common.Signal import Signal
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
 from cointrader.order.enum.OrderSide import OrderSide
 
+# names of the signal states, and of the weights for them
+SIGNAL_STATE_NAMES = (
+    'macd', 'sama', 'zlema', 'rsi', 'stochastic', 'ema', 'sma', 'supertrend', 'adx', 'squeeze',
+    'roc', 'psar', 'vwap', 'ppo', 'cmf', 'cci', 'ao', 'uo', 'dpo', 'ichimoku', 'vo', 'kvo', 'eom',
+    'kst', 'willr', 'macd_change', 'rsi_change', 'stoch_change', 'adx_change', 'roc_change',
+    'vwap_change', 'vo_change', 'kvo_change', 'uo_change', 'kst_change',
+)
+
+# the change states are only updated while the signal they belong to has a weight
+SIGNAL_CHANGE_PARENTS = {
+    'macd_change': 'macd', 'rsi_change': 'rsi', 'stoch_change': 'stochastic', 'adx_change': 'adx', 'roc_change': 'roc',
+    'vwap_change': 'vwap', 'vo_change': 'vo', 'kvo_change': 'kvo', 'uo_change': 'uo', 'kst_change': 'kst',
+}
+
 
 class SignalStrength(Strategy):
     def __init__(self, symbol: str, name='signal_strength', granularity=0, weights=None):
         super().__init__(symbol=symbol, name=name, granularity=granularity)
         self._buy_signal_name = None
         self._sell_signal_name = None
+        self._signal_weight_counts = None
 
         if weights is not None:
             self._signal_weights = weights
@@ -63,89 +79,24 @@ class SignalStrength(Strategy):
             }
 
         # set to 0 if not present
-        if 'macd' not in self._signal_weights:
-            self._signal_weights['macd'] = 0
-        if 'sama' not in self._signal_weights:
-            self._signal_weights['sama'] = 0
-        if 'zlema' not in self._signal_weights:
-            self._signal_weights['zlema'] = 0
-        if 'rsi' not in self._signal_weights:
-            self._signal_weights['rsi'] = 0
-        if 'stochastic' not in self._signal_weights:
-            self._signal_weights['stochastic'] = 0
-        if 'ema' not in self._signal_weights:
-            self._signal_weights['ema'] = 0
-        if 'sma' not in self._signal_weights:
-            self._signal_weights['sma'] = 0
-        if 'supertrend' not in self._signal_weights:
-            self._signal_weights['supertrend'] = 0
-        if 'adx' not in self._signal_weights:
-            self._signal_weights['adx'] = 0
-        if 'squeeze' not in self._signal_weights:
-            self._signal_weights['squeeze'] = 0
-        if 'roc' not in self._signal_weights:
-            self._signal_weights['roc'] = 0
-        if 'psar' not in self._signal_weights:
-            self._signal_weights['psar'] = 0
-        if 'vwap' not in self._signal_weights:
-            self._signal_weights['vwap'] = 0
-        if 'ppo' not in self._signal_weights:
-            self._signal_weights['ppo'] = 0
-        if 'cmf' not in self._signal_weights:
-            self._signal_weights['cmf'] = 0
-        if 'cci' not in self._signal_weights:
-            self._signal_weights['cci'] = 0
-        if 'ao' not in self._signal_weights:
-            self._signal_weights['ao'] = 0
-        if 'uo' not in self._signal_weights:
-            self._signal_weights['uo'] = 0
-        if 'dpo' not in self._signal_weights:
-            self._signal_weights['dpo'] = 0
-        if 'ichimoku' not in self._signal_weights:
-            self._signal_weights['ichimoku'] = 0
-        if 'vo' not in self._signal_weights:
-            self._signal_weights['vo'] = 0
-        if 'kvo' not in self._signal_weights:
-            self._signal_weights['kvo'] = 0
-        if 'eom' not in self._signal_weights:
-            self._signal_weights['eom'] = 0
-        if 'kst' not in self._signal_weights:
-            self._signal_weights['kst'] = 0
-        if 'willr' not in self._signal_weights:
-            self._signal_weights['willr'] = 0
-        if 'macd_change' not in self._signal_weights:
-            self._signal_weights['macd_change'] = 0
-        if 'rsi_change' not in self._signal_weights:
-            self._signal_weights['rsi_change'] = 0
-        if 'stoch_change' not in self._signal_weights:
-            self._signal_weights['stoch_change'] = 0
-        if 'adx_change' not in self._signal_weights:
-            self._signal_weights['adx_change'] = 0
-        if 'roc_change' not in self._signal_weights:
-            self._signal_weights['roc_change'] = 0
-        if 'vwap_change' not in self._signal_weights:
-            self._signal_weights['vwap_change'] = 0
-        if 'vo_change' not in self._signal_weights:
-            self._signal_weights['vo_change'] = 0
-        if 'kvo_change' not in self._signal_weights:
-            self._signal_weights['kvo_change'] = 0
-        if 'uo_change' not in self._signal_weights:
-            self._signal_weights['uo_change'] = 0
-        if 'kst_change' not in self._signal_weights:
-            self._signal_weights['kst_change'] = 0
+        for name in SIGNAL_STATE_NAMES:
+            if name not in self._signal_weights:
+                self._signal_weights[name] = 0
 
         self._total_weight = sum(self._signal_weights.values())
 
+        # the indicators several signals are built on (the 12 and 26 period EMAs, the 14 period ATR) are computed once
+        self.indicators = IndicatorRegistry()
         self.signals: dict[str, Signal] = {}
         if self._signal_weights['macd'] > 0:
             from cointrader.signals.MACDSignal import MACDSignal
-            self.signals['macd'] = MACDSignal(symbol=self._symbol, short_period=12, long_period=26, signal_period=9)
+            self.signals['macd'] = MACDSignal(symbol=self._symbol, short_period=12, long_period=26, signal_period=9, indicators=self.indicators)
         if self._signal_weights['sama'] > 0:
             from cointrader.signals.SAMASignal import SAMASignal
             self.signals['sama'] = SAMASignal(symbol=self._symbol)
         if self._signal_weights['zlema'] > 0:
             from cointrader.signals.ZLEMACross import ZLEMACross
-            self.signals['zlema'] = ZLEMACross(symbol=self._symbol, short_period=12, long_period=26)
+            self.signals['zlema'] = ZLEMACross(symbol=self._symbol, short_period=12, long_period=26, indicators=self.indicators)
         if self._signal_weights['rsi'] > 0:
             from cointrader.signals.RSISignal import RSISignal
             self.signals['rsi'] = RSISignal(symbol=self._symbol, period=14, overbought=70, oversold=30)
@@ -154,16 +105,16 @@ class SignalStrength(Strategy):
             self.signals['stochastic'] = StochasticSignal(symbol=self._symbol, k_period=14, d_period=3, overbought=80, oversold=20)
         if self._signal_weights['ema'] > 0:
             from cointrader.signals.EMACross import EMACross
-            self.signals['ema'] = EMACross(symbol=self._symbol, short_period=12, long_period=26)
+            self.signals['ema'] = EMACross(symbol=self._symbol, short_period=12, long_period=26, indicators=self.indicators)
         if self._signal_weights['sma'] > 0:
             from cointrader.signals.SMACross import SMACross
             self.signals['sma'] = SMACross(symbol=self._symbol, short_period=50, long_period=100)
         if self._signal_weights['supertrend'] > 0:
             from cointrader.signals.SupertrendSignal import SupertrendSignal
-            self.signals['supertrend'] = SupertrendSignal(symbol=self._symbol, period=14, multiplier=3)
+            self.signals['supertrend'] = SupertrendSignal(symbol=self._symbol, period=14, multiplier=3, indicators=self.indicators)
         if self._signal_weights['adx'] > 0:
             from cointrader.signals.ADXSignal import ADXSignal
-            self.signals['adx'] = ADXSignal(symbol=self._symbol, period=14, threshold=25)
+            self.signals['adx'] = ADXSignal(symbol=self._symbol, period=14, threshold=25, indicators=self.indicators)
         if self._signal_weights['squeeze'] > 0:
             from cointrader.signals.SqueezeMomentumSignal import SqueezeMomentumSignal
             self.signals['squeeze'] = SqueezeMomentumSignal(symbol=self._symbol, length=20, multBB=2.0, multKC=1.5)
@@ -178,7 +129,7 @@ class SignalStrength(Strategy):
             self.signals['vwap'] = VWAPSignal(symbol=self._symbol, period=14)
         if self._signal_weights['ppo'] > 0:
             from cointrader.signals.PPOSignal import PPOSignal
-            self.signals['ppo'] = PPOSignal(symbol=self._symbol, short_period=12, long_period=26, signal_period=9, overbought=100, oversold=-100)
+            self.signals['ppo'] = PPOSignal(symbol=self._symbol, short_period=12, long_period=26, signal_period=9, overbought=100, oversold=-100, indicators=self.indicators)
         if self._signal_weights['cmf'] > 0:
             from cointrader.signals.CMFSignal import CMFSignal
             self.signals['cmf'] = CMFSignal(symbol=self._symbol, period=20, signal_period=9, overbought=0.05, oversold=-0.05)
@@ -218,11 +169,32 @@ class SignalStrength(Strategy):
             self.signal_states[name] = OrderSide.NONE
 
     def update(self, kline):
+        # the signal weights and names are counted again on the first call after the update
+        self._signal_weight_counts = None
+        self._buy_signal_name = None
+        self._sell_signal_name = None
+        profiler = self._profiler
+        if profiler is None:
+            self.indicators.update(kline)
+            for name, signal in self.signals.items():
+                if self._signal_weights[name] == 0:
+                    continue
+                signal.update(kline)
+            self._update_signal_states()
+            return
+
+        # same as above, with a timer for each signal
+        with profiler.timer(self._symbol, 'indicators'):
+            self.indicators.update(kline)
         for name, signal in self.signals.items():
             if self._signal_weights[name] == 0:
                 continue
-            signal.update(kline)
+            with profiler.timer(self._symbol, name):
+                signal.update(kline)
+        with profiler.timer(self._symbol, 'signal_states'):
+            self._update_signal_states()
 
+    def _update_signal_states(self):
         if self._signal_weights['macd'] > 0 and self.signals['macd'].ready():
             if self.signals['macd'].cross_up():
                 self.signal_states['macd'] = OrderSide.BUY
@@ -230,13 +202,13 @@ class SignalStrength(Strategy):
                 self.signal_states['macd'] = OrderSide.SELL
             if self.signals['macd'].increasing():
                 if self._signal_weights['macd_change'] > 0:
-                    self._signal_weights['macd_change'] = OrderSide.BUY
+                    self.signal_states['macd_change'] = OrderSide.BUY
             elif self.signals['macd'].decreasing():
                 if self._signal_weights['macd_change'] > 0:
-                    self._signal_weights['macd_change'] = OrderSide.SELL
+                    self.signal_states['macd_change'] = OrderSide.SELL
             else:
                 if self._signal_weights['macd_change'] > 0:
-                    self._signal_weights['macd_change'] = OrderSide.NONE
+                    self.signal_states['macd_change'] = OrderSide.NONE
 
         if self._signal_weights['sama'] > 0 and self.signals['sama'].ready():
             if self.signals['sama'].cross_up():
@@ -475,83 +447,63 @@ class SignalStrength(Strategy):
                 self.signal_states['willr'] = OrderSide.NONE
 
     def buy_signal_name(self):
-        result = self._buy_signal_name
-        return result
+        if self._buy_signal_name is None:
+            self._buy_signal_name = self._signal_names(OrderSide.BUY)
+        return self._buy_signal_name
 
     def sell_signal_name(self):
-        result = self._sell_signal_name
-        return result
+        if self._sell_signal_name is None:
+            self._sell_signal_name = self._signal_names(OrderSide.SELL)
+        return self._sell_signal_name
+
+    def _signal_names(self, side: OrderSide) -> str:
+        return "".join(name for name, state in self.signal_states.items() if state == side)
 
     def _count_signals(self):
-        self._buy_signal_name = ""
-        self._sell_signal_name = ""
         buy_signal_count = 0
         sell_signal_count = 0
-        for name, state in self.signal_states.items():
+        for state in self.signal_states.values():
             if state == OrderSide.BUY:
                 buy_signal_count += 1
-                self._buy_signal_name += name
             elif state == OrderSide.SELL:
                 sell_signal_count += 1
-                self._sell_signal_name += name
         return buy_signal_count, sell_signal_count
 
     def _weighted_count_signals(self):
-        self._buy_signal_name = ""
-        self._sell_signal_name = ""
+        """
+        Buy and sell signal weights of the signal states, counted once per update()
+        """
+        if self._signal_weight_counts is not None:
+            return self._signal_weight_counts
+
         buy_signal_weight = 0
         sell_signal_weight = 0
-
         for name, state in self.signal_states.items():
-            weight = self._signal_weights.get(name, 1.0)
             if state == OrderSide.BUY:
-                buy_signal_weight += weight
-                self._buy_signal_name += name
+                buy_signal_weight += self._signal_weights.get(name, 1.0)
             elif state == OrderSide.SELL:
-                sell_signal_weight += weight
-                self._sell_signal_name += name
-        return buy_signal_weight, sell_signal_weight
+                sell_signal_weight += self._signal_weights.get(name, 1.0)
+        self._signal_weight_counts = (buy_signal_weight, sell_signal_weight)
+        return self._signal_weight_counts
 
-    def buy_signal(self):
-        buy_signal_weight, sell_signal_weight = self._weighted_count_signals()
+    def _decided(self, buy_signal_weight, sell_signal_weight) -> bool:
         if buy_signal_weight == 0 or sell_signal_weight == 0:
             return False
         # make sure we have enough signals to make a decision
-        if buy_signal_weight + sell_signal_weight < self._total_weight / 2:
-            return False
-        if buy_signal_weight > sell_signal_weight:
-            return True
-        return False
+        return buy_signal_weight + sell_signal_weight >= self._total_weight / 2
+
+    def buy_signal(self):
+        buy_signal_weight, sell_signal_weight = self._weighted_count_signals()
+        return self._decided(buy_signal_weight, sell_signal_weight) and buy_signal_weight > sell_signal_weight
 
     def sell_signal(self):
         buy_signal_weight, sell_signal_weight = self._weighted_count_signals()
-        if buy_signal_weight == 0 or sell_signal_weight == 0:
-            return False
-        # make sure we have enough signals to make a decision
-        if buy_signal_weight + sell_signal_weight < self._total_weight / 2:
-            return False
-        if sell_signal_weight > buy_signal_weight:
-            return True
-        return False
+        return self._decided(buy_signal_weight, sell_signal_weight) and sell_signal_weight > buy_signal_weight
 
     def strong_buy_signal(self):
         buy_signal_weight, sell_signal_weight = self._weighted_count_signals()
-        if buy_signal_weight == 0 or sell_signal_weight == 0:
-            return False
-        # make sure we have enough signals to make a decision
-        if buy_signal_weight + sell_signal_weight < self._total_weight / 2:
-            return False
-        if buy_signal_weight >= 2.0 * sell_signal_weight:
-            return True
-        return False
+        return self._decided(buy_signal_weight, sell_signal_weight) and buy_signal_weight >= 2.0 * sell_signal_weight
 
     def strong_sell_signal(self):
         buy_signal_weight, sell_signal_weight = self._weighted_count_signals()
-        if buy_signal_weight == 0 or sell_signal_weight == 0:
-            return False
-        # make sure we have enough signals to make a decision
-        if buy_signal_weight + sell_signal_weight < self._total_weight / 2:
-            return False
-        if sell_signal_weight >= 2.0 * buy_signal_weight:
-            return True
-        return False
\ No newline at end of file
+        return self._decided(buy_signal_weight, sell_signal_weight) and sell_signal_weight >= 2.0 * buy_signal_weight
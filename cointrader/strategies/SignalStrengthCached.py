@@ -0,0 +1,52 @@
+# Same as SignalStrength, but reads the signal states from a precomputed SignalStateMatrix instead of running the signals.
+# Used by the strategy weight search, where the same klines are replayed for every combination of weights
+from cointrader.common.Strategy import Strategy
+from cointrader.backtest.SignalStateMatrix import SignalStateMatrix, STATE_BUY, STATE_SELL
+from cointrader.strategies.SignalStrength import SIGNAL_STATE_NAMES
+import numpy as np
+
+
+class SignalStrengthCached(Strategy):
+    def __init__(self, symbol: str, name='signal_strength', granularity=0, weights=None):
+        super().__init__(symbol=symbol, name=name, granularity=granularity)
+        self._matrix = SignalStateMatrix.registered(symbol, granularity)
+        if self._matrix is None:
+            raise ValueError(f"No SignalStateMatrix registered for {symbol} granularity {granularity}")
+
+        signal_weights = {name: 0 for name in SIGNAL_STATE_NAMES}
+        if weights is not None:
+            signal_weights.update(weights)
+
+        # one vectorized pass over the matrix for these weights, the replay then only looks up the current row
+        self._buy, self._sell, self._strong_buy, self._strong_sell = [signal.tolist() for signal in self._matrix.signals(signal_weights)]
+        self._ts = self._matrix.ts
+        self._index = -1
+
+    def update(self, kline):
+        index = self._index + 1
+        if index >= len(self._ts) or self._ts[index] != kline.ts:
+            # klines were skipped or repeated, find the row for this kline
+            index = int(np.searchsorted(self._ts, kline.ts, side='right')) - 1
+        self._index = index
+
+    def buy_signal_name(self):
+        if self._index < 0:
+            return None
+        return self._matrix.row_names(self._index, STATE_BUY)
+
+    def sell_signal_name(self):
+        if self._index < 0:
+            return None
+        return self._matrix.row_names(self._index, STATE_SELL)
+
+    def buy_signal(self):
+        return self._index >= 0 and self._buy[self._index]
+
+    def sell_signal(self):
+        return self._index >= 0 and self._sell[self._index]
+
+    def strong_buy_signal(self):
+        return self._index >= 0 and self._strong_buy[self._index]
+
+    def strong_sell_signal(self):
+        return self._index >= 0 and self._strong_sell[self._index]
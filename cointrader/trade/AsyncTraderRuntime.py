@@ -0,0 +1,226 @@
+# This file contains the AsyncTraderRuntime class, which runs live trading on a single asyncio event loop.
+# The loop multiplexes the klines pushed from the websocket, the periodic price refreshes, the order status polling
+# and shutdown. All exchange I/O is done by coroutines on the loop, so the requests for every symbol can be in flight
+# at once. The traders are synchronous, and only ever run on one trader thread, so their state needs no locks:
+# the loop hands them klines and prices on that thread, and their order requests go back to the loop through the
+# AsyncExecutePipeline. With a PriceCache, the prices come from the streamed klines, and the exchange is only asked for
+# the prices of the symbols that went stale. The order status poll never changes the orders itself: the results are
+# handed to the positions through the pipeline, and the positions handle the fills like on a price refresh
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+from cointrader.common.Kline import Kline
+from cointrader.exchange.AsyncTraderExchangeBase import AsyncTraderExchangeBase
+from cointrader.execute.pipeline.AsyncExecutePipeline import AsyncExecutePipeline
+from cointrader.market.PriceCache import PriceCache
+from cointrader.order.Order import Order
+from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.Orders import Orders
+from cointrader.order.enum.OrderStatus import OrderStatus
+from cointrader.order.enum.OrderType import OrderType
+from .MultiTrader import MultiTrader
+from .TraderConfig import TraderConfig
+
+class AsyncTraderRuntime(object):
+    def __init__(self, mtrader: MultiTrader, orders: Orders, exchange: AsyncTraderExchangeBase, exec_pipe: AsyncExecutePipeline,
+                 config: TraderConfig, symbols: list[str], granularity: int,
+                 price_interval: float = 60.0, status_interval: float = 10.0, price_cache: PriceCache = None):
+        """
+        :param symbols: Symbols to trade, klines and prices of other symbols are ignored
+        :param price_interval: Seconds between price refreshes
+        :param status_interval: Seconds between order status polls, 0 to leave the order status to the positions
+        :param price_cache: Cache fed by the pushed klines, None to request all the prices on every refresh
+        """
+        self._mtrader = mtrader
+        self._orders = orders
+        self._exchange = exchange
+        self._exec_pipe = exec_pipe
+        self._config = config
+        self._symbols = list(symbols)
+        self._symbol_set = set(symbols)
+        self._granularity = granularity
+        self._price_interval = price_interval
+        self._status_interval = status_interval
+        self._price_cache = price_cache
+        self._prev_klines: dict[str, Kline] = {}
+        # prices of the last refresh, for running the positions of the symbols with polled order updates
+        self._prices: dict[str, float] = {}
+        self._trader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trader')
+        self._loop: asyncio.AbstractEventLoop = None
+        self._klines: asyncio.Queue = None
+        self._stopped: asyncio.Event = None
+        self._stats = {'klines': 0, 'price_refreshes': 0, 'price_requests': 0, 'status_polls': 0, 'status_updates': 0}
+
+    def preload(self, symbol: str, klines: list[Kline]):
+        """
+        Preload the strategies of symbol with klines in ts order, before run()
+        """
+        if len(klines) == 0:
+            return
+        # the klines of the other timeframes are built from these by the MultiTrader
+        self._mtrader.market_preload(symbol, klines)
+        self._prev_klines[symbol] = klines[-1]
+
+    def start(self):
+        """
+        Bind the runtime and the pipeline to the running loop, so klines can be pushed before run() is awaited
+        """
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._klines = asyncio.Queue()
+        self._stopped = asyncio.Event()
+        self._exec_pipe.bind(self._loop)
+
+    async def run(self):
+        """
+        Run until stop() is called
+        """
+        self.start()
+        tasks = [asyncio.create_task(self._ingest_klines()), asyncio.create_task(self._refresh_prices())]
+        if self._status_interval > 0:
+            tasks.append(asyncio.create_task(self._poll_order_status()))
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # let the trader finish what it is doing, its order requests still need the loop
+            await self._loop.run_in_executor(None, self._trader.shutdown)
+            self._exec_pipe.shutdown()
+            await self._exchange.close()
+
+    def stop(self):
+        """
+        Stop the runtime, from any thread
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def push_kline(self, kline: Kline):
+        """
+        Queue a kline for the traders, from any thread (the websocket callback)
+        """
+        if self._price_cache is not None:
+            # the candle updates of the current period are dropped by the traders, but their close is the latest price
+            self._price_cache.update(kline.symbol, kline.close)
+        self._loop.call_soon_threadsafe(self._klines.put_nowait, kline)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    async def run_trader(self, fn, *args):
+        """
+        Run fn on the trader thread, and return its result
+        """
+        return await self._loop.run_in_executor(self._trader, fn, *args)
+
+    async def _ingest_klines(self):
+        while True:
+            klines = [await self._klines.get()]
+            while not self._klines.empty():
+                klines.append(self._klines.get_nowait())
+            await self.run_trader(self._update_klines, klines)
+
+    async def _refresh_prices(self):
+        while True:
+            try:
+                prices = await self._get_prices()
+            except Exception as e:
+                print(f"AsyncTraderRuntime: Failed to get prices: {e}")
+                prices = None
+            if prices:
+                await self.run_trader(self._update_prices, prices, int(time.time()))
+            await asyncio.sleep(self._price_interval)
+
+    async def _get_prices(self) -> dict[str, float]:
+        cache = self._price_cache
+        if cache is None:
+            self._stats['price_requests'] += 1
+            return await self._exchange.market_ticker_prices_all_get()
+
+        stale = cache.stale_symbols(self._symbols)
+        if len(stale) > cache.rest_limit():
+            self._stats['price_requests'] += 1
+            cache.update_prices(await self._exchange.market_ticker_prices_all_get(), listing=True)
+        elif len(stale) > 0:
+            self._stats['price_requests'] += len(stale)
+            results = await asyncio.gather(*[self._exchange.market_ticker_price_get(symbol) for symbol in stale], return_exceptions=True)
+            for symbol, price in zip(stale, results):
+                if isinstance(price, Exception):
+                    print(f"AsyncTraderRuntime: Failed to get price of {symbol}: {price}")
+                    continue
+                cache.update(symbol, price)
+        return cache.prices(self._symbols)
+
+    async def _poll_order_status(self):
+        while True:
+            await asyncio.sleep(self._status_interval)
+            orders = await self.run_trader(self._open_orders)
+            if len(orders) == 0:
+                continue
+            requests = []
+            for order in orders:
+                oreq = OrderRequest(symbol=order.symbol, type=OrderType.STATUS)
+                oreq.order_id = order.id
+                requests.append(oreq)
+            results = await self._exec_pipe.submit_batch(requests)
+            await self.run_trader(self._update_orders, orders, results)
+
+    def _open_orders(self) -> list[Order]:
+        return [order for order in self._orders.get_active_orders(None) if order.placed()]
+
+    def _update_klines(self, klines: list[Kline]):
+        for kline in klines:
+            prev_kline = self._prev_klines.get(kline.symbol)
+            if kline.symbol not in self._symbol_set or (prev_kline is not None and kline.ts <= prev_kline.ts):
+                continue
+
+            self._mtrader.market_update_kline(symbol=kline.symbol, kline=kline, granularity=self._granularity)
+            self._prev_klines[kline.symbol] = kline
+            self._stats['klines'] += 1
+
+    def _update_prices(self, prices: dict[str, float], current_ts: int):
+        # update quote balance before trying to open positions (only once per refresh)
+        self._mtrader.market_update_quote_balance(quote_name=self._config.quote_currency())
+        self._mtrader.market_update_prices(prices, current_ts=current_ts, granularity=self._granularity)
+        self._prices.update(prices)
+        self._stats['price_refreshes'] += 1
+
+    def _last_price(self, symbol: str) -> float:
+        if self._price_cache is not None:
+            price = self._price_cache.prices([symbol]).get(symbol)
+            if price is not None:
+                return price
+        return self._prices.get(symbol)
+
+    def _update_orders(self, orders: list[Order], results: list):
+        """
+        Hand the polled status of the orders that changed to their positions. The pipeline answers order_status() with
+        the results, and the traders of those symbols are updated with their last price, so the positions see the fills
+        """
+        self._stats['status_polls'] += 1
+        changed: dict[str, OrderResult] = {}
+        symbols = []
+        for order, result in zip(orders, results):
+            if not isinstance(result, OrderResult) or result.status == OrderStatus.UNKNOWN:
+                print(f"AsyncTraderRuntime: Failed to get status of {order.symbol} order {order.id}: {result}")
+                continue
+            if result.status == order.status and result.filled_size == order.filled_size:
+                continue
+            changed[order.id] = result
+            if order.symbol not in symbols:
+                symbols.append(order.symbol)
+            self._stats['status_updates'] += 1
+        if len(changed) == 0:
+            return
+
+        self._exec_pipe.set_order_status(changed)
+        current_ts = int(time.time())
+        for symbol in symbols:
+            price = self._last_price(symbol)
+            # without a price yet, the positions get the results on the first price refresh
+            if price is not None:
+                self._mtrader.market_update_price(symbol=symbol, current_price=price, current_ts=current_ts, granularity=self._granularity)
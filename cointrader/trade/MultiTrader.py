@@ -1,14 +1,18 @@
 from .Trader import Trader
 from .TraderConfig import TraderConfig
 from cointrader.order.Orders import Orders
+from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.enum.OrderType import OrderType
 from cointrader.execute.ExecuteBase import ExecuteBase
 from cointrader.execute.pipeline.ExecutePipeline import ExecutePipeline
 from cointrader.account.AccountBase import AccountBase
 from cointrader.common.Kline import Kline
+from cointrader.common.TimeframeAggregator import TimeframeAggregator
 from cointrader.common.LogLevel import LogLevel
+from cointrader.common.Profiler import Profiler
 
 class MultiTrader(object):
-    def __init__(self, account: AccountBase, exec_pipe: ExecutePipeline, config: TraderConfig, orders: Orders = None, restore_positions = False, granularity: int = 0, strategy_weights: dict[str, float] = None):
+    def __init__(self, account: AccountBase, exec_pipe: ExecutePipeline, config: TraderConfig, orders: Orders = None, restore_positions = False, granularity: int = 0, strategy_weights: dict[str, float] = None, profiler: Profiler = None):
         self._traders: dict[str, Trader] = {}
         self._account = account
         self._config = config
@@ -17,6 +21,9 @@ class MultiTrader(object):
         self._global_disable_ts = 0
         self._max_positions = self._config.max_positions()
         self._position_count_per_symbol = {}
+        self._profiler = profiler
+        # builds the klines of the other timeframe strategies of each symbol from its klines
+        self._aggregators: dict[str, TimeframeAggregator] = {}
 
         # set default temporary global config
         self._config.set_global_disable_new_positions(False)
@@ -29,15 +36,27 @@ class MultiTrader(object):
             self._orders = orders
         self._symbols = self._config.trade_symbols()
 
+        if profiler is not None:
+            self._orders.set_profiler(profiler)
+            self._exec_pipe.set_profiler(profiler)
+
         if self._config.log_level() >= LogLevel.INFO.value:
             print(f"MultiTrader: strategy: {self._config.strategy()} trade_quote_size: {self._config.max_position_quote_size()} max_positions: {self._config.max_positions()} symbols: {self._symbols} ")
 
         for symbol in self._symbols:
             if symbol not in self._traders.keys():
-                self._traders[symbol] = Trader(account=account, symbol=symbol, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders, granularity=self._granularity, strategy_weights=strategy_weights)
-                # restore previously open positions if needed
-                if restore_positions:
-                    self._traders[symbol].restore_positions(current_price=0.0, current_ts=0)
+                self._traders[symbol] = Trader(account=account, symbol=symbol, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders, granularity=self._granularity, strategy_weights=strategy_weights, profiler=profiler)
+
+        # restore previously open positions if needed
+        if restore_positions:
+            self.restore_positions()
+
+    def restore_positions(self):
+        """
+        Restore the positions of all traders from the orders database
+        """
+        for trader in self._traders.values():
+            trader.restore_positions(current_price=0.0, current_ts=0)
 
     def market_update_quote_balance(self, quote_name: str):
         """
@@ -61,6 +80,8 @@ class MultiTrader(object):
 
         trader = self._traders[symbol]
         trader.market_preload(klines)
+        for kline in klines:
+            self._update_other_timeframes(symbol, kline, self._granularity, preload=True)
 
     def market_update_kline_other_timeframe(self, symbol: str, kline: Kline, granularity: int, preload: bool = False):
         """
@@ -71,7 +92,12 @@ class MultiTrader(object):
             return
         
         trader = self._traders[symbol]
-        trader.market_update_kline_other_timeframe(kline=kline, granularity=granularity, preload=preload)
+        profiler = self._profiler
+        if profiler is None:
+            trader.market_update_kline_other_timeframe(kline=kline, granularity=granularity, preload=preload)
+        else:
+            with profiler.timer(symbol, 'kline_other_timeframe'):
+                trader.market_update_kline_other_timeframe(kline=kline, granularity=granularity, preload=preload)
 
     def market_update_price(self, symbol: str, current_price: float, current_ts: int, granularity: int):
         """
@@ -103,7 +129,14 @@ class MultiTrader(object):
             self._config.set_global_disable_new_positions(False)
             #trader.disable_new_positions(False)
 
-        trader.market_update_price(current_price=current_price, current_ts=current_ts, granularity=granularity)
+        profiler = self._profiler
+        if profiler is None:
+            trader.market_update_price(current_price=current_price, current_ts=current_ts, granularity=granularity)
+        else:
+            with profiler.timer(symbol, 'price'):
+                trader.market_update_price(current_price=current_price, current_ts=current_ts, granularity=granularity)
+            # print the summary every report_interval seconds
+            profiler.report()
         self._position_count_per_symbol[symbol] = trader.position_count()
 
         last_closed_profit = self._config.global_last_closed_position_profit()
@@ -116,16 +149,80 @@ class MultiTrader(object):
             if disable_after_loss_secs > 0:
                 self._global_disable_ts = current_ts + disable_after_loss_secs
 
+    def market_update_prices(self, prices: dict[str, float], current_ts: int, granularity: int):
+        """
+        Update all traders with the current prices at once. The status of the open orders of all positions
+        is fetched together first, so the positions don't each wait for a status request
+        """
+        order_requests = []
+        for symbol, trader in self._traders.items():
+            if symbol not in prices:
+                continue
+            for order in trader.pending_orders():
+                oreq = OrderRequest(symbol=symbol, type=OrderType.STATUS, current_price=prices[symbol], current_ts=current_ts)
+                oreq.order_id = order.id
+                order_requests.append(oreq)
+
+        profiler = self._profiler
+        if profiler is None:
+            self._exec_pipe.prefetch_order_status(order_requests)
+        else:
+            with profiler.timer('', 'order_status'):
+                self._exec_pipe.prefetch_order_status(order_requests)
+
+        for symbol in self._symbols:
+            if symbol in prices:
+                self.market_update_price(symbol=symbol, current_price=prices[symbol], current_ts=current_ts, granularity=granularity)
+            else:
+                print(f"Symbol {symbol} not in prices")
+
     def market_update_kline(self, symbol: str, kline: Kline, granularity: int):
         """
-        Update the trader strategy with the current kline
+        Update the trader strategy with the current kline. The strategies for other timeframes are updated first
+        with the klines the kline completed
         """
         if symbol not in self._traders.keys():
             print(f"Symbol {symbol} not found in traders: {self._traders.keys()}")
             return
 
+        self._update_other_timeframes(symbol, kline, granularity, preload=False)
         trader = self._traders[symbol]
-        trader.market_update_kline(kline=kline, granularity=granularity)
+        profiler = self._profiler
+        if profiler is None:
+            trader.market_update_kline(kline=kline, granularity=granularity)
+        else:
+            with profiler.timer(symbol, 'kline'):
+                trader.market_update_kline(kline=kline, granularity=granularity)
+            profiler.count(symbol, 'klines')
+
+    def flush_other_timeframes(self, symbol: str):
+        """
+        Update the strategies for other timeframes with the klines still being built for symbol
+        """
+        aggregator = self._aggregators.get(symbol)
+        if aggregator is None:
+            return
+        for kline_other in aggregator.flush():
+            self.market_update_kline_other_timeframe(symbol, kline_other, kline_other.granularity, preload=False)
+
+    def _update_other_timeframes(self, symbol: str, kline: Kline, granularity: int, preload: bool):
+        if symbol not in self._aggregators.keys():
+            if symbol not in self._traders.keys() or not granularity:
+                return
+            # only the timeframes that can be built from this granularity, None if there are none
+            granularities = [g for g in self._traders[symbol].other_timeframes() if g > granularity and g % granularity == 0]
+            aggregator = None
+            if len(granularities) > 0:
+                aggregator = TimeframeAggregator(src_granularity=granularity, dst_granularities=granularities, symbol=symbol)
+            self._aggregators[symbol] = aggregator
+        aggregator = self._aggregators[symbol]
+        if aggregator is None:
+            return
+        for kline_other in aggregator.update(kline):
+            self.market_update_kline_other_timeframe(symbol, kline_other, kline_other.granularity, preload=preload)
+
+    def profiler(self) -> Profiler:
+        return self._profiler
 
     def net_profit_percent(self, symbol: str):
         if symbol not in self._traders.keys():
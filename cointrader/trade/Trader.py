@@ -8,6 +8,7 @@ from .TraderConfig import TraderConfig
 from cointrader.execute.ExecuteBase import ExecuteBase
 from cointrader.execute.pipeline.ExecutePipeline import ExecutePipeline
 from .position.TraderPosition import TraderPosition
+from cointrader.order.Order import Order
 from cointrader.order.Orders import Orders
 from cointrader.order.OrderRequest import OrderRequest
 from cointrader.order.enum.OrderType import OrderType
@@ -15,6 +16,7 @@ from cointrader.order.enum.OrderStatus import OrderStatus
 from cointrader.order.enum.OrderSide import OrderSide
 from cointrader.common.TradeLossBase import TradeLossBase
 from cointrader.common.TradeSizeBase import TradeSizeBase
+from cointrader.common.Profiler import Profiler, NULL_TIMER
 import importlib
 from colorama import Fore, Back, Style
 import time
@@ -33,7 +35,7 @@ class Trader(object):
     _orders: Orders = None
     _max_positions_per_symbol = 0
 
-    def __init__(self, account: Account, symbol: str, exec_pipe: ExecutePipeline, config: TraderConfig, orders: Orders, granularity: int = 0, strategy_weights: dict[str, float] = None):
+    def __init__(self, account: Account, symbol: str, exec_pipe: ExecutePipeline, config: TraderConfig, orders: Orders, granularity: int = 0, strategy_weights: dict[str, float] = None, profiler: Profiler = None):
         self._symbol = symbol
         self._account = account
         self._execute = exec_pipe.execute()
@@ -73,6 +75,13 @@ class Trader(object):
 
         self._max_positions_per_symbol = config.max_positions_per_symbol()
 
+        # optional timers for the strategy updates and position handling
+        self._profiler = profiler
+        if profiler is not None:
+            self._strategy.set_profiler(profiler)
+            for strategy in self._strategies_other_timeframes.values():
+                strategy.set_profiler(profiler)
+
         # control disabling new positions from this specific trader (disabled by default)
         self._local_disable_new_positions = True
         self._prev_local_disable_new_positions = True
@@ -91,6 +100,12 @@ class Trader(object):
 
     def symbol(self) -> str:
         return self._symbol
+
+    def other_timeframes(self) -> list[int]:
+        """
+        Granularities of the strategies for other timeframes
+        """
+        return sorted(int(granularity) for granularity in self._strategies_other_timeframes.keys())
     
 
     def position_count(self) -> int:
@@ -98,6 +113,13 @@ class Trader(object):
         Get the number of positions open
         """
         return len(self._positions)
+
+
+    def pending_orders(self) -> list[Order]:
+        """
+        Get the orders of all positions that still need their status checked
+        """
+        return [order for position in self._positions for order in position.pending_orders()]
     
 
     # def disable_new_positions(self, disable: bool):
@@ -111,84 +133,83 @@ class Trader(object):
         """
         Restore positions from the database. Used if trading bot exits prematurely, and we need to restore the positions from the order database
         """
-        orders = self._orders.get_active_orders(symbol=self._symbol)
+        # the positions of the active orders, in the order they were opened
+        pids = list(dict.fromkeys(order.pid for order in self._orders.get_active_orders(symbol=self._symbol)))
         order_by_pid = {}
-        # reorganize orders by pid
-        for order in orders:
+        for pid in pids:
+            order = self._restore_position_orders(pid, current_price, current_ts)
+            if order is not None:
+                order_by_pid[pid] = order
+
+        # restore the positions with buy orders
+        for _, order in order_by_pid.items():
+            if self._config.log_level() >= LogLevel.INFO.value:
+                print(f"{self._symbol} Restoring position from order: {order}")
+            position = TraderPosition(symbol=self._symbol, pid=self._cur_id, strategy=self._strategy, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders)
+            position.restore_buy_order(order=order, current_price=current_price, current_ts=current_ts)
+            self._positions.append(position)
+            self._cur_id += 1
+
+
+    def _restore_position_orders(self, pid: int, current_price: float, current_ts: int) -> Order:
+        """
+        Cancel the open orders of position pid left by a previous run, returns its filled buy order to restore the position from
+        """
+        buy_order = None
+        for order in self._orders.get_position_orders(symbol=self._symbol, pid=pid):
+            if not order.active:
+                continue
             # if the order is cancelled, skip it and set inactive
             if order.cancelled():
                 self._orders.update_order_active(symbol=self._symbol, order_id=order.id, active=False)
                 continue
-            if order.pid not in order_by_pid.keys():
+            if buy_order is None:
                 if order.side == OrderSide.BUY:
-                    #result = self._execute.status(order_id=order.id, symbol=self._symbol, current_price=current_price, current_ts=current_ts)
-                    oreq = OrderRequest(symbol=self._symbol, type=OrderType.STATUS, current_price=current_price, current_ts=current_ts)
-                    oreq.order_id = order.id
-
-                    # TODO: replace with order pipeline
-                    result = self._execute.execute_order(oreq)
+                    result = self._exec_pipe.order_status(self._symbol, order.id, current_price=current_price, current_ts=current_ts)
+                    if result is None:
+                        print(f"{self._symbol} restore_positions() Failed to get status of buy order {order.id}")
+                        continue
 
                     order.update_order(result)
                     if order.placed():
                         # for simplicity, just cancel the open order
                         if self._config.log_level() >= LogLevel.INFO.value:
                             print(f"{self._symbol} Cancelling buy order {order}")
-                        #result = self._execute.cancel(order_id=order.id, symbol=self._symbol, current_price=current_price, current_ts=current_ts)
-                        oreq = OrderRequest(symbol=self._symbol, type=OrderType.CANCEL, current_price=current_price, current_ts=current_ts)
-                        oreq.order_id = order.id
-
-                        # TODO: replace with order pipeline
-                        result = self._execute.execute_order(oreq)
-
-                        if not self._config.simulate():
-                            time.sleep(1)
-                        order.update_order(result)
-                        order.active = False
-                        self._orders.update_order(symbol=self._symbol, order=order)
+                        self._restore_cancel_order(order, current_price, current_ts)
                     elif order.filled():
-                        order_by_pid[order.pid] = order
+                        buy_order = order
 
                 elif order.side == OrderSide.SELL and order.placed():
                     # to keep things simple, just cancel the order
                     if self._config.log_level() >= LogLevel.INFO.value:
                         print(f"{self._symbol} Cancelling sell order {order}")
-                    #result = self._execute.cancel(order_id=order.id, symbol=self._symbol, current_price=current_price, current_ts=current_ts)
-                    oreq = OrderRequest(symbol=self._symbol, type=OrderType.CANCEL, current_price=current_price, current_ts=current_ts)
-                    oreq.order_id = order.id
-
-                    # TODO: replace with order pipeline
-                    result = self._execute.execute_order(oreq)
-
-                    if not self._config.simulate():
-                        time.sleep(1)
-                    order.update_order(result)
-                    order.active = False
-                    self._orders.update_order(symbol=self._symbol, order=order)
+                    self._restore_cancel_order(order, current_price, current_ts)
             else:
                 if order.side == OrderSide.BUY and order.placed():
                     if self._config.log_level() >= LogLevel.WARNING.value:
                         print(f"Error: Duplicate buy order found, cancelling order: {order}")
-                    #result = self._execute.cancel(order_id=order.id, symbol=self._symbol, current_price=current_price, current_ts=current_ts)
-                    oreq = OrderRequest(symbol=self._symbol, type=OrderType.CANCEL, current_price=current_price, current_ts=current_ts)
-                    oreq.order_id = order.id
+                    self._restore_cancel_order(order, current_price, current_ts)
+        return buy_order
 
-                    # TODO: replace with order pipeline
-                    result = self._execute.execute_order(oreq)
 
-                    if not self._config.simulate():
-                        time.sleep(1)
-                    order.update_order(result)
-                    order.active = False
-                    self._orders.update_order(symbol=self._symbol, order=order)
-        
-        # restore the positions with buy orders
-        for _, order in order_by_pid.items():
-            if self._config.log_level() >= LogLevel.INFO.value:
-                print(f"{self._symbol} Restoring position from order: {order}")
-            position = TraderPosition(symbol=self._symbol, pid=self._cur_id, strategy=self._strategy, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders)
-            position.restore_buy_order(order=order, current_price=current_price, current_ts=current_ts)
-            self._positions.append(position)
-            self._cur_id += 1
+    def _restore_cancel_order(self, order: Order, current_price: float, current_ts: int):
+        """
+        Cancel an order left open by a previous run, through the order pipeline
+        """
+        oreq = OrderRequest(symbol=self._symbol, type=OrderType.CANCEL, current_price=current_price, current_ts=current_ts)
+        oreq.order_id = order.id
+        self._exec_pipe.process_order_request(order_request=oreq)
+        result = self._exec_pipe.wait_order_result(oreq.rid)
+        self._exec_pipe.completed(oreq.rid)
+        if result is None:
+            print(f"{self._symbol} restore_positions() Failed to cancel order {order.id}")
+            return
+
+        if not self._config.simulate():
+            time.sleep(1)
+        order.update_order(result)
+        order.active = False
+        self._orders.update_order(symbol=self._symbol, order=order)
 
 
     def market_preload(self, klines: list[Kline]):
@@ -196,9 +217,7 @@ class Trader(object):
         Preload klines for the strategy
         """
         for kline in klines:
-            self._strategy.update(kline=kline)
-            self._loss_strategy.update(kline=kline)
-            self._size_strategy.update(kline=kline)
+            self._update_strategies(kline)
 
 
     def market_update_kline_other_timeframe(self, kline: Kline, granularity: int, preload: bool = False):
@@ -211,7 +230,12 @@ class Trader(object):
             return
 
         strategy = self._strategies_other_timeframes[str(granularity)]
-        strategy.update(kline)
+        profiler = self._profiler
+        if profiler is None:
+            strategy.update(kline)
+        else:
+            with profiler.timer(self._symbol, 'strategy'):
+                strategy.update(kline)
 
         # disable opening new positions on a sell signal from another timeframe
         # re-enable opening new positions on a buy signal from another timeframe
@@ -237,11 +261,36 @@ class Trader(object):
             return
         if granularity == self._granularity:
             # update the main strategy
+            self._update_strategies(kline)
+
+
+    def _update_strategies(self, kline: Kline):
+        """
+        Update the main, loss and size strategies with the kline
+        """
+        profiler = self._profiler
+        if profiler is None:
+            self._strategy.update(kline=kline)
+            self._loss_strategy.update(kline=kline)
+            self._size_strategy.update(kline=kline)
+            return
+
+        with profiler.timer(self._symbol, 'strategy'):
             self._strategy.update(kline=kline)
+        with profiler.timer(self._symbol, 'loss_strategy'):
             self._loss_strategy.update(kline=kline)
+        with profiler.timer(self._symbol, 'size_strategy'):
             self._size_strategy.update(kline=kline)
 
 
+    def _timer(self, component: str):
+        """
+        Time component with the profiler, if there is one
+        """
+        if self._profiler is None:
+            return NULL_TIMER
+        return self._profiler.timer(self._symbol, component)
+
     def market_update_price(self, current_price: float, current_ts: int, granularity: int = 0):
         """
         Update the market price for the symbol
@@ -249,11 +298,13 @@ class Trader(object):
         # if position has been closed, remove it from the list
         for position in self._positions:
             if granularity == self._granularity:
-                position.market_update(current_price=current_price, current_ts=current_ts)
+                with self._timer('position_update'):
+                    position.market_update(current_price=current_price, current_ts=current_ts)
 
             # handle trailing stop loss, prevent placing stop loss if we have already started closing the position
             if position.opened() and not position.closed_position() and self._config.trailing_stop_loss():
-                self.update_trailing_stop_loss_position(position, current_price, current_ts)
+                with self._timer('stop_loss'):
+                    self.update_trailing_stop_loss_position(position, current_price, current_ts)
 
             # handle closed position when sell order or stop loss has been filled
             if position.closed():
@@ -322,7 +373,9 @@ class Trader(object):
 
             #print(f'Buy signal {self._strategy.buy_signal_name()} for {self._symbol}')
             position = TraderPosition(symbol=self._symbol, pid=self._cur_id, strategy=self._strategy, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders)
-            if position.open_position(size=size, current_price=current_price, current_ts=current_ts):
+            with self._timer('position_open'):
+                opened = position.open_position(size=size, current_price=current_price, current_ts=current_ts)
+            if opened:
                 # if position successfully opened, update quote balance
                 self._config.set_global_current_balance_quote(balance - quote_size)
                 self._total_position_count += 1
@@ -370,7 +423,8 @@ class Trader(object):
                     #print("balance", balance, self._config.quote_currency())
                     balance = self._account.round_quote(self._symbol, balance)
                     if balance >= quote_size:
-                        position.update_buy_position(size=size, current_price=current_price, current_ts=current_ts)
+                        with self._timer('position_update_buy'):
+                            position.update_buy_position(size=size, current_price=current_price, current_ts=current_ts)
                     elif self._config.log_level() >= LogLevel.WARNING.value:
                         print(f"{self._symbol} {quote_name} Insufficient balance {balance} (quote_size={quote_size}) to update buy position at price {current_price}")
 
@@ -396,7 +450,8 @@ class Trader(object):
                         #if not position.stop_loss_is_set() and balance < position.buy_size():
                         #    print(f"{self._symbol} {base_name} Insufficient balance {balance} to close position at price {current_price}")
                         #else:
-                        position.close_position(current_price=current_price, current_ts=current_ts)
+                        with self._timer('position_close'):
+                            position.close_position(current_price=current_price, current_ts=current_ts)
                     elif not position.closed():
                         # for limit and stop loss orders, we may need to cancel them if the price has moved, and place a new order
                         #base_name = self._account.get_base_name(self._symbol)
@@ -404,7 +459,8 @@ class Trader(object):
                         #if not position.stop_loss_is_set() and balance < position.buy_size():
                         #    print(f"{self._symbol} {base_name} Insufficient balance {balance} to update sell position at price {current_price}")
                         #else:
-                        position.update_sell_position(current_price=current_price, current_ts=current_ts)
+                        with self._timer('position_update_sell'):
+                            position.update_sell_position(current_price=current_price, current_ts=current_ts)
 
 
     def positions_buy_orders_completed(self):
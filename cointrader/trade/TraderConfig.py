@@ -9,6 +9,9 @@ DEFAULT_TRADE_CONFIG = {
     'log_level': LogLevel.INFO.value,         # Log level (4=DEBUG, 3=INFO, 2=WARNING, 1=ERROR, 0=NONE)
     'orders_db_path': 'orders.db',            # Path to the order database
     'market_db_path': 'market_data.db',       # Path to the market database
+    'orders_db_flush_interval': 0.05,         # Seconds order writes are batched for in live mode before they are written
+    'orders_db_flush_count': 100,             # Number of orders with pending writes that starts a write right away in live mode
+    'orders_db_synchronous': 'NORMAL',        # sqlite synchronous mode of the order database in live mode (NORMAL, or FULL to fsync every write)
     'max_position_per_symbol': 1,             # Maximum number of positions to hold per symbol
     'max_positions': 5,                       # Maximum number of positions to hold
     'quote_currency': 'USD',                  # Currency to use for trading
@@ -51,7 +54,8 @@ DEFAULT_TRADE_CONFIG = {
 class TraderConfig(object):
     def __init__(self, path : str):
         self._path = path
-        self._config = DEFAULT_TRADE_CONFIG
+        # a copy, so setting a key doesn't change the defaults of other configs
+        self._config = dict(DEFAULT_TRADE_CONFIG)
 
     def path(self) -> str:
         return self._path
@@ -131,6 +135,20 @@ class TraderConfig(object):
     def market_db_path(self):
         return self.get('market_db_path')
 
+    def orders_db_flush_interval(self) -> float:
+        return self._get_default('orders_db_flush_interval')
+
+    def orders_db_flush_count(self) -> int:
+        return self._get_default('orders_db_flush_count')
+
+    def orders_db_synchronous(self) -> str:
+        return self._get_default('orders_db_synchronous')
+
+    def _get_default(self, key):
+        # configs saved before the key was added don't have it
+        result = self.get(key)
+        return DEFAULT_TRADE_CONFIG[key] if result is None else result
+
     def max_positions_per_symbol(self):
         return self.get('max_positions_per_symbol')
     
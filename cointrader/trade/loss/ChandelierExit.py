@@ -1,9 +1,9 @@
 # This file is used to define a Chandelier Exit for trailing stop loss strategy. This strategy is used to set a stop loss price based on the highest high price over a period of time.
-from collections import deque
 from cointrader.common.TradeLossBase import TradeLossBase
 from cointrader.account.AccountBase import AccountBase
 from cointrader.trade.TraderConfig import TraderConfig
 from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
 from cointrader.indicators.ATR import ATR
 
 class ChandelierExit(TradeLossBase):
@@ -14,16 +14,14 @@ class ChandelierExit(TradeLossBase):
         self._min_stop_loss_percent = self._config.min_stop_loss_percent()
         self._atr = ATR(period=self._period)
         self._multiplier = 3.0
-        self._highs = deque(maxlen=self._period)
-        self._lows = deque(maxlen=self._period)
+        self._extrema = RollingExtrema(self._period)
 
     def reset(self):
         self._atr.reset()
-        self._highs.clear()
-        self._lows.clear()
+        self._extrema.clear()
 
     def ready(self) -> bool:
-        return len(self._highs) == self._period
+        return self._extrema.full()
 
     def get_stop_loss_price(self, price: float, current_ts: int) -> float:
         #highest_high = max(self._highs)
@@ -35,7 +33,7 @@ class ChandelierExit(TradeLossBase):
         return stop_price
 
     def get_stop_limit_price(self, price: float, current_ts: int) -> float:
-        highest_high = max(self._highs)
+        highest_high = self._extrema.max()
 
         stop_limit_price = self._account.round_quote(self._symbol, highest_high - self._multiplier * self._atr.get_last_value())
 
@@ -47,5 +45,4 @@ class ChandelierExit(TradeLossBase):
 
     def update(self, kline: Kline):
         self._atr.update(kline)
-        self._highs.append(kline.high)
-        self._lows.append(kline.low)
+        self._extrema.push(kline.high, kline.low)
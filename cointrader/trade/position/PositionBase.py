@@ -224,6 +224,13 @@ class PositionBase(object):
         raise NotImplementedError
 
 
+    def pending_orders(self) -> list[Order]:
+        """
+        Get the orders that still need their status checked on market updates
+        """
+        raise NotImplementedError
+
+
     def cancel_stop_loss_position(self):
         """
         Cancel the stop loss order
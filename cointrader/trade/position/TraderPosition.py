@@ -60,16 +60,10 @@ class TraderPosition(PositionBase):
             return self._stop_loss_order
 
         #result = self._execute.status(symbol=self._symbol, order_id=self._stop_loss_order.id, current_price=self._current_price, current_ts=self._current_ts)
-        oreq = OrderRequest(symbol=self._symbol, type=OrderType.STATUS, current_price=self._current_price, current_ts=self._current_ts)
-        oreq.order_id = self._stop_loss_order.id
-
-        #result = self._execute.execute_order(oreq)
-        self._exec_pipe.process_order_request(order_request=oreq)
-        result = self._exec_pipe.wait_order_result(oreq.rid)
+        result = self._exec_pipe.order_status(self._symbol, self._stop_loss_order.id, current_price=self._current_price, current_ts=self._current_ts)
         if result is None:
             print(f"update_stop_loss_position() Stop loss order failed: {self._symbol} {self._current_price}")
             return None
-        self._exec_pipe.completed(oreq.rid)
 
         self._stop_loss_order.update_order(result)
         self._stop_loss_order.pid = self._pid
@@ -364,6 +358,19 @@ class TraderPosition(PositionBase):
             self._closed_position_completed = True
 
 
+    def pending_orders(self) -> list[Order]:
+        """
+        The orders market_update() checks the status of
+        """
+        orders = []
+        if self._buy_order and not self._buy_order.completed() and not self._buy_order.cancelled():
+            orders.append(self._buy_order)
+        if not self._closed_position_completed and self._sell_order and not self._sell_order.completed() and not self._sell_order.cancelled():
+            orders.append(self._sell_order)
+        if not self._closed_position_completed and self._stop_loss_order and not self.stop_loss_is_cancelled() and not self._stop_loss_order.completed():
+            orders.append(self._stop_loss_order)
+        return orders
+
     def market_update(self, current_price: float, current_ts: int):
         """
         Update the position with order status and the current market price
@@ -375,17 +382,10 @@ class TraderPosition(PositionBase):
 
         if self._buy_order and not self._buy_order.completed() and not self._buy_order.cancelled():
             #result = self._execute.status(symbol=self._symbol, order_id=self._buy_order.id, current_price=current_price, current_ts=current_ts)
-            oreq = OrderRequest(symbol=self._symbol, type=OrderType.STATUS, current_price=current_price, current_ts=current_ts)
-            oreq.order_id = self._buy_order.id
-
-            # TODO: replace with order pipeline
-            #result = self._execute.execute_order(oreq)
-            self._exec_pipe.process_order_request(order_request=oreq)
-            result = self._exec_pipe.wait_order_result(oreq.rid)
+            result = self._exec_pipe.order_status(self._symbol, self._buy_order.id, current_price=current_price, current_ts=current_ts)
             if result is None:
                 print(f"market_update() Buy order failed: {self._symbol} {current_price}")
                 return
-            self._exec_pipe.completed(oreq.rid)
 
             self._buy_order.update_order(result)
             self._buy_order.pid = self._pid
@@ -404,16 +404,10 @@ class TraderPosition(PositionBase):
 
         if not self._closed_position_completed and self._sell_order and not self._sell_order.completed() and not self._sell_order.cancelled():
             #result = self._execute.status(symbol=self._symbol, order_id=self._sell_order.id, current_price=current_price, current_ts=current_ts)
-            oreq = OrderRequest(symbol=self._symbol, type=OrderType.STATUS, current_price=current_price, current_ts=current_ts)
-            oreq.order_id = self._sell_order.id
-
-            #result = self._execute.execute_order(oreq)
-            self._exec_pipe.process_order_request(order_request=oreq)
-            result = self._exec_pipe.wait_order_result(oreq.rid)
+            result = self._exec_pipe.order_status(self._symbol, self._sell_order.id, current_price=current_price, current_ts=current_ts)
             if result is None:
                 print(f"market_update() Sell order failed: {self._symbol} {current_price}")
                 return
-            self._exec_pipe.completed(oreq.rid)
 
             self._sell_order.update_order(result)
             self._buy_order.pid = self._pid
@@ -438,16 +432,10 @@ class TraderPosition(PositionBase):
         if not self._closed_position_completed and self._stop_loss_order and not self.stop_loss_is_cancelled() and not self._stop_loss_order.completed():
             #print(f"stop loss order: {self._stop_loss_order}")
             #result = self._execute.status(symbol=self._symbol, order_id=self._stop_loss_order.id, current_price=current_price, current_ts=current_ts)
-            oreq = OrderRequest(symbol=self._symbol, type=OrderType.STATUS, current_price=current_price, current_ts=current_ts)
-            oreq.order_id = self._stop_loss_order.id
-
-            #result = self._execute.execute_order(oreq)
-            self._exec_pipe.process_order_request(order_request=oreq)
-            result = self._exec_pipe.wait_order_result(oreq.rid)
+            result = self._exec_pipe.order_status(self._symbol, self._stop_loss_order.id, current_price=current_price, current_ts=current_ts)
             if result is None:
                 print(f"market_update() Stop loss order failed: {self._symbol} {current_price}")
                 return
-            self._exec_pipe.completed(oreq.rid)
 
             self._stop_loss_order.update_order(result)
             self._stop_loss_order.pid = self._pid
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Checks that the KlineArchive files round trip the CSV and market database klines, and that feeds are mapped, not copied
+import os
+import sys
+import tempfile
+sys.path.append('.')
+sys.path.append('tools')
+import numpy as np
+from cointrader.backtest.BacktestFeed import BacktestFeed
+from cointrader.backtest.KlineArchive import KlineArchive, open_feed, save_feed
+from cointrader.common.KlineArray import KlineArray
+from cointrader.market.MarketStorage import MarketStorage
+from benchmark_backtest_feed import generate_csv
+
+
+def feed_rows(feed: BacktestFeed) -> list[tuple]:
+    return [(k.symbol, k.ts, k.open, k.high, k.low, k.close, k.volume) for k in feed]
+
+
+def test_csv_round_trip():
+    symbols = ['BTC-USDT', 'ETH-USDT', 'SOL-USDT']
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, 'klines.csv')
+    generate_csv(csv_path, symbols, 500)
+
+    archive = KlineArchive(os.path.join(directory, 'archive'))
+    assert sorted(archive.import_csv(csv_path, 3600)) == symbols
+    assert archive.symbols(3600) == symbols
+    assert archive.symbols(60) == []
+
+    expected = BacktestFeed.from_csv(csv_path, granularity=3600, symbols=['ETH-USDT', 'BTC-USDT'])
+    start_ts = int(expected.klines('BTC-USDT').ts[50])
+    end_ts = int(expected.klines('BTC-USDT').ts[-50])
+    expected = BacktestFeed.from_csv(csv_path, granularity=3600, symbols=['ETH-USDT', 'BTC-USDT'], start_ts=start_ts, end_ts=end_ts)
+
+    for cache in (False, True, True):
+        feed = archive.feed(3600, symbols=['ETH-USDT', 'BTC-USDT'], start_ts=start_ts, end_ts=end_ts, cache=cache)
+        assert feed.symbols() == ['ETH-USDT', 'BTC-USDT']
+        assert feed_rows(feed) == feed_rows(expected)
+        assert (feed.path() is not None) == cache
+    assert len(os.listdir(os.path.join(directory, 'archive', 'feeds'))) == 1
+
+    klines = archive.open('SOL-USDT', 3600, start_ts, end_ts)
+    # read only views of the mapped file
+    assert not klines.close.flags.owndata and not klines.close.flags.writeable
+    assert archive.info('SOL-USDT', 3600)['count'] == 500
+    assert np.array_equal(klines.close, expected_close(csv_path, 'SOL-USDT', start_ts, end_ts))
+
+
+def expected_close(csv_path: str, symbol: str, start_ts: int, end_ts: int) -> np.ndarray:
+    return BacktestFeed.from_csv(csv_path, granularity=3600, symbols=[symbol], start_ts=start_ts, end_ts=end_ts).klines(symbol).close
+
+
+def test_merge_and_storage():
+    directory = tempfile.mkdtemp()
+    storage = MarketStorage(':memory:')
+    ts = 1700000000 + np.arange(1000, dtype=np.int64) * 300
+    close = np.linspace(100.0, 200.0, 1000)
+    storage.store_kline_array(KlineArray(symbol='BTC-USD', granularity=300, ts=ts, open=close, high=close + 1, low=close - 1,
+                                         close=close, volume=np.ones(1000)))
+
+    archive = KlineArchive(directory)
+    assert archive.import_storage(storage, 300) == ['BTC-USD']
+    klines = archive.open('BTC-USD', 300)
+    assert np.array_equal(klines.ts, ts) and np.array_equal(klines.close, close)
+
+    # newer klines replace the ones with the same ts, and the rest are kept in ts order
+    newer = KlineArray(symbol='BTC-USD', granularity=300, ts=ts[-10:] + 5 * 300, open=np.zeros(10), high=np.zeros(10),
+                       low=np.zeros(10), close=np.zeros(10), volume=np.zeros(10))
+    archive.write(newer)
+    klines = archive.open('BTC-USD', 300)
+    assert len(klines) == 1005
+    assert np.all(np.diff(klines.ts) > 0)
+    assert np.array_equal(klines.close[:995], close[:995]) and np.all(klines.close[995:] == 0)
+    info = archive.info('BTC-USD', 300)
+    assert (info['first_ts'], info['last_ts']) == (int(ts[0]), int(ts[-1]) + 5 * 300)
+
+    assert len(archive.open('BTC-USD', 300, 0, 1)) == 0
+    archive.write(KlineArray(symbol='ETH-USD', granularity=300))
+    assert len(archive.open('ETH-USD', 300)) == 0
+
+
+def test_saved_feed():
+    path = os.path.join(tempfile.mkdtemp(), 'klines.feed')
+    feed = BacktestFeed.from_arrays(['A', 'B'], 60, np.array([0, 1, 0], dtype=np.int32), np.array([60, 60, 120], dtype=np.int64),
+                                    *[np.array([1.0, 2.0, 3.0])] * 5)
+    save_feed(feed, path)
+    mapped = open_feed(path)
+    assert mapped.path() == path
+    assert feed_rows(mapped) == feed_rows(feed)
+    assert mapped.klines('A').ts.tolist() == [60, 120]
+
+
+if __name__ == '__main__':
+    test_csv_round_trip()
+    test_merge_and_storage()
+    test_saved_feed()
+    print("KlineArchive tests passed")
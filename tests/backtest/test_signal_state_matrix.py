@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Checks that scoring weights with a SignalStateMatrix gives the same buy/sell signals as running SignalStrength
+import os
+import sys
+import tempfile
+sys.path.append('.')
+import numpy as np
+from cointrader.strategies.SignalStrength import SignalStrength, SIGNAL_STATE_NAMES
+from cointrader.strategies.SignalStrengthCached import SignalStrengthCached
+from cointrader.backtest.SignalStateMatrix import SignalStateMatrix
+from tests.kline_data import generate_klines
+
+
+def random_weights(rng) -> dict[str, float]:
+    # multiples of 0.5 add up exactly in any order, so ties between buy and sell weights are the same
+    return {name: float(rng.choice([0, 0, 0.5, 1.0, 1.5])) for name in SIGNAL_STATE_NAMES}
+
+
+def test_matrix_matches_signal_strength():
+    klines = generate_klines(1500, symbol='BTC-USDT')
+    matrix = SignalStateMatrix.from_kline_array(klines)
+    matrix.register()
+    rng = np.random.default_rng(7)
+
+    all_weights = [random_weights(rng) for _ in range(6)]
+    batch_buy, batch_sell, _, _ = matrix.signals(matrix.weight_vector(all_weights))
+
+    for column, weights in enumerate(all_weights):
+        strategy = SignalStrength(symbol=klines.symbol, granularity=klines.granularity, weights=dict(weights))
+        cached = SignalStrengthCached(symbol=klines.symbol, granularity=klines.granularity, weights=dict(weights))
+        expected = []
+        actual = []
+        for kline in klines:
+            strategy.update(kline)
+            cached.update(kline)
+            expected.append((strategy.buy_signal(), strategy.sell_signal(), strategy.strong_buy_signal(), strategy.strong_sell_signal()))
+            actual.append((cached.buy_signal(), cached.sell_signal(), cached.strong_buy_signal(), cached.strong_sell_signal()))
+
+        buy, sell, strong_buy, strong_sell = matrix.signals(weights)
+        assert actual == expected
+        assert list(zip(buy.tolist(), sell.tolist(), strong_buy.tolist(), strong_sell.tolist())) == expected
+        assert batch_buy[:, column].tolist() == buy.tolist()
+        assert batch_sell[:, column].tolist() == sell.tolist()
+
+
+def test_signal_returns_batch():
+    klines = generate_klines(800, seed=2, symbol='BTC-USDT')
+    matrix = SignalStateMatrix.from_kline_array(klines)
+    rng = np.random.default_rng(3)
+    all_weights = [random_weights(rng) for _ in range(8)]
+
+    returns = matrix.signal_returns(matrix.weight_vector(all_weights))
+    for column, weights in enumerate(all_weights):
+        buy, sell, _, _ = matrix.signals(weights)
+        # simple loop version of holding from a buy signal until the next sell signal
+        holding = False
+        expected = 0.0
+        for i in range(len(klines) - 1):
+            if buy[i]:
+                holding = True
+            elif sell[i]:
+                holding = False
+            if holding:
+                expected += np.log(klines.close[i + 1] / klines.close[i])
+        assert np.isclose(returns[column], expected)
+        assert np.isclose(matrix.signal_returns(weights), expected)
+
+
+def test_cache():
+    klines = generate_klines(300, seed=4, symbol='BTC-USDT')
+    cache_dir = tempfile.mkdtemp()
+    matrix = SignalStateMatrix.from_kline_array(klines, cache_dir=cache_dir)
+    path = os.path.join(cache_dir, SignalStateMatrix.cache_name(klines))
+    assert os.path.exists(path)
+
+    loaded = SignalStateMatrix.from_kline_array(klines, cache_dir=cache_dir)
+    assert loaded.names == matrix.names
+    assert loaded.states.dtype == np.int8
+    assert np.array_equal(loaded.states, matrix.states)
+    assert np.array_equal(loaded.ts, matrix.ts)
+
+    # different klines use a different cache file
+    assert SignalStateMatrix.cache_name(klines[:-1]) != SignalStateMatrix.cache_name(klines)
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    test_matrix_matches_signal_strength()
+    test_signal_returns_batch()
+    test_cache()
+    print("SignalStateMatrix tests passed")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Checks the WeightOptimizer process pool search against a serial search, and the checkpoint / pruning support
+import itertools
+import os
+import sys
+import tempfile
+sys.path.append('.')
+import numpy as np
+from cointrader.common.KlineFrame import KlineFrame
+from cointrader.backtest.BacktestFeed import BacktestFeed
+from cointrader.backtest.SharedBacktestFeed import SharedBacktestFeed
+from cointrader.backtest.WeightOptimizer import WeightOptimizer, DrawdownPruner
+from cointrader.backtest.KlineArchive import open_feed, save_feed
+
+NAMES = ['macd', 'rsi', 'ema', 'sma', 'kst']
+
+
+def generate_feed(symbols: list[str], count: int, seed: int = 1) -> BacktestFeed:
+    rng = np.random.default_rng(seed)
+    ts = np.tile(np.arange(count, dtype=np.int64) * 3600, len(symbols))
+    close = 100.0 + np.cumsum(rng.normal(0, 1, count * len(symbols)))
+    names = np.repeat(symbols, count)
+    frame = KlineFrame.from_columns(names, ts, close, close + 1.0, close - 1.0, close, np.ones(len(close)), granularity=3600)
+    return BacktestFeed(frame, symbols=symbols)
+
+
+def evaluate_closes(feed: BacktestFeed, weights: dict[str, float], max_drawdown: float = 0.0):
+    """
+    Stand-in for a backtest: walks the feed and accumulates a weighted change of the close price
+    """
+    close = feed.arrays()[5]
+    scale = sum((i + 1) * weight for i, weight in enumerate(weights.values())) - 3.0
+    pruner = DrawdownPruner(max_drawdown=max_drawdown, check_interval=10) if max_drawdown > 0 else None
+    net_profit = 0.0
+    for i in range(1, len(close)):
+        net_profit += scale * (close[i] - close[i - 1])
+        if pruner is not None and pruner.step() and pruner.update(net_profit):
+            return {'pruned': True, 'net_profit': float(net_profit)}
+    return {'net_profit': float(net_profit), 'scale': scale}
+
+
+def test_shared_feed():
+    feed = generate_feed(['BTC-USDT', 'ETH-USDT'], 100)
+    shared = SharedBacktestFeed(feed)
+    attached = SharedBacktestFeed.attach(shared.descriptor())
+    expected = [(k.symbol, k.ts, k.close) for k in feed]
+    assert [(k.symbol, k.ts, k.close) for k in attached] == expected
+    assert attached.first_prices() == feed.first_prices()
+    assert attached.last_prices() == feed.last_prices()
+    assert np.array_equal(attached.klines('ETH-USDT').close, feed.klines('ETH-USDT').close)
+    del attached
+    SharedBacktestFeed.detach(shared.descriptor())
+    shared.close()
+
+
+def test_optimizer_matches_serial():
+    feed = generate_feed(['BTC-USDT', 'ETH-USDT'], 200)
+    optimizer = WeightOptimizer(feed=feed, names=NAMES, evaluate=evaluate_closes, weight_values=[0, 1], max_workers=2, min_nonzero=2)
+    records = list(optimizer.run())
+
+    expected = {}
+    for index, combination in enumerate(itertools.product([0, 1], repeat=len(NAMES))):
+        if sum(weight != 0 for weight in combination) >= 2:
+            expected[index] = evaluate_closes(feed, dict(zip(NAMES, combination)))
+
+    assert sorted(record['index'] for record in records) == sorted(expected.keys())
+    for record in records:
+        assert record['weights'] == dict(zip(NAMES, optimizer.combination(record['index'])))
+        assert np.isclose(record['result']['net_profit'], expected[record['index']]['net_profit'])
+
+    best_index = max(expected, key=lambda index: expected[index]['net_profit'])
+    assert optimizer.best()['net_profit']['index'] == best_index
+    assert optimizer.evaluated() == len(expected)
+    assert optimizer.next_index() == 2 ** len(NAMES)
+    assert [tuple(row) for row in optimizer.weight_matrix(3, 20).tolist()] == [optimizer.combination(index) for index in range(3, 20)]
+
+
+def test_mapped_feed():
+    # a feed mapped from a file is opened by the workers instead of being copied into shared memory
+    feed = generate_feed(['BTC-USDT', 'ETH-USDT'], 200)
+    path = os.path.join(tempfile.mkdtemp(), 'klines.feed')
+    save_feed(feed, path)
+    optimizer = WeightOptimizer(feed=open_feed(path), names=NAMES, evaluate=evaluate_closes, weight_values=[0, 1], max_workers=2)
+    for record in optimizer.run():
+        assert np.isclose(record['result']['net_profit'], evaluate_closes(feed, record['weights'])['net_profit'])
+    assert optimizer.evaluated() == 2 ** len(NAMES)
+
+
+def test_checkpoint_resume():
+    feed = generate_feed(['BTC-USDT'], 100)
+    path = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    optimizer = WeightOptimizer(feed=feed, names=NAMES, evaluate=evaluate_closes, weight_values=[0, 1], max_workers=2, checkpoint_path=path)
+    first = [record['index'] for record in optimizer.run(end=10)]
+    assert sorted(first) == list(range(10))
+
+    resumed = WeightOptimizer(feed=feed, names=NAMES, evaluate=evaluate_closes, weight_values=[0, 1], max_workers=2, checkpoint_path=path)
+    assert resumed.next_index() == 10
+    second = [record['index'] for record in resumed.run()]
+    assert sorted(first + second) == list(range(2 ** len(NAMES)))
+    assert resumed.evaluated() == 2 ** len(NAMES)
+    os.remove(path)
+
+
+def test_pruning():
+    pruner = DrawdownPruner(max_drawdown=5.0, check_interval=1)
+    assert not pruner.update(10.0)
+    assert not pruner.update(6.0)
+    assert pruner.update(4.0)
+    assert pruner.drawdown() == 6.0
+
+    feed = generate_feed(['BTC-USDT'], 300)
+    optimizer = WeightOptimizer(feed=feed, names=NAMES, evaluate=evaluate_closes, weight_values=[0, 1], options={'max_drawdown': 5.0}, max_workers=2)
+    records = list(optimizer.run())
+    pruned = [record for record in records if record['result'].get('pruned')]
+    assert len(pruned) == optimizer.pruned() > 0
+    assert all(not record['result'].get('pruned') for record in optimizer.best().values())
+
+
+if __name__ == '__main__':
+    test_shared_feed()
+    test_optimizer_matches_serial()
+    test_mapped_feed()
+    test_checkpoint_resume()
+    test_pruning()
+    print("WeightOptimizer tests passed")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Checks that the signals of SignalStrength give the same states with the indicators shared through the
+# IndicatorRegistry as with their own indicators, and that each shared indicator is only computed once per kline
+import sys
+sys.path.append('.')
+from cointrader.common.IndicatorRegistry import IndicatorRegistry
+from cointrader.indicators.EMA import EMA
+from cointrader.indicators.MACD import MACD
+from cointrader.signals.ADXSignal import ADXSignal
+from cointrader.signals.EMACross import EMACross
+from cointrader.signals.MACDSignal import MACDSignal
+from cointrader.signals.PPOSignal import PPOSignal
+from cointrader.signals.SupertrendSignal import SupertrendSignal
+from cointrader.signals.ZLEMACross import ZLEMACross
+from cointrader.strategies.SignalStrength import SignalStrength, SIGNAL_STATE_NAMES
+from tests.kline_data import generate_klines
+
+
+def test_shared_instances():
+    registry = IndicatorRegistry()
+    ema = registry.get(EMA, name='a', period=12)
+    assert registry.get(EMA, name='b', period=12) is ema and registry.get(EMA, period=26) is not ema
+    macd = MACD(short_period=12, long_period=26, indicators=registry)
+    assert len(registry) == 2 and registry.requests() == 5
+
+    reference = MACD(short_period=12, long_period=26)
+    for kline in generate_klines(100, seed=2).klines():
+        registry.update(kline)
+        # a second update of the same kline is not applied again
+        assert ema.update(kline) == ema.update(kline)
+        assert macd.update(kline) == reference.update(kline)
+    # the signals don't reset the shared indicators, the registry does
+    ema.reset()
+    assert ema.ready()
+    registry.reset()
+    assert not ema.ready()
+
+
+def test_signal_strength_unchanged():
+    shared = SignalStrength(symbol='BTC-USD', granularity=3600, weights={name: 1.0 for name in SIGNAL_STATE_NAMES})
+    plain = SignalStrength(symbol='BTC-USD', granularity=3600, weights={name: 1.0 for name in SIGNAL_STATE_NAMES})
+    # the same signals with indicators of their own
+    plain.signals['macd'] = MACDSignal(symbol='BTC-USD', short_period=12, long_period=26, signal_period=9)
+    plain.signals['zlema'] = ZLEMACross(symbol='BTC-USD', short_period=12, long_period=26)
+    plain.signals['ema'] = EMACross(symbol='BTC-USD', short_period=12, long_period=26)
+    plain.signals['supertrend'] = SupertrendSignal(symbol='BTC-USD', period=14, multiplier=3)
+    plain.signals['adx'] = ADXSignal(symbol='BTC-USD', period=14, threshold=25)
+    plain.signals['ppo'] = PPOSignal(symbol='BTC-USD', short_period=12, long_period=26, signal_period=9, overbought=100, oversold=-100)
+
+    # 9 EMAs and ATRs asked for, 3 computed
+    assert len(shared.indicators) == 3 and shared.indicators.requests() == 9
+
+    for kline in generate_klines(500, seed=2).klines():
+        shared.update(kline)
+        plain.update(kline)
+        assert shared.signal_states == plain.signal_states
+        assert shared.buy_signal() == plain.buy_signal() and shared.sell_signal() == plain.sell_signal()
+
+
+if __name__ == '__main__':
+    test_shared_instances()
+    test_signal_strength_unchanged()
+    print("IndicatorRegistry tests passed")
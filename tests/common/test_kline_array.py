@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# Checks the columnar KlineArray / KlineFrame kline stores against plain Kline objects
+import sys
+import numpy as np
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.common.KlineArray import KlineArray
+from cointrader.common.KlineFrame import KlineFrame
+
+
+def test_kline_array_rows_match_klines():
+    klines = [Kline(symbol='BTC-USD', open=i, close=i + 1.5, low=i - 1, high=i + 2, volume=10 * i, ts=3600 * i, granularity=3600) for i in range(10000)]
+    array = KlineArray.from_klines(klines)
+    assert len(array) == len(klines)
+    assert array[42] == klines[42]
+    assert array[42].granularity == 3600
+    for expected, kline in zip(klines, array):
+        assert kline == expected and kline.symbol == 'BTC-USD'
+    assert [k.ts for k in array.range(3600 * 10, 3600 * 19)] == [3600 * i for i in range(10, 20)]
+    assert array.to_dicts()[7]['close'] == 8.5
+
+
+def test_kline_frame_groups_by_symbol():
+    symbols = np.array(['ETH-USDT', 'BTC-USDT', 'ETH-USDT', 'BTC-USDT', 'BTC-USDT'])
+    ts = np.array([7200, 7200, 3600, 3600, 10800])
+    close = np.array([2.0, 20.0, 1.0, 10.0, 30.0])
+    frame = KlineFrame.from_columns(symbols, ts, close, close, close, close, close, granularity=3600)
+    assert sorted(frame.symbols()) == ['BTC-USDT', 'ETH-USDT']
+    assert frame['BTC-USDT'].close.tolist() == [10.0, 20.0, 30.0]
+    assert frame['ETH-USDT'].ts.tolist() == [3600, 7200]
+    assert len(frame) == 5
+    assert len(frame.range(3600, 7200)) == 4
+
+
+if __name__ == '__main__':
+    test_kline_array_rows_match_klines()
+    test_kline_frame_groups_by_symbol()
+    print("KlineArray and KlineFrame tests passed")
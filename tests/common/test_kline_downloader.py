@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# Checks the KlineDownloader against a local fake exchange: chunking, retries, the rate limit and resuming
+import sys
+import threading
+import time
+sys.path.append('.')
+from cointrader.market.KlineDownloader import KlineDownloader, RateLimiter
+from cointrader.market.MarketStorage import MarketStorage
+
+
+class FakeKlineExchange(object):
+    """
+    Serves klines for any symbol, with a close derived from the symbol and ts. The first request of the chunks
+    starting at a ts in fail_once raises, like an exchange that rate limits or times out now and then
+    """
+    def __init__(self, max_klines: int = 300, fail_once: set = None, fail_always: set = None, delay: float = 0.0):
+        self.max_klines = max_klines
+        self.fail_once = set(fail_once or ())
+        self.fail_always = set(fail_always or ())
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def market_get_max_kline_count(self, granularity: int) -> int:
+        return self.max_klines
+
+    def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> list:
+        with self._lock:
+            self.requests.append((ticker, start_ts, end_ts, time.monotonic()))
+            if (end_ts - start_ts) // granularity + 1 > self.max_klines:
+                raise ValueError("too many klines requested")
+            if start_ts in self.fail_always or (ticker, start_ts) in self.fail_once:
+                self.fail_once.discard((ticker, start_ts))
+                raise ConnectionError("timed out")
+        time.sleep(self.delay)
+        return [{'start': str(ts), 'open': '1.0', 'high': '2.0', 'low': '0.5', 'close': str(close(ticker, ts)), 'volume': '1.0'}
+                for ts in range(end_ts - end_ts % granularity, start_ts - 1, -granularity)]
+
+
+def close(ticker: str, ts: int) -> float:
+    return float(len(ticker) + ts % 1000)
+
+
+def test_download():
+    granularity = 300
+    start_ts = 1700000000 // granularity * granularity
+    end_ts = start_ts + 5000 * granularity - 1
+    symbols = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+    exchange = FakeKlineExchange(max_klines=300, fail_once={('ETH-USD', start_ts + 300 * granularity)})
+    storage = MarketStorage(':memory:')
+    downloader = KlineDownloader(exchange, storage, requests_per_second=0, max_workers=4, backoff=0.01, flush_size=1000)
+
+    assert downloader.chunks('BTC-USD', start_ts, end_ts, granularity)[:2] == [
+        (start_ts, start_ts + 299 * granularity), (start_ts + 300 * granularity, start_ts + 599 * granularity)]
+    result = downloader.download(symbols, start_ts, end_ts, granularity)
+    # 17 chunks per symbol, and one retry
+    assert result['requests'] == 3 * 17 + 1 and result['retries'] == 1
+    for symbol in symbols:
+        assert result['symbols'][symbol] == {'chunks': 17, 'klines': 5000, 'failed': 0}
+        array = storage.get_kline_array(symbol, start_ts, end_ts, granularity)
+        assert array.ts.tolist() == list(range(start_ts, end_ts, granularity))
+        assert array.close.tolist() == [close(symbol, ts) for ts in range(start_ts, end_ts, granularity)]
+
+    # resuming over a longer range only requests the new klines
+    exchange.requests.clear()
+    result = downloader.download(symbols, start_ts, end_ts + 100 * granularity, granularity)
+    assert sorted(request[:3] for request in exchange.requests) == [
+        (symbol, end_ts + 1, end_ts + 1 + 99 * granularity) for symbol in symbols]
+    assert all(stats['klines'] == 100 for stats in result['symbols'].values())
+
+
+def test_failed_chunks_resume():
+    granularity = 60
+    start_ts = 1700000040
+    exchange = FakeKlineExchange(max_klines=100, fail_always={start_ts + 100 * granularity})
+    storage = MarketStorage(':memory:')
+    downloader = KlineDownloader(exchange, storage, requests_per_second=0, max_workers=1, max_retries=2, backoff=0.001)
+    result = downloader.download(['BTC-USD'], start_ts, start_ts + 299 * granularity, granularity)
+    assert result['symbols']['BTC-USD'] == {'chunks': 3, 'klines': 200, 'failed': 1}
+    assert result['requests'] == 5
+
+    # the chunk that failed is still missing, and is all the next download requests
+    assert storage.get_missing_ranges('BTC-USD', granularity, start_ts, start_ts + 299 * granularity) == [
+        (start_ts + 100 * granularity, start_ts + 199 * granularity)]
+    exchange.fail_always.clear()
+    result = downloader.download(['BTC-USD'], start_ts, start_ts + 299 * granularity, granularity)
+    assert result['requests'] == 1 and result['symbols']['BTC-USD']['klines'] == 100
+    assert storage.get_ts_range('BTC-USD', granularity) == (start_ts, start_ts + 299 * granularity, 300)
+
+
+def test_rate_limit():
+    limiter = RateLimiter(requests_per_second=200)
+    start = time.monotonic()
+    for _ in range(21):
+        limiter.acquire()
+    # the first request goes right away, the other 20 are 5ms apart
+    assert time.monotonic() - start >= 0.099
+
+    exchange = FakeKlineExchange(max_klines=10)
+    downloader = KlineDownloader(exchange, MarketStorage(':memory:'), requests_per_second=100, max_workers=8)
+    downloader.download(['BTC-USD', 'ETH-USD'], 1700000000, 1700000000 + 199 * 60, 60)
+    times = sorted(request[3] for request in exchange.requests)
+    assert len(times) == 40
+    assert times[-1] - times[0] >= 39 * 0.01 * 0.95
+
+
+if __name__ == '__main__':
+    test_download()
+    test_failed_chunks_resume()
+    test_rate_limit()
+    print("KlineDownloader tests passed")
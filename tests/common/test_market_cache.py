@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Checks that Market.market_get_klines_range with store_db only requests the ranges that were never fetched
+import sys
+import time
+sys.path.append('.')
+from cointrader.market.Market import Market
+from cointrader.market.MarketStorage import MarketStorage
+
+
+class FakeExchange(object):
+    """
+    Returns one kline per granularity, newest first like cbadv, except in the ts ranges without trades
+    """
+    def __init__(self, max_klines: int = 10, no_trades: tuple = (0, -1)):
+        self.max_klines = max_klines
+        self.no_trades = no_trades
+        self.requests = []
+
+    def market_get_max_kline_count(self, granularity: int) -> int:
+        return self.max_klines
+
+    def market_get_klines_range(self, ticker: str, start_ts: int, end_ts: int, granularity: int) -> list:
+        self.requests.append((start_ts, end_ts))
+        first = -(-start_ts // granularity) * granularity
+        klines = []
+        for ts in range(first, end_ts + 1, granularity):
+            if self.no_trades[0] <= ts <= self.no_trades[1]:
+                continue
+            klines.append({'start': str(ts), 'open': '1.0', 'high': '2.0', 'low': '0.5', 'close': str(ts % 97), 'volume': '3.0'})
+        return list(reversed(klines))
+
+
+def test_fetches_only_gaps():
+    granularity = 60
+    base = 1700000000 // granularity * granularity
+    exchange = FakeExchange(max_klines=10, no_trades=(base + 30 * 60, base + 34 * 60))
+    market = Market(exchange=exchange, db_path=':memory:')
+
+    klines = market.market_get_klines_range('BTC-USD', base, base + 49 * 60, granularity, store_db=True)
+    # 50 klines in chunks of at most 10, the 5 without trades are fetched but never stored
+    assert exchange.requests == [(base + i * 600, base + i * 600 + 540) for i in range(5)]
+    assert [kline['ts'] for kline in klines] == [base + i * 60 for i in range(50) if not 30 <= i <= 34]
+
+    # the same window again, and the range without trades, are already covered
+    exchange.requests.clear()
+    assert market.market_get_klines_range('BTC-USD', base, base + 49 * 60, granularity, store_db=True) == klines
+    market.market_get_klines_range('BTC-USD', base + 31 * 60, base + 33 * 60, granularity, store_db=True)
+    assert exchange.requests == []
+
+    # an overlapping window only fetches the new klines on both sides, and they are merged in order
+    klines = market.market_get_klines_range('BTC-USD', base - 5 * 60, base + 59 * 60 + 30, granularity, store_db=True)
+    assert exchange.requests == [(base - 5 * 60, base - 60), (base + 50 * 60, base + 59 * 60)]
+    assert [kline['ts'] for kline in klines] == [base + i * 60 for i in range(-5, 60) if not 30 <= i <= 34]
+    assert market._storage.get_covered_ranges('BTC-USD', granularity, 0, 2**62) == [(base - 5 * 60, base + 59 * 60)]
+
+
+def test_open_kline_not_covered():
+    granularity = 300
+    now = int(time.time())
+    exchange = FakeExchange(max_klines=100)
+    market = Market(exchange=exchange, db_path=':memory:')
+    market.market_get_klines_range('ETH-USD', now - 3600, now, granularity, store_db=True)
+    market.market_get_klines_range('ETH-USD', now - 3600, now, granularity, store_db=True)
+    # the kline that is still open is fetched again every time
+    open_ts = now // granularity * granularity
+    assert exchange.requests[-1] == (open_ts, open_ts)
+
+
+def test_missing_ranges():
+    storage = MarketStorage(':memory:')
+    assert storage.get_missing_ranges('BTC-USD', 60, 90, 610) == [(120, 600)]
+    storage.add_covered_range('BTC-USD', 60, 180, 300)
+    storage.add_covered_range('BTC-USD', 60, 480, 540)
+    assert storage.get_missing_ranges('BTC-USD', 60, 0, 1200) == [(0, 120), (360, 420), (600, 1200)]
+    # touching ranges are merged into one
+    storage.add_covered_range('BTC-USD', 60, 360, 420)
+    assert storage.get_covered_ranges('BTC-USD', 60, 0, 1200) == [(180, 540)]
+    assert storage.get_missing_ranges('BTC-USD', 60, 200, 500) == []
+    assert storage.get_missing_ranges('BTC-USD', 300, 200, 500) == [(300, 300)]
+
+
+if __name__ == '__main__':
+    test_fetches_only_gaps()
+    test_open_kline_not_covered()
+    test_missing_ranges()
+    print("Market cache tests passed")
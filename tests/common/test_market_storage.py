@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Checks the MarketStorage bulk upserts, range reads and the migration of the older per symbol tables
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append('.')
+import numpy as np
+from cointrader.common.KlineArray import KlineArray
+from cointrader.market.MarketStorage import MarketStorage
+
+
+def generate_klines(count: int, start_ts: int = 1700000000, granularity: int = 300, seed: int = 1) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0, 1, count))
+    return [{'start': str(start_ts + i * granularity), 'open': str(close[i] - 0.5), 'high': str(close[i] + 1.0),
+             'low': str(close[i] - 1.0), 'close': str(close[i]), 'volume': str(10.0 + i)} for i in range(count)]
+
+
+def test_store_and_read():
+    storage = MarketStorage(':memory:')
+    klines = generate_klines(1000)
+    assert not storage.table_exists('BTC-USD', 300)
+    assert storage.store_klines('BTC-USD', 300, klines) == 1000
+    # storing an overlapping batch again replaces the klines instead of adding duplicates
+    changed = [dict(kline, close='1.0') for kline in klines[900:]] + generate_klines(100, start_ts=1700000000 + 1000 * 300, seed=2)
+    storage.store_klines('BTC-USD', 300, changed)
+    storage.store_klines('ETH-USD', 300, generate_klines(10))
+
+    assert storage.table_exists('BTC-USD', 300)
+    assert not storage.table_exists('BTC-USD', 60)
+    assert storage.get_ts_range('BTC-USD', 300) == (1700000000, 1700000000 + 1099 * 300, 1100)
+    assert storage.get_ts_range('BTC-USD', 60) == (None, None, 0)
+    assert storage.symbols() == ['BTC-USD', 'ETH-USD']
+    assert storage.kline_exists('BTC-USD', 1700000000 + 5 * 300, 300)
+    assert not storage.kline_exists('BTC-USD', 1700000000 + 5 * 300 + 1, 300)
+    assert storage.get_kline('BTC-USD', 1700000000 + 950 * 300, 300)['close'] == 1.0
+
+    start_ts = 1700000000 + 100 * 300
+    end_ts = 1700000000 + 199 * 300
+    dicts = storage.get_klines_range('BTC-USD', start_ts, end_ts, 300)
+    array = storage.get_kline_array('BTC-USD', start_ts, end_ts, 300)
+    assert len(dicts) == len(array) == 100
+    assert array.ts.dtype == np.int64 and array.close.dtype == np.float64
+    assert np.array_equal(array.ts, KlineArray.from_dicts(dicts).ts)
+    assert np.array_equal(array.close, [float(kline['close']) for kline in klines[100:200]])
+    assert np.array_equal(storage.get_ts('BTC-USD', start_ts, end_ts, 300), array.ts)
+    assert len(storage.get_kline_array('BTC-USD', 0, 1, 300)) == 0
+    storage.close()
+
+
+def test_store_kline_array():
+    path = os.path.join(tempfile.mkdtemp(), 'market.db')
+    storage = MarketStorage(path)
+    assert storage.connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    klines = KlineArray.from_dicts(generate_klines(500), symbol='SOL-USD', granularity=60, ts='start')
+    assert storage.store_kline_array(klines) == 500
+    storage.close()
+
+    storage = MarketStorage(path)
+    stored = storage.get_kline_array('SOL-USD', 0, 2**62, 60)
+    for name in ('ts', 'open', 'high', 'low', 'close', 'volume'):
+        assert np.array_equal(getattr(stored, name), getattr(klines, name))
+    storage.close()
+
+
+def test_migrate_legacy_tables():
+    path = os.path.join(tempfile.mkdtemp(), 'market.db')
+    connection = sqlite3.connect(path)
+    connection.execute('''
+        CREATE TABLE BTC_USD_5m (id INTEGER PRIMARY KEY, open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL,
+                                 close REAL NOT NULL, volume REAL NOT NULL, ts INTEGER NOT NULL)
+    ''')
+    rows = [(1.0, 2.0, 0.5, 1.5, 10.0, 1700000000 + i * 300) for i in range(20)]
+    # the older tables allowed the same ts more than once
+    rows.append((9.0, 9.0, 9.0, 9.0, 9.0, 1700000000))
+    connection.executemany('INSERT INTO BTC_USD_5m (open, high, low, close, volume, ts) VALUES (?, ?, ?, ?, ?, ?)', rows)
+    connection.commit()
+    connection.close()
+
+    storage = MarketStorage(path)
+    assert not storage.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'BTC_USD_5m'").fetchone()
+    assert storage.get_ts_range('BTC-USD', 300) == (1700000000, 1700000000 + 19 * 300, 20)
+    assert storage.get_kline('BTC-USD', 1700000000, 300)['close'] == 1.5
+    # klines stored before the coverage table existed count as fetched
+    assert storage.get_covered_ranges('BTC-USD', 300, 0, 2**62) == [(1700000000, 1700000000 + 19 * 300)]
+    storage.close()
+
+
+if __name__ == '__main__':
+    test_store_and_read()
+    test_store_kline_array()
+    test_migrate_legacy_tables()
+    print("MarketStorage tests passed")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Checks that the PriceCache serves the streamed prices, and that Market only requests the prices that went stale
+import sys
+sys.path.append('.')
+from cointrader.market.Market import Market
+from cointrader.market.PriceCache import PriceCache
+
+
+class FakeClock(object):
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeExchange(object):
+    def __init__(self, prices: dict[str, float]):
+        self.prices = prices
+        self.listings = 0
+        self.requests = []
+
+    def market_ticker_price_get(self, ticker: str) -> float:
+        self.requests.append(ticker)
+        return self.prices[ticker]
+
+    def market_ticker_prices_all_get(self) -> dict:
+        self.listings += 1
+        return dict(self.prices)
+
+
+def test_staleness():
+    clock = FakeClock()
+    cache = PriceCache(max_age=60.0, clock=clock)
+    cache.update('BTC-USD', 50000.0)
+    cache.update('ETH-USD', 3000.0, ts=clock.now - 90)
+    # a late update does not overwrite a newer price, and a zero price is ignored
+    cache.update('BTC-USD', 49000.0, ts=clock.now - 10)
+    cache.update('BTC-USD', 0.0)
+    assert cache.get('BTC-USD') == 50000.0
+    assert cache.get('ETH-USD') is None and cache.get('ETH-USD', max_age=120) == 3000.0
+    assert cache.stale_symbols(['BTC-USD', 'ETH-USD', 'SOL-USD']) == ['ETH-USD', 'SOL-USD']
+    clock.now += 61
+    assert cache.stale_symbols() == ['BTC-USD', 'ETH-USD']
+    # stale prices are still returned, the caller decides whether to refresh them
+    assert cache.prices(['BTC-USD', 'SOL-USD']) == {'BTC-USD': 50000.0}
+    assert cache.age('BTC-USD') == 61 and cache.age('SOL-USD') is None
+
+
+def test_market_refreshes_stale_only():
+    clock = FakeClock()
+    prices = {f'C{i}-USD': float(i + 1) for i in range(20)}
+    exchange = FakeExchange(prices)
+    cache = PriceCache(max_age=60.0, rest_limit=3, clock=clock)
+    market = Market(exchange=exchange, db_path=None, price_cache=cache)
+    tickers = list(prices.keys())
+
+    # nothing cached, too many stale tickers to request one by one
+    assert market.market_ticker_prices_get(tickers) == prices
+    assert exchange.listings == 1 and exchange.requests == []
+
+    # streamed updates keep most of them fresh, the two that went quiet are requested alone
+    clock.now += 120
+    for ticker in tickers[2:]:
+        cache.update(ticker, prices[ticker] * 2)
+    result = market.market_ticker_prices_get(tickers)
+    assert exchange.listings == 1 and exchange.requests == tickers[:2]
+    assert result[tickers[0]] == prices[tickers[0]] and result[tickers[5]] == prices[tickers[5]] * 2
+
+    # a ticker that isn't in the listing has no price, and is not requested again
+    exchange.requests.clear()
+    assert market.market_ticker_prices_get(tickers[5:7] + ['NONE-USD']) == {t: prices[t] * 2 for t in tickers[5:7]}
+    assert exchange.requests == []
+
+
+def test_market_without_cache():
+    exchange = FakeExchange({'BTC-USD': 50000.0, 'ETH-USD': 3000.0})
+    market = Market(exchange=exchange, db_path=None)
+    assert market.market_ticker_prices_get(['BTC-USD', 'SOL-USD']) == {'BTC-USD': 50000.0}
+    assert exchange.listings == 1
+
+
+if __name__ == '__main__':
+    test_staleness()
+    test_market_refreshes_stale_only()
+    test_market_without_cache()
+    print("PriceCache tests passed")
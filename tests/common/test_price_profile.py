@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Checks that PriceProfile matches a profile rebuilt from scratch for every window, and the profile indicators built on it
+import sys
+sys.path.append('.')
+import math
+import numpy as np
+from cointrader.common.Kline import Kline
+from cointrader.common.PriceProfile import PriceProfile
+from cointrader.indicators.VolumeProfile import VolumeProfile
+from cointrader.indicators.MarketProfile import MarketProfile
+
+
+def generate_klines(count: int, price: float, seed: int = 1) -> list[tuple[float, float, float]]:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.005, count)))
+    high = close * (1 + rng.uniform(0, 0.01, count))
+    low = close * (1 - rng.uniform(0, 0.01, count))
+    # some klines with no range, which put all their volume in one bin
+    high[::17] = low[::17]
+    volume = rng.integers(1, 100, count).astype(np.float64)
+    return list(zip(low.tolist(), high.tolist(), volume.tolist()))
+
+
+def reference_profile(profile: PriceProfile, window, tpo: bool) -> dict[int, float]:
+    """
+    Rebuild the bins over the window one bin at a time
+    """
+    counts = {}
+    for low, high, volume in window:
+        start = profile.bin_index(low)
+        end = max(profile.bin_index(high), start)
+        overlaps = []
+        for index in range(start, end + 1):
+            edges = profile.bin_edges(index, index + 1)
+            overlaps.append(max(0.0, min(edges[1], high) - max(edges[0], low)))
+        total = sum(overlaps)
+        for i, index in enumerate(range(start, end + 1)):
+            if tpo:
+                amount = 1.0
+            elif start == end:
+                amount = volume
+            elif total > 0:
+                amount = volume * overlaps[i] / total
+            else:
+                amount = volume if i == 0 else 0.0
+            counts[index] = counts.get(index, 0.0) + amount
+    return counts
+
+
+def reference_metrics(profile: PriceProfile, counts: dict[int, float]):
+    indices = sorted(counts)
+    poc = max(indices, key=lambda index: (counts[index], -index))
+    total = sum(counts.values())
+    target = profile.value_area_percentage / 100.0 * total
+    cumulative = 0.0
+    selected = []
+    for index in sorted(indices, key=lambda index: counts[index], reverse=True):
+        cumulative += counts[index]
+        selected.append(index)
+        if cumulative >= target:
+            break
+    return profile.bin_price(poc), profile.bin_price(min(selected)), profile.bin_price(max(selected))
+
+
+def check_profile(profile: PriceProfile, klines, tpo: bool):
+    window = []
+    for low, high, volume in klines:
+        profile.push(low, high, None if tpo else volume)
+        window = (window + [(low, high, volume)])[-profile.period:]
+        counts = reference_profile(profile, window, tpo)
+
+        prices, values = profile.profile()
+        actual = {profile.bin_index(price): value for price, value in zip(prices.tolist(), values.tolist()) if value > 1e-9}
+        expected = {index: value for index, value in counts.items() if value > 1e-9}
+        assert actual.keys() == expected.keys()
+        assert all(math.isclose(actual[index], expected[index], rel_tol=1e-9) for index in expected)
+        assert math.isclose(profile.total(), sum(expected.values()), rel_tol=1e-9)
+
+        poc, val, vah = reference_metrics(profile, expected)
+        if tpo:
+            # TPO counts are whole numbers, so ties are exact
+            assert profile.poc() == poc
+            assert profile.value_area() == (val, vah)
+        else:
+            assert math.isclose(profile.bin_price(profile.bin_index(profile.poc())), profile.poc())
+            assert expected[profile.bin_index(profile.poc())] >= max(expected.values()) * (1 - 1e-9)
+
+
+def test_tick_bins():
+    check_profile(PriceProfile(30, tick_size=0.5), generate_klines(300, 100.0), tpo=False)
+    check_profile(PriceProfile(30, tick_size=0.5), generate_klines(300, 100.0, seed=2), tpo=True)
+
+
+def test_log_bins():
+    check_profile(PriceProfile(40, log_step=0.002), generate_klines(300, 60000.0), tpo=False)
+    check_profile(PriceProfile(40, log_step=0.002), generate_klines(300, 60000.0, seed=3), tpo=True)
+
+
+def test_bins_independent_of_price():
+    # the same moves at very different prices cover the same number of log spaced bins, give or take the bin at the edge
+    cheap = PriceProfile(50, log_step=0.001)
+    expensive = PriceProfile(50, log_step=0.001)
+    for (low, high, volume) in generate_klines(200, 1.0, seed=4):
+        cheap.push(low, high, volume)
+        expensive.push(low * 65536.0, high * 65536.0, volume)
+    assert abs(len(cheap.profile()[0]) - len(expensive.profile()[0])) <= 1
+    assert math.isclose(cheap.total(), expensive.total())
+
+
+def test_log_bins_reject_non_positive_price():
+    profile = PriceProfile(10, log_step=0.001)
+    for price in (0.0, -1.0):
+        try:
+            profile.push(price, 1.0, 1.0)
+        except ValueError:
+            pass
+        else:
+            assert False, f"log spaced bins accepted price {price}"
+    assert len(profile) == 0
+    # tick sized bins are linear, so they still take any price
+    profile = PriceProfile(10, tick_size=0.5)
+    profile.push(-1.0, 1.0, 1.0)
+    assert profile.total() == 1.0
+
+
+def to_kline(low: float, high: float, volume: float) -> Kline:
+    kline = Kline()
+    kline.open = low
+    kline.close = high
+    kline.low = low
+    kline.high = high
+    kline.volume = volume
+    return kline
+
+
+def test_indicators():
+    volume_profile = VolumeProfile(period=50, bins=20)
+    market_profile = MarketProfile(period=50)
+    klines = generate_klines(200, 60000.0, seed=5)
+    for i, (low, high, volume) in enumerate(klines):
+        vp = volume_profile.update(to_kline(low, high, volume))
+        mp = market_profile.update(to_kline(low, high, volume))
+        if i < 49:
+            assert vp is None and mp is None
+            continue
+        window = klines[i - 49:i + 1]
+        lowest = min(low for low, _, _ in window)
+        highest = max(high for _, high, _ in window)
+        # the point of control is always in the value area, and both are inside the window give or take a bin
+        assert lowest * 0.99 <= vp['val'] <= vp['poc'] <= vp['vah'] <= highest * 1.01
+        assert lowest * 0.99 <= mp['val'] <= mp['poc'] <= mp['vah'] <= highest * 1.01
+        assert math.isclose(sum(vp['volume_distribution']), sum(volume for _, _, volume in window), rel_tol=1e-9)
+        assert sum(mp['profile'].values()) == market_profile.profile.total()
+
+
+if __name__ == '__main__':
+    test_tick_bins()
+    test_log_bins()
+    test_bins_independent_of_price()
+    test_log_bins_reject_non_positive_price()
+    test_indicators()
+    print("PriceProfile tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Checks the Profiler timers, the exports, and the per signal timers in SignalStrength
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from cointrader.common.Profiler import Profiler
+from cointrader.strategies.SignalStrength import SignalStrength
+from tests.kline_data import generate_klines
+
+
+def test_nested_timers():
+    profiler = Profiler()
+    for _ in range(3):
+        outer = profiler.start('kline')
+        inner = profiler.start('strategy')
+        sum(range(10000))
+        profiler.stop('BTC-USD', inner)
+        inner = profiler.start('loss_strategy')
+        profiler.stop('BTC-USD', inner)
+        profiler.stop('BTC-USD', outer)
+    start = profiler.start('kline')
+    profiler.stop('ETH-USD', start)
+    profiler.count('BTC-USD', 'klines', 3)
+
+    components = profiler.components()
+    assert list(components.keys())[0] == 'kline'
+    assert components['kline']['count'] == 4
+    assert components['kline;strategy']['count'] == 3
+    assert components['kline']['total_ms'] >= components['kline;strategy']['total_ms']
+    assert set(profiler.components('ETH-USD').keys()) == {'kline'}
+
+    snapshot = profiler.snapshot()
+    assert snapshot['counters'] == {'BTC-USD': {'klines': 3}}
+    assert set(snapshot['timers']['BTC-USD'].keys()) == {'kline', 'kline;strategy', 'kline;loss_strategy'}
+
+    path = os.path.join(tempfile.mkdtemp(), 'profile.json')
+    profiler.save_json(path)
+    with open(path) as f:
+        assert json.load(f)['counters'] == snapshot['counters']
+    os.remove(path)
+
+
+def test_folded():
+    profiler = Profiler()
+    # fake timers, so the self times are exact: kline 10ms, of which strategy 7ms, of which macd 5ms
+    profiler._timers = {
+        ('BTC-USD', 'kline'): [1, 10_000_000, 10_000_000],
+        ('BTC-USD', 'kline;strategy'): [1, 7_000_000, 7_000_000],
+        ('BTC-USD', 'kline;strategy;macd'): [1, 5_000_000, 5_000_000],
+        ('ETH-USD', 'kline;strategy'): [1, 1_000_000, 1_000_000],
+    }
+    assert profiler.folded() == [
+        'BTC-USD;kline 3000',
+        'BTC-USD;kline;strategy 2000',
+        'BTC-USD;kline;strategy;macd 5000',
+        'ETH-USD;kline;strategy 1000',
+    ]
+    assert profiler.folded(by_symbol=False) == ['kline 2000', 'kline;strategy 3000', 'kline;strategy;macd 5000']
+
+
+def test_timer_exception():
+    profiler = Profiler()
+    try:
+        with profiler.timer('BTC-USD', 'kline'):
+            with profiler.timer('BTC-USD', 'strategy'):
+                raise ValueError('failed update')
+    except ValueError:
+        pass
+    # the failed timers are still recorded, and the next timer is not nested under them
+    with profiler.timer('BTC-USD', 'price'):
+        pass
+    assert set(profiler.components().keys()) == {'kline', 'kline;strategy', 'price'}
+
+
+def test_signal_strength_timers():
+    weights = {'macd': 1.0, 'rsi': 1.0, 'kst': 0.5}
+    klines = generate_klines(300)
+    plain = SignalStrength(symbol='BTC-USD', granularity=3600, weights=None)
+    weights = dict(plain._signal_weights, **weights)
+    plain = SignalStrength(symbol='BTC-USD', granularity=3600, weights=dict(weights))
+    profiled = SignalStrength(symbol='BTC-USD', granularity=3600, weights=dict(weights))
+    profiler = Profiler()
+    profiled.set_profiler(profiler)
+
+    for kline in klines:
+        plain.update(kline)
+        with profiler.timer('BTC-USD', 'strategy'):
+            profiled.update(kline)
+        assert plain.buy_signal() == profiled.buy_signal()
+        assert plain.sell_signal() == profiled.sell_signal()
+
+    components = profiler.components()
+    enabled = [name for name in plain.signals.keys() if weights[name] > 0]
+    # the shared EMAs of macd are updated once, before the signals
+    assert set(components.keys()) == {'strategy', 'strategy;indicators', 'strategy;signal_states'} | {f'strategy;{name}' for name in enabled}
+    assert all(components[f'strategy;{name}']['count'] == len(klines) for name in enabled)
+
+
+if __name__ == '__main__':
+    test_nested_timers()
+    test_folded()
+    test_timer_exception()
+    test_signal_strength_timers()
+    print("Profiler tests passed")
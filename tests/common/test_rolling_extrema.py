@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Checks RollingExtrema, and the channel style indicators using it, against rescanning the whole window
+import sys
+import numpy as np
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.common.RollingExtrema import RollingExtrema
+from cointrader.indicators.IchimokuCloud import IchimokuCloud
+from cointrader.indicators.Fibonacci import FibonacciRetracement
+from cointrader.indicators.DonchianChannels import DonchianChannels
+from cointrader.indicators.PriceChannel import PriceChannel
+from cointrader.indicators.WILLR import WILLR
+from cointrader.indicators.STOCH import StochasticOscillator
+from cointrader.indicators.FisherTransform import FisherTransform
+
+
+def generate_klines(count: int, seed: int = 1) -> list[Kline]:
+    rng = np.random.default_rng(seed)
+    # rounded prices, so there are plenty of equal highs and lows in a window
+    close = np.round(100.0 + np.cumsum(rng.normal(0, 1, count)), 0)
+    high = close + np.round(rng.uniform(0, 3, count), 0)
+    low = close - np.round(rng.uniform(0, 3, count), 0)
+    return [Kline(open=float(c), close=float(c), high=float(h), low=float(l), volume=1.0, ts=i * 60)
+            for i, (c, h, l) in enumerate(zip(close, high, low))]
+
+
+def test_rolling_extrema():
+    klines = generate_klines(3000)
+    for period in [1, 2, 5, 52, 500]:
+        extrema = RollingExtrema(period)
+        assert extrema.max() is None and extrema.min() is None
+        for i, kline in enumerate(klines):
+            extrema.push(kline.high, kline.low)
+            window = klines[max(0, i + 1 - period):i + 1]
+            assert extrema.max() == max(k.high for k in window)
+            assert extrema.min() == min(k.low for k in window)
+            assert len(extrema) == len(window)
+            assert extrema.full() == (len(window) == period)
+        extrema.clear()
+        assert len(extrema) == 0 and extrema.max() is None
+
+    extrema = RollingExtrema(3)
+    for value in [5, 1, 4, 2]:
+        extrema.push(value)
+    assert (extrema.max(), extrema.min()) == (4, 1)
+
+
+def test_channel_indicators():
+    klines = generate_klines(2000, seed=2)
+    highs = [k.high for k in klines]
+    lows = [k.low for k in klines]
+
+    def highest(i, period):
+        return max(highs[max(0, i + 1 - period):i + 1])
+
+    def lowest(i, period):
+        return min(lows[max(0, i + 1 - period):i + 1])
+
+    ichimoku = IchimokuCloud()
+    fibonacci = FibonacciRetracement(period=20)
+    donchian = DonchianChannels(period=20)
+    channel = PriceChannel(period=20)
+    willr = WILLR(period=14)
+    stoch = StochasticOscillator(k_period=14, d_period=3)
+    for i, kline in enumerate(klines):
+        value = ichimoku.update(kline)
+        if i + 1 >= 52:
+            assert value['tenkan_sen'] == (highest(i, 9) + lowest(i, 9)) / 2
+            assert value['kijun_sen'] == (highest(i, 26) + lowest(i, 26)) / 2
+            assert value['senkou_span_b'] == (highest(i, 52) + lowest(i, 52)) / 2
+        else:
+            assert value is None
+
+        value = fibonacci.update(kline)
+        assert (value is None) == (i + 1 < 20)
+        if value is not None:
+            assert value['100'] == highest(i, 20) and value['0'] == lowest(i, 20)
+
+        value = donchian.update(kline)
+        if i + 1 >= 20:
+            assert value['upper'] == highest(i, 20) and value['lower'] == lowest(i, 20)
+
+        value = channel.update(kline)
+        if i + 1 >= 20:
+            assert value['middle'] == (highest(i, 20) + lowest(i, 20)) / 2
+            previous_middle = (max(highs[i - 19:i]) + min(lows[i - 19:i])) / 2
+            assert channel.increasing() == (value['middle'] > previous_middle)
+            assert channel.decreasing() == (value['middle'] < previous_middle)
+
+        value = willr.update(kline)
+        if i + 1 >= 14 and highest(i, 14) != lowest(i, 14):
+            assert value == (highest(i, 14) - kline.close) / (highest(i, 14) - lowest(i, 14)) * -100
+
+        value = stoch.update(kline)
+        if value is not None:
+            assert value['pk'] == (kline.close - lowest(i, 14)) / (highest(i, 14) - lowest(i, 14)) * 100.0
+
+    fisher = FisherTransform(length=9)
+    for kline in klines[:8]:
+        assert fisher.update(kline) is None
+    assert fisher.update(klines[8]) is not None
+
+
+if __name__ == '__main__':
+    test_rolling_extrema()
+    test_channel_indicators()
+    print("RollingExtrema tests passed")
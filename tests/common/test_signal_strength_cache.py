@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# Checks that SignalStrength counts the signal weights once per kline, and that the buy/sell decisions and the
+# signal names are the same as counting them from the signal states on every call
+import sys
+sys.path.append('.')
+from cointrader.order.enum.OrderSide import OrderSide
+from cointrader.strategies.SignalStrength import SignalStrength, SIGNAL_STATE_NAMES
+from tests.kline_data import generate_klines
+
+
+def expected_signals(strategy: SignalStrength) -> tuple:
+    buy = sum(strategy._signal_weights[name] for name, state in strategy.signal_states.items() if state == OrderSide.BUY)
+    sell = sum(strategy._signal_weights[name] for name, state in strategy.signal_states.items() if state == OrderSide.SELL)
+    decided = buy != 0 and sell != 0 and buy + sell >= strategy._total_weight / 2
+    names = ("".join(name for name, state in strategy.signal_states.items() if state == OrderSide.BUY),
+             "".join(name for name, state in strategy.signal_states.items() if state == OrderSide.SELL))
+    return (decided and buy > sell, decided and sell > buy, decided and buy >= 2.0 * sell, decided and sell >= 2.0 * buy), names
+
+
+def test_counted_once_per_kline():
+    weights = {name: 1.0 + (i % 3) * 0.5 for i, name in enumerate(SIGNAL_STATE_NAMES)}
+    strategy = SignalStrength(symbol='BTC-USD', granularity=3600, weights=weights)
+    decisions = 0
+    for kline in generate_klines(400, seed=3).klines():
+        strategy.update(kline)
+        signals, names = expected_signals(strategy)
+        # price ticks between klines ask again, and get the counts of the kline
+        for _ in range(3):
+            assert (strategy.buy_signal(), strategy.sell_signal(), strategy.strong_buy_signal(), strategy.strong_sell_signal()) == signals
+        counts = strategy._signal_weight_counts
+        strategy.sell_signal()
+        assert strategy._signal_weight_counts is counts
+        assert (strategy.buy_signal_name(), strategy.sell_signal_name()) == names
+        decisions += any(signals)
+    # the klines gave some buy or sell decisions to compare
+    assert decisions > 0
+
+
+if __name__ == '__main__':
+    test_counted_once_per_kline()
+    print("SignalStrength signal cache tests passed")
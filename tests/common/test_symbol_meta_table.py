@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Checks that AccountSimulate rounds with the compiled SymbolMetaTable like it did by formatting, and keeps exact fixed-point balances
+import os
+import random
+import sys
+import tempfile
+sys.path.append('.')
+from cointrader.account.AccountSimulate import AccountSimulate
+from cointrader.common.AssetInfo import AssetInfo
+from cointrader.common.AssetInfoConfig import AssetInfoConfig
+from cointrader.common.SymbolInfo import SymbolInfo
+from cointrader.common.SymbolInfoConfig import SymbolInfoConfig
+from cointrader.common.SymbolMetaTable import SymbolMetaTable
+
+
+class FakeExchange(object):
+    def name(self) -> str:
+        return 'fake'
+
+
+class CountingSymbolInfo(SymbolInfoConfig):
+    def __init__(self, exchange, path: str):
+        super().__init__(exchange=exchange, path=path)
+        self.lookups = 0
+
+    def get_symbol_info(self, symbol) -> SymbolInfo:
+        self.lookups += 1
+        return super().get_symbol_info(symbol)
+
+
+def symbol_info(base: str, quote: str, base_precision: int, quote_precision: int, base_min_size: float) -> SymbolInfo:
+    info = SymbolInfo()
+    info.load_from_dict({'base_name': base, 'quote_name': quote, 'base_min_size': base_min_size, 'quote_min_size': 1.0,
+                         'base_step_size': 10 ** -base_precision, 'quote_step_size': 10 ** -quote_precision, 'is_currency_pair': True,
+                         'base_precision': base_precision, 'quote_precision': quote_precision, 'orderTypes': []})
+    return info
+
+
+def asset_info(precision: int) -> AssetInfo:
+    info = AssetInfo()
+    info.load_from_dict({'min_size': 0.0, 'step_size': 10 ** -precision, 'precision': precision})
+    return info
+
+
+def account() -> tuple[AccountSimulate, CountingSymbolInfo]:
+    exchange = FakeExchange()
+    directory = tempfile.mkdtemp()
+    symbols = CountingSymbolInfo(exchange=exchange, path=os.path.join(directory, 'symbol_info.json'))
+    symbols.set_symbol_info('BTC-USD', symbol_info('BTC', 'USD', 8, 2, 0.0001))
+    assets = AssetInfoConfig(exchange=exchange, path=os.path.join(directory, 'asset_info.json'))
+    assets.set_asset_info('BTC', asset_info(8))
+    assets.set_asset_info('USD', asset_info(2))
+    return AccountSimulate(exchange=exchange, market=None, symbol_info=symbols, asset_info=assets), symbols
+
+
+def test_meta_table():
+    table = SymbolMetaTable()
+    meta = table.symbol('ETH-USD')
+    assert meta.base_precision == 8 and meta.quote_scale == 10 ** 8 and meta.base_min_size == 0.0
+    assert table.symbol('ETH-USD') is meta
+    assert table.asset('ETH').to_units(1.5) == 150000000
+
+
+def test_rounding():
+    acc, symbols = account()
+    rng = random.Random(7)
+    for _ in range(2000):
+        amount = rng.uniform(0.0, 1000.0)
+        assert acc.round_base('BTC-USD', amount) == float(f"{amount:.8f}")
+        assert acc.round_quote('BTC-USD', amount) == float(f"{amount:.2f}")
+        assert acc.round_asset('USD', amount) == float(f"{amount:.2f}")
+    assert acc.get_base_min_size('BTC-USD') == 0.0001
+    assert acc.get_quote_precision('ETH-USD') == 8
+    # the symbol info is looked up once per symbol, not on every rounding
+    assert symbols.lookups == 2
+
+
+def test_fixed_point_balances():
+    acc, _ = account()
+    acc.update_asset_balance('USD', 100.004, 0.0)
+    assert acc.get_asset_balance('USD') == (100.0, 0.0)
+    for _ in range(10):
+        acc.adjust_asset_balance('USD', -0.1, 0.1)
+    assert acc.get_asset_balance('USD') == (99.0, 1.0)
+    assert acc.adjust_asset_balance('BTC', 0.1, 0.0) == (0.1, 0.0)
+    for _ in range(9):
+        acc.adjust_asset_balance('BTC', 0.1, 0.0)
+    assert acc.get_asset_balance('BTC') == (1.0, 0.0)
+    assert acc.get_account_balances() == {'USD': (99.0, 1.0), 'BTC': (1.0, 0.0)}
+    assert acc.get_asset_balance('ETH') == (0.0, 0.0)
+
+
+if __name__ == '__main__':
+    test_meta_table()
+    test_rounding()
+    test_fixed_point_balances()
+    print("SymbolMetaTable tests passed")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Checks that TimeframeAggregator builds epoch aligned klines of several granularities, with gaps in the source klines
+import sys
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.common.KlineEmitter import KlineEmitter
+from cointrader.common.TimeframeAggregator import TimeframeAggregator
+
+BASE = 1700006400 // 86400 * 86400
+
+
+def make_kline(ts: int, price: float, volume: float = 1.0) -> Kline:
+    return Kline(symbol='BTC-USD', open=price, close=price + 0.5, low=price - 1.0, high=price + 1.0, volume=volume, ts=ts, granularity=300)
+
+
+def test_matches_emitter():
+    # on complete and aligned klines the buckets have the OHLCV of the KlineEmitter klines, at the start of the bucket
+    klines = [make_kline(BASE + i * 300, 100.0 + (i * 7) % 13, volume=i) for i in range(12 * 24)]
+    aggregator = TimeframeAggregator(src_granularity=300, dst_granularities=[3600, 900])
+    emitter = KlineEmitter(src_granularity=300, dst_granularity=3600)
+    hourly = []
+    counts = {900: 0, 3600: 0}
+    for kline in klines:
+        for kline_other in aggregator.update(kline):
+            counts[kline_other.granularity] += 1
+            if kline_other.granularity == 3600:
+                hourly.append(kline_other)
+        emitter.update(kline)
+        if emitter.ready():
+            expected = emitter.emit()
+            emitter.reset()
+            result = hourly[-1]
+            assert (result.open, result.close, result.low, result.high, result.volume) == (expected.open, expected.close, expected.low, expected.high, expected.volume)
+            assert result.ts == expected.ts - 3300 and result.symbol == 'BTC-USD'
+    assert counts == {900: 96, 3600: 24} and aggregator.flush() == []
+
+
+def test_gaps_and_alignment():
+    aggregator = TimeframeAggregator(src_granularity=3600, dst_granularities=[86400, 21600], symbol='ETH-USD')
+    # the stream starts in the middle of a 6h bucket, and hours 8 to 13 have no klines
+    emitted = []
+    for hour in [3, 4, 5, 6, 7, 14, 15, 16, 17]:
+        emitted += aggregator.update(make_kline(BASE + hour * 3600, 10.0 + hour))
+    # a repeated kline is ignored
+    assert aggregator.update(make_kline(BASE + 17 * 3600, 50.0)) == []
+    assert [(k.granularity, (k.ts - BASE) // 3600) for k in emitted] == [(21600, 0), (21600, 6), (21600, 12)]
+    assert emitted[1].open == 16.0 and emitted[1].close == 17.5 and emitted[1].volume == 2
+    assert emitted[2].high == 28.0 and emitted[2].symbol == 'ETH-USD'
+    # the day is still being built
+    rest = aggregator.flush()
+    assert [(k.granularity, k.ts - BASE) for k in rest] == [(86400, 0)]
+    assert rest[-1].low == 12.0 and rest[-1].volume == 9
+
+
+def test_drop_partial():
+    aggregator = TimeframeAggregator(src_granularity=300, dst_granularities=[900], emit_partial=False)
+    emitted = []
+    for i in [0, 1, 2, 3, 5, 6, 7, 8]:
+        emitted += aggregator.update(make_kline(BASE + i * 300, 1.0))
+    # the bucket of klines 3 to 5 is missing kline 4
+    assert [(k.ts - BASE) // 900 for k in emitted] == [0, 2]
+    try:
+        TimeframeAggregator(src_granularity=300, dst_granularities=[1000])
+        assert False
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_matches_emitter()
+    test_gaps_and_alignment()
+    test_drop_partial()
+    print("TimeframeAggregator tests passed")
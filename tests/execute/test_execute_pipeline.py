@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Checks that the ExecutePipeline returns the order results through futures, in the calling thread and from the worker threads
+import sys
+import threading
+import time
+sys.path.append('.')
+from cointrader.execute.pipeline.ExecutePipeline import ExecutePipeline
+from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.enum.OrderType import OrderType
+
+
+class FakeExecute(object):
+    """
+    Executes orders after delay seconds, and fails the orders of the symbol FAIL-USD
+    """
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.threads = set()
+
+    def account(self):
+        return None
+
+    def execute_order(self, order_request: OrderRequest) -> OrderResult:
+        self.threads.add(threading.current_thread().name)
+        if order_request.symbol == 'FAIL-USD':
+            raise RuntimeError("order failed")
+        time.sleep(self.delay)
+        result = OrderResult(symbol=order_request.symbol)
+        result.id = order_request.rid
+        return result
+
+
+def request(symbol: str = 'BTC-USD') -> OrderRequest:
+    return OrderRequest(symbol=symbol, type=OrderType.MARKET, size=1.0, current_price=100.0, current_ts=0)
+
+
+def test_not_threaded():
+    execute = FakeExecute()
+    pipe = ExecutePipeline(execute=execute)
+    requests = [request() for _ in range(3)]
+    futures = pipe.process_order_requests_batch(requests)
+    assert not any(future.done() for future in futures)
+    # waiting for one executes all the queued requests in this thread
+    assert pipe.wait_order_result(requests[1].rid).id == requests[1].rid
+    assert all(future.done() for future in futures)
+    assert execute.threads == {threading.current_thread().name}
+    assert pipe.completed(requests[1].rid) and not pipe.completed(requests[1].rid)
+    assert pipe.wait_order_result(requests[1].rid) is None
+
+
+def test_threaded():
+    execute = FakeExecute(delay=0.05)
+    pipe = ExecutePipeline(execute=execute, threaded=True, workers=4)
+    requests = [request() for _ in range(8)] + [request('FAIL-USD')]
+    done = []
+    start = time.perf_counter()
+    futures = pipe.process_order_requests_batch(requests)
+    for future in futures:
+        future.add_done_callback(done.append)
+
+    results = [pipe.wait_order_result(order_request.rid) for order_request in requests]
+    elapsed = time.perf_counter() - start
+    assert [result.id for result in results[:-1]] == [order_request.rid for order_request in requests[:-1]]
+    # the failed order is reported as no result, not as an exception in the caller
+    assert results[-1] is None and isinstance(futures[-1].exception(), RuntimeError)
+    # 8 orders of 50ms on 4 workers
+    assert elapsed < 0.35
+    assert len(done) == len(requests)
+    assert threading.current_thread().name not in execute.threads
+
+    slow = request()
+    pipe = ExecutePipeline(execute=FakeExecute(delay=0.2), threaded=True, timeout=0.01)
+    pipe.process_order_request(slow)
+    assert pipe.wait_order_result(slow.rid) is None
+    assert pipe.wait_order_result(slow.rid, timeout=5).id == slow.rid
+    pipe.shutdown()
+
+
+if __name__ == '__main__':
+    test_not_threaded()
+    test_threaded()
+    print("ExecutePipeline tests passed")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# Checks that TraderExecuteSimulate fills the resting orders crossed by the low and high of a kline, and drops the completed orders
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.execute.SimulateOrderBook import SimulateOrderBook
+from cointrader.execute.TradeExecuteSimulate import TraderExecuteSimulate
+from cointrader.order.enum.OrderStatus import OrderStatus
+from cointrader.trade.TraderConfig import TraderConfig
+
+
+class FakeExchange(object):
+    def info_ticker_get_base(self, symbol: str) -> str:
+        return symbol.split('-')[0]
+
+    def info_ticker_get_quote(self, symbol: str) -> str:
+        return symbol.split('-')[1]
+
+
+class FakeAccount(object):
+    def __init__(self, balances: dict[str, float]):
+        self.balances = {name: [balance, 0.0] for name, balance in balances.items()}
+
+    def round_base(self, symbol: str, amount: float) -> float:
+        return amount
+
+    def round_quote(self, symbol: str, amount: float) -> float:
+        return amount
+
+    def get_base_min_size(self, symbol: str) -> float:
+        return 0.0
+
+    def get_asset_balance(self, name: str):
+        return tuple(self.balances.setdefault(name, [0.0, 0.0]))
+
+    def update_asset_balance(self, name: str, balance: float, hold: float):
+        self.balances[name] = [balance, hold]
+
+    def adjust_asset_balance(self, name: str, balance: float, hold: float):
+        current = self.balances.setdefault(name, [0.0, 0.0])
+        current[0] += balance
+        current[1] += hold
+        return tuple(current)
+
+
+def kline(low: float, high: float, ts: int, symbol: str = 'BTC-USD') -> Kline:
+    return Kline(symbol=symbol, open=low, close=high, low=low, high=high, volume=1.0, ts=ts, granularity=3600)
+
+
+def simulate(max_completed: int = 1000) -> tuple[TraderExecuteSimulate, FakeAccount]:
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    account = FakeAccount({'USD': 1000.0, 'BTC': 10.0})
+    return TraderExecuteSimulate(exchange=FakeExchange(), account=account, config=config, max_completed=max_completed), account
+
+
+def test_order_book():
+    book = SimulateOrderBook()
+    book.add('buy90', 90.0, falling=True)
+    book.add('buy95', 95.0, falling=True)
+    book.add('sell110', 110.0, falling=False)
+    book.add('sell105', 105.0, falling=False)
+    assert book.match(96.0, 104.0) == []
+    assert book.remove('buy95') and not book.remove('buy95')
+    assert book.match(89.0, 106.0) == ['buy90', 'sell105']
+    assert len(book) == 1 and 'sell110' in book
+
+
+def test_kline_range_fills():
+    ex, account = simulate()
+    buy = ex.limit_buy('BTC-USD', limit_price=95.0, amount=1.0)
+    sell = ex.limit_sell('BTC-USD', limit_price=110.0, amount=1.0)
+    stop = ex.stop_loss_limit_sell('BTC-USD', limit_price=90.0, stop_price=91.0, amount=1.0)
+    assert account.balances['USD'] == [905.0, 95.0]
+    assert account.balances['BTC'] == [8.0, 2.0]
+
+    assert ex.market_update_kline('BTC-USD', kline(96.0, 105.0, 0)) == []
+    # the close of the next kline is above the limit price, only its low crosses it
+    filled = ex.market_update_kline('BTC-USD', kline(94.0, 108.0, 3600))
+    assert filled == [buy]
+    assert buy.status == OrderStatus.FILLED and buy.price == 95.0 and buy.filled_ts == 3600
+    assert account.balances['USD'] == [905.0, 0.0] and account.balances['BTC'] == [9.0, 2.0]
+    assert ex.status('BTC-USD', buy.id, current_price=108.0, current_ts=3600) is buy
+
+    filled = ex.market_update_kline('BTC-USD', kline(89.0, 111.0, 7200))
+    assert filled == [stop, sell]
+    assert account.balances['USD'] == [1105.0, 0.0] and account.balances['BTC'] == [9.0, 0.0]
+    assert ex.open_orders() == {}
+
+
+def test_status_and_cancel():
+    ex, account = simulate(max_completed=2)
+    buy = ex.limit_buy('BTC-USD', limit_price=95.0, amount=1.0)
+    stop = ex.stop_loss_limit_buy('BTC-USD', limit_price=105.0, stop_price=104.0, amount=1.0)
+    assert set(ex.open_orders('BTC-USD')) == {buy.id, stop.id}
+
+    # polling with the current price fills the order the same way, and takes it out of the book
+    assert ex.status('BTC-USD', stop.id, current_price=106.0, current_ts=10).status == OrderStatus.FILLED
+    assert ex.market_update_kline('BTC-USD', kline(90.0, 110.0, 20)) == [buy]
+
+    sell = ex.limit_sell('BTC-USD', limit_price=120.0, amount=1.0)
+    assert ex.cancel('BTC-USD', sell.id, current_price=100.0, current_ts=30).status == OrderStatus.CANCELLED
+    assert account.balances['BTC'] == [12.0, 0.0]
+    assert ex.market_update_kline('BTC-USD', kline(90.0, 130.0, 40)) == []
+
+    # only the last max_completed orders are kept
+    assert ex.status('BTC-USD', stop.id, current_price=100.0, current_ts=50).status == OrderStatus.UNKNOWN
+    assert ex.status('BTC-USD', sell.id, current_price=100.0, current_ts=50) is sell
+
+
+def test_failed_fill():
+    ex, account = simulate()
+    buy = ex.limit_buy('BTC-USD', limit_price=95.0, amount=1.0)
+    sell = ex.limit_sell('BTC-USD', limit_price=105.0, amount=1.0)
+    # the quote hold of the buy is gone, so it can't be filled
+    account.balances['USD'][1] = 0.0
+    assert ex.market_update_kline('BTC-USD', kline(90.0, 110.0, 0)) == [sell]
+    assert buy.status == OrderStatus.PLACED and account.balances['USD'] == [1010.0, 0.0]
+
+    # the buy is still in the book, and fills once the hold is back
+    account.balances['USD'][1] = 95.0
+    assert ex.market_update_kline('BTC-USD', kline(90.0, 110.0, 3600)) == [buy]
+    assert buy.status == OrderStatus.FILLED and ex.open_orders() == {}
+
+
+if __name__ == '__main__':
+    test_order_book()
+    test_kline_range_fills()
+    test_status_and_cancel()
+    test_failed_fill()
+    print("TraderExecuteSimulate tests passed")
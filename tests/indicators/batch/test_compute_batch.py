@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Checks that Indicator.compute_batch() matches streaming update() for every indicator,
+# and that streaming can continue after a batch without any difference in output
+import importlib
+import inspect
+import os
+import sys
+import numpy as np
+sys.path.append('.')
+from cointrader.common.Indicator import Indicator
+from cointrader.common.Kline import Kline
+from tests.kline_data import generate_klines
+
+INDICATORS_PATH = 'cointrader/indicators'
+
+
+def indicator_classes():
+    for filename in sorted(os.listdir(INDICATORS_PATH)):
+        if not filename.endswith('.py'):
+            continue
+        module = importlib.import_module(f'cointrader.indicators.{filename[:-3]}')
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, Indicator) and cls is not Indicator and cls.__module__ == module.__name__:
+                yield cls
+
+
+def to_array(values):
+    # None becomes NaN, outputs which aren't numbers are kept as objects
+    try:
+        result = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        if result.ndim == 1:
+            return result
+    except (TypeError, ValueError):
+        pass
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
+
+
+def stream(indicator: Indicator, arrays, start: int, end: int):
+    """
+    Outputs of update() for klines start to end, in the same columns as compute_batch()
+    """
+    open, high, low, close, volume, ts = arrays
+    outputs = []
+    for i in range(start, end):
+        kline = Kline(open=float(open[i]), close=float(close[i]), low=float(low[i]), high=float(high[i]),
+                      volume=float(volume[i]), ts=int(ts[i]))
+        outputs.append(indicator.update(kline))
+    keys = list(dict.fromkeys(key for output in outputs if isinstance(output, dict) for key in output.keys()))
+    if not keys:
+        return to_array(outputs)
+    return {key: to_array([output.get(key) if isinstance(output, dict) else None for output in outputs]) for key in keys}
+
+
+def concat(first, second):
+    if isinstance(first, dict):
+        return {key: np.concatenate((first[key], second[key])) for key in first.keys()}
+    return np.concatenate((first, second))
+
+
+def assert_same(name, expected, actual):
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict), f"{name}: expected dict result"
+        assert expected.keys() == actual.keys(), f"{name}: {expected.keys()} != {actual.keys()}"
+        for key in expected.keys():
+            assert_same(f"{name}[{key}]", expected[key], actual[key])
+        return
+    if expected.dtype == object:
+        assert len(expected) == len(actual), f"{name}: length mismatch"
+        return
+    assert np.allclose(expected, actual, rtol=1e-9, atol=1e-9, equal_nan=True), f"{name}: batch output differs from update()"
+
+
+def test_compute_batch_matches_update():
+    arrays = generate_klines(600).arrays()
+    split = 350
+    for cls in indicator_classes():
+        name = cls.__name__
+        expected = stream(cls(), arrays, 0, len(arrays[3]))
+
+        # batch everything
+        assert_same(f"{name} batch", expected, cls().compute_batch(*arrays))
+
+        # batch the preload, then continue streaming from the batch state
+        indicator = cls()
+        first = indicator.compute_batch(*[a[:split] for a in arrays])
+        second = stream(indicator, arrays, split, len(arrays[3]))
+        assert_same(f"{name} batch+stream", expected, concat(first, second))
+
+        # stream first, then batch the remainder
+        indicator = cls()
+        first = stream(indicator, arrays, 0, split)
+        second = indicator.compute_batch(*[a[split:] for a in arrays])
+        assert_same(f"{name} stream+batch", expected, concat(first, second))
+
+
+if __name__ == '__main__':
+    test_compute_batch_matches_update()
+    print("compute_batch() matches update() for all indicators")
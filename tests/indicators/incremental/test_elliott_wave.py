@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Checks the zig-zag ElliottWaveIndicator against a peak search over the whole price history, done the way
+# scipy.signal.find_peaks does it (distance filter, then prominence filter) followed by the peak / trough alternation
+import sys
+sys.path.append('.')
+import numpy as np
+from cointrader.common.Kline import Kline
+from cointrader.signals.ElliotWave import ElliottWaveIndicator, ELLIOTT_WAVE_LABELS
+
+
+def find_peaks(x: list[float], distance: int, prominence: float) -> list[int]:
+    peaks = [i for i in range(1, len(x) - 1) if x[i - 1] < x[i] > x[i + 1]]
+
+    # highest peaks first, each removes the lower peaks closer than distance
+    keep = {peak: True for peak in peaks}
+    for peak in sorted(peaks, key=lambda peak: x[peak], reverse=True):
+        if not keep[peak]:
+            continue
+        for other in peaks:
+            if other != peak and abs(other - peak) < distance:
+                keep[other] = False
+    peaks = [peak for peak in peaks if keep[peak]]
+
+    result = []
+    for peak in peaks:
+        left_min = x[peak]
+        i = peak
+        while i >= 0 and x[i] <= x[peak]:
+            left_min = min(left_min, x[i])
+            i -= 1
+        right_min = x[peak]
+        i = peak
+        while i < len(x) and x[i] <= x[peak]:
+            right_min = min(right_min, x[i])
+            i += 1
+        if x[peak] - max(left_min, right_min) >= prominence:
+            result.append(peak)
+    return result
+
+
+def reference_waves(prices: list[float], distance: int, prominence: float) -> list[tuple[str, int]]:
+    peaks = find_peaks(prices, distance, prominence)
+    troughs = find_peaks([-price for price in prices], distance, prominence)
+    waves = []
+    for index, wave_type in sorted([(peak, 'peak') for peak in peaks] + [(trough, 'trough') for trough in troughs]):
+        if waves and waves[-1][0] == wave_type:
+            # If two consecutive peaks or troughs, keep the more extreme one
+            last = prices[waves[-1][1]]
+            if (wave_type == 'peak' and prices[index] > last) or (wave_type == 'trough' and prices[index] < last):
+                waves[-1] = (wave_type, index)
+            continue
+        waves.append((wave_type, index))
+    return waves
+
+
+def generate_prices(count: int, seed: int) -> list[float]:
+    rng = np.random.default_rng(seed)
+    return (100.0 + np.cumsum(rng.normal(0, 0.3, count))).tolist()
+
+
+def run_indicator(prices: list[float], min_distance: int) -> ElliottWaveIndicator:
+    indicator = ElliottWaveIndicator(period=len(prices) + 1, max_waves=len(prices))
+    indicator.min_distance = min_distance
+    kline = Kline()
+    for i, price in enumerate(prices):
+        kline.ts = 1700000000 + i * 300
+        kline.close = price
+        indicator.update(kline)
+    return indicator
+
+
+def test_matches_prominence_peaks():
+    for seed in range(5):
+        prices = generate_prices(2000, seed)
+        indicator = run_indicator(prices, min_distance=1)
+        expected = reference_waves(prices, distance=1, prominence=indicator.min_prominence * indicator.sensitivity)
+        actual = [(wave['type'], wave['index']) for wave in indicator.waves]
+        # the reference sees the whole history, so it may also have the extreme the zig-zag hasn't confirmed yet
+        assert expected[:len(actual)] == actual
+        assert len(expected) - len(actual) <= 1
+
+
+def test_min_distance():
+    prices = generate_prices(2000, 7)
+    indicator = run_indicator(prices, min_distance=5)
+    waves = list(indicator.waves)
+    assert [wave['type'] for wave in waves[1:]] == ['trough' if wave['type'] == 'peak' else 'peak' for wave in waves[:-1]]
+    assert all(waves[i + 2]['index'] - waves[i]['index'] >= 5 for i in range(len(waves) - 2))
+    assert all(prices[wave['index']] == wave['price'] for wave in waves)
+    assert [wave['elliott_wave'] for wave in waves] == [ELLIOTT_WAVE_LABELS[i % 8] for i in range(len(waves))]
+
+
+def test_window():
+    prices = generate_prices(3000, 9)
+    indicator = ElliottWaveIndicator(period=500, max_waves=8)
+    kline = Kline()
+    for i, price in enumerate(prices):
+        kline.ts = i
+        kline.close = price
+        waves = indicator.update(kline)
+        if waves is not None:
+            assert len(waves) <= 8
+            assert all(wave['index'] > i - 500 for wave in waves)
+
+
+if __name__ == '__main__':
+    test_matches_prominence_peaks()
+    test_min_distance()
+    test_window()
+    print("ElliottWaveIndicator tests passed")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Checks the running sum WMA, KAMA and HMA against the previous implementations, which recomputed the whole window every update
+import sys
+from collections import deque
+from math import sqrt
+sys.path.append('.')
+import numpy as np
+from cointrader.indicators.WMA import WMA
+from cointrader.indicators.KAMA import KAMA
+from cointrader.indicators.HULL import HMA
+from cointrader.common.Kline import Kline
+
+PERIODS = [1, 2, 3, 10, 14, 55, 200]
+
+
+class ReferenceWMA(object):
+    def __init__(self, period=14):
+        self.period = period
+        self.values = deque(maxlen=period)
+
+    def update_with_value(self, value):
+        self.values.append(value)
+        if len(self.values) < self.period:
+            return None
+        weights = range(1, len(self.values) + 1)
+        return sum(v * w for v, w in zip(self.values, weights)) / sum(weights)
+
+
+class ReferenceKAMA(object):
+    def __init__(self, period=10, fast_period=2, slow_period=30):
+        self.period = period
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.values = deque(maxlen=period)
+        self._last_value = None
+
+    def update_with_value(self, value):
+        self.values.append(value)
+        if len(self.values) == self.period:
+            change = abs(self.values[-1] - self.values[0])
+            volatility = sum(abs(self.values[i] - self.values[i - 1]) for i in range(1, self.period))
+            er = change / volatility if volatility != 0 else 0
+            sc = (er * (2 / (self.fast_period + 1) - 2 / (self.slow_period + 1)) + 2 / (self.slow_period + 1)) ** 2
+            if self._last_value is None:
+                self._last_value = self.values[-1]
+            self._last_value = self._last_value + sc * (self.values[-1] - self._last_value)
+        return self._last_value
+
+
+class ReferenceHMA(object):
+    def __init__(self, period=14):
+        self.wma_full = ReferenceWMA(period)
+        self.wma_half = ReferenceWMA(period // 2)
+        self.wma_hull = ReferenceWMA(int(sqrt(period)))
+        self._last_value = None
+
+    def update_with_value(self, value):
+        half = self.wma_half.update_with_value(value)
+        full = self.wma_full.update_with_value(value)
+        if half is not None and full is not None:
+            self._last_value = self.wma_hull.update_with_value(2 * half - full)
+        return self._last_value
+
+
+def generate_values(count: int, seed: int = 1) -> list[float]:
+    rng = np.random.default_rng(seed)
+    values = 20000.0 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    # flat stretches, where the KAMA volatility is exactly 0
+    values[1000:1300] = values[1000]
+    values[3000:3005] = values[3000]
+    return values.tolist()
+
+
+def assert_same(expected, actual):
+    assert len(expected) == len(actual)
+    for e, a in zip(expected, actual):
+        if e is None or a is None:
+            assert e is None and a is None
+        else:
+            assert np.isclose(a, e, rtol=1e-9, atol=0), (e, a)
+
+
+def test_wma():
+    values = generate_values(5000)
+    for period in PERIODS:
+        reference = ReferenceWMA(period=period)
+        wma = WMA(period=period)
+        assert_same([reference.update_with_value(v) for v in values], [wma.update_with_value(v) for v in values])
+        wma.reset()
+        reference = ReferenceWMA(period=period)
+        assert_same([reference.update_with_value(v) for v in values[:300]], [wma.update_with_value(v) for v in values[:300]])
+
+
+def test_kama():
+    values = generate_values(5000, seed=2)
+    for period in PERIODS:
+        reference = ReferenceKAMA(period=period)
+        kama = KAMA(period=period)
+        assert_same([reference.update_with_value(v) for v in values], [kama.update_with_value(v) for v in values])
+        kama.reset()
+        reference = ReferenceKAMA(period=period)
+        assert_same([reference.update_with_value(v) for v in values[:300]], [kama.update_with_value(v) for v in values[:300]])
+
+
+def test_hma():
+    values = generate_values(5000, seed=3)
+    for period in PERIODS[2:]:
+        reference = ReferenceHMA(period=period)
+        hma = HMA(period=period)
+        assert_same([reference.update_with_value(v) for v in values], [hma.update(Kline(close=v))['hma'] for v in values])
+
+
+if __name__ == '__main__':
+    test_wma()
+    test_kama()
+    test_hma()
+    print("WMA, KAMA and HMA match the previous implementations")
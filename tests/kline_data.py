@@ -0,0 +1,35 @@
+# Random walk klines shared by the tests, the same for a given count and seed
+import numpy as np
+import pandas as pd
+from cointrader.common.KlineArray import KlineArray
+
+
+def generate_klines(count: int, seed: int = 1, symbol: str = 'BTC-USD', granularity: int = 3600) -> KlineArray:
+    rng = np.random.default_rng(seed)
+    close = 20000.0 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    open = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open, close) * (1 + rng.uniform(0, 0.01, count))
+    low = np.minimum(open, close) * (1 - rng.uniform(0, 0.01, count))
+    volume = rng.uniform(10, 1000, count)
+    ts = 1700000000 + np.arange(count, dtype=np.int64) * granularity
+    return KlineArray(symbol=symbol, granularity=granularity, ts=ts, open=open, high=high, low=low, close=close, volume=volume)
+
+
+def generate_csv(path: str, symbols: list[str], count: int):
+    """
+    Write hourly klines for symbols in the same format as data/crypto_hourly_data/cryptotoken_full_binance_1h.csv
+    """
+    dates = pd.date_range('2020-01-01', periods=count, freq='h').strftime('%Y-%m-%d %H:%M:%S')
+    frames = []
+    for seed, symbol in enumerate(symbols):
+        klines = generate_klines(count, seed=seed, symbol=symbol)
+        frames.append(pd.DataFrame({
+            'Date': dates,
+            'Symbol': symbol.replace('-', ''),
+            'Open': klines.open,
+            'High': klines.high,
+            'Low': klines.low,
+            'Close': klines.close,
+            'Volume USDT': klines.volume
+        }))
+    pd.concat(frames).to_csv(path, index=False)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Checks that the write-behind OrderStorage writes the same orders as the direct writes, and coalesces the writes per order
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+sys.path.append('.')
+from cointrader.order.Order import Order
+from cointrader.order.OrderStorage import OrderStorage
+from cointrader.order.enum.OrderSide import OrderSide
+from cointrader.order.enum.OrderStatus import OrderStatus
+from cointrader.order.enum.OrderType import OrderType
+from cointrader.trade.TraderConfig import TraderConfig
+
+
+def make_order(order_id: str, symbol: str, price: float) -> Order:
+    order = Order(symbol=symbol)
+    order.id = order_id
+    order.type = OrderType.LIMIT
+    order.side = OrderSide.BUY
+    order.price = price
+    order.limit_price = price
+    order.size = 1.5
+    order.status = OrderStatus.PLACED
+    return order
+
+
+def apply_updates(storage: OrderStorage):
+    for i in range(20):
+        storage.add_order(make_order(f"order-{i}", 'BTC-USD' if i % 2 else 'ETH-USD', 100.0 + i))
+    for step in range(10):
+        for i in range(20):
+            order = make_order(f"order-{i}", 'BTC-USD' if i % 2 else 'ETH-USD', 100.0 + i + step)
+            order.filled_size = step * 0.1
+            storage.update_order(order)
+    for i in range(0, 20, 3):
+        storage.update_order_active(f"order-{i}", False)
+    storage.update_order_status('order-1', OrderStatus.FILLED.name)
+    storage.delete_order('order-2')
+    storage.update_order_active('order-2', False)
+
+
+def rows(db_path: str) -> list[tuple]:
+    connection = sqlite3.connect(db_path)
+    result = connection.execute('SELECT * FROM orders ORDER BY id').fetchall()
+    connection.close()
+    return result
+
+
+def test_matches_direct_writes():
+    directory = tempfile.mkdtemp()
+    config = TraderConfig(path=os.path.join(directory, 'config.json'))
+
+    direct = OrderStorage(config=config, db_path=os.path.join(directory, 'direct.db'), write_behind=False)
+    apply_updates(direct)
+    direct.commit()
+
+    storage = OrderStorage(config=config, db_path=os.path.join(directory, 'write_behind.db'), write_behind=True)
+    apply_updates(storage)
+    # reads see the queued writes
+    assert storage.get_order('order-1').status == OrderStatus.FILLED
+    assert storage.get_order('order-2') is None
+    assert len(storage.get_active_orders(symbol='ETH-USD')) == len([i for i in range(0, 20, 2) if i % 3 != 0 and i != 2])
+    assert rows(storage.db_path) == rows(direct.db_path)
+
+    stats = storage.stats()
+    assert stats['queued'] == 20 + 200 + 7 + 2 + 1 and stats['pending'] == 0
+    # each order is written once per batch, not once per write
+    assert stats['written'] < stats['queued']
+    storage.close()
+
+
+def test_flush_on_close():
+    directory = tempfile.mkdtemp()
+    config = TraderConfig(path=os.path.join(directory, 'config.json'))
+    config.set('orders_db_flush_interval', 60.0)
+    storage = OrderStorage(config=config, db_path=os.path.join(directory, 'orders.db'), write_behind=True)
+    storage.add_order(make_order('order-0', 'BTC-USD', 100.0))
+    storage.update_order_active('order-0', False)
+    assert storage.stats()['pending'] == 1
+    storage.close()
+    assert rows(storage.db_path)[0][:3] == ('order-0', 0, 0)
+
+
+def test_failed_write_is_kept():
+    directory = tempfile.mkdtemp()
+    config = TraderConfig(path=os.path.join(directory, 'config.json'))
+    config.set('orders_db_flush_interval', 0.05)
+    db_path = os.path.join(directory, 'orders.db')
+    storage = OrderStorage(config=config, db_path=db_path, write_behind=True)
+    connection = sqlite3.connect(db_path)
+    connection.execute('DROP TABLE orders')
+    connection.commit()
+
+    storage.add_order(make_order('order-0', 'BTC-USD', 100.0))
+    try:
+        storage.flush()
+        assert False
+    except RuntimeError:
+        pass
+    # the failed insert is still pending, and a newer write is merged into it
+    storage.update_order_active('order-0', False)
+    assert storage.stats()['pending'] == 1
+
+    OrderStorage(config=config, db_path=db_path, reset=False, write_behind=False)
+    assert storage.flush(timeout=5.0)
+    assert rows(db_path)[0][:3] == ('order-0', 0, 0)
+    storage.close()
+    connection.close()
+
+
+def test_writes_after_close():
+    directory = tempfile.mkdtemp()
+    config = TraderConfig(path=os.path.join(directory, 'config.json'))
+    storage = OrderStorage(config=config, db_path=os.path.join(directory, 'orders.db'), write_behind=True)
+    storage.add_order(make_order('order-0', 'BTC-USD', 100.0))
+    readers = []
+    thread = threading.Thread(target=lambda: readers.append(storage.get_connection()))
+    thread.start()
+    thread.join()
+    storage.close()
+    # the reader connections of all threads are closed
+    try:
+        readers[0].execute('SELECT 1')
+        assert False
+    except sqlite3.ProgrammingError:
+        pass
+
+    # with the writer stopped, writes go to the database and reads don't wait for a writer
+    result = []
+    def write_and_read():
+        storage.update_order_active('order-0', False)
+        result.append(storage.get_order('order-0'))
+    thread = threading.Thread(target=write_and_read)
+    thread.start()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive() and result[0].active == 0
+    assert storage.flush()
+
+
+if __name__ == '__main__':
+    test_matches_direct_writes()
+    test_flush_on_close()
+    test_failed_write_is_kept()
+    test_writes_after_close()
+    print("OrderStorage tests passed")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Checks that the Orders index follows the order updates, and is rebuilt from the order storage on startup
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from cointrader.order.Orders import Orders
+from cointrader.trade.TraderConfig import TraderConfig
+from test_order_storage import make_order
+
+
+def test_index():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    orders = Orders(config=config, db_path=None)
+    for i in range(6):
+        order = make_order(f"order-{i}", 'BTC-USD' if i % 2 else 'ETH-USD', 100.0 + i)
+        order.pid = i // 2
+        order.active = True
+        orders.add_order(order.symbol, order)
+
+    assert orders.get_order('BTC-USD', 'order-1').price == 101.0
+    # the order exists, but not for this symbol
+    assert orders.get_order('ETH-USD', 'order-1') is None
+    assert orders.get_order(None, 'order-1') is not None
+    assert [order.id for order in orders.get_position_orders('BTC-USD', 0)] == ['order-1']
+
+    orders.update_order_active('BTC-USD', 'order-1', False)
+    assert [order.id for order in orders.get_active_orders('BTC-USD')] == ['order-3', 'order-5']
+    assert len(orders.get_all_orders('BTC-USD')) == 3
+
+    # a changed pid moves the order to the other position
+    order = orders.get_order('ETH-USD', 'order-0')
+    order.pid = 7
+    order.active = False
+    orders.update_order('ETH-USD', order)
+    assert orders.get_position_orders('ETH-USD', 0) == []
+    assert orders.get_position_orders('ETH-USD', 7) == [order]
+    assert [order.id for order in orders.get_active_orders('ETH-USD')] == ['order-2', 'order-4']
+
+    assert orders.remove_order('ETH-USD', 'order-2')
+    assert not orders.remove_order('ETH-USD', 'order-2')
+    assert len(orders.get_active_orders(None)) == 3
+    assert len(orders.get_all_orders()) == 5
+
+
+def test_restore():
+    directory = tempfile.mkdtemp()
+    config = TraderConfig(path=os.path.join(directory, 'config.json'))
+    db_path = os.path.join(directory, 'orders.db')
+    orders = Orders(config=config, db_path=db_path)
+    for i in range(4):
+        order = make_order(f"order-{i}", 'BTC-USD', 100.0 + i)
+        order.pid = i // 2
+        order.active = True
+        orders.add_order('BTC-USD', order)
+    orders.update_order_active('BTC-USD', 'order-0', False)
+    orders.remove_order('BTC-USD', 'order-3')
+    orders.commit()
+
+    restored = Orders(config=config, db_path=db_path, reset=False)
+    assert [order.id for order in restored.get_active_orders('BTC-USD')] == ['order-1', 'order-2']
+    assert [order.id for order in restored.get_position_orders('BTC-USD', 0)] == ['order-0', 'order-1']
+    assert restored.get_order('BTC-USD', 'order-2').price == 102.0
+    assert restored.get_order('BTC-USD', 'order-3') is None
+
+
+if __name__ == '__main__':
+    test_index()
+    test_restore()
+    print("Orders tests passed")
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# Checks the asyncio live runtime against a local mock exchange: the orders of many symbols are placed and polled
+# concurrently on the event loop, while the trader code runs on its one trader thread
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.exchange.AsyncTraderExchangeBase import AsyncTraderExchangeBase
+from cointrader.execute.AsyncTradeExecute import AsyncTraderExecute
+from cointrader.execute.pipeline.AsyncExecutePipeline import AsyncExecutePipeline
+from cointrader.market.PriceCache import PriceCache
+from cointrader.order.Order import Order
+from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.Orders import Orders
+from cointrader.order.enum.OrderSide import OrderSide
+from cointrader.order.enum.OrderStatus import OrderStatus
+from cointrader.order.enum.OrderType import OrderType
+from cointrader.trade.AsyncTraderRuntime import AsyncTraderRuntime
+from cointrader.trade.MultiTrader import MultiTrader
+from cointrader.trade.TraderConfig import TraderConfig
+from cointrader.trade.position.TraderPosition import TraderPosition
+
+SYMBOLS = [f"C{i}-USD" for i in range(30)]
+
+
+class MockAsyncExchange(AsyncTraderExchangeBase):
+    """
+    Answers every request after latency seconds. Limit orders are placed, and filled by the next status request if fill_on_status
+    """
+    def __init__(self, latency: float = 0.05, fill_on_status: bool = True):
+        self._name = "mock"
+        self._latency = latency
+        self._fill_on_status = fill_on_status
+        self._ids = itertools.count()
+        self.orders: dict[str, OrderResult] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _request(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self._latency)
+        self.in_flight -= 1
+
+    async def market_ticker_price_get(self, ticker: str) -> float:
+        await self._request()
+        return 100.0 + SYMBOLS.index(ticker)
+
+    async def market_ticker_prices_all_get(self) -> dict:
+        await self._request()
+        return {symbol: 100.0 + i for i, symbol in enumerate(SYMBOLS)}
+
+    async def trade_buy_limit(self, ticker: str, amount: float, price: float, type: str = "") -> OrderResult:
+        await self._request()
+        result = OrderResult(symbol=ticker)
+        result.id = f"order-{next(self._ids)}"
+        result.type = OrderType.LIMIT
+        result.side = OrderSide.BUY
+        result.limit_price = price
+        result.size = amount
+        result.status = OrderStatus.PLACED
+        self.orders[result.id] = result
+        return self.copy(result)
+
+    async def trade_get_order(self, ticker: str, order_id: str) -> OrderResult:
+        await self._request()
+        result = self.copy(self.orders[order_id])
+        if self._fill_on_status and result.status == OrderStatus.PLACED:
+            result.status = OrderStatus.FILLED
+            result.filled_size = result.size
+            self.orders[order_id] = result
+        return result
+
+    async def trade_cancel_order(self, ticker: str, order_id: str) -> OrderResult:
+        await self._request()
+        result = self.copy(self.orders[order_id])
+        result.status = OrderStatus.CANCELLED
+        self.orders[order_id] = result
+        return result
+
+    def copy(self, result: OrderResult) -> OrderResult:
+        # the exchange answers with new results, never with the orders the traders hold
+        copy = OrderResult(symbol=result.symbol)
+        copy.from_dict(result.to_dict())
+        return copy
+
+
+class FakeMultiTrader(object):
+    """
+    Records the updates, and places a limit buy for each symbol on its first price update, like a Trader would
+    """
+    def __init__(self, exec_pipe: AsyncExecutePipeline, orders: Orders):
+        self._exec_pipe = exec_pipe
+        self._orders = orders
+        self.threads = set()
+        self.klines = []
+        self.prices = {}
+
+    def market_update_quote_balance(self, quote_name: str):
+        self.threads.add(threading.get_ident())
+
+    def market_update_kline(self, symbol: str, kline: Kline, granularity: int):
+        self.threads.add(threading.get_ident())
+        self.klines.append((symbol, kline.ts))
+
+    def market_update_prices(self, prices: dict[str, float], current_ts: int, granularity: int):
+        for symbol in SYMBOLS:
+            self.market_update_price(symbol, prices[symbol], current_ts, granularity)
+
+    def market_update_price(self, symbol: str, current_price: float, current_ts: int, granularity: int):
+        self.threads.add(threading.get_ident())
+        if symbol in self.prices:
+            # a position takes the status of its open order from the pipeline
+            for order in self._orders.get_active_orders(symbol):
+                if order.placed():
+                    order.update_order(self._exec_pipe.order_status(symbol, order.id, current_price, current_ts))
+            return
+        self.prices[symbol] = current_price
+        oreq = OrderRequest(symbol=symbol, type=OrderType.LIMIT, side=OrderSide.BUY, size=1.0)
+        oreq.limit_price = current_price
+        self._exec_pipe.process_order_request(order_request=oreq)
+        result = self._exec_pipe.wait_order_result(oreq.rid)
+        self._exec_pipe.completed(oreq.rid)
+        order = Order(symbol=symbol)
+        order.update_order(result)
+        order.active = True
+        self._orders.add_order(symbol, order)
+
+
+class FakeAccount(object):
+    def round_quote(self, symbol: str, amount: float) -> float:
+        return round(amount, 2)
+
+
+class PositionMultiTrader(object):
+    """
+    Opens a real TraderPosition with a limit buy for each symbol on its first price update, and updates it on the next ones
+    """
+    def __init__(self, exec_pipe: AsyncExecutePipeline, config: TraderConfig, orders: Orders):
+        self._exec_pipe = exec_pipe
+        self._config = config
+        self._orders = orders
+        self.positions: dict[str, TraderPosition] = {}
+
+    def market_update_quote_balance(self, quote_name: str):
+        pass
+
+    def market_update_kline(self, symbol: str, kline: Kline, granularity: int):
+        pass
+
+    def market_update_prices(self, prices: dict[str, float], current_ts: int, granularity: int):
+        for symbol in SYMBOLS:
+            self.market_update_price(symbol, prices[symbol], current_ts, granularity)
+
+    def market_update_price(self, symbol: str, current_price: float, current_ts: int, granularity: int):
+        position = self.positions.get(symbol)
+        if position is None:
+            position = TraderPosition(symbol=symbol, pid=0, strategy=None, exec_pipe=self._exec_pipe, config=self._config, orders=self._orders)
+            position.open_position(size=1.0, current_price=current_price, current_ts=current_ts)
+            self.positions[symbol] = position
+        else:
+            position.market_update(current_price=current_price, current_ts=current_ts)
+
+
+def make_kline(symbol: str, ts: int) -> Kline:
+    return Kline(symbol=symbol, open=1.0, close=1.0, low=1.0, high=1.0, volume=1.0, ts=ts, granularity=300)
+
+
+def test_concurrent_orders():
+    exchange = MockAsyncExchange(latency=0.05)
+    pipe = AsyncExecutePipeline(execute=AsyncTraderExecute(exchange=exchange, account=None, config=None))
+
+    async def run():
+        pipe.bind()
+        requests = []
+        for symbol in SYMBOLS:
+            oreq = OrderRequest(symbol=symbol, type=OrderType.LIMIT, side=OrderSide.BUY, size=1.0)
+            oreq.limit_price = 10.0
+            requests.append(oreq)
+        start = time.perf_counter()
+        results = await pipe.submit_batch(requests)
+        elapsed = time.perf_counter() - start
+        # 30 requests of 50ms each are in flight together
+        assert elapsed < 0.3 and exchange.max_in_flight == len(SYMBOLS)
+        assert [result.symbol for result in results] == SYMBOLS
+
+        # a synchronous caller on another thread waits on the future, not on the loop
+        def place(oreq: OrderRequest) -> OrderResult:
+            pipe.process_order_request(order_request=oreq)
+            return pipe.wait_order_result(oreq.rid)
+        result = await asyncio.get_running_loop().run_in_executor(None, place, requests[0])
+        assert result.status == OrderStatus.PLACED
+        # placing and waiting from the loop itself would deadlock
+        try:
+            pipe.process_order_request(requests[0])
+            assert False
+        except RuntimeError:
+            pass
+
+    asyncio.run(run())
+
+
+def test_runtime():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    exchange = MockAsyncExchange(latency=0.02)
+    pipe = AsyncExecutePipeline(execute=AsyncTraderExecute(exchange=exchange, account=None, config=config))
+    orders = Orders(config=config, db_path=None)
+    mtrader = FakeMultiTrader(pipe, orders)
+    runtime = AsyncTraderRuntime(mtrader=mtrader, orders=orders, exchange=exchange, exec_pipe=pipe, config=config, symbols=SYMBOLS,
+                                 granularity=300, price_interval=60.0, status_interval=0.05)
+
+    async def run():
+        runtime.start()
+        task = asyncio.create_task(runtime.run())
+        # the websocket pushes klines from its own thread, with a duplicate and a symbol that isn't traded
+        def push():
+            for symbol in SYMBOLS + ['OTHER-USD']:
+                runtime.push_kline(make_kline(symbol, 600))
+            runtime.push_kline(make_kline(SYMBOLS[0], 600))
+            runtime.push_kline(make_kline(SYMBOLS[0], 900))
+        threading.Thread(target=push).start()
+
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if len(orders.get_active_orders(None)) == len(SYMBOLS) and all(order.filled() for order in orders.get_active_orders(None)):
+                break
+        runtime.stop()
+        await task
+
+    asyncio.run(run())
+    assert len(mtrader.klines) == len(SYMBOLS) + 1
+    assert sorted(mtrader.prices) == sorted(SYMBOLS)
+    assert all(order.filled() for order in orders.get_all_orders())
+    assert len(orders.get_all_orders()) == len(SYMBOLS)
+    # all the trader calls were made on the one trader thread
+    assert len(mtrader.threads) == 1 and threading.get_ident() not in mtrader.threads
+    stats = runtime.stats()
+    assert stats['status_updates'] == len(SYMBOLS) and stats['price_refreshes'] == 1
+
+
+def test_runtime_price_cache():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    exchange = MockAsyncExchange(latency=0.01)
+    pipe = AsyncExecutePipeline(execute=AsyncTraderExecute(exchange=exchange, account=None, config=config))
+    orders = Orders(config=config, db_path=None)
+    mtrader = FakeMultiTrader(pipe, orders)
+    cache = PriceCache(max_age=60.0, rest_limit=5)
+    runtime = AsyncTraderRuntime(mtrader=mtrader, orders=orders, exchange=exchange, exec_pipe=pipe, config=config, symbols=SYMBOLS,
+                                 granularity=300, price_interval=60.0, status_interval=0, price_cache=cache)
+
+    async def run():
+        runtime.start()
+        # the candles of all but two symbols were streamed, only those two are requested
+        for symbol in SYMBOLS[2:]:
+            runtime.push_kline(make_kline(symbol, 600))
+        task = asyncio.create_task(runtime.run())
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if runtime.stats()['price_refreshes'] == 1:
+                break
+        runtime.stop()
+        await task
+
+    asyncio.run(run())
+    assert runtime.stats()['price_requests'] == 2
+    assert mtrader.prices[SYMBOLS[0]] == 100.0 and mtrader.prices[SYMBOLS[5]] == 1.0
+    assert cache.stale_symbols(SYMBOLS) == []
+
+
+def test_runtime_positions():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    config.set_start_position_type('LIMIT')
+    exchange = MockAsyncExchange(latency=0.01)
+    pipe = AsyncExecutePipeline(execute=AsyncTraderExecute(exchange=exchange, account=FakeAccount(), config=config))
+    orders = Orders(config=config, db_path=None)
+    mtrader = PositionMultiTrader(pipe, config, orders)
+    runtime = AsyncTraderRuntime(mtrader=mtrader, orders=orders, exchange=exchange, exec_pipe=pipe, config=config, symbols=SYMBOLS,
+                                 granularity=300, price_interval=60.0, status_interval=0.05)
+
+    async def run():
+        task = asyncio.create_task(runtime.run())
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if len(mtrader.positions) == len(SYMBOLS) and all(position.opened_position_completed() for position in mtrader.positions.values()):
+                break
+        runtime.stop()
+        await task
+
+    asyncio.run(run())
+    # the fills found by the status poll, between price refreshes, are handled by the positions
+    assert len(mtrader.positions) == len(SYMBOLS)
+    assert all(position.opened_position_completed() for position in mtrader.positions.values())
+    assert all(position.buy_order().filled() for position in mtrader.positions.values())
+    assert runtime.stats()['price_refreshes'] == 1 and runtime.stats()['status_updates'] == len(SYMBOLS)
+
+
+def test_restore_positions():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    config.set_trade_symbols([SYMBOLS[0]])
+    exchange = MockAsyncExchange(latency=0.01, fill_on_status=False)
+    pipe = AsyncExecutePipeline(execute=AsyncTraderExecute(exchange=exchange, account=None, config=config))
+    orders = Orders(config=config, db_path=None)
+    # left by a previous run: a position with a filled buy and a duplicate open buy, one with an open sell and one with an open buy
+    for order_id, pid, side, status in [('order-100', 0, OrderSide.BUY, OrderStatus.FILLED), ('order-101', 2, OrderSide.SELL, OrderStatus.PLACED),
+                                        ('order-102', 1, OrderSide.BUY, OrderStatus.PLACED), ('order-103', 0, OrderSide.BUY, OrderStatus.PLACED)]:
+        result = OrderResult(symbol=SYMBOLS[0])
+        result.id = order_id
+        result.type = OrderType.LIMIT
+        result.side = side
+        result.size = 1.0
+        result.filled_size = result.size if status == OrderStatus.FILLED else 0.0
+        result.status = status
+        exchange.orders[order_id] = result
+        order = Order(symbol=SYMBOLS[0])
+        order.update_order(exchange.copy(result))
+        order.pid = pid
+        order.active = True
+        orders.add_order(SYMBOLS[0], order)
+    mtrader = MultiTrader(account=None, exec_pipe=pipe, config=config, orders=orders, granularity=300)
+    runtime = AsyncTraderRuntime(mtrader=mtrader, orders=orders, exchange=exchange, exec_pipe=pipe, config=config, symbols=[SYMBOLS[0]],
+                                 granularity=300, status_interval=0)
+
+    async def run():
+        runtime.start()
+        # the status and cancel requests of the restore go through the pipeline to the loop
+        await runtime.run_trader(mtrader.restore_positions)
+
+    asyncio.run(run())
+    trader = mtrader._traders[SYMBOLS[0]]
+    assert trader.position_count() == 1 and trader._positions[0].buy_order().id == 'order-100'
+    assert [order.id for order in orders.get_active_orders(SYMBOLS[0])] == ['order-100']
+    assert all(orders.get_order(SYMBOLS[0], order_id).cancelled() for order_id in ['order-101', 'order-102', 'order-103'])
+
+
+if __name__ == '__main__':
+    test_concurrent_orders()
+    test_runtime()
+    test_runtime_price_cache()
+    test_runtime_positions()
+    test_restore_positions()
+    print("AsyncTraderRuntime tests passed")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Checks that MultiTrader builds the klines of the other timeframe strategies of each trader from its klines
+import os
+import sys
+import tempfile
+sys.path.append('.')
+from cointrader.common.Kline import Kline
+from cointrader.order.Orders import Orders
+from cointrader.trade.MultiTrader import MultiTrader
+from cointrader.trade.TraderConfig import TraderConfig
+
+BASE = 1700006400 // 86400 * 86400
+
+
+class FakeTrader(object):
+    def __init__(self, timeframes: list[int]):
+        self.timeframes = timeframes
+        self.klines = []
+        self.other = []
+
+    def other_timeframes(self) -> list[int]:
+        return self.timeframes
+
+    def market_preload(self, klines: list[Kline]):
+        self.klines += [(kline.ts, True) for kline in klines]
+
+    def market_update_kline(self, kline: Kline, granularity: int):
+        self.klines.append((kline.ts, False))
+
+    def market_update_kline_other_timeframe(self, kline: Kline, granularity: int, preload: bool = False):
+        self.other.append((granularity, kline.ts, preload))
+
+
+def test_other_timeframes():
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    config.set_trade_symbols([])
+    mtrader = MultiTrader(account=None, exec_pipe=None, config=config, orders=Orders(config=config, db_path=None), granularity=3600)
+    # 900 can't be built from hourly klines, and the second trader has no other timeframes
+    mtrader._traders = {'BTC-USD': FakeTrader([900, 21600, 86400]), 'ETH-USD': FakeTrader([])}
+
+    klines = [Kline(symbol='BTC-USD', open=1.0, close=1.0, low=1.0, high=1.0, volume=1.0, ts=BASE + h * 3600) for h in range(30)]
+    mtrader.market_preload('BTC-USD', klines[:12])
+    for kline in klines[12:]:
+        mtrader.market_update_kline('BTC-USD', kline, 3600)
+        mtrader.market_update_kline('ETH-USD', kline, 3600)
+
+    trader = mtrader._traders['BTC-USD']
+    assert trader.other == [(21600, BASE, True), (21600, BASE + 21600, True), (21600, BASE + 43200, False),
+                            (21600, BASE + 64800, False), (86400, BASE, False), (21600, BASE + 86400, False)]
+    assert len(trader.klines) == 30 and mtrader._traders['ETH-USD'].other == []
+    mtrader.flush_other_timeframes('BTC-USD')
+    # the rest of the second day
+    assert trader.other[-1] == (86400, BASE + 86400, False) and len(trader.other) == 7
+
+
+if __name__ == '__main__':
+    test_other_timeframes()
+    print("MultiTrader timeframe tests passed")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Checks that MultiTrader.market_update_prices() fetches the status of the open orders of all positions in one batch,
+# and that the positions are answered from it instead of waiting for a request each
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append('.')
+from cointrader.execute.pipeline.AsyncExecutePipeline import AsyncExecutePipeline
+from cointrader.execute.pipeline.ExecutePipeline import ExecutePipeline
+from cointrader.order.Order import Order
+from cointrader.order.OrderRequest import OrderRequest
+from cointrader.order.OrderResult import OrderResult
+from cointrader.order.Orders import Orders
+from cointrader.order.enum.OrderStatus import OrderStatus
+from cointrader.order.enum.OrderType import OrderType
+from cointrader.trade.MultiTrader import MultiTrader
+from cointrader.trade.TraderConfig import TraderConfig
+
+SYMBOLS = [f"C{i}-USD" for i in range(30)]
+
+
+class FakeExecute(object):
+    """
+    Answers each request after latency seconds. Orders with an even number are open, the others filled
+    """
+    def __init__(self, latency: float, list_open_orders: bool):
+        self.latency = latency
+        self.list_open_orders = list_open_orders
+        self.requests = []
+        self.open_orders_calls = 0
+        self._lock = threading.Lock()
+
+    def account(self):
+        return None
+
+    def result(self, symbol: str, order_id: str) -> OrderResult:
+        result = OrderResult(symbol=symbol)
+        result.id = order_id
+        result.status = OrderStatus.PLACED if int(order_id.split('-')[1]) % 2 == 0 else OrderStatus.FILLED
+        return result
+
+    def execute_order(self, order_request: OrderRequest) -> OrderResult:
+        with self._lock:
+            self.requests.append((order_request.type, order_request.order_id))
+        time.sleep(self.latency)
+        return self.result(order_request.symbol, order_request.order_id)
+
+    def open_orders(self, symbol: str = None) -> dict[str, OrderResult]:
+        if not self.list_open_orders:
+            raise NotImplementedError
+        self.open_orders_calls += 1
+        time.sleep(self.latency)
+        return {f"order-{i}": self.result(SYMBOLS[i], f"order-{i}") for i in range(0, len(SYMBOLS), 2)}
+
+
+class FakeTrader(object):
+    """
+    One position with one open order, which asks the pipeline for its status on each price update
+    """
+    def __init__(self, exec_pipe: ExecutePipeline, symbol: str, order_id: str):
+        self._exec_pipe = exec_pipe
+        self._order = Order(symbol=symbol)
+        self._order.id = order_id
+        self._order.status = OrderStatus.PLACED
+
+    def pending_orders(self) -> list[Order]:
+        return [self._order] if self._order.placed() else []
+
+    def position_count(self) -> int:
+        return 1
+
+    def market_update_price(self, current_price: float, current_ts: int, granularity: int = 0):
+        if self._order.placed():
+            self._order.update_order(self._exec_pipe.order_status(self._order.symbol, self._order.id, current_price, current_ts))
+
+
+def make_mtrader(execute: FakeExecute, workers: int) -> tuple[MultiTrader, ExecutePipeline]:
+    config = TraderConfig(path=os.path.join(tempfile.mkdtemp(), 'config.json'))
+    config.set_trade_symbols([])
+    pipe = ExecutePipeline(execute=execute, threaded=True, workers=workers)
+    mtrader = MultiTrader(account=None, exec_pipe=pipe, config=config, orders=Orders(config=config, db_path=None))
+    mtrader._symbols = SYMBOLS
+    mtrader._traders = {symbol: FakeTrader(pipe, symbol, f"order-{i}") for i, symbol in enumerate(SYMBOLS)}
+    mtrader._max_positions = 100
+    return mtrader, pipe
+
+
+def test_concurrent_status():
+    execute = FakeExecute(latency=0.02, list_open_orders=False)
+    mtrader, pipe = make_mtrader(execute, workers=len(SYMBOLS))
+    start = time.perf_counter()
+    mtrader.market_update_prices({symbol: 1.0 for symbol in SYMBOLS}, current_ts=0, granularity=300)
+    elapsed = time.perf_counter() - start
+    # 30 status requests of 20ms are in flight together, instead of one after the other
+    assert elapsed < 0.3
+    assert len(execute.requests) == len(SYMBOLS)
+    assert [trader.pending_orders() == [] for trader in mtrader._traders.values()] == [i % 2 == 1 for i in range(len(SYMBOLS))]
+
+    # the next tick only asks for the orders that are still open
+    execute.requests.clear()
+    mtrader.market_update_prices({symbol: 1.0 for symbol in SYMBOLS}, current_ts=0, granularity=300)
+    assert sorted(order_id for _, order_id in execute.requests) == sorted(f"order-{i}" for i in range(0, len(SYMBOLS), 2))
+    pipe.shutdown()
+
+
+def test_open_orders():
+    execute = FakeExecute(latency=0.02, list_open_orders=True)
+    mtrader, pipe = make_mtrader(execute, workers=4)
+    mtrader.market_update_prices({symbol: 1.0 for symbol in SYMBOLS}, current_ts=0, granularity=300)
+    # one listing for the open orders, and a request each for the orders that are no longer open
+    assert execute.open_orders_calls == 1
+    assert sorted(order_id for _, order_id in execute.requests) == sorted(f"order-{i}" for i in range(1, len(SYMBOLS), 2))
+
+    # a cancel drops the prefetched status of its order
+    assert pipe.order_status(SYMBOLS[0], 'order-0').status == OrderStatus.PLACED
+    count = len(execute.requests)
+    oreq = OrderRequest(symbol=SYMBOLS[0], type=OrderType.CANCEL)
+    oreq.order_id = 'order-0'
+    pipe.process_order_request(oreq)
+    pipe.wait_order_result(oreq.rid)
+    pipe.order_status(SYMBOLS[0], 'order-0')
+    assert len(execute.requests) == count + 2
+    pipe.shutdown()
+
+
+def test_async_pipeline_cancel():
+    execute = FakeExecute(latency=0.0, list_open_orders=False)
+    pipe = AsyncExecutePipeline(execute=execute)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    pipe.bind(loop)
+    try:
+        # a polled status answers the position without a request
+        pipe.set_order_status({'order-0': execute.result(SYMBOLS[0], 'order-0')})
+        assert pipe.order_status(SYMBOLS[0], 'order-0').status == OrderStatus.PLACED
+        assert execute.requests == []
+
+        # a cancel sent through the async pipeline drops it too
+        oreq = OrderRequest(symbol=SYMBOLS[0], type=OrderType.CANCEL)
+        oreq.order_id = 'order-0'
+        pipe.process_order_request(oreq)
+        pipe.wait_order_result(oreq.rid)
+        pipe.completed(oreq.rid)
+        pipe.order_status(SYMBOLS[0], 'order-0')
+        assert execute.requests == [(OrderType.CANCEL, 'order-0'), (OrderType.STATUS, 'order-0')]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+if __name__ == '__main__':
+    test_concurrent_status()
+    test_open_orders()
+    test_async_pipeline_cancel()
+    print("Order status batch tests passed")
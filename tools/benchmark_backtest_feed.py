@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Benchmark replaying the hourly kline CSV with df.iterrows() against BacktestFeed, reports klines/sec for each
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import cointrader
+except ImportError:
+    sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+
+from cointrader.backtest.BacktestFeed import BacktestFeed
+from cointrader.common.Kline import Kline
+
+def generate_csv(path: str, symbols: list[str], count: int):
+    """
+    Write a synthetic CSV in the same format as data/crypto_hourly_data/cryptotoken_full_binance_1h.csv
+    """
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2020-01-01', periods=count, freq='h').strftime('%Y-%m-%d %H:%M:%S')
+    frames = []
+    for symbol in symbols:
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+        frames.append(pd.DataFrame({
+            'Date': dates,
+            'Symbol': symbol.replace('-', ''),
+            'Open': close * (1 + rng.normal(0, 0.001, count)),
+            'High': close * 1.01,
+            'Low': close * 0.99,
+            'Close': close,
+            'Volume USDT': rng.uniform(1000, 10000, count)
+        }))
+    pd.concat(frames).to_csv(path, index=False)
+
+def replay_iterrows(csv_path: str, symbols: list[str], granularity: int):
+    """
+    The replay loop used by tools/trade_simulate_past_klines_csv.py before BacktestFeed
+    """
+    df = pd.read_csv(csv_path)
+    df['Date'] = pd.to_datetime(df['Date'], format='mixed')
+    df['Timestamp'] = df['Date'].apply(lambda x: int(x.timestamp()))
+    df = df.sort_values(by='Date').reset_index(drop=True)
+    df['Symbol'] = df['Symbol'].apply(lambda x: x.replace('USDT', '-USDT'))
+    load_end = time.perf_counter()
+
+    count = 0
+    kline = Kline()
+    for index, row in df.iterrows():
+        symbol = row['Symbol']
+        if symbol in symbols:
+            kline_data = {
+                'ts': row['Timestamp'],
+                'open': row['Open'],
+                'high': row['High'],
+                'low': row['Low'],
+                'close': row['Close'],
+                'volume': row['Volume USDT']
+            }
+            kline.from_dict(kline_data)
+            kline.symbol = symbol
+            kline.granularity = granularity
+            count += 1
+    return count, load_end
+
+def replay_feed(csv_path: str, symbols: list[str], granularity: int):
+    feed = BacktestFeed.from_csv(csv_path, granularity=granularity, symbols=symbols)
+    load_end = time.perf_counter()
+
+    count = 0
+    for kline in feed:
+        count += 1
+    return count, load_end
+
+def run(name: str, replay, csv_path: str, symbols: list[str], granularity: int):
+    start = time.perf_counter()
+    count, load_end = replay(csv_path, symbols, granularity)
+    end = time.perf_counter()
+    print(f"{name}: {count} klines, load {load_end - start:.2f}s, replay {end - load_end:.2f}s, {count / (end - load_end):.0f} klines/sec")
+
+def main(args):
+    symbols = args.symbols.split(',')
+    csv_path = args.csv_path
+    tmp_path = None
+    if not csv_path:
+        tmp_path = os.path.join(tempfile.mkdtemp(), 'klines.csv')
+        generate_csv(tmp_path, symbols, args.count)
+        csv_path = tmp_path
+        print(f"Generated {args.count} hourly klines for {len(symbols)} symbols")
+
+    run("df.iterrows()", replay_iterrows, csv_path, symbols, args.granularity)
+    run("BacktestFeed", replay_feed, csv_path, symbols, args.granularity)
+
+    if tmp_path:
+        os.remove(tmp_path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark kline replay for backtests.')
+    parser.add_argument('--csv_path', type=str, default='', help='Path to the CSV file (a synthetic CSV is generated if not set)')
+    parser.add_argument('--symbols', type=str, default='BTC-USDT,ETH-USDT,SOL-USDT,HBAR-USDT,DOT-USDT,DOGE-USDT', help='Comma separated list of symbols')
+    parser.add_argument('--count', type=int, default=20000, help='Number of klines per symbol for the synthetic CSV')
+    parser.add_argument('--granularity', type=int, default=3600, help='Granularity of klines')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Benchmark the update cost of WMA, KAMA and HMA for different periods. The updates keep running sums, so the cost
+# should stay about the same as the period grows. Reports microseconds per update
+import argparse
+import sys
+import time
+
+try:
+    import cointrader
+except ImportError:
+    sys.path.append('.')
+
+import numpy as np
+
+from cointrader.indicators.WMA import WMA
+from cointrader.indicators.KAMA import KAMA
+from cointrader.indicators.HULL import HMA
+
+def time_updates(indicator, values: list[float]) -> float:
+    """
+    Returns the average time of one update_with_value() call in microseconds
+    """
+    update = indicator.update_with_value
+    start = time.perf_counter()
+    for value in values:
+        update(value)
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+def main(args):
+    rng = np.random.default_rng(0)
+    values = (20000.0 * np.exp(np.cumsum(rng.normal(0, 0.001, args.count)))).tolist()
+    periods = [int(period) for period in args.periods.split(',')]
+
+    indicators = [
+        ('WMA', WMA),
+        ('KAMA', KAMA),
+        ('HMA', HMA),
+    ]
+    print(f"{args.count} updates per run, tick cost is for {args.symbols} symbols")
+    print(f"{'indicator':<10}{'period':>8}{'update us':>12}{'tick ms':>10}")
+    for name, indicator_class in indicators:
+        for period in periods:
+            current = time_updates(indicator_class(period=period), values)
+            tick = current * args.symbols / 1000
+            print(f"{name:<10}{period:>8}{current:>12.2f}{tick:>10.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark WMA, KAMA and HMA updates.')
+    parser.add_argument('--count', type=int, default=20000, help='Number of values to update each indicator with')
+    parser.add_argument('--periods', type=str, default='14,50,200,1000', help='Comma separated list of periods')
+    parser.add_argument('--symbols', type=int, default=30, help='Number of symbols for the per tick cost')
+    args = parser.parse_args()
+    main(args)
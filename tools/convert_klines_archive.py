@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# Converts a Binance style kline CSV or a market database into a kline archive, which the backtest
+# tools load with --archive instead of parsing the CSV on every run
+import sys
+import argparse
+import time
+sys.path.append('.')
+from cointrader.backtest.KlineArchive import KlineArchive
+from cointrader.market.MarketStorage import MarketStorage
+
+def main(args):
+    archive = KlineArchive(args.archive)
+    symbols = args.symbols.split(',') if args.symbols else None
+
+    start_time = time.time()
+    if args.csv_path:
+        written = archive.import_csv(args.csv_path, args.granularity, symbols=symbols, merge=not args.replace)
+    elif args.db_path:
+        storage = MarketStorage(args.db_path)
+        written = archive.import_storage(storage, args.granularity, symbols=symbols, merge=not args.replace)
+        storage.close()
+    else:
+        print("Either --csv_path or --db_path is required")
+        return
+
+    for symbol in written:
+        info = archive.info(symbol, args.granularity)
+        print(f"{symbol}: {info['count']} klines from {info['first_ts']} to {info['last_ts']}")
+    print(f"Converted {len(written)} symbols in {time.time() - start_time:.1f}s to {args.archive}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv_path', type=str, default='', help='Binance style kline CSV to convert')
+    parser.add_argument('--db_path', type=str, default='', help='Market database to convert')
+    parser.add_argument('--archive', type=str, default='data/archive', help='Kline archive directory to write to')
+    parser.add_argument('--granularity', type=int, default=3600, help='Granularity of the klines')
+    parser.add_argument('--symbols', type=str, default='', help='Comma separated list of symbols, all symbols if empty')
+    parser.add_argument('--replace', action='store_true', help='Replace the klines already in the archive instead of merging with them')
+    args = parser.parse_args()
+
+    main(args)
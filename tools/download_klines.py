@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 import sys
 import argparse
+import time
 from datetime import datetime
 #sys.path.append('./tests')
 sys.path.append('.')
 from cointrader.exchange.TraderSelectExchange import TraderSelectExchange
 from cointrader.account.Account import Account
 from cointrader.market.Market import Market
+from cointrader.market.KlineDownloader import KlineDownloader
 from cointrader.trade.TraderConfig import TraderConfig
 
 CLIENT_NAME = "cbadv"
@@ -38,21 +40,17 @@ def main(args):
     print(f"Start ts: {start_ts} End ts: {end_ts}")
     print(f"Symbols: {symbols}")
 
-    max_klines = market.market_get_max_kline_count(args.granularity)
+    downloader = KlineDownloader(exchange, market.storage(), requests_per_second=args.requests_per_second,
+                                 max_workers=args.workers, max_retries=args.retries)
+    chunks = sum(len(downloader.chunks(symbol, start_ts, end_ts, args.granularity)) for symbol in symbols)
+    print(f"Requesting {chunks} chunks of up to {market.market_get_max_kline_count(args.granularity)} klines")
 
-    increment = args.granularity * max_klines
-    print(f"Max klines: {max_klines} Increment: {increment}")
-    for symbol in symbols:
-        cur_start_ts = start_ts
-        print(f"Getting klines for {symbol}")
-        while cur_start_ts < end_ts:
-            print(f"Getting klines for {symbol} at {cur_start_ts}")
-            cur_end_ts = cur_start_ts + args.granularity
-            klines = market.market_get_klines_range(symbol, start_ts=cur_start_ts, end_ts=cur_end_ts, granularity=args.granularity, store_db=True)
-            print(klines)
-            if len(klines) > 0:
-                print(f"Klines for {symbol} at {cur_start_ts}: {klines}")
-            cur_start_ts += args.granularity
+    start_time = time.time()
+    result = downloader.download(symbols, start_ts, end_ts, args.granularity)
+    for symbol, stats in result['symbols'].items():
+        _, _, count = market.storage().get_ts_range(symbol, args.granularity)
+        print(f"{symbol}: {stats['klines']} klines stored, {stats['failed']} of {stats['chunks']} chunks failed, {count} klines in the database")
+    print(f"{result['requests']} requests ({result['retries']} retries) in {time.time() - start_time:.1f}s")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -61,6 +59,9 @@ if __name__ == '__main__':
     parser.add_argument('--granularity', type=int, default=300)
     parser.add_argument('--start-date', type=str, default='2024-12-02', help='Start date for klines')
     parser.add_argument('--end-date', type=str, default='now', help='End date for klines')
+    parser.add_argument('--requests-per-second', type=float, default=10.0, help='Budget of requests to the exchange, 0 for no limit')
+    parser.add_argument('--workers', type=int, default=4, help='Number of requests in flight at once')
+    parser.add_argument('--retries', type=int, default=5, help='Number of retries of a failed request')
     args = parser.parse_args()
 
     main(args)
@@ -26,7 +26,6 @@ from cointrader.trade.MultiTrader import MultiTrader
 from cointrader.trade.TraderConfig import TraderConfig
 from cointrader.order.Orders import Orders
 from cointrader.common.Kline import Kline
-from cointrader.common.KlineEmitter import KlineEmitter
 from cointrader.config import *
 from cointrader.indicators.EMA import EMA
 
@@ -85,12 +84,9 @@ def main(args):
 
     print(f"Getting klines for {args.start_date} to {args.end_date}")
 
-    kline_emitters: dict[str, KlineEmitter] = {}
-
     # get all klines for each symbol stored in the market db
     for symbol in symbols:
-        kline_emitters[symbol] = KlineEmitter(src_granularity=args.granularity, dst_granularity=900)
-        all_klines[symbol] = market.market_get_stored_klines_range(symbol, start_ts=start_ts, end_ts=end_ts, granularity=args.granularity)
+        all_klines[symbol] = market.market_get_stored_kline_array(symbol, start_ts=start_ts, end_ts=end_ts, granularity=args.granularity)
         kline_count = len(all_klines[symbol])
         if lowest_kline_count == 0 or kline_count < lowest_kline_count:
             lowest_kline_count = kline_count
@@ -99,23 +95,15 @@ def main(args):
 
     print(f"Simulating with {lowest_kline_count} klines")
 
-    kline = Kline()
-    #kline.set_dict_names(ts='start')
+    kline_iters = {}
+    for symbol in symbols:
+        kline_iters[symbol] = all_klines[symbol].klines(end=lowest_kline_count)
 
     for i in range(lowest_kline_count):
         for symbol in symbols:
-            k = all_klines[symbol][i]
-            #print(k)
-            kline.from_dict(k)
-            kline.symbol = symbol
-            kline.granularity = args.granularity
-            kline_emitters[symbol].update(kline)
-            if kline_emitters[symbol].ready():
-                kline_15m = kline_emitters[symbol].emit()
-                kline_emitters[symbol].reset()
-                if kline_15m:
-                    mtrader.market_update_kline_other_timeframe(symbol, kline_15m, 900)
-
+            kline = next(kline_iters[symbol])
+            # fill the resting orders crossed by the kline before the traders see it
+            ex.market_update_kline(symbol, kline)
             mtrader.market_update_kline(symbol=symbol, kline=kline, granularity=args.granularity)
 
             # update quote balance before trying to open positions
@@ -129,7 +117,7 @@ def main(args):
 
     last_prices = {}
     for symbol in symbols:
-        last_prices[symbol] = all_klines[symbol][-1]['close']
+        last_prices[symbol] = float(all_klines[symbol].close[-1])
 
     print(account.get_account_balances())
     print("\nFinal Total USD Balance:")
@@ -4,11 +4,9 @@ from coinbase.websocket import WSClient, WebsocketResponse
 #from coinbase.rest import RESTExchange
 from datetime import datetime, timedelta
 from matplotlib import pyplot as plt
-from threading import Thread
 
 import json
 import sys
-import time
 import argparse
 
 try:
@@ -30,19 +28,11 @@ from cointrader.common.Kline import Kline
 from cointrader.common.LogLevel import LogLevel
 from cointrader.config import *
 from cointrader.indicators.EMA import EMA
-from cointrader.common.KlineEmitter import KlineEmitter
+from cointrader.backtest.BacktestFeed import BacktestFeed
+from cointrader.backtest.KlineArchive import KlineArchive
+from cointrader.common.Profiler import Profiler
 
-class PipelineExecutionThread(Thread):
-    def __init__(self, exec_pipe: ExecutePipeline):
-        Thread.__init__(self)
-        self._exec_pipe = exec_pipe
-
-    def run(self):
-        while True:
-            self._exec_pipe.process_order_requests()
-            time.sleep(1 / 1000) # sleep for 1ms
-
-def run_trader(tconfig: TraderConfig, account: AccountSimulate, exchange: str, symbols: list[str], df: pd.DataFrame, granularity: int, initial_usdt: float):
+def run_trader(tconfig: TraderConfig, account: AccountSimulate, exchange: str, symbols: list[str], feed: BacktestFeed, granularity: int, initial_usdt: float, profiler: Profiler = None):
     account.update_asset_balance("USDT", available=initial_usdt, hold=0.0)
     tconfig.set_global_current_balance_quote(balance=initial_usdt)
 
@@ -76,71 +66,34 @@ def run_trader(tconfig: TraderConfig, account: AccountSimulate, exchange: str, s
     
     strategy_weights = None #dict(zip(indicators, weights))
 
-    mtrader = MultiTrader(account=account, exec_pipe=ep, config=tconfig, orders=orders, restore_positions=False, granularity=granularity, strategy_weights=strategy_weights)
+    mtrader = MultiTrader(account=account, exec_pipe=ep, config=tconfig, orders=orders, restore_positions=False, granularity=granularity, strategy_weights=strategy_weights, profiler=profiler)
 
     # update quote balance before trying to open positions
     mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
 
-    kline = Kline()
-    #kline.set_dict_names(ts='start')
+    first_prices = feed.first_prices()
+    last_prices = feed.last_prices()
 
-    first_prices = {}
-    last_prices = {}
+    # start the order execution threads
+    if exec_pipe_threaded:
+        ep.start()
 
-    kline_emitters: dict[str, KlineEmitter] = {}
+    # iterate through all klines in timestamp order
+    for kline in feed:
+        symbol = kline.symbol
 
-    # emitter takes in hourly klines, and emits daily klines
-    for symbol in symbols:
-        kline_emitters[symbol] = KlineEmitter(src_granularity=granularity, dst_granularity=86400)
+        # fill the resting orders crossed by the kline before the traders see it
+        ex.market_update_kline(symbol, kline)
 
-    #kline_emitter = KlineEmitter(src_granularity=granularity, dst_granularity=86400)
+        # the daily klines of the other timeframe strategies are built by the MultiTrader
+        mtrader.market_update_kline(symbol=symbol, kline=kline, granularity=granularity)
 
-    # create thread
-    if exec_pipe_threaded:
-        exec_pipe_thread = PipelineExecutionThread(exec_pipe=ep)
-        exec_pipe_thread.daemon = True
-        exec_pipe_thread.start()
-
-    # iterate through all rows in the DataFrame
-    for index, row in df.iterrows():
-        symbol = row['Symbol']
-        if symbol in symbols:
-            kline_data = {
-                'ts': row['Timestamp'],
-                'open': row['Open'],
-                'high': row['High'],
-                'low': row['Low'],
-                'close': row['Close'],
-                'volume': row['Volume USDT']
-            }
-
-            if symbol not in first_prices:
-                first_prices[symbol] = kline_data['close']
-
-            #print(kline_data)
-            kline.from_dict(kline_data)
-            kline.symbol = symbol
-            kline.granularity = granularity
-
-            # emit daily klines
-            kline_emitter = kline_emitters[symbol]
-            kline_emitter.update(kline)
-            if kline_emitter.ready():
-                kline_daily = kline_emitter.emit()
-                kline_emitter.reset()
-                if kline_daily:
-                    kline_daily.symbol = symbol
-                    kline_daily.granularity = kline_emitter.granularity()
-                    #mtrader.market_update(symbol=symbol, kline=kline, current_price=kline.close, current_ts=kline.ts, granularity=kline_emitter.granularity())
-                    mtrader.market_update_kline_other_timeframe(symbol=symbol, kline=kline_daily, granularity=kline_emitter.granularity(), preload=False)
-
-            mtrader.market_update_kline(symbol=symbol, kline=kline, granularity=granularity)
-
-            # update quote balance before trying to open positions
-            mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
-
-            mtrader.market_update_price(symbol=symbol, current_price=kline.close, current_ts=kline.ts, granularity=granularity)
-            last_prices[symbol] = kline_data['close']
+        # update quote balance before trying to open positions. This is done for every kline, not once per timestamp,
+        # because the fills above and the orders of the previous symbol at the same timestamp change the simulated
+        # balance, and reading it back from the simulated exchange is only a dict lookup
+        mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
+
+        mtrader.market_update_price(symbol=symbol, current_price=kline.close, current_ts=kline.ts, granularity=granularity)
 
     orders.commit()
     if tconfig.log_level() >= LogLevel.INFO.value:
@@ -163,11 +116,6 @@ def main(args):
     else:
         end_ts = int(datetime.fromisoformat(args.end_date).timestamp())
 
-    df = pd.read_csv(args.csv_path)
-
-    # print all unique strings from the Symbols column
-    unique_symbols = df['Symbol'].unique()
-
     tconfig = TraderConfig(path=f'config/{name}_trader_simulate_csv_config.json')
     if not tconfig.load_config():
         print(f"Failed to load config {tconfig.get_config_path()}")
@@ -186,34 +134,36 @@ def main(args):
 
     granularity = tconfig.granularity()
 
+    # load the klines for the selected symbols, sorted by timestamp
+    if args.archive:
+        # mapped from the archive written by tools/convert_klines_archive.py
+        feed = KlineArchive(args.archive).feed(granularity, symbols=symbols, start_ts=start_ts, end_ts=end_ts)
+    else:
+        feed = BacktestFeed.from_csv(args.csv_path, granularity=granularity, symbols=symbols, start_ts=start_ts, end_ts=end_ts)
     if tconfig.log_level() >= LogLevel.INFO.value:
-        print("Symbols:", unique_symbols)
-
-    # Convert the Date column to datetime format
-    df['Date'] = pd.to_datetime(df['Date'], format='mixed') #'%Y-%m-%d %H:%M:%S')
-    # Convert the Date column to unix timestamp
-    df['Timestamp'] = df['Date'].apply(lambda x: int(x.timestamp()))
-    # Sort the DataFrame by the Date column
-    df = df.sort_values(by='Date').reset_index(drop=True)
-    # Convert all symbols ending with 'USDT' to '-USDT'
-    df['Symbol'] = df['Symbol'].apply(lambda x: x.replace('USDT', '-USDT'))
-    # Display the first few rows of the DataFrame
-    if tconfig.log_level() >= LogLevel.INFO.value:
-        print(df.head())
-
-    # Filter the DataFrame by the Timestamp column
-    df = df[(df['Timestamp'] >= start_ts) & (df['Timestamp'] <= end_ts)]
-
+        print(f"Loaded {len(feed)} klines for symbols: {feed.symbols()}")
 
     market = Market(exchange=exchange, db_path=tconfig.market_db_path())
     account = AccountSimulate(exchange=exchange, market=market)
     account.load_symbol_info()
     account.load_asset_info()
 
-    mtrader, first_prices, last_prices = run_trader(tconfig, account, exchange, symbols, df, granularity, initial_usdt)
+    profiler = None
+    if args.profile or args.profile_json or args.profile_folded:
+        profiler = Profiler(report_interval=args.profile_interval)
 
-    #if exec_pipe_threaded:
-    #    exec_pipe_thread.join(timeout=5)
+    mtrader, first_prices, last_prices = run_trader(tconfig, account, exchange, symbols, feed, granularity, initial_usdt, profiler=profiler)
+
+    if profiler is not None:
+        print(profiler.summary())
+        if args.profile_json:
+            profiler.save_json(args.profile_json)
+        if args.profile_folded:
+            # render with flamegraph.pl or load into speedscope
+            profiler.save_folded(args.profile_folded)
+
+    if exec_pipe_threaded:
+        ep.shutdown()
 
     if tconfig.log_level() >= LogLevel.INFO.value:
         # calculate what the profit would be if we just bought and held
@@ -296,10 +246,15 @@ if __name__ == '__main__':
     parser.add_argument('--exchange', type=str, default="cbadv", help='Account to use for simulation')
     #parser.add_argument('--granularity', type=int, default=3600, help='Granularity of klines')
     parser.add_argument('--csv_path', type=str, default='data/crypto_hourly_data/cryptotoken_full_binance_1h.csv', help='Path to the CSV file')
+    parser.add_argument('--archive', type=str, default='', help='Kline archive directory to load the klines from instead of the CSV file')
     parser.add_argument('--symbols', type=str, default='BTC-USDT,ETH-USDT,SOL-USDT,HBAR-USDT,DOT-USDT,DOGE-USDT', help='Comma separated list of symbols')
     parser.add_argument('--strategy', type=str, default='', help='Strategy to use for simulation')
     parser.add_argument('--start_date', type=str, default='2020-08-11 06:00:00', help='Start date for klines')
     parser.add_argument('--end_date', type=str, default='2023-10-19 23:00:00', help='End date for klines')
     parser.add_argument('--log_level', type=int, default=3, help='Log level')
+    parser.add_argument('--profile', action='store_true', help='Time the strategy, signals, positions and orders per symbol and print a summary')
+    parser.add_argument('--profile_interval', type=float, default=0.0, help='Seconds between profile summaries during the run, 0 for only at the end')
+    parser.add_argument('--profile_json', type=str, default='', help='Write the profile timers and counters to this JSON file')
+    parser.add_argument('--profile_folded', type=str, default='', help='Write the profile in folded stack format for flamegraphs to this file')
     args = parser.parse_args()
     main(args)
@@ -5,13 +5,10 @@ from coinbase.websocket import WSClient, WebsocketResponse
 #from coinbase.rest import RESTExchange
 from datetime import datetime, timedelta
 from matplotlib import pyplot as plt
-from threading import Thread
-from threading import RLock
 import json
 import sys
 import time
 import argparse
-import itertools
 import gc
 
 try:
@@ -33,20 +30,15 @@ from cointrader.common.Kline import Kline
 from cointrader.common.LogLevel import LogLevel
 from cointrader.config import *
 from cointrader.indicators.EMA import EMA
-from cointrader.common.KlineEmitter import KlineEmitter
-from concurrent.futures import ThreadPoolExecutor
-
-class PipelineExecutionThread(Thread):
-    def __init__(self, exec_pipe: ExecutePipeline):
-        Thread.__init__(self)
-        self._exec_pipe = exec_pipe
-
-    def run(self):
-        while True:
-            self._exec_pipe.process_order_requests()
-            time.sleep(1 / 1000) # sleep for 1ms
-
-def run_trader(exchange: str, symbols: list[str], df: pd.DataFrame, initial_usdt: float, strategy_weights: dict[str, float] = None, count=0, name=""):
+from cointrader.common.TimeframeAggregator import TimeframeAggregator
+from cointrader.backtest.BacktestFeed import BacktestFeed
+from cointrader.backtest.KlineArchive import KlineArchive
+from cointrader.backtest.WeightOptimizer import WeightOptimizer, DrawdownPruner
+from cointrader.backtest.SignalStateMatrix import SignalStateMatrix
+from cointrader.common.KlineArray import KlineArray
+import numpy as np
+
+def run_trader(exchange: str, symbols: list[str], feed: BacktestFeed, initial_usdt: float, strategy_weights: dict[str, float] = None, count=0, name="", pruner: DrawdownPruner = None, strategy: str = "SignalStrength"):
     tconfig = TraderConfig(path=f'config/{name}_trader_simulate_csv_config.json')
     if not tconfig.load_config():
         print(f"Failed to load config {tconfig.get_config_path()}")
@@ -59,7 +51,10 @@ def run_trader(exchange: str, symbols: list[str], df: pd.DataFrame, initial_usdt
 
     #if args.strategy and tconfig.strategy() != args.strategy:
     #    tconfig.set_strategy(args.strategy)
-    tconfig.set_strategy("SignalStrength" )
+    tconfig.set_strategy(strategy)
+    if strategy != "SignalStrength":
+        # use the same strategy for the other timeframes, so no signals are run at all
+        tconfig.set_strategies_other_timeframes([s.replace("SignalStrength:", f"{strategy}:") for s in tconfig.strategies_other_timeframes()])
 
     #print(f"Using strategy: {tconfig.strategy()} db_path: {tconfig.orders_db_path()}")
 
@@ -92,79 +87,37 @@ def run_trader(exchange: str, symbols: list[str], df: pd.DataFrame, initial_usdt
     # update quote balance before trying to open positions
     mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
 
-    kline = Kline()
-    #kline.set_dict_names(ts='start')
+    first_prices = feed.first_prices()
+    last_prices = feed.last_prices()
 
-    first_prices = {}
-    last_prices = {}
+    # start the order execution threads
+    if exec_pipe_threaded:
+        ep.start()
 
-    kline_emitters: dict[str, KlineEmitter] = {}
 
-    # emitter takes in hourly klines, and emits daily klines
-    for symbol in symbols:
-        kline_emitters[symbol] = KlineEmitter(src_granularity=granularity, dst_granularity=86400)
+    found = False
 
-    #kline_emitter = KlineEmitter(src_granularity=granularity, dst_granularity=86400)
+    # iterate through all klines in timestamp order
+    for kline in feed:
+        symbol = kline.symbol
 
-    # create thread
-    if exec_pipe_threaded:
-        exec_pipe_thread = PipelineExecutionThread(exec_pipe=ep)
-        exec_pipe_thread.daemon = True
-        exec_pipe_thread.start()
+        # fill the resting orders crossed by the kline before the traders see it
+        ex.market_update_kline(symbol, kline)
 
+        # the daily klines of the other timeframe strategies are built by the MultiTrader
+        mtrader.market_update_kline(symbol=symbol, kline=kline, granularity=granularity)
 
-    found = False
+        # update quote balance before trying to open positions. This is done for every kline, not once per timestamp,
+        # because the fills above and the orders of the previous symbol at the same timestamp change the simulated
+        # balance, and reading it back from the simulated exchange is only a dict lookup
+        mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
+
+        mtrader.market_update_price(symbol=symbol, current_price=kline.close, current_ts=kline.ts, granularity=granularity)
 
-    # iterate through all rows in the DataFrame
-    for index, row in df.iterrows():
-        # if index >= 100000:
-        #     if not found:
-        #         position_count = 0
-        #         for symbol in symbols:
-        #             position_count += mtrader.total_position_count(symbol)
-        #         if position_count == 0:
-        #             #print(f"Exiting at index {index} with no positions")
-        #             break
-        #         #print(f"{count} strategy_weights={strategy_weights}")
-        #         found = True
-        symbol = row['Symbol']
-        if symbol in symbols:
-            kline_data = {
-                'ts': row['Timestamp'],
-                'open': row['Open'],
-                'high': row['High'],
-                'low': row['Low'],
-                'close': row['Close'],
-                'volume': row['Volume USDT']
-            }
-
-            if symbol not in first_prices:
-                first_prices[symbol] = kline_data['close']
-
-            #print(kline_data)
-            kline.from_dict(kline_data)
-            kline.symbol = symbol
-            kline.granularity = granularity
-
-            # emit daily klines
-            kline_emitter = kline_emitters[symbol]
-            kline_emitter.update(kline)
-            if kline_emitter.ready():
-                kline_daily = kline_emitter.emit()
-                kline_emitter.reset()
-                if kline_daily:
-                    kline_daily.symbol = symbol
-                    kline_daily.granularity = kline_emitter.granularity()
-                    #mtrader.market_update(symbol=symbol, kline=kline, current_price=kline.close, current_ts=kline.ts, granularity=kline_emitter.granularity())
-                    mtrader.market_update_kline_other_timeframe(symbol=symbol, kline=kline_daily, granularity=kline_emitter.granularity())
-
-            mtrader.market_update_kline(symbol=symbol, kline=kline, granularity=granularity)
-
-            # update quote balance before trying to open positions
-            mtrader.market_update_quote_balance(quote_name=tconfig.quote_currency())
-
-            mtrader.market_update_price(symbol=symbol, current_price=kline.close, current_ts=kline.ts, granularity=granularity)
-            last_prices[symbol] = kline_data['close']
+        # stop early if the drawdown of the closed positions so far rules out these weights
+        if pruner is not None and pruner.step():
+            if pruner.update(sum(mtrader.net_profit_percent(symbol) for symbol in symbols)):
+                break
 
     #orders.commit()
     if tconfig.log_level() >= LogLevel.INFO.value:
@@ -179,12 +132,118 @@ def run_trader(exchange: str, symbols: list[str], df: pd.DataFrame, initial_usdt
     return mtrader, first_prices, last_prices
 
 
+# exchange for each worker process, created on first use
+_exchanges = {}
+# signal state cache directory that was loaded in this process
+_signal_cache = None
+
+def daily_klines(klines: KlineArray, src_granularity: int = 3600) -> KlineArray:
+    """
+    Daily klines for a symbol, emitted the same way as in run_trader()
+    """
+    aggregator = TimeframeAggregator(src_granularity=src_granularity, dst_granularities=[86400], symbol=klines.symbol)
+    result = []
+    for kline in klines:
+        result.extend(aggregator.update(kline))
+    return KlineArray.from_klines(result, symbol=klines.symbol, granularity=86400)
+
+def load_signal_matrices(feed: BacktestFeed, cache_dir: str):
+    """
+    Load (or compute and cache) the signal states of every symbol in the feed for the hourly and daily klines,
+    and register them for the SignalStrengthCached strategy
+    """
+    matrices = []
+    for symbol in feed.symbols():
+        klines = feed.klines(symbol)
+        for symbol_klines in [klines, daily_klines(klines, src_granularity=feed.granularity())]:
+            matrix = SignalStateMatrix.from_kline_array(symbol_klines, cache_dir=cache_dir)
+            matrix.register()
+            matrices.append(matrix)
+    return matrices
+
+def evaluate_weights(feed: BacktestFeed, strategy_weights: dict[str, float], name: str, initial_usdt: float, max_drawdown: float = 0.0, check_interval: int = 1000, signal_cache: str = None):
+    """
+    Run a backtest with strategy_weights in a WeightOptimizer worker process
+    """
+    global _signal_cache
+    if name not in _exchanges:
+        _exchanges[name] = TraderSelectExchange(name).get_exchange()
+    exchange = _exchanges[name]
+
+    strategy = "SignalStrength"
+    if signal_cache:
+        if _signal_cache != signal_cache:
+            load_signal_matrices(feed, signal_cache)
+            _signal_cache = signal_cache
+        strategy = "SignalStrengthCached"
+
+    symbols = feed.symbols()
+    pruner = DrawdownPruner(max_drawdown=max_drawdown, check_interval=check_interval) if max_drawdown > 0 else None
+
+    # Simulate trading with these weights
+    mtrader, _, _ = run_trader(exchange, symbols, feed, initial_usdt, strategy_weights, name=name, pruner=pruner, strategy=strategy)
+
+    total_positive_profit = sum(
+        mtrader.positive_profit_percent(symbol) for symbol in symbols
+    )
+    total_negative_profit = sum(
+        mtrader.negative_profit_percent(symbol) for symbol in symbols
+    )
+    net_profit = total_positive_profit + total_negative_profit
+
+    if pruner is not None and pruner.pruned():
+        return {'pruned': True, 'net_profit': net_profit, 'drawdown': pruner.drawdown()}
+
+    # Ignore cases where any profits are zero or mostly negative profits
+    if total_positive_profit == 0 or total_negative_profit == 0 or net_profit <= 0:
+        return None
+
+    return {
+        'total_positive_profit': total_positive_profit,
+        'total_negative_profit': total_negative_profit,
+        'net_profit': net_profit
+    }
+
+
+def vectorized_search(optimizer: WeightOptimizer, matrices: list[SignalStateMatrix], indicators: list[str], min_nonzero: int, batch_size: int, top: int):
+    """
+    Rank every combination by the signal returns of the hourly signal state matrices, without running a backtest
+    """
+    columns = [matrices[0].names.index(indicator) for indicator in indicators]
+    best_scores = np.empty(0)
+    best_indices = np.empty(0, dtype=np.int64)
+    start_time = time.time()
+    count = optimizer.combination_count()
+    for start in range(0, count, batch_size):
+        combinations = optimizer.weight_matrix(start, start + batch_size)
+        indices = np.arange(start, start + len(combinations), dtype=np.int64)
+        selected = (combinations != 0).sum(axis=1) >= min_nonzero
+        combinations = combinations[selected]
+        indices = indices[selected]
+        if len(indices) == 0:
+            continue
+
+        weights = np.zeros((len(matrices[0].names), len(combinations)))
+        weights[columns] = combinations.T
+        scores = sum(matrix.signal_returns(weights) for matrix in matrices)
+
+        # keep the top scores seen so far
+        best_scores = np.concatenate((best_scores, scores))
+        best_indices = np.concatenate((best_indices, indices))
+        order = np.argsort(-best_scores, kind='stable')[:top]
+        best_scores = best_scores[order]
+        best_indices = best_indices[order]
+
+    elapsed = time.time() - start_time
+    print(f"Scored {count} combinations in {elapsed:.1f} seconds")
+    for score, index in zip(best_scores.tolist(), best_indices.tolist()):
+        print(f"{index} Signal return: {score * 100:.2f}% with weights {optimizer.combination(index)}")
+
+
 def main(args):
     name = args.exchange
     initial_usdt = args.initial_usdt
 
-    exchange = TraderSelectExchange(name).get_exchange()
-
     symbols = args.symbols.split(',')
 
     start_ts = int(datetime.fromisoformat(args.start_date).timestamp())
@@ -193,52 +252,14 @@ def main(args):
     else:
         end_ts = int(datetime.fromisoformat(args.end_date).timestamp())
 
-    df = pd.read_csv(args.csv_path)
-
-    # print all unique strings from the Symbols column
-    unique_symbols = df['Symbol'].unique()
-    print("Symbols:", unique_symbols)
-
-    # Convert the Date column to datetime format
-    df['Date'] = pd.to_datetime(df['Date'], format='mixed') #'%Y-%m-%d %H:%M:%S')
-    # Convert the Date column to unix timestamp
-    df['Timestamp'] = df['Date'].apply(lambda x: int(x.timestamp()))
-    # Sort the DataFrame by the Date column
-    df = df.sort_values(by='Date').reset_index(drop=True)
-    # Convert all symbols ending with 'USDT' to '-USDT'
-    df['Symbol'] = df['Symbol'].apply(lambda x: x.replace('USDT', '-USDT'))
-    # Display the first few rows of the DataFrame
-    print(df.head())
-
-    # Filter the DataFrame by the Timestamp column
-    df = df[(df['Timestamp'] >= start_ts) & (df['Timestamp'] <= end_ts)]
-
-    # generate weights for strategies
-    strategy_weights = {
-                'macd': 0,
-                'sama': 0,
-                'zlema': 0,
-                'rsi': 0,
-                'stochastic': 0,
-                'ema': 0,
-                'sma': 0,
-                'supertrend': 0.8,
-                'adx': 0,
-                'squeeze': 0,
-                'psar': 0,
-                'vwap': 0,
-                'ppo': 0,
-                'cmf': 0,
-                'cci': 0,
-                'ao': 0,
-                'uo': 0,
-                'dpo': 0,
-                'ichimoku': 0,
-                'vo': 0,
-                'kvo': 0,
-                'eom': 0,
-                'kst': 1.0,
-            }
+    # load the hourly klines for the selected symbols, sorted by timestamp
+    if args.archive:
+        # mapped from the archive written by tools/convert_klines_archive.py
+        feed = KlineArchive(args.archive).feed(3600, symbols=symbols, start_ts=start_ts, end_ts=end_ts)
+    else:
+        feed = BacktestFeed.from_csv(args.csv_path, granularity=3600, symbols=symbols, start_ts=start_ts, end_ts=end_ts)
+    print(f"Loaded {len(feed)} klines for symbols: {feed.symbols()}")
+
     # Define possible weights for each indicator
     weight_values = [0, 0.5]
     indicators = [
@@ -247,99 +268,50 @@ def main(args):
         'uo', 'dpo', 'ichimoku', 'vo', 'kvo', 'eom', 'kst'
     ]
 
-    # Cartesian product of weights for all indicators
-    all_combinations = itertools.product(weight_values, repeat=len(indicators))
-
-    # Initialize variables
-    best_weights = None
-    best_positive_profit = float('-inf')
-    best_negative_profit = float('inf')
-    best_net_profit = float('-inf')
-
-    best_positive_profit_weights = None
-    best_negative_profit_weights = None
-    best_net_profit_weights = None
-
-    count = 0
-
-    def simulate_combination(combination, count):
-        strategy_weights = dict(zip(indicators, combination))
-        
-        # Ensure at least three weights are non-zero
-        if sum(weight > 0 for weight in strategy_weights.values()) < 4:
-            return None
-
-        # Simulate trading with these weights
-        mtrader, _, _ = run_trader(
-            exchange, symbols, df, initial_usdt, strategy_weights, count, name
-        )
-
-        total_positive_profit = sum(
-            mtrader.positive_profit_percent(symbol) for symbol in symbols
-        )
-        total_negative_profit = sum(
-            mtrader.negative_profit_percent(symbol) for symbol in symbols
-        )
-        net_profit = total_positive_profit + total_negative_profit
-
-        del mtrader
-
-        # Ignore cases where any profits are zero or mostly negative profits
-        if total_positive_profit == 0 or total_negative_profit == 0 or net_profit <= 0:
-            return None
-
-        #print(f"{count} Positive profit: {total_positive_profit:.2f}%")
-        #print(f"{count} Negative profit: {total_negative_profit:.2f}%")
-        #print(f"{count} Net profit: {net_profit:.2f}%")
-
-        return {
-            'combination': combination,
-            'total_positive_profit': total_positive_profit,
-            'total_negative_profit': total_negative_profit,
-            'net_profit': net_profit
-        }
-
-    lock = RLock()
-    futures = []
-
-    #with ThreadPoolExecutor(max_workers=6) as executor:
-    #    futures = [executor.submit(simulate_combination, combination, count) for count, combination in enumerate(all_combinations)]
-        #for future in futures:
-        #    result = future.result()
-        #    if result:
-        #        with lock:
-    for count, combination in enumerate(all_combinations):
-        result = simulate_combination(combination, count)
-        if result is None:
-            continue
-        combination = result['combination']
-        total_positive_profit = result['total_positive_profit']
-        total_negative_profit = result['total_negative_profit']
-        net_profit = result['net_profit']
-
-        if total_positive_profit > best_positive_profit:
-            best_positive_profit = total_positive_profit
-            best_positive_profit_weights = combination
-            print(f"{count} Best positive profit: {best_positive_profit:.2f}% with weights {best_positive_profit_weights}")
-            print(f"\t{count} negative profit: {total_negative_profit:.2f}%")
-
-        if abs(total_negative_profit) < abs(best_negative_profit):
-            best_negative_profit = total_negative_profit
-            best_negative_profit_weights = combination
-            print(f"{count} Best negative profit: {best_negative_profit:.2f}% with weights {best_negative_profit_weights}")
-            print(f"\t{count} net profit: {net_profit:.2f}%")
-
-        if net_profit > best_net_profit:
-            best_net_profit = net_profit
-            best_net_profit_weights = combination
-            print(f"{count} Best net profit: {best_net_profit:.2f}% with weights {best_net_profit_weights}")
-            print(f"\t{count} positive profit: {total_positive_profit:.2f}%")
-            print(f"\t{count} negative profit: {total_negative_profit:.2f}%")
-
-    print(f"Final Best positive profit: {best_positive_profit:.2f}% with weights {best_positive_profit_weights}")
-    print(f"Final Best negative profit: {best_negative_profit:.2f}% with weights {best_negative_profit_weights}")
-    print(f"Final Best net profit: {best_net_profit:.2f}% with weights {best_net_profit_weights}")
-
+    signal_cache = args.signal_cache if args.signal_cache else None
+    if signal_cache or args.vectorized:
+        # run the signals once per symbol here, the workers then load the states from the cache
+        matrices = load_signal_matrices(feed, signal_cache)
+        print(f"Loaded signal states for {len(matrices)} symbols and timeframes")
+
+    optimizer = WeightOptimizer(feed=feed, names=indicators, evaluate=evaluate_weights, weight_values=weight_values,
+                                options={'name': name, 'initial_usdt': initial_usdt, 'max_drawdown': args.max_drawdown, 'check_interval': args.check_interval, 'signal_cache': signal_cache},
+                                max_workers=args.workers, min_nonzero=4, scores=['total_positive_profit', 'total_negative_profit', 'net_profit'],
+                                checkpoint_path=args.checkpoint if args.checkpoint else None)
+
+    if args.vectorized:
+        hourly = [matrix for matrix in matrices if matrix.granularity == feed.granularity()]
+        vectorized_search(optimizer, hourly, indicators, min_nonzero=4, batch_size=args.batch_size, top=args.top)
+        return
+
+    print(f"Searching {optimizer.combination_count()} combinations starting at {optimizer.next_index()}")
+
+    # results are printed as they finish, so they are not in combination order
+    for record in optimizer.run():
+        count = record['index']
+        result = record['result']
+        combination = tuple(record['weights'].values())
+        if 'total_positive_profit' in record['best']:
+            print(f"{count} Best positive profit: {result['total_positive_profit']:.2f}% with weights {combination}")
+            print(f"\t{count} negative profit: {result['total_negative_profit']:.2f}%")
+
+        # the negative profit is always <= 0, so the best is the one closest to zero
+        if 'total_negative_profit' in record['best']:
+            print(f"{count} Best negative profit: {result['total_negative_profit']:.2f}% with weights {combination}")
+            print(f"\t{count} net profit: {result['net_profit']:.2f}%")
+
+        if 'net_profit' in record['best']:
+            print(f"{count} Best net profit: {result['net_profit']:.2f}% with weights {combination}")
+            print(f"\t{count} positive profit: {result['total_positive_profit']:.2f}%")
+            print(f"\t{count} negative profit: {result['total_negative_profit']:.2f}%")
+
+    print(f"Evaluated {optimizer.evaluated()} combinations, pruned {optimizer.pruned()}")
+    best = optimizer.best()
+    for score, label in [('total_positive_profit', 'positive profit'), ('total_negative_profit', 'negative profit'), ('net_profit', 'net profit')]:
+        if score in best:
+            print(f"Final Best {label}: {best[score]['result'][score]:.2f}% with weights {tuple(best[score]['weights'].values())}")
+        else:
+            print(f"Final Best {label}: none")
 
 
 if __name__ == '__main__':
@@ -348,9 +320,18 @@ if __name__ == '__main__':
     parser.add_argument('--exchange', type=str, default="cbadv", help='Account to use for simulation')
     #parser.add_argument('--granularity', type=int, default=3600, help='Granularity of klines')
     parser.add_argument('--csv_path', type=str, default='data/crypto_hourly_data/cryptotoken_full_binance_1h.csv', help='Path to the CSV file')
+    parser.add_argument('--archive', type=str, default='', help='Kline archive directory to load the klines from instead of the CSV file')
     parser.add_argument('--symbols', type=str, default='BTC-USDT,ETH-USDT,SOL-USDT,HBAR-USDT,DOT-USDT', help='Comma separated list of symbols')
     parser.add_argument('--strategy', type=str, default='', help='Strategy to use for simulation')
     parser.add_argument('--start_date', type=str, default='2020-08-11 06:00:00', help='Start date for klines')
     parser.add_argument('--end_date', type=str, default='2023-10-19 23:00:00', help='End date for klines')
+    parser.add_argument('--workers', type=int, default=0, help='Number of worker processes (default: number of cores)')
+    parser.add_argument('--checkpoint', type=str, default='', help='Checkpoint file to resume the search from')
+    parser.add_argument('--max_drawdown', type=float, default=0.0, help='Stop a backtest early once its net profit percent drops this much below its peak (0 to disable)')
+    parser.add_argument('--check_interval', type=int, default=1000, help='Number of klines between drawdown checks')
+    parser.add_argument('--signal_cache', type=str, default='', help='Directory to cache the signal states in, so the backtests replay them instead of running the signals')
+    parser.add_argument('--vectorized', action='store_true', help='Rank the combinations with the signal states only, without running backtests')
+    parser.add_argument('--batch_size', type=int, default=1024, help='Number of combinations scored at once with --vectorized')
+    parser.add_argument('--top', type=int, default=20, help='Number of best combinations to print with --vectorized')
     args = parser.parse_args()
     main(args)